@@ -1,7 +1,7 @@
-import pygame
 from OpenGL.GL import *
 from OpenGL.GLUT import *
 from OpenGL.GLU import *
+import os
 import sys
 import threading
 import socket
@@ -9,6 +9,19 @@ import json
 import logging
 import time
 import math
+import struct
+import ctypes
+import io
+import numpy as np
+from OpenGL.raw.GL.VERSION.GL_1_0 import glReadPixels as read_pixels_into
+from collections import deque
+from scene_geometry import SceneArrays, GeometryBuffer, ClipRegion, build_geometry, transform_points, clip_segments, \
+    clip_polygons, pixel_boxes, WORLD_WINDOW, VERTEX_FLOATS
+
+try:
+    import msgpack # Opsional: format biner 'msgpack' hanya ditawarkan jika terpasang
+except ImportError:
+    msgpack = None
 
 # --- Konfigurasi Logging ---
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -30,6 +43,11 @@ DRAW_MODE_TRIANGLE = 3
 DRAW_MODE_ELLIPSE = 4
 DRAW_MODE_RECTANGLE = 5 # <--- BARU: Mode gambar persegi
 DRAW_MODE_CLIP_WINDOW = 6 # <--- Urutan berubah, jadi ini jadi 6
+DRAW_MODE_POLYGON = 7 # Poligon dengan jumlah verteks bebas (boleh cekung)
+DRAW_MODE_POLYLINE = 8 # Rangkaian garis terbuka dengan jumlah verteks bebas
+DRAW_MODE_CLIP_POLYGON = 9 # Daerah clipping poligon konveks (klik verteks-verteksnya)
+SHAPE_MODES = (DRAW_MODE_POLYGON, DRAW_MODE_POLYLINE)
+SHAPE_CLOSE_DISTANCE = 0.03 # Klik sedekat ini ke titik pertama (poligon) / terakhir (polyline) menyelesaikan bentuk
 
 current_draw_mode = DRAW_MODE_NONE
 drawing_points = []
@@ -43,20 +61,124 @@ drawing_points = []
 # 'transformations': dictionary untuk transformasi spesifik objek {'translate': [tx,ty], 'rotate': angle, 'scale': [sx,sy]}
 drawn_objects = []
 
-# Variabel untuk clipping window
-clipping_window_coords = {'x_min': -0.7, 'y_min': -0.7, 'x_max': 0.7, 'y_max': 0.7}
+# Daerah clipping: poligon-poligon konveks (scene_geometry.ClipRegion). Dengan clipping aktif,
+# objek hanya terlihat di dalam gabungan semua daerah.
+DEFAULT_CLIP_WINDOW = (-0.7, -0.7, 0.7, 0.7) # x_min, y_min, x_max, y_max
+clip_regions = [ClipRegion.rectangle(*DEFAULT_CLIP_WINDOW)]
+clip_region_append = False # Daerah yang digambar dengan mouse ditambahkan (True) atau menggantikan semua daerah
 clipping_enabled = False
 
 selected_object_index = -1 # Index objek yang sedang dipilih, -1 jika tidak ada.
 
-# Variabel untuk fitur drag jendela clipping
-is_dragging_clipping_window = False
+# Variabel untuk fitur drag daerah clipping
+dragged_clip_region = -1 # Indeks daerah clipping yang sedang di-drag, -1 jika tidak ada.
 drag_start_x = 0.0 # Posisi X awal klik saat memulai drag
 drag_start_y = 0.0 # Posisi Y awal klik saat memulai drag
-# Offset dari titik klik ke sudut kiri bawah jendela clipping
+# Offset dari titik klik ke verteks pertama daerah clipping (sudut kiri bawah untuk persegi)
 drag_offset_x = 0.0
 drag_offset_y = 0.0
 
+# Viewport yang menerima klik terakhir (drag berlanjut di viewport yang sama), dan pan dengan klik tengah
+active_viewport = None
+panned_viewport = None
+pan_anchor = (0.0, 0.0) # Titik dunia yang dipegang kursor selama pan
+VIEW_ZOOM_STEP = 1.25 # Faktor zoom per langkah scroll mouse
+
+redraw_needed = True # Diset oleh thread lain (perintah, snapshot); idle() meminta redraw
+frame_counter = 0 # Jumlah frame yang sudah digambar oleh display()
+
+
+# --- Protokol Biner (opsional) ---
+# Koneksi yang diawali BINARY_PROTOCOL_MAGIC membuka sesi biner yang tetap terbuka:
+#   handshake klien : MAGIC + jumlah format (1 byte) + id format yang ditawarkan
+#   balasan server  : MAGIC + id format yang dipilih
+#   setelah itu     : frame = panjang (uint32 big-endian) + payload, satu perintah per frame
+# Payload diawali 1 byte tag: TAG_SCHEMA (skema tetap struct), TAG_MSGPACK, atau TAG_JSON.
+# Koneksi tanpa MAGIC tetap memakai protokol lama (satu perintah JSON per koneksi).
+BINARY_PROTOCOL_MAGIC = b'GKB1'
+PROTOCOL_FORMATS = ('msgpack', 'struct', 'json') # Urutan preferensi server
+PROTOCOL_FORMAT_IDS = {'json': 0, 'struct': 1, 'msgpack': 2}
+PROTOCOL_FORMAT_NAMES = {format_id: name for name, format_id in PROTOCOL_FORMAT_IDS.items()}
+TAG_SCHEMA = 0x01
+TAG_MSGPACK = 0x02
+TAG_JSON = 0x03
+FRAME_HEADER = struct.Struct('>I')
+
+# Skema tetap untuk perintah transformasi (frekuensi tinggi saat slider digeser):
+# tag, indeks aksi, dua nilai float32. Field yang dipakai tergantung aksinya.
+TRANSFORM_ACTIONS = ('translate', 'rotate', 'scale', 'reset_transforms')
+TRANSFORM_FIELDS = {
+    'translate': ('x', 'y'),
+    'rotate': ('angle',),
+    'scale': ('scale_x', 'scale_y'),
+    'reset_transforms': ()
+}
+TRANSFORM_STRUCT = struct.Struct('<BBff')
+# Respon skema tetap: tag, status (0 = success, 1 = error), lalu pesan UTF-8
+RESPONSE_STRUCT = struct.Struct('<BB')
+
+def available_protocol_formats():
+    """Format yang didukung sisi ini, urut dari yang paling disukai."""
+    return [fmt for fmt in PROTOCOL_FORMATS if fmt != 'msgpack' or msgpack is not None]
+
+def encode_command(command_data, fmt):
+    """Mengubah dictionary perintah menjadi payload biner sesuai format sesi."""
+    if fmt != 'json' and command_data.get("type") == "transform" and command_data.get("action") in TRANSFORM_FIELDS:
+        action = command_data["action"]
+        fields = TRANSFORM_FIELDS[action]
+        if set(command_data) <= {"type", "action"} | set(fields):
+            values = [float(command_data.get(field, 0.0)) for field in fields]
+            values += [0.0] * (2 - len(values))
+            return TRANSFORM_STRUCT.pack(TAG_SCHEMA, TRANSFORM_ACTIONS.index(action), *values)
+    if fmt == 'msgpack' and msgpack is not None:
+        return bytes([TAG_MSGPACK]) + msgpack.packb(command_data, use_bin_type=True)
+    return bytes([TAG_JSON]) + json.dumps(command_data).encode('utf-8')
+
+def decode_command(payload):
+    """Kebalikan encode_command: payload biner -> dictionary perintah."""
+    tag = payload[0]
+    if tag == TAG_SCHEMA:
+        _, action_index, first, second = TRANSFORM_STRUCT.unpack(payload)
+        action = TRANSFORM_ACTIONS[action_index]
+        command_data = {"type": "transform", "action": action}
+        command_data.update(zip(TRANSFORM_FIELDS[action], (first, second)))
+        return command_data
+    if tag == TAG_MSGPACK and msgpack is not None:
+        return msgpack.unpackb(payload[1:], raw=False)
+    if tag == TAG_JSON:
+        return json.loads(payload[1:].decode('utf-8'))
+    raise ValueError(f"Tag payload tidak dikenal: 0x{tag:02x}")
+
+def encode_response(response, fmt):
+    """Respon {'status', 'message'} dalam format sesi."""
+    if fmt != 'json' and set(response) == {"status", "message"}:
+        status = 0 if response["status"] == "success" else 1
+        return RESPONSE_STRUCT.pack(TAG_SCHEMA, status) + str(response["message"]).encode('utf-8')
+    if fmt == 'msgpack' and msgpack is not None:
+        return bytes([TAG_MSGPACK]) + msgpack.packb(response, use_bin_type=True)
+    return bytes([TAG_JSON]) + json.dumps(response).encode('utf-8')
+
+def decode_response(payload):
+    tag = payload[0]
+    if tag == TAG_SCHEMA:
+        _, status = RESPONSE_STRUCT.unpack_from(payload)
+        return {"status": "success" if status == 0 else "error",
+                "message": payload[RESPONSE_STRUCT.size:].decode('utf-8')}
+    return decode_command(payload)
+
+def send_frame(sock, payload):
+    sock.sendall(FRAME_HEADER.pack(len(payload)) + payload)
+
+def read_frame(reader):
+    """Membaca satu frame dari file soket (makefile('rb')); None jika koneksi ditutup."""
+    header = reader.read(FRAME_HEADER.size)
+    if len(header) < FRAME_HEADER.size:
+        return None
+    length, = FRAME_HEADER.unpack(header)
+    payload = reader.read(length)
+    if len(payload) < length:
+        return None
+    return payload
 
 # --- Kelas Server Perintah PyOpenGL ---
 class PyOpenGLCommandServer:
@@ -67,6 +189,9 @@ class PyOpenGLCommandServer:
         self.server_socket = None
         self.running = False
         self.thread = None
+        # Sesi biner berjalan di thread masing-masing, bersamaan dengan loop
+        # accept JSON; callback dieksekusi satu per satu
+        self.command_lock = threading.Lock()
 
     def start(self):
         """Memulai server soket di thread terpisah."""
@@ -85,6 +210,10 @@ class PyOpenGLCommandServer:
             
             while self.running:
                 conn, addr = self.server_socket.accept()
+                # Klien protokol biner mengirim handshake (dengan MAGIC) dalam satu kali kirim
+                if conn.recv(len(BINARY_PROTOCOL_MAGIC), socket.MSG_PEEK) == BINARY_PROTOCOL_MAGIC:
+                    threading.Thread(target=self._serve_binary_session, args=(conn, addr), daemon=True).start()
+                    continue
                 with conn:
                     logging.info(f"Koneksi diterima dari {addr}")
                     data = conn.recv(1024).decode('utf-8')
@@ -101,6 +230,49 @@ class PyOpenGLCommandServer:
                 self.server_socket.close()
             logging.info("PyOpenGL Command Server dihentikan.")
 
+    def _serve_binary_session(self, conn, addr):
+        """
+        Melayani satu sesi protokol biner: handshake pemilihan format, lalu
+        perintah ber-frame sampai klien menutup koneksi.
+        """
+        with conn, conn.makefile('rb') as reader:
+            try:
+                header = reader.read(len(BINARY_PROTOCOL_MAGIC) + 1)
+                offered = reader.read(header[-1]) if len(header) == len(BINARY_PROTOCOL_MAGIC) + 1 else b''
+                offered_names = {PROTOCOL_FORMAT_NAMES.get(format_id) for format_id in offered}
+                fmt = next((name for name in available_protocol_formats() if name in offered_names), 'json')
+                conn.sendall(BINARY_PROTOCOL_MAGIC + bytes([PROTOCOL_FORMAT_IDS[fmt]]))
+                logging.info(f"Sesi protokol biner '{fmt}' dari {addr}")
+
+                while self.running:
+                    payload = read_frame(reader)
+                    if payload is None:
+                        break
+                    try:
+                        command_data = decode_command(payload)
+                    except (ValueError, IndexError, struct.error, json.JSONDecodeError) as e:
+                        response = {"status": "error", "message": f"Payload biner tidak valid: {e}"}
+                    else:
+                        logging.debug(f"Perintah biner diterima: {command_data}")
+                        response = self._execute_command(command_data)
+                    send_frame(conn, encode_response(response, fmt))
+            except OSError as e:
+                logging.warning(f"Sesi protokol biner dari {addr} terputus: {e}")
+        logging.info(f"Sesi protokol biner dari {addr} ditutup")
+
+    def _execute_command(self, command_data):
+        """Memanggil fungsi callback dengan perintah yang sudah diuraikan dan mengembalikan respon."""
+        try:
+            if self.command_callback:
+                with self.command_lock:
+                    self.command_callback(command_data)
+                return {"status": "success", "message": "Perintah dieksekusi"}
+        except Exception as e:
+            logging.error(f"Error memproses perintah: {e}")
+            return {"status": "error", "message": f"Gagal memproses perintah: {e}"}
+        
+        return {"status": "error", "message": "Perintah tidak dikenali atau callback tidak ada"}
+
     def _process_command(self, command_string):
         """
         Menguraikan string perintah (diharapkan dalam format JSON) dan memanggil fungsi callback.
@@ -108,17 +280,10 @@ class PyOpenGLCommandServer:
         """
         try:
             command_data = json.loads(command_string) 
-            if self.command_callback:
-                self.command_callback(command_data) 
-                return json.dumps({"status": "success", "message": "Perintah dieksekusi"})
         except json.JSONDecodeError:
             logging.warning(f"Perintah non-JSON diterima: {command_string}. Mengabaikan.")
             return json.dumps({"status": "error", "message": "Perintah diterima dalam format tidak valid (bukan JSON)."})
-        except Exception as e:
-            logging.error(f"Error memproses perintah: {e}")
-            return json.dumps({"status": "error", "message": f"Gagal memproses perintah: {e}"})
-        
-        return json.dumps({"status": "error", "message": "Perintah tidak dikenali atau callback tidak ada"})
+        return json.dumps(self._execute_command(command_data))
 
     def stop(self):
         """Menghentikan server soket dengan aman."""
@@ -130,6 +295,107 @@ class PyOpenGLCommandServer:
         if self.thread:
             self.thread.join(timeout=1)
 
+# --- Snapshot Frame (untuk /api/snapshot) ---
+def encode_png(pixels, width, height):
+    """Mengubah piksel RGB dari glReadPixels (baris bawah lebih dulu) menjadi bytes PNG."""
+    import pygame # Diimpor saat snapshot pertama saja: impor pygame memperlambat startup
+    surface = pygame.image.frombuffer(pixels, (width, height), 'RGB')
+    buffer = io.BytesIO()
+    pygame.image.save(pygame.transform.flip(surface, False, True), buffer, 'frame.png')
+    return buffer.getvalue()
+
+class FrameSnapshot:
+    """
+    Readback frame secara asinkron untuk snapshot.
+    display() menyalin framebuffer ke salah satu dari dua pixel buffer object (PBO)
+    secara bergantian; glReadPixels ke PBO tidak menunggu GPU. idle() memetakan PBO
+    itu setelah frame selesai. Encoding PNG dikerjakan thread yang meminta snapshot
+    (bukan thread render), sekali per frame: permintaan untuk frame yang sama memakai
+    bytes yang sama.
+    """
+    def __init__(self):
+        self.buffers = None
+        self.size = None
+        self.pending = [None, None] # (frame_id, lebar, tinggi) yang sudah dibaca ke tiap PBO, belum dipetakan
+        self.index = 0
+        self.wanted_after = None # Ada permintaan yang menunggu frame setelah nomor ini
+        self.condition = threading.Condition()
+        self.encode_lock = threading.Lock()
+        self.frame = None # (frame_id, piksel, lebar, tinggi) terakhir
+        self.png = None # (frame_id, bytes PNG) terakhir
+
+    @property
+    def busy(self):
+        return any(self.pending)
+
+    @property
+    def requested(self):
+        return self.wanted_after is not None
+
+    def capture(self, frame_id, width, height):
+        """Dipanggil display() sebelum glutSwapBuffers: mulai membaca framebuffer ke PBO berikutnya."""
+        with self.condition:
+            if self.wanted_after is not None and frame_id > self.wanted_after:
+                self.wanted_after = None
+        if self.buffers is None:
+            self.buffers = [int(buffer) for buffer in glGenBuffers(2)]
+        if self.size != (width, height):
+            self.collect()
+            for buffer in self.buffers:
+                glBindBuffer(GL_PIXEL_PACK_BUFFER, buffer)
+                glBufferData(GL_PIXEL_PACK_BUFFER, width * height * 3, None, GL_STREAM_READ)
+            self.size = (width, height)
+        if self.pending[self.index] is not None: # Kedua PBO terisi: petakan yang lama dulu
+            self._map(self.index)
+        glBindBuffer(GL_PIXEL_PACK_BUFFER, self.buffers[self.index])
+        glPixelStorei(GL_PACK_ALIGNMENT, 1)
+        read_pixels_into(0, 0, width, height, GL_RGB, GL_UNSIGNED_BYTE, ctypes.c_void_p(0))
+        glBindBuffer(GL_PIXEL_PACK_BUFFER, 0)
+        self.pending[self.index] = (frame_id, width, height)
+        self.index ^= 1
+
+    def collect(self):
+        """Dipanggil idle(): memetakan PBO yang sudah dibaca dan membangunkan thread yang menunggu."""
+        for index in sorted((i for i in (0, 1) if self.pending[i]), key=lambda i: self.pending[i][0]):
+            self._map(index)
+        glBindBuffer(GL_PIXEL_PACK_BUFFER, 0)
+
+    def _map(self, index):
+        frame_id, width, height = self.pending[index]
+        self.pending[index] = None
+        glBindBuffer(GL_PIXEL_PACK_BUFFER, self.buffers[index])
+        pointer = glMapBuffer(GL_PIXEL_PACK_BUFFER, GL_READ_ONLY)
+        try:
+            pixels = ctypes.string_at(pointer, width * height * 3)
+        finally:
+            glUnmapBuffer(GL_PIXEL_PACK_BUFFER)
+        with self.condition:
+            self.frame = (frame_id, pixels, width, height)
+            self.condition.notify_all()
+
+    def request(self, timeout=2.0):
+        """
+        (frame_id, bytes PNG) dari frame terbaru. Jika sejak snapshot terakhir tidak ada
+        yang digambar ulang, frame itu dipakai lagi; selain itu diminta satu redraw.
+        None jika tidak ada frame dalam batas waktu.
+        """
+        global redraw_needed
+        with self.condition:
+            if self.frame is None or self.frame[0] != frame_counter or redraw_needed:
+                target = frame_counter
+                self.wanted_after = target if self.wanted_after is None else max(self.wanted_after, target)
+                redraw_needed = True
+                if not self.condition.wait_for(lambda: self.frame is not None and self.frame[0] > target, timeout):
+                    return None
+            frame_id, pixels, width, height = self.frame
+
+        with self.encode_lock:
+            if self.png is None or self.png[0] < frame_id:
+                self.png = (frame_id, encode_png(pixels, width, height))
+            return self.png
+
+frame_snapshot = FrameSnapshot()
+
 # --- Fungsi Gambar Primitif OpenGL ---
 def draw_point(x, y, color, size):
     """Menggambar sebuah titik."""
@@ -211,6 +477,36 @@ def draw_rectangle(p1, p2, color, filled=True, thickness=1.0):
     glVertex2f(x1, y2)
     glEnd()
 
+def draw_convex_polygon(vertices, color):
+    """Menggambar poligon konveks (mis. hasil clipping) sebagai segitiga (fan dari verteks pertama)."""
+    glColor3fv(color)
+    glBegin(GL_TRIANGLES)
+    for i in range(1, len(vertices) - 1):
+        for vertex in (vertices[0], vertices[i], vertices[i + 1]):
+            glVertex2f(vertex[0], vertex[1])
+    glEnd()
+
+def draw_polygon(vertices, triangles, color):
+    """Menggambar poligon (boleh cekung) dari triangulasinya; vertices (k, 2), triangles (t, 3)."""
+    if not len(triangles):
+        return
+    glColor3fv(color)
+    glEnableClientState(GL_VERTEX_ARRAY)
+    glVertexPointer(2, GL_DOUBLE, 0, np.ascontiguousarray(vertices, dtype=np.float64))
+    glDrawElements(GL_TRIANGLES, triangles.size, GL_UNSIGNED_INT, np.ascontiguousarray(triangles, dtype=np.uint32))
+    glDisableClientState(GL_VERTEX_ARRAY)
+
+def draw_polyline(vertices, color, thickness, mode=GL_LINE_STRIP):
+    """Menggambar rangkaian garis (GL_LINE_STRIP, atau GL_LINE_LOOP untuk outline poligon)."""
+    if len(vertices) < 2:
+        return
+    glColor3fv(color)
+    glLineWidth(thickness)
+    glEnableClientState(GL_VERTEX_ARRAY)
+    glVertexPointer(2, GL_DOUBLE, 0, np.ascontiguousarray(vertices, dtype=np.float64))
+    glDrawArrays(mode, 0, len(vertices))
+    glDisableClientState(GL_VERTEX_ARRAY)
+
 
 # --- Fungsi Transformasi Titik ---
 def apply_object_transform_to_point(point, transformations):
@@ -243,309 +539,855 @@ def apply_object_transform_to_point(point, transformations):
         
     return [x, y]
 
-
-# --- Fungsi Clipping (Cohen-Sutherland & Sutherland-Hodgman) ---
-# Cohen-Sutherland untuk Garis
-INSIDE = 0  # 0000 -> Titik di dalam window
-LEFT = 1    # 0001 -> Titik di kiri window
-RIGHT = 2   # 0010 -> Titik di kanan window
-BOTTOM = 4  # 0100 -> Titik di bawah window
-TOP = 8     # 1000 -> Titik di atas window
-
-def compute_outcode(x, y, x_min, y_min, x_max, y_max):
-    """Menghitung outcode (kode region) untuk sebuah titik."""
-    code = INSIDE
-    if x < x_min: code |= LEFT
-    elif x > x_max: code |= RIGHT
-    if y < y_min: code |= BOTTOM
-    elif y > y_max: code |= TOP
-    return code
-
-def cohen_sutherland_clip(p1, p2, window_coords):
+def transform_shape_points(obj):
+    """Semua titik poligon/polyline setelah transformasi objek, sebagai array (k, 2)."""
+    transforms = obj.get('transformations', {})
+    tx, ty = transforms.get('translate', [0.0, 0.0])
+    sx, sy = transforms.get('scale', [1.0, 1.0])
+    points = np.asarray(obj['points'], dtype=float).reshape(1, -1, 2)
+    return transform_points(points, np.array([[tx, ty, transforms.get('rotate', 0.0), sx, sy]]))[0]
+
+def point_in_polygon(x, y, vertices):
+    """Uji even-odd (ray casting) untuk satu titik terhadap poligon (k, 2)."""
+    x1, y1 = vertices[:, 0], vertices[:, 1]
+    x2, y2 = np.roll(x1, -1), np.roll(y1, -1)
+    crosses = (y1 > y) != (y2 > y)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        intersect_x = x1 + (y - y1) * (x2 - x1) / (y2 - y1)
+    return bool(np.count_nonzero(crosses & (x < intersect_x)) % 2)
+
+def distance_to_polyline(x, y, vertices):
+    """Jarak terdekat titik ke rangkaian segmen (k, 2)."""
+    if len(vertices) < 2:
+        return float(np.hypot(*(vertices[0] - (x, y)))) if len(vertices) else float('inf')
+    start, end = vertices[:-1], vertices[1:]
+    delta = end - start
+    length = np.maximum(np.einsum('ij,ij->i', delta, delta), 1e-18)
+    t = np.clip(np.einsum('ij,ij->i', np.array([x, y]) - start, delta) / length, 0.0, 1.0)
+    nearest = start + t[:, None] * delta
+    return float(np.hypot(nearest[:, 0] - x, nearest[:, 1] - y).min())
+
+# --- Fungsi Clipping (Cyrus-Beck & Sutherland-Hodgman) ---
+# Daerah clipping berupa poligon konveks (ClipRegion). Perhitungannya ada di scene_geometry
+# dalam bentuk array (banyak primitif sekaligus); fungsi di sini memotong satu primitif.
+
+def cyrus_beck_clip(p1, p2, region):
     """
-    Mengimplementasikan algoritma clipping Cohen-Sutherland untuk garis.
+    Mengimplementasikan algoritma clipping Cyrus-Beck untuk garis terhadap daerah konveks.
     Mengembalikan koordinat garis yang sudah di-clip ([x1,y1], [x2,y2]) atau None jika garis sepenuhnya di-clip.
     """
-    x1, y1 = p1
-    x2, y2 = p2
-    x_min, y_min, x_max, y_max = window_coords['x_min'], window_coords['y_min'], window_coords['x_max'], window_coords['y_max']
+    start, end, keep = clip_segments(np.array([p1], dtype=float), np.array([p2], dtype=float), region)
+    if keep[0]:
+        return start[0].tolist(), end[0].tolist()
+    return None
 
-    code1 = compute_outcode(x1, y1, x_min, y_min, x_max, y_max)
-    code2 = compute_outcode(x2, y2, x_min, y_min, x_max, y_max)
-    
-    accept = False
-
-    while True:
-        if (code1 == 0 and code2 == 0): # Kedua titik akhir berada di dalam jendela
-            accept = True
-            break
-        elif (code1 & code2) != 0: # Kedua titik akhir berada di luar dan di sisi yang sama
-            break
-        else:
-            x, y = 0.0, 0.0
-            code_out = code1 if code1 != 0 else code2
-
-            if code_out & TOP:
-                x = x1 + (x2 - x1) * (y_max - y1) / (y2 - y1)
-                y = y_max
-            elif code_out & BOTTOM:
-                x = x1 + (x2 - x1) * (y_min - y1) / (y2 - y1)
-                y = y_min
-            elif code_out & RIGHT:
-                y = y1 + (y2 - y1) * (x_max - x1) / (x2 - x1)
-                x = x_max
-            elif code_out & LEFT:
-                y = y1 + (y2 - y1) * (x_min - x1) / (x2 - x1)
-                x = x_min 
-
-            if code_out == code1:
-                x1, y1 = x, y
-                code1 = compute_outcode(x1, y1, x_min, y_min, x_max, y_max)
-            else:
-                x2, y2 = x, y
-                code2 = compute_outcode(x2, y2, x_min, y_min, x_max, y_max)
-    
-    if accept:
-        return [x1, y1], [x2, y2]
-    else:
-        return None
+def sutherland_hodgman_clip(polygon_vertices, region):
+    """
+    Mengimplementasikan algoritma clipping Sutherland-Hodgman terhadap daerah konveks
+    (satu langkah per tepi daerah). Mengembalikan verteks hasil clipping, kosong jika seluruhnya di luar.
+    """
+    if not polygon_vertices:
+        return []
+    vertices, counts = clip_polygons(np.array([polygon_vertices], dtype=float), [len(polygon_vertices)], region)
+    return vertices[0, :counts[0]].tolist() if counts[0] >= 3 else []
+
+# --- Menggambar Satu Objek ---
+def draw_object_clipped(obj, path, region):
+    """Menggambar bagian objek tersimpan yang berada di dalam satu daerah clipping."""
+    current_obj_transforms = obj.get('transformations', {})
+
+    # KLIPING TITIK
+    if obj['type'] == DRAW_MODE_POINT:
+        transformed_point = apply_object_transform_to_point(obj['points'][0], current_obj_transforms)
+        if region.contains(transformed_point[0], transformed_point[1]):
+            draw_point(transformed_point[0], transformed_point[1], obj['color'], obj['thickness'])
+    # KLIPING GARIS
+    elif obj['type'] == DRAW_MODE_LINE:
+        # Transformasi kedua titik garis sebelum clipping
+        transformed_p1 = apply_object_transform_to_point(obj['points'][0], current_obj_transforms)
+        transformed_p2 = apply_object_transform_to_point(obj['points'][1], current_obj_transforms)
+
+        clipped_line_coords = cyrus_beck_clip(transformed_p1, transformed_p2, region)
+        if clipped_line_coords:
+            draw_line(clipped_line_coords[0], clipped_line_coords[1], obj['color'], obj['thickness'])
+    # KLIPING SEGITIGA
+    elif obj['type'] == DRAW_MODE_TRIANGLE:
+        # Transformasi semua verteks segitiga sebelum clipping
+        transformed_vertices = [apply_object_transform_to_point(p, current_obj_transforms) for p in obj['points']]
+
+        clipped_triangle_vertices = sutherland_hodgman_clip(transformed_vertices, region)
+        if clipped_triangle_vertices:
+            draw_convex_polygon(clipped_triangle_vertices, obj['color'])
+    # KLIPING ELIPS (outline)
+    elif obj['type'] == DRAW_MODE_ELLIPSE:
+        # Transformasi pusat elips dan skala radiusnya.
+        transformed_center = apply_object_transform_to_point(obj['points'][0], current_obj_transforms)
+        original_radius_x, original_radius_y = obj['points'][1]
+        transformed_radius_x, transformed_radius_y = original_radius_x, original_radius_y
+        if 'scale' in current_obj_transforms:
+            transformed_radius_x *= current_obj_transforms['scale'][0]
+            transformed_radius_y *= current_obj_transforms['scale'][1]
+
+        # Mendapatkan segmen garis yang membentuk outline elips yang sudah ditransformasi secara logis.
+        ellipse_segments = draw_ellipse(transformed_center[0], transformed_center[1],
+                                        transformed_radius_x, transformed_radius_y,
+                                        obj['color'], filled=False, thickness=obj['thickness'])
+
+        if ellipse_segments:
+            for segment in ellipse_segments:
+                # Setiap segmen elips yang sudah "ditransformasi secara logis"
+                # sekarang di-clip menggunakan Cyrus-Beck.
+                clipped_segment = cyrus_beck_clip(segment[0], segment[1], region)
+                if clipped_segment:
+                    draw_line(clipped_segment[0], clipped_segment[1], obj['color'], obj['thickness'])
+    # KLIPING PERSEGI
+    elif obj['type'] == DRAW_MODE_RECTANGLE:
+        x1_orig, y1_orig = obj['points'][0]
+        x2_orig, y2_orig = obj['points'][1]
+        rect_vertices = [
+            [x1_orig, y1_orig],
+            [x2_orig, y1_orig],
+            [x2_orig, y2_orig],
+            [x1_orig, y2_orig]
+        ]
+        # Transformasi verteks persegi
+        transformed_vertices = [apply_object_transform_to_point(p, current_obj_transforms) for p in rect_vertices]
+
+        clipped_rect_vertices = sutherland_hodgman_clip(transformed_vertices, region)
+        if clipped_rect_vertices:
+            draw_convex_polygon(clipped_rect_vertices, obj['color'])
+    # KLIPING POLIGON: semua segitiga triangulasinya dipotong sekaligus (hasilnya konveks)
+    elif obj['type'] == DRAW_MODE_POLYGON and path is not None:
+        triangles = transform_shape_points(obj)[path.triangles]
+        clipped, counts = clip_polygons(triangles, np.full(len(triangles), 3), region)
+        for vertices, count in zip(clipped, counts.tolist()):
+            if count >= 3:
+                draw_convex_polygon(vertices[:count].tolist(), obj['color'])
+    # KLIPING POLYLINE: semua segmen dipotong sekaligus
+    elif obj['type'] == DRAW_MODE_POLYLINE:
+        transformed_vertices = transform_shape_points(obj)
+        start, end, keep = clip_segments(transformed_vertices[:-1], transformed_vertices[1:], region)
+        for p1, p2 in zip(start[keep].tolist(), end[keep].tolist()):
+            draw_line(p1, p2, obj['color'], obj['thickness'])
+
+def draw_object(obj, path=None):
+    """
+    Menggambar satu objek tersimpan (dengan clipping jika diaktifkan). Poligon dan
+    polyline memakai path dari scene_layer.arrays (titik dan triangulasi yang di-cache).
+    """
+    # Dapatkan transformasi objek saat ini (default ke dictionary kosong jika tidak ada)
+    current_obj_transforms = obj.get('transformations', {})
+
+    # --- Bagian CLIPPING ---
+    if clipping_enabled:
+        # Objek dipotong terhadap setiap daerah clipping; yang tergambar adalah gabungannya.
+        for region in list(clip_regions):
+            draw_object_clipped(obj, path, region)
+    else: # Clipping dinonaktifkan, gambar objek seperti biasa (tanpa pemotongan).
+        # Terapkan transformasi OpenGL di sini untuk rendering tanpa clipping.
+        glPushMatrix() # Simpan matriks sebelum transformasi.
+        if 'translate' in current_obj_transforms:
+            tx, ty = current_obj_transforms['translate']
+            glTranslatef(tx, ty, 0.0)
+        if 'rotate' in current_obj_transforms:
+            angle = current_obj_transforms['rotate']
+            glRotatef(angle, 0.0, 0.0, 1.0) 
+        if 'scale' in current_obj_transforms:
+            sx, sy = current_obj_transforms['scale']
+            glScalef(sx, sy, 1.0)
+
+        if obj['type'] == DRAW_MODE_POINT:
+            draw_point(obj['points'][0][0], obj['points'][0][1], obj['color'], obj['thickness'])
+        elif obj['type'] == DRAW_MODE_LINE:
+            draw_line(obj['points'][0], obj['points'][1], obj['color'], obj['thickness'])
+        elif obj['type'] == DRAW_MODE_TRIANGLE:
+            draw_triangle(obj['points'][0], obj['points'][1], obj['points'][2], obj['color'])
+        elif obj['type'] == DRAW_MODE_ELLIPSE:
+            draw_ellipse(obj['points'][0][0], obj['points'][0][1], obj['points'][1][0], obj['points'][1][1], obj['color'], filled=True, thickness=obj['thickness'])
+        elif obj['type'] == DRAW_MODE_RECTANGLE:
+            draw_rectangle(obj['points'][0], obj['points'][1], obj['color'], filled=True, thickness=obj['thickness'])
+        elif obj['type'] == DRAW_MODE_POLYGON and path is not None:
+            draw_polygon(path.vertices, path.triangles, obj['color'])
+        elif obj['type'] == DRAW_MODE_POLYLINE:
+            draw_polyline(obj['points'], obj['color'], obj['thickness'])
+        glPopMatrix()
+
+def draw_selection_highlight(obj):
+    """Menggambar highlight kuning untuk objek yang dipilih."""
+    glColor3f(1.0, 1.0, 0.0) # Warna kuning untuk highlight.
+    glLineWidth(3.0) # Ketebalan garis highlight.
+
+    # Untuk menggambar highlight, kita perlu menerapkan transformasi objek
+    # dan kemudian menggambar bentuk highlight.
+    glPushMatrix()
+    current_obj_transforms = obj.get('transformations', {})
+    if 'translate' in current_obj_transforms:
+        tx, ty = current_obj_transforms['translate']
+        glTranslatef(tx, ty, 0.0)
+    if 'rotate' in current_obj_transforms:
+        angle = current_obj_transforms['rotate']
+        glRotatef(angle, 0.0, 0.0, 1.0)
+    if 'scale' in current_obj_transforms:
+        sx, sy = current_obj_transforms['scale']
+        glScalef(sx, sy, 1.0)
+
+    # Gambar bentuk highlight berdasarkan tipe objek.
+    if obj['type'] == DRAW_MODE_POINT:
+        x, y = obj['points'][0]
+        glBegin(GL_LINE_LOOP)
+        glVertex2f(x - 0.03, y - 0.03) # Ukuran kotak highlight.
+        glVertex2f(x + 0.03, y - 0.03)
+        glVertex2f(x + 0.03, y + 0.03)
+        glVertex2f(x - 0.03, y + 0.03)
+        glEnd()
+    elif obj['type'] == DRAW_MODE_LINE:
+        draw_line(obj['points'][0], obj['points'][1], color=[1.0,1.0,0.0], thickness=obj['thickness']+2)
+    elif obj['type'] == DRAW_MODE_TRIANGLE:
+        glBegin(GL_LINE_LOOP)
+        for p in obj['points']:
+            glVertex2f(p[0], p[1])
+        glEnd()
+    elif obj['type'] == DRAW_MODE_ELLIPSE:
+        center_x, center_y = obj['points'][0]
+        radius_x, radius_y = obj['points'][1]
+        ellipse_segments = draw_ellipse(center_x, center_y, radius_x, radius_y, color=[1.0,1.0,0.0], filled=False, thickness=3.0)
+        if ellipse_segments:
+            for segment in ellipse_segments:
+                draw_line(segment[0], segment[1], color=[1.0,1.0,0.0], thickness=3.0)
+    elif obj['type'] == DRAW_MODE_RECTANGLE:
+        draw_rectangle(obj['points'][0], obj['points'][1], color=[1.0,1.0,0.0], filled=False, thickness=3.0)
+    elif obj['type'] == DRAW_MODE_POLYGON:
+        draw_polyline(obj['points'], [1.0,1.0,0.0], 3.0, mode=GL_LINE_LOOP)
+    elif obj['type'] == DRAW_MODE_POLYLINE:
+        draw_polyline(obj['points'], [1.0,1.0,0.0], obj['thickness']+2)
+    glPopMatrix()
+
+# --- Redraw Parsial (Damage Region) ---
+class ViewportPlan:
+    """Bagian FramePlan untuk satu viewport: region yang digambar ulang dan objek yang terlihat."""
+
+    def __init__(self, viewport, size, window, full_redraw, rects):
+        self.viewport = viewport
+        self.size = size # Ukuran FBO viewport saat region dihitung (width, height)
+        self.window = window # Viewport.window() saat region dihitung
+        self.full_redraw = full_redraw
+        self.rects = rects # Kotak piksel (x0, y0, x1, y1); kosong jika full_redraw
+        self.groups = [] # Indeks FramePlan.groups yang terlihat di viewport ini
+
+class FramePlan:
+    """
+    Hasil persiapan frame oleh worker: geometri siap unggah dan region yang digambar ulang
+    per viewport. Objek dikelompokkan menurut kombinasi viewport yang menggambarnya ulang;
+    setiap kelompok dibangun sekali (satu Geometry, berurutan di satu VBO) dan viewport
+    hanya menggambar kelompok yang memuatnya.
+    """
+
+    def __init__(self, views, groups, objects, buffer):
+        self.views = views # [ViewportPlan]
+        self.groups = groups # [(scene_geometry.Geometry, indeks segitiga pertamanya di index buffer)]
+        self.objects = objects # Jumlah objek di dalam geometri
+        self.buffer = buffer # GeometryBuffer tempat verteks berada
 
-# Sutherland-Hodgman untuk Poligon (Dasar Konveks)
-def sutherland_hodgman_clip(polygon_vertices, window_coords):
+    @property
+    def empty(self):
+        return all(geometry.empty for geometry, _ in self.groups)
+
+class FramePipeline:
     """
-    Mengimplementasikan algoritma clipping Sutherland-Hodgman untuk poligon konveks.
-    Ini adalah implementasi dasar yang berfungsi untuk poligon konveks (seperti segitiga).
+    Persiapan frame berikutnya (transformasi, clipping dan tesselasi dengan NumPy) di
+    thread worker, sementara thread GL terus menggambar frame. Antrean sedalam satu
+    plan: worker baru menyiapkan plan berikutnya setelah plan sebelumnya diambil thread
+    GL, dan verteksnya ditulis ke salah satu dari dua GeometryBuffer (double buffering)
+    yang tidak sedang diunggah. Dengan threaded=False plan disiapkan langsung di take().
     """
-    clipped_polygon = list(polygon_vertices)
-
-    x_min, y_min, x_max, y_max = window_coords['x_min'], window_coords['y_min'], window_coords['x_max'], window_coords['y_max']
-
-    def clip_against_edge(input_polygon, edge_type, edge_value):
-        output_polygon = []
-        if not input_polygon: return output_polygon
-
-        for i in range(len(input_polygon)):
-            p1 = input_polygon[i]
-            p2 = input_polygon[(i + 1) % len(input_polygon)]
-
-            def is_inside(point):
-                if edge_type == 'left': return point[0] >= edge_value
-                if edge_type == 'right': return point[0] <= edge_value
-                if edge_type == 'bottom': return point[1] >= edge_value
-                if edge_type == 'top': return point[1] <= edge_value
-
-            def intersect(p_start, p_end):
-                if edge_type == 'left' or edge_type == 'right':
-                    denom = (p_end[0] - p_start[0])
-                    if denom == 0:
-                        return [edge_value, p_start[1]]
-                    t = (edge_value - p_start[0]) / denom
-                    return [edge_value, p_start[1] + t * (p_end[1] - p_start[1])]
-                elif edge_type == 'bottom' or edge_type == 'top':
-                    denom = (p_end[1] - p_start[1])
-                    if denom == 0:
-                        return [p_start[0], edge_value]
-                    t = (edge_value - p_start[1]) / denom
-                    return [p_start[0] + t * (p_end[0] - p_start[0]), edge_value]
-                return []
-
-            p1_inside = is_inside(p1)
-            p2_inside = is_inside(p2)
-
-            if p1_inside and p2_inside:
-                output_polygon.append(p2)
-            elif p1_inside and not p2_inside:
-                output_polygon.append(intersect(p1, p2))
-            elif not p1_inside and p2_inside:
-                output_polygon.append(intersect(p1, p2))
-                output_polygon.append(p2)
-
-        return output_polygon
-    
-    # Clip against each edge of the window
-    clipped_polygon = clip_against_edge(clipped_polygon, 'left', x_min)
-    if not clipped_polygon: return []
-    clipped_polygon = clip_against_edge(clipped_polygon, 'right', x_max)
-    if not clipped_polygon: return []
-    clipped_polygon = clip_against_edge(clipped_polygon, 'bottom', y_min)
-    if not clipped_polygon: return []
-    clipped_polygon = clip_against_edge(clipped_polygon, 'top', y_max)
 
-    return clipped_polygon if clipped_polygon else []
+    def __init__(self, prepare, on_ready=None, threaded=True):
+        self.prepare = prepare # prepare(buffer) -> FramePlan atau None (tidak ada yang berubah)
+        self.on_ready = on_ready # Dipanggil dari worker setelah plan siap (meminta redraw)
+        self.threaded = threaded
+        self.condition = threading.Condition()
+        self.buffers = [GeometryBuffer(), GeometryBuffer()]
+        self.requested = False
+        self.busy = False
+        self.ready = None # Plan yang menunggu diambil thread GL
+        self.uploading = None # Buffer yang sedang diunggah thread GL
+        self.thread = None
+        self.prep_intervals = deque(maxlen=256) # (mulai, selesai) setiap persiapan, perf_counter
+        self.stats = {'plans': 0, 'prep_ms': 0.0}
+
+    def notify(self):
+        """Ada perubahan scene: siapkan plan baru (worker dijalankan saat pertama dibutuhkan)."""
+        with self.condition:
+            self.requested = True
+            if self.threaded and self.thread is None:
+                self.thread = threading.Thread(target=self._run, name='frame-pipeline', daemon=True)
+                self.thread.start()
+            self.condition.notify_all()
+
+    def pending(self):
+        """True selama masih ada perubahan yang belum sampai ke thread GL."""
+        with self.condition:
+            return self.requested or self.busy or self.ready is not None
+
+    def _prepare(self, buffer):
+        started = time.perf_counter()
+        plan = self.prepare(buffer)
+        finished = time.perf_counter()
+        self.prep_intervals.append((started, finished))
+        self.stats['plans'] += 1
+        self.stats['prep_ms'] += (finished - started) * 1000.0
+        return plan
+
+    def _run(self):
+        while True:
+            with self.condition:
+                while not self.requested or self.ready is not None:
+                    self.condition.wait()
+                self.requested = False
+                self.busy = True
+                buffer = self.buffers[0] if self.buffers[0] is not self.uploading else self.buffers[1]
+            try:
+                plan = self._prepare(buffer)
+            except Exception as e:
+                logging.error(f"Error saat menyiapkan frame: {e}")
+                plan = None
+            with self.condition:
+                self.busy = False
+                self.ready = plan
+                self.condition.notify_all()
+            if plan is not None and self.on_ready:
+                self.on_ready()
+
+    def take(self):
+        """Plan yang siap (atau None); buffer-nya dipakai thread GL sampai release()."""
+        if not self.threaded:
+            with self.condition:
+                requested, self.requested = self.requested, False
+            return self._prepare(self.buffers[0]) if requested else None
+        with self.condition:
+            plan, self.ready = self.ready, None
+            if plan is not None:
+                self.uploading = plan.buffer
+            self.condition.notify_all()
+            return plan
+
+    def release(self, plan):
+        with self.condition:
+            if self.uploading is plan.buffer:
+                self.uploading = None
+            self.condition.notify_all()
+
+def request_redraw():
+    global redraw_needed
+    redraw_needed = True
 
-# --- Fungsi Utama Rendering OpenGL ---
-def display():
+# --- Viewport (Pan/Zoom) ---
+class Viewport:
     """
-    Fungsi ini dipanggil setiap kali jendela OpenGL perlu digambar ulang.
-    Ini adalah tempat semua logika rendering grafis berada.
+    Satu tampilan scene dengan pan/zoom sendiri: bagian dunia di sekitar center selebar
+    2 / zoom (window(), argumen gluOrtho2D) digambar ke kotak layout di jendela (pecahan
+    lebar/tinggi jendela: x, y dari kiri bawah, lebar, tinggi), atau ke target offscreen
+    berukuran tetap (offscreen_size) yang tidak disalin ke layar.
+
+    Setiap viewport punya FBO scene dan status full redraw sendiri (diisi SceneLayer di
+    thread GL); damage region dalam koordinat dunia dan geometri satu plan dipakai
+    bersama oleh semua viewport.
+    """
+    MIN_ZOOM = 0.1
+    MAX_ZOOM = 1000.0
+
+    def __init__(self, name, layout=(0.0, 0.0, 1.0, 1.0), center=(0.0, 0.0), zoom=1.0, offscreen_size=None,
+                 show_views=False):
+        self.name = name
+        self.layout = layout
+        self.center = (float(center[0]), float(center[1]))
+        self.zoom = min(max(float(zoom), self.MIN_ZOOM), self.MAX_ZOOM)
+        self.offscreen_size = offscreen_size # (lebar, tinggi) piksel, atau None untuk viewport di jendela
+        self.show_views = show_views # Menggambar batas viewport lain (tampilan ringkasan)
+        self.framebuffer = None
+        self.renderbuffers = None # (warna, depth)
+        self.size = None # Ukuran FBO (piksel)
+        self.full_redraw = True
+
+    @property
+    def on_screen(self):
+        return self.offscreen_size is None
+
+    def window(self):
+        """Bagian dunia yang terlihat (x_min, y_min, x_max, y_max)."""
+        half = 1.0 / self.zoom
+        x, y = self.center
+        return (x - half, y - half, x + half, y + half)
+
+    def pixel_rect(self, width, height):
+        """Kotak piksel (x, y, lebar, tinggi) di jendela width x height (minimal 1x1)."""
+        if not self.on_screen:
+            return (0, 0, *self.offscreen_size)
+        x, y, w, h = self.layout
+        x0, y0 = int(round(x * width)), int(round(y * height))
+        x1, y1 = int(round((x + w) * width)), int(round((y + h) * height))
+        return (x0, y0, max(x1 - x0, 1), max(y1 - y0, 1))
+
+    def contains(self, x, y, width, height):
+        """True jika piksel jendela (x, y; Y ke atas) berada di dalam viewport ini."""
+        x0, y0, w, h = self.pixel_rect(width, height)
+        return self.on_screen and x0 <= x < x0 + w and y0 <= y < y0 + h
+
+    def to_world(self, x, y, width, height):
+        """Piksel jendela (x, y; Y ke atas) -> koordinat dunia viewport ini."""
+        x0, y0, w, h = self.pixel_rect(width, height)
+        x_min, y_min, x_max, y_max = self.window()
+        return (x_min + (x - x0) / w * (x_max - x_min), y_min + (y - y0) / h * (y_max - y_min))
+
+# Tata letak viewport di jendela: nama -> [(nama viewport, layout, show_views)]. Viewport yang
+# namanya sama dipertahankan (pan/zoom dan FBO-nya) saat tata letak diganti.
+VIEWPORT_LAYOUTS = {
+    'single': [('main', (0.0, 0.0, 1.0, 1.0), False)],
+    # Detail (viewport utama) memenuhi jendela, ringkasan seluruh scene di pojok kanan atas
+    'overview_detail': [('main', (0.0, 0.0, 1.0, 1.0), False), ('overview', (0.69, 0.69, 0.3, 0.3), True)],
+}
+
+viewports = [Viewport('main')]
+
+def find_viewport(name):
+    viewport = next((viewport for viewport in viewports if viewport.name == name), None)
+    if viewport is None:
+        raise ValueError(f"Viewport '{name}' tidak ada.")
+    return viewport
+
+def viewport_at(x, y):
+    """Viewport teratas (terakhir di daftar) di posisi mouse GLUT (x, y; Y ke bawah), atau viewport pertama."""
+    width, height = glutGet(GLUT_WINDOW_WIDTH), glutGet(GLUT_WINDOW_HEIGHT)
+    on_screen = [viewport for viewport in viewports if viewport.on_screen]
+    return next((viewport for viewport in reversed(on_screen) if viewport.contains(x, height - y, width, height)),
+                on_screen[0] if on_screen else viewports[0])
+
+def window_to_world(x, y, viewport=None):
+    """Posisi mouse GLUT (piksel, Y ke bawah) -> koordinat dunia di viewport (default: viewport di posisi itu)."""
+    width, height = glutGet(GLUT_WINDOW_WIDTH), glutGet(GLUT_WINDOW_HEIGHT)
+    viewport = viewport or viewport_at(x, y)
+    return viewport.to_world(x, height - y, width, height) # Sumbu Y terbalik: layar Y+ ke bawah, OpenGL Y+ ke atas.
+
+def set_view(viewport, center=None, zoom=None):
+    """Pan/zoom satu viewport; hanya FBO viewport itu yang digambar ulang (penuh)."""
+    with scene_layer.lock:
+        if center is not None:
+            viewport.center = (float(center[0]), float(center[1]))
+        if zoom is not None:
+            viewport.zoom = min(max(float(zoom), Viewport.MIN_ZOOM), Viewport.MAX_ZOOM)
+    scene_layer.invalidate(viewport=viewport)
+    request_redraw()
+
+def zoom_view(viewport, factor, anchor=None):
+    """Zoom dengan faktor; titik dunia anchor (default: tengah) tetap di posisi layarnya."""
+    zoom = min(max(viewport.zoom * factor, Viewport.MIN_ZOOM), Viewport.MAX_ZOOM)
+    x, y = viewport.center
+    ax, ay = anchor if anchor is not None else (x, y)
+    ratio = viewport.zoom / zoom
+    set_view(viewport, (ax + (x - ax) * ratio, ay + (y - ay) * ratio), zoom)
+
+def fit_view(viewport):
+    """Pan/zoom agar semua objek (bounding box setelah transformasi) terlihat."""
+    bounds = scene_layer.arrays.scene_bounds()
+    if bounds is None:
+        set_view(viewport, (0.0, 0.0), 1.0)
+        return
+    x_min, y_min, x_max, y_max = bounds
+    half = max(x_max - x_min, y_max - y_min, 1e-6) / 2.0 * 1.05
+    set_view(viewport, ((x_min + x_max) / 2.0, (y_min + y_max) / 2.0), 1.0 / half)
+
+def set_viewport_layout(name):
+    """Mengganti tata letak (VIEWPORT_LAYOUTS); viewport offscreen tetap ada."""
+    global viewports
+    if name not in VIEWPORT_LAYOUTS:
+        raise ValueError(f"Tata letak viewport tidak dikenal: {name}. Pilihan: {', '.join(VIEWPORT_LAYOUTS)}.")
+    existing = {viewport.name: viewport for viewport in viewports}
+    arranged = []
+    for viewport_name, layout, show_views in VIEWPORT_LAYOUTS[name]:
+        viewport = existing.get(viewport_name)
+        if viewport is None or not viewport.on_screen:
+            viewport = Viewport(viewport_name)
+        viewport.layout, viewport.show_views = layout, show_views
+        arranged.append(viewport)
+    viewports = arranged + [viewport for viewport in viewports if not viewport.on_screen and viewport not in arranged]
+    request_redraw() # FBO viewport baru dibuat (dan digambar penuh) oleh SceneLayer.render()
+
+class SceneLayer:
     """
-    global redraw_needed, current_draw_mode, selected_object_index
+    Objek-objek tersimpan dirender ke framebuffer object (FBO) yang dipertahankan antar
+    frame. Setiap perubahan mencatat damage region (bounding box objek sebelum dan sesudah
+    berubah); hanya region itu yang dihapus (scissor test) dan objek yang bounding box-nya
+    beririsan dengannya digambar ulang, lalu FBO disalin ke layar. Highlight, daerah
+    clipping dan titik input digambar di atasnya setiap frame (overlay).
+
+    Setiap Viewport punya FBO sendiri. Damage region dicatat dalam koordinat dunia dan
+    diubah menjadi kotak piksel per viewport; objek di luar window() viewport tidak ikut
+    digambar ke viewport itu (culling). Pan/zoom satu viewport hanya menggambar ulang
+    viewport itu.
+
+    Objek disimpan juga sebagai array (scene_geometry.SceneArrays). prepare() berjalan di
+    thread worker FramePipeline: memilih objek yang terkena damage di semua viewport dan
+    membangun vertex array-nya sekali (transformasi, clipping dan tesselasi tidak diulang
+    per viewport); render() di thread GL hanya mengunggah array itu ke satu VBO dan
+    menggambarnya ke setiap viewport. Urutan gambar objek dijaga oleh depth buffer FBO
+    (lihat scene_geometry.DEPTH_STEP).
+    """
+    MAX_REGIONS = 8 # Lebih dari ini, region digabung menjadi satu kotak
+    FULL_REDRAW_FRACTION = 0.5 # Damage lebih dari separuh layar: gambar ulang semuanya
+
+    def __init__(self, threaded=True):
+        self.lock = threading.Lock()
+        self.vertex_buffer = None
+        self.index_buffer = None
+        self.allocated = [] # Viewport yang FBO-nya sudah dibuat (dihapus saat viewport tidak dipakai lagi)
+        self.available = True # False jika FBO tidak didukung: selalu gambar ulang penuh ke layar
+        self.regions = [] # Damage region [x_min, y_min, x_max, y_max, margin_piksel] di koordinat dunia
+        self.prepared_regions = None # Daerah clipping pada plan terakhir (hanya dipakai worker)
+        self.arrays = SceneArrays()
+        self.pipeline = FramePipeline(self.prepare, on_ready=request_redraw, threaded=threaded)
+        self.stats = {'full_redraws': 0, 'partial_redraws': 0, 'regions': 0, 'objects_redrawn': 0,
+                      'stale_plans': 0}
+
+    def invalidate(self, rebuild_bounds=False, viewport=None):
+        """
+        Seluruh scene digambar ulang pada frame berikutnya (mis. clipping diaktifkan/dinonaktifkan),
+        di semua viewport atau hanya di viewport (setelah pan/zoom).
+        """
+        with self.lock:
+            for target in [viewport] if viewport is not None else viewports:
+                target.full_redraw = True
+            if rebuild_bounds:
+                self.arrays.reset()
+        self.pipeline.notify()
+
+    def damage_object(self, index):
+        """
+        Dipanggil setelah objek berubah: objek dikemas ulang, dan posisi lama (yang masih
+        tersimpan) serta posisi barunya menjadi damage region. Worker hanya membaca objek
+        yang sudah dikemas, jadi perubahan dictionary sebelum panggilan ini tidak terlihat
+        setengah jadi.
+        """
+        if not 0 <= index < len(drawn_objects):
+            return
+        changed = self.arrays.update(index, drawn_objects[index])
+        if changed is None:
+            return # Objek baru: ditambahkan oleh prepare()
+        old, new = changed
+        with self.lock:
+            self.regions.append(old.tolist())
+            if not np.array_equal(old, new):
+                self.regions.append(new.tolist())
+        self.pipeline.notify()
+
+    def damage_clip_regions(self):
+        """
+        Daerah clipping berubah (clipping aktif). prepare() membandingkan daerah saat ini
+        dengan daerah plan sebelumnya, sehingga beberapa gerakan drag yang terkumpul menjadi
+        satu damage: hanya tempat yang dilewati tepi-tepinya.
+        """
+        self.pipeline.notify()
+
+    def _clip_region_damage(self, regions):
+        """
+        Hasil clipping hanya berubah di tempat yang dilewati tepi daerah yang berubah. Tepi ke-i
+        daerah yang digeser atau diubah (jumlah verteks sama) selalu berada di dalam bounding
+        box tepi ke-i lama dan barunya; tepi yang hanya bergeser di sepanjang garisnya sendiri
+        (tepi atas/bawah saat digeser mendatar) dilewati, ujungnya tercakup tepi tetangganya.
+        Daerah yang ditambah atau dihapus di-damage seluruhnya. Ditambah margin garis tebal.
+        """
+        old, self.prepared_regions = self.prepared_regions, regions
+        if old is None or not clipping_enabled:
+            return []
+        margin = self.arrays.max_margin()
+        damage = []
+        for index in range(max(len(old), len(regions))):
+            before = old[index] if index < len(old) else None
+            after = regions[index] if index < len(regions) else None
+            if before is not None and before == after:
+                continue
+            if before is not None and after is not None and len(before.vertices) == len(after.vertices):
+                following = np.roll(after.vertices, -1, axis=0)
+                corners = np.stack([before.vertices, np.roll(before.vertices, -1, axis=0),
+                                    after.vertices, following], axis=1)
+                sliding = ((np.einsum('ij,ij->i', before.normals, after.vertices) == before.offsets) &
+                           (np.einsum('ij,ij->i', before.normals, following) == before.offsets))
+                boxes = np.hstack([corners.min(axis=1), corners.max(axis=1)])[~sliding]
+                damage.extend(box + [margin] for box in boxes.tolist())
+            else:
+                damage.extend(list(region.bounds) + [margin] for region in (before, after) if region is not None)
+        return damage
+
+    def _ensure_framebuffer(self, viewport, width, height):
+        if viewport.size == (width, height):
+            return True
+        try:
+            if self.vertex_buffer is None:
+                self.vertex_buffer, self.index_buffer = (int(buffer) for buffer in glGenBuffers(2))
+            if viewport.framebuffer is None:
+                viewport.framebuffer = int(glGenFramebuffers(1))
+                viewport.renderbuffers = [int(buffer) for buffer in glGenRenderbuffers(2)]
+                self.allocated.append(viewport)
+            color, depth = viewport.renderbuffers
+            glBindRenderbuffer(GL_RENDERBUFFER, color)
+            glRenderbufferStorage(GL_RENDERBUFFER, GL_RGBA8, width, height)
+            glBindRenderbuffer(GL_RENDERBUFFER, depth)
+            glRenderbufferStorage(GL_RENDERBUFFER, GL_DEPTH_COMPONENT24, width, height)
+            glBindRenderbuffer(GL_RENDERBUFFER, 0)
+            glBindFramebuffer(GL_FRAMEBUFFER, viewport.framebuffer)
+            glFramebufferRenderbuffer(GL_FRAMEBUFFER, GL_COLOR_ATTACHMENT0, GL_RENDERBUFFER, color)
+            glFramebufferRenderbuffer(GL_FRAMEBUFFER, GL_DEPTH_ATTACHMENT, GL_RENDERBUFFER, depth)
+            complete = glCheckFramebufferStatus(GL_FRAMEBUFFER) == GL_FRAMEBUFFER_COMPLETE
+            glBindFramebuffer(GL_FRAMEBUFFER, 0)
+        except Exception as e:
+            logging.warning(f"FBO tidak tersedia, setiap frame digambar ulang penuh: {e}")
+            complete = False
+        if not complete:
+            self.available = False
+            return False
+        with self.lock:
+            viewport.size = (width, height)
+            viewport.full_redraw = True
+        # FBO baru masih kosong
+        glBindFramebuffer(GL_FRAMEBUFFER, viewport.framebuffer)
+        glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
+        glBindFramebuffer(GL_FRAMEBUFFER, 0)
+        self.pipeline.notify()
+        return True
+
+    def _release_framebuffers(self, views):
+        """Menghapus FBO viewport yang tidak ada lagi di daftar (tata letak diganti)."""
+        for viewport in [viewport for viewport in self.allocated if viewport not in views]:
+            glDeleteFramebuffers(1, [viewport.framebuffer])
+            glDeleteRenderbuffers(2, viewport.renderbuffers)
+            viewport.framebuffer = viewport.renderbuffers = viewport.size = None
+            viewport.full_redraw = True
+            self.allocated.remove(viewport)
+
+    def _damage_rects(self, regions, width, height, window=WORLD_WINDOW):
+        """Damage region -> kotak piksel bulat di viewport yang dipotong ke ukurannya (digabung jika terlalu banyak)."""
+        rects = pixel_boxes(np.asarray(regions, dtype=float), width, height, window)
+        rects = np.hstack([np.floor(rects[:, :2]), np.ceil(rects[:, 2:])])
+        rects = np.clip(rects, 0, [width, height, width, height])
+        rects = rects[(rects[:, 2] > rects[:, 0]) & (rects[:, 3] > rects[:, 1])]
+        if len(rects) > self.MAX_REGIONS:
+            rects = np.array([[rects[:, 0].min(), rects[:, 1].min(), rects[:, 2].max(), rects[:, 3].max()]])
+        return rects
+
+    def _plan_viewport(self, viewport, size, window, full_redraw, regions):
+        """(ViewportPlan, indeks objek yang digambar ulang di viewport itu), atau None jika tidak ada yang berubah."""
+        width, height = size
+        rects = np.zeros((0, 4))
+        if not full_redraw:
+            if not regions:
+                return None
+            rects = self._damage_rects(regions, width, height, window)
+            if not len(rects):
+                return None
+            area = np.sum((rects[:, 2] - rects[:, 0]) * (rects[:, 3] - rects[:, 1]))
+            full_redraw = area > self.FULL_REDRAW_FRACTION * width * height
+        if full_redraw:
+            rects = np.zeros((0, 4))
+            # Culling: hanya objek yang bounding box-nya berada di dalam window viewport
+            selected = self.arrays.hits([(0, 0, width, height)], width, height, window)
+        else:
+            selected = self.arrays.hits(rects, width, height, window)
+        return ViewportPlan(viewport, size, window, full_redraw, rects), selected
+
+    def prepare(self, buffer):
+        """
+        (Thread worker) Mengambil damage yang terkumpul dan membangun geometri objek yang
+        harus digambar ulang di salah satu viewport. Setiap objek dibangun sekali, berapa
+        pun viewport yang menampilkannya. None jika tidak ada yang berubah.
+        """
+        with self.lock:
+            regions, self.regions = self.regions, []
+            views = [(viewport, viewport.size, viewport.window(), viewport.full_redraw)
+                     for viewport in list(viewports) if viewport.size is not None]
+            for viewport, *_ in views:
+                viewport.full_redraw = False
+        if not views:
+            return None
+        added, shrunk = self.arrays.sync(list(drawn_objects))
+        clip = list(clip_regions)
+        regions = regions + added.tolist() + self._clip_region_damage(clip)
+
+        planned = [self._plan_viewport(viewport, size, window, full_redraw or shrunk, regions)
+                   for viewport, size, window, full_redraw in views]
+        planned = [entry for entry in planned if entry is not None]
+        if not planned:
+            return None
+        objects = np.unique(np.concatenate([selected for _, selected in planned]))
+        # Bit ke-i: objek digambar ulang di viewport ke-i plan ini
+        membership = np.zeros(len(objects), dtype=np.int64)
+        for bit, (_, selected) in enumerate(planned):
+            membership[np.searchsorted(objects, selected)] |= 1 << bit
+
+        buffer.reset()
+        groups, first, triangles = [], 0, 0
+        for combination in np.unique(membership).tolist():
+            geometry = build_geometry(self.arrays.rows(objects[membership == combination]), clipping_enabled, clip,
+                                      buffer, first)
+            for bit, (view, _) in enumerate(planned):
+                if combination >> bit & 1:
+                    view.groups.append(len(groups))
+            groups.append((geometry, triangles))
+            first += len(geometry.vertices)
+            triangles += len(geometry.triangles)
+        return FramePlan([view for view, _ in planned], groups, len(objects), buffer)
+
+    def _upload(self, groups):
+        """
+        Mengunggah verteks dan indeks segitiga semua kelompok plan ke VBO (sekali per plan,
+        dipakai semua viewport dan region).
+        """
+        vertex_bytes = sum(geometry.vertices.nbytes for geometry, _ in groups)
+        index_bytes = sum(geometry.triangles.nbytes for geometry, _ in groups)
+        glBindBuffer(GL_ARRAY_BUFFER, self.vertex_buffer)
+        glBufferData(GL_ARRAY_BUFFER, vertex_bytes, None, GL_STREAM_DRAW)
+        if index_bytes:
+            glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, self.index_buffer)
+            glBufferData(GL_ELEMENT_ARRAY_BUFFER, index_bytes, None, GL_STREAM_DRAW)
+        for geometry, first_triangle in groups:
+            if not geometry.empty:
+                glBufferSubData(GL_ARRAY_BUFFER, geometry.first * geometry.vertices.strides[0],
+                                geometry.vertices.nbytes, geometry.vertices)
+            if len(geometry.triangles):
+                glBufferSubData(GL_ELEMENT_ARRAY_BUFFER, first_triangle * geometry.triangles.itemsize,
+                                geometry.triangles.nbytes, geometry.triangles)
+        glEnableClientState(GL_VERTEX_ARRAY)
+        glEnableClientState(GL_COLOR_ARRAY)
+        stride = VERTEX_FLOATS * 4 # float32
+        glVertexPointer(3, GL_FLOAT, stride, ctypes.c_void_p(0))
+        glColorPointer(3, GL_FLOAT, stride, ctypes.c_void_p(3 * 4))
+
+    def _draw(self, geometry, first_triangle):
+        """Menggambar segitiga, garis dan titik satu kelompok dari VBO yang sudah diunggah."""
+        if len(geometry.triangles):
+            glDrawElements(GL_TRIANGLES, len(geometry.triangles), GL_UNSIGNED_INT,
+                           ctypes.c_void_p(first_triangle * geometry.triangles.itemsize))
+        for width, first, count in geometry.line_batches:
+            glLineWidth(width)
+            glDrawArrays(GL_LINES, first, count)
+        for size, first, count in geometry.point_batches:
+            glPointSize(size)
+            glDrawArrays(GL_POINTS, first, count)
+
+    def _apply_viewport(self, view, groups):
+        """(Thread GL) Menggambar bagian plan satu viewport ke FBO-nya: semuanya, atau per damage region."""
+        width, height = view.size
+        glBindFramebuffer(GL_FRAMEBUFFER, view.viewport.framebuffer)
+        glViewport(0, 0, width, height)
+        x_min, y_min, x_max, y_max = view.window
+        glLoadIdentity()
+        gluOrtho2D(x_min, x_max, y_min, y_max)
+        visible = [groups[index] for index in view.groups if not groups[index][0].empty]
+        if view.full_redraw:
+            glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
+            for geometry, first_triangle in visible:
+                self._draw(geometry, first_triangle)
+            self.stats['full_redraws'] += 1
+        else:
+            glEnable(GL_SCISSOR_TEST)
+            for x0, y0, x1, y1 in view.rects.tolist():
+                glScissor(int(x0), int(y0), int(x1 - x0), int(y1 - y0))
+                glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
+                for geometry, first_triangle in visible:
+                    self._draw(geometry, first_triangle)
+            glDisable(GL_SCISSOR_TEST)
+            self.stats['partial_redraws'] += 1
+            self.stats['regions'] += len(view.rects)
+
+    def _apply(self, plan, views):
+        """(Thread GL) Mengunggah geometri plan sekali, lalu menggambarnya ke FBO setiap viewport."""
+        glEnable(GL_DEPTH_TEST)
+        glDepthFunc(GL_LESS)
+        if not plan.empty:
+            self._upload(plan.groups)
+        for view in plan.views:
+            viewport = view.viewport
+            if viewport not in views:
+                continue # Tata letak diganti sejak plan disiapkan
+            if viewport.size != view.size or viewport.window() != view.window:
+                # Region dihitung untuk ukuran atau pan/zoom lama
+                self.stats['stale_plans'] += 1
+                self.invalidate(viewport=viewport)
+                continue
+            self._apply_viewport(view, plan.groups)
+        if not plan.empty:
+            glDisableClientState(GL_COLOR_ARRAY)
+            glDisableClientState(GL_VERTEX_ARRAY)
+            glBindBuffer(GL_ARRAY_BUFFER, 0)
+            glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, 0)
+        self.stats['objects_redrawn'] += plan.objects
+        glDisable(GL_DEPTH_TEST)
+        glBindFramebuffer(GL_FRAMEBUFFER, 0)
+
+    def render(self, width, height):
+        """
+        (Thread GL) Menggambar plan yang sudah disiapkan (jika ada) ke FBO setiap viewport,
+        lalu menyalin FBO viewport di jendela ke kotaknya di layar. False jika FBO tidak
+        tersedia (pemanggil menggambar semua objek langsung).
+        """
+        if not self.available:
+            return False
+        views = list(viewports)
+        self._release_framebuffers(views)
+        for viewport in views:
+            if not self._ensure_framebuffer(viewport, *viewport.pixel_rect(width, height)[2:]):
+                return False
+        if len(drawn_objects) != self.arrays.count:
+            self.pipeline.notify()
+        plan = self.pipeline.take()
+        if plan is not None:
+            self._apply(plan, views)
+            self.pipeline.release(plan)
+        glViewport(0, 0, width, height)
+        glBindFramebuffer(GL_DRAW_FRAMEBUFFER, 0)
+        for viewport in views:
+            if viewport.on_screen:
+                x, y, w, h = viewport.pixel_rect(width, height)
+                glBindFramebuffer(GL_READ_FRAMEBUFFER, viewport.framebuffer)
+                glBlitFramebuffer(0, 0, w, h, x, y, x + w, y + h, GL_COLOR_BUFFER_BIT, GL_NEAREST)
+        glBindFramebuffer(GL_FRAMEBUFFER, 0)
+        return True
+
+    def read_pixels(self, viewport):
+        """(Thread GL) Piksel RGB FBO viewport (baris bawah lebih dulu), mis. untuk target offscreen."""
+        width, height = viewport.size
+        glBindFramebuffer(GL_READ_FRAMEBUFFER, viewport.framebuffer)
+        glPixelStorei(GL_PACK_ALIGNMENT, 1)
+        pixels = glReadPixels(0, 0, width, height, GL_RGB, GL_UNSIGNED_BYTE)
+        glBindFramebuffer(GL_READ_FRAMEBUFFER, 0)
+        return np.frombuffer(pixels, dtype=np.uint8).reshape(height, width, 3)
+
+# Dengan satu inti CPU worker hanya berebut waktu dengan thread GL: siapkan frame langsung di display()
+scene_layer = SceneLayer(threaded=(os.cpu_count() or 1) > 1)
 
-    glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
+# --- Fungsi Utama Rendering OpenGL ---
+def begin_viewport(viewport, width, height):
+    """Mengarahkan gambar ke kotak viewport di jendela (glViewport + scissor) dengan proyeksi pan/zoom-nya."""
+    x, y, w, h = viewport.pixel_rect(width, height)
+    glViewport(x, y, w, h)
+    glScissor(x, y, w, h) # Garis tebal dan titik besar tidak keluar dari kotak viewport
+    glEnable(GL_SCISSOR_TEST)
+    x_min, y_min, x_max, y_max = viewport.window()
     glLoadIdentity()
-    gluOrtho2D(-1.0, 1.0, -1.0, 1.0) 
+    gluOrtho2D(x_min, x_max, y_min, y_max)
 
-    # Menggambar objek-objek yang sudah disimpan.
-    for i, obj in enumerate(drawn_objects):
-        # Dapatkan transformasi objek saat ini (default ke dictionary kosong jika tidak ada)
-        current_obj_transforms = obj.get('transformations', {})
+def draw_overlay(viewport, views, width, height):
+    """Highlight, daerah clipping, titik input dan (ringkasan) batas viewport lain di atas scene satu viewport."""
+    # --- Menarik Highlight untuk Objek yang Dipilih ---
+    if 0 <= selected_object_index < len(drawn_objects):
+        draw_selection_highlight(drawn_objects[selected_object_index])
 
-        # --- Bagian CLIPPING ---
-        if clipping_enabled:
-            # KLIPING TITIK
-            if obj['type'] == DRAW_MODE_POINT:
-                transformed_point = apply_object_transform_to_point(obj['points'][0], current_obj_transforms)
-                if (clipping_window_coords['x_min'] <= transformed_point[0] <= clipping_window_coords['x_max'] and
-                    clipping_window_coords['y_min'] <= transformed_point[1] <= clipping_window_coords['y_max']):
-                    draw_point(transformed_point[0], transformed_point[1], obj['color'], obj['thickness'])
-            # KLIPING GARIS
-            elif obj['type'] == DRAW_MODE_LINE:
-                # Transformasi kedua titik garis sebelum clipping
-                transformed_p1 = apply_object_transform_to_point(obj['points'][0], current_obj_transforms)
-                transformed_p2 = apply_object_transform_to_point(obj['points'][1], current_obj_transforms)
-                
-                clipped_line_coords = cohen_sutherland_clip(transformed_p1, transformed_p2, clipping_window_coords)
-                if clipped_line_coords: 
-                    draw_line(clipped_line_coords[0], clipped_line_coords[1], obj['color'], obj['thickness'])
-            # KLIPING SEGITIGA
-            elif obj['type'] == DRAW_MODE_TRIANGLE:
-                # Transformasi semua verteks segitiga sebelum clipping
-                transformed_vertices = [apply_object_transform_to_point(p, current_obj_transforms) for p in obj['points']]
-                
-                clipped_triangle_vertices = sutherland_hodgman_clip(transformed_vertices, clipping_window_coords)
-                if clipped_triangle_vertices:
-                    glColor3fv(obj['color'])
-                    glBegin(GL_POLYGON)
-                    for vertex in clipped_triangle_vertices:
-                        glVertex2f(vertex[0], vertex[1])
-                    glEnd()
-            # KLIPING ELIPS (outline)
-            elif obj['type'] == DRAW_MODE_ELLIPSE:
-                # Transformasi pusat elips dan skala radiusnya.
-                transformed_center = apply_object_transform_to_point(obj['points'][0], current_obj_transforms)
-                original_radius_x, original_radius_y = obj['points'][1]
-                transformed_radius_x, transformed_radius_y = original_radius_x, original_radius_y
-                if 'scale' in current_obj_transforms:
-                    transformed_radius_x *= current_obj_transforms['scale'][0]
-                    transformed_radius_y *= current_obj_transforms['scale'][1]
-                
-                # Mendapatkan segmen garis yang membentuk outline elips yang sudah ditransformasi secara logis.
-                ellipse_segments = draw_ellipse(transformed_center[0], transformed_center[1],
-                                                transformed_radius_x, transformed_radius_y,
-                                                obj['color'], filled=False, thickness=obj['thickness'])
-                
-                if ellipse_segments:
-                    for segment in ellipse_segments:
-                        # Setiap segmen elips yang sudah "ditransformasi secara logis"
-                        # sekarang di-clip menggunakan Cohen-Sutherland.
-                        clipped_segment = cohen_sutherland_clip(segment[0], segment[1], clipping_window_coords)
-                        if clipped_segment:
-                            draw_line(clipped_segment[0], clipped_segment[1], obj['color'], obj['thickness'])
-            # KLIPING PERSEGI (outline)
-            elif obj['type'] == DRAW_MODE_RECTANGLE:
-                x1_orig, y1_orig = obj['points'][0]
-                x2_orig, y2_orig = obj['points'][1]
-                rect_vertices = [
-                    [x1_orig, y1_orig],
-                    [x2_orig, y1_orig],
-                    [x2_orig, y2_orig],
-                    [x1_orig, y2_orig]
-                ]
-                # Transformasi verteks persegi
-                transformed_vertices = [apply_object_transform_to_point(p, current_obj_transforms) for p in rect_vertices]
-
-                clipped_rect_vertices = sutherland_hodgman_clip(transformed_vertices, clipping_window_coords)
-                if clipped_rect_vertices:
-                    glColor3fv(obj['color'])
-                    glBegin(GL_POLYGON) # Gunakan GL_POLYGON untuk menggambar poligon umum
-                    for vertex in clipped_rect_vertices:
-                        glVertex2f(vertex[0], vertex[1])
-                    glEnd()
-        else: # Clipping dinonaktifkan, gambar objek seperti biasa (tanpa pemotongan).
-            # Terapkan transformasi OpenGL di sini untuk rendering tanpa clipping.
-            glPushMatrix() # Simpan matriks sebelum transformasi.
-            if 'translate' in current_obj_transforms:
-                tx, ty = current_obj_transforms['translate']
-                glTranslatef(tx, ty, 0.0)
-            if 'rotate' in current_obj_transforms:
-                angle = current_obj_transforms['rotate']
-                glRotatef(angle, 0.0, 0.0, 1.0) 
-            if 'scale' in current_obj_transforms:
-                sx, sy = current_obj_transforms['scale']
-                glScalef(sx, sy, 1.0)
-
-            if obj['type'] == DRAW_MODE_POINT:
-                draw_point(obj['points'][0][0], obj['points'][0][1], obj['color'], obj['thickness'])
-            elif obj['type'] == DRAW_MODE_LINE:
-                draw_line(obj['points'][0], obj['points'][1], obj['color'], obj['thickness'])
-            elif obj['type'] == DRAW_MODE_TRIANGLE:
-                draw_triangle(obj['points'][0], obj['points'][1], obj['points'][2], obj['color'])
-            elif obj['type'] == DRAW_MODE_ELLIPSE:
-                draw_ellipse(obj['points'][0][0], obj['points'][0][1], obj['points'][1][0], obj['points'][1][1], obj['color'], filled=True, thickness=obj['thickness'])
-            elif obj['type'] == DRAW_MODE_RECTANGLE:
-                draw_rectangle(obj['points'][0], obj['points'][1], obj['color'], filled=True, thickness=obj['thickness'])
-            glPopMatrix()
-
-
-        # --- Menarik Highlight untuk Objek yang Dipilih ---
-        if i == selected_object_index:
-            glColor3f(1.0, 1.0, 0.0) # Warna kuning untuk highlight.
-            glLineWidth(3.0) # Ketebalan garis highlight.
-
-            # Untuk menggambar highlight, kita perlu menerapkan transformasi objek
-            # dan kemudian menggambar bentuk highlight.
-            glPushMatrix()
-            current_obj_transforms = obj.get('transformations', {})
-            if 'translate' in current_obj_transforms:
-                tx, ty = current_obj_transforms['translate']
-                glTranslatef(tx, ty, 0.0)
-            if 'rotate' in current_obj_transforms:
-                angle = current_obj_transforms['rotate']
-                glRotatef(angle, 0.0, 0.0, 1.0)
-            if 'scale' in current_obj_transforms:
-                sx, sy = current_obj_transforms['scale']
-                glScalef(sx, sy, 1.0)
-
-            # Gambar bentuk highlight berdasarkan tipe objek.
-            if obj['type'] == DRAW_MODE_POINT:
-                x, y = obj['points'][0]
-                glBegin(GL_LINE_LOOP)
-                glVertex2f(x - 0.03, y - 0.03) # Ukuran kotak highlight.
-                glVertex2f(x + 0.03, y - 0.03)
-                glVertex2f(x + 0.03, y + 0.03)
-                glVertex2f(x - 0.03, y + 0.03)
-                glEnd()
-            elif obj['type'] == DRAW_MODE_LINE:
-                draw_line(obj['points'][0], obj['points'][1], color=[1.0,1.0,0.0], thickness=obj['thickness']+2)
-            elif obj['type'] == DRAW_MODE_TRIANGLE:
-                glBegin(GL_LINE_LOOP)
-                for p in obj['points']:
-                    glVertex2f(p[0], p[1])
-                glEnd()
-            elif obj['type'] == DRAW_MODE_ELLIPSE:
-                center_x, center_y = obj['points'][0]
-                radius_x, radius_y = obj['points'][1]
-                ellipse_segments = draw_ellipse(center_x, center_y, radius_x, radius_y, color=[1.0,1.0,0.0], filled=False, thickness=3.0)
-                if ellipse_segments:
-                    for segment in ellipse_segments:
-                        draw_line(segment[0], segment[1], color=[1.0,1.0,0.0], thickness=3.0)
-            elif obj['type'] == DRAW_MODE_RECTANGLE:
-                draw_rectangle(obj['points'][0], obj['points'][1], color=[1.0,1.0,0.0], filled=False, thickness=3.0)
-            glPopMatrix()
-
-
-    # Menggambar jendela clipping (garis batas) di atas semua objek.
-    glColor3f(0.0, 1.0, 1.0) # Warna cyan.
-    glLineWidth(2.0)
-    glBegin(GL_LINE_LOOP)
-    glVertex2f(clipping_window_coords['x_min'], clipping_window_coords['y_min'])
-    glVertex2f(clipping_window_coords['x_max'], clipping_window_coords['y_min'])
-    glVertex2f(clipping_window_coords['x_max'], clipping_window_coords['y_max'])
-    glVertex2f(clipping_window_coords['x_min'], clipping_window_coords['y_max'])
-    glEnd()
+    # Menggambar daerah-daerah clipping (garis batas) di atas semua objek.
+    for region in list(clip_regions):
+        draw_polyline(region.vertices, [0.0, 1.0, 1.0], 2.0, mode=GL_LINE_LOOP) # Warna cyan.
 
     # Menggambar titik-titik sementara yang sedang diinput oleh mouse.
-    if current_draw_mode in [DRAW_MODE_LINE, DRAW_MODE_TRIANGLE, DRAW_MODE_ELLIPSE, DRAW_MODE_RECTANGLE, DRAW_MODE_CLIP_WINDOW] and drawing_points:
+    if current_draw_mode in [*SHAPE_MODES, DRAW_MODE_CLIP_POLYGON] and len(drawing_points) > 1:
+        draw_polyline(drawing_points, [1.0, 1.0, 0.0], 1.0) # Pratinjau poligon/polyline yang sedang diinput
+    if current_draw_mode in [DRAW_MODE_LINE, DRAW_MODE_TRIANGLE, DRAW_MODE_ELLIPSE, DRAW_MODE_RECTANGLE, DRAW_MODE_CLIP_WINDOW, DRAW_MODE_CLIP_POLYGON, *SHAPE_MODES] and drawing_points:
         glPointSize(8.0)
         glColor3f(1.0, 1.0, 0.0) # Kuning.
         glBegin(GL_POINTS)
@@ -553,25 +1395,125 @@ def display():
             glVertex2f(p[0], p[1])
         glEnd()
 
+    if len(views) > 1:
+        # Batas viewport ini (setengah piksel ke dalam agar tidak terpotong scissor)
+        x_min, y_min, x_max, y_max = viewport.window()
+        _, _, w, h = viewport.pixel_rect(width, height)
+        dx, dy = 0.5 * (x_max - x_min) / w, 0.5 * (y_max - y_min) / h
+        draw_rectangle([x_min + dx, y_min + dy], [x_max - dx, y_max - dy], [0.6, 0.6, 0.6], filled=False)
+    if viewport.show_views:
+        # Tampilan ringkasan: bagian dunia yang diperlihatkan viewport lain
+        for other in views:
+            if other is not viewport:
+                x_min, y_min, x_max, y_max = other.window()
+                draw_rectangle([x_min, y_min], [x_max, y_max], [1.0, 1.0, 1.0], filled=False)
+
+def display():
+    """
+    Fungsi ini dipanggil setiap kali jendela OpenGL perlu digambar ulang.
+    Ini adalah tempat semua logika rendering grafis berada.
+    """
+    global redraw_needed, current_draw_mode, selected_object_index, frame_counter
+
+    frame_counter += 1
+    width, height = glutGet(GLUT_WINDOW_WIDTH), glutGet(GLUT_WINDOW_HEIGHT)
+    views = [viewport for viewport in list(viewports) if viewport.on_screen]
+
+    # Objek-objek yang sudah disimpan: hanya damage region yang digambar ulang ke FBO setiap viewport
+    if not scene_layer.render(width, height):
+        objects = list(drawn_objects)
+        scene_layer.arrays.sync(objects)
+        for viewport in views:
+            begin_viewport(viewport, width, height)
+            glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
+            _, _, w, h = viewport.pixel_rect(width, height)
+            for index in scene_layer.arrays.hits([(0, 0, w, h)], w, h, viewport.window()).tolist():
+                draw_object(objects[index], scene_layer.arrays.path(index))
+
+    # Overlay digambar di setiap viewport dengan proyeksinya sendiri
+    for viewport in views:
+        begin_viewport(viewport, width, height)
+        draw_overlay(viewport, views, width, height)
+    glDisable(GL_SCISSOR_TEST)
+    glViewport(0, 0, width, height)
+
+    # Snapshot diminta: baca frame ini ke PBO sebelum buffer ditukar (dipetakan di idle())
+    if frame_snapshot.requested:
+        frame_snapshot.capture(frame_counter, width, height)
+
     glutSwapBuffers()
     redraw_needed = False
 
 def idle():
     """Fungsi idle dipanggil oleh GLUT saat tidak ada event lain yang menunggu."""
     global redraw_needed
-    if redraw_needed:
+    if frame_snapshot.busy:
+        frame_snapshot.collect()
+    if redraw_needed or frame_snapshot.requested:
         glutPostRedisplay()
     time.sleep(0.01)
 
 # --- Penanganan Input Mouse OpenGL ---
+def add_clip_region(region, replace):
+    """Menambahkan daerah clipping, atau (replace) menggantikan semua daerah dengannya."""
+    global clip_regions
+    clip_regions = [region] if replace else clip_regions + [region]
+    if clipping_enabled:
+        scene_layer.damage_clip_regions()
+    logging.info(f"Daerah clipping {'diatur ke' if replace else 'ditambahkan'}: {region.vertices.round(3).tolist()} "
+                 f"({len(clip_regions)} daerah)")
+
+def finish_shape():
+    """
+    Menyimpan poligon/polyline yang sedang diinput (jika titiknya cukup), lalu mulai bentuk baru.
+    Dalam mode daerah clipping poligon, titik-titiknya (convex hull) menjadi daerah clipping.
+    """
+    global redraw_needed, current_draw_mode
+    if current_draw_mode == DRAW_MODE_CLIP_POLYGON:
+        try:
+            add_clip_region(ClipRegion(drawing_points), replace=not clip_region_append)
+            current_draw_mode = DRAW_MODE_NONE
+        except ValueError as e:
+            logging.warning(f"Daerah clipping tidak dibuat: {e}")
+        drawing_points.clear()
+        redraw_needed = True
+        return
+    minimum = 3 if current_draw_mode == DRAW_MODE_POLYGON else 2
+    if current_draw_mode in SHAPE_MODES and len(drawing_points) >= minimum:
+        drawn_objects.append({
+            'type': current_draw_mode,
+            'points': [list(p) for p in drawing_points],
+            'color': list(current_draw_color),
+            'thickness': current_line_thickness,
+            'transformations': {}
+        })
+        logging.info(f"{'Poligon' if current_draw_mode == DRAW_MODE_POLYGON else 'Polyline'} digambar dengan {len(drawing_points)} verteks")
+    drawing_points.clear()
+    redraw_needed = True
+
 def mouse_handler(button, state, x, y):
     """Fungsi callback untuk event klik mouse di jendela OpenGL."""
-    global current_draw_mode, drawing_points, drawn_objects, clipping_window_coords, redraw_needed, selected_object_index, \
-           is_dragging_clipping_window, drag_start_x, drag_start_y, drag_offset_x, drag_offset_y
-
-    # Konversi koordinat layar (piksel) ke koordinat dunia OpenGL (-1.0 ke 1.0).
-    gl_x = (x / (glutGet(GLUT_WINDOW_WIDTH) / 2.0)) - 1.0
-    gl_y = 1.0 - (y / (glutGet(GLUT_WINDOW_HEIGHT) / 2.0)) # Sumbu Y terbalik: layar Y+ ke bawah, OpenGL Y+ ke atas.
+    global current_draw_mode, drawing_points, drawn_objects, redraw_needed, selected_object_index, \
+           dragged_clip_region, drag_start_x, drag_start_y, drag_offset_x, drag_offset_y, \
+           active_viewport, panned_viewport, pan_anchor
+
+    # Konversi koordinat layar (piksel) ke koordinat dunia OpenGL di viewport yang diklik (sesuai pan/zoom-nya).
+    if state == GLUT_DOWN or active_viewport not in viewports:
+        active_viewport = viewport_at(x, y)
+    gl_x, gl_y = window_to_world(x, y, active_viewport)
+    tolerance = 0.03 / active_viewport.zoom # Jarak klik ke objek, tetap sama di layar pada zoom berapa pun
+
+    # Scroll mouse (tombol 3/4 di freeglut): zoom viewport di bawah kursor, titik di bawah kursor tetap
+    if button in (3, 4):
+        if state == GLUT_DOWN:
+            zoom_view(active_viewport, VIEW_ZOOM_STEP if button == 3 else 1.0 / VIEW_ZOOM_STEP, anchor=(gl_x, gl_y))
+        return
+
+    # Klik tengah + drag: pan viewport
+    if button == GLUT_MIDDLE_BUTTON:
+        panned_viewport = active_viewport if state == GLUT_DOWN else None
+        pan_anchor = (gl_x, gl_y)
+        return
 
     if button == GLUT_LEFT_BUTTON and state == GLUT_DOWN:
         if current_draw_mode == DRAW_MODE_POINT:
@@ -647,16 +1589,26 @@ def mouse_handler(button, state, x, y):
                 drawing_points.clear()
                 redraw_needed = True
 
+        elif current_draw_mode in SHAPE_MODES or current_draw_mode == DRAW_MODE_CLIP_POLYGON:
+            # Klik di titik pertama menutup poligon; klik di titik terakhir sekali lagi mengakhiri polyline
+            if drawing_points:
+                end_x, end_y = drawing_points[-1] if current_draw_mode == DRAW_MODE_POLYLINE else drawing_points[0]
+                if (gl_x - end_x)**2 + (gl_y - end_y)**2 < (SHAPE_CLOSE_DISTANCE / active_viewport.zoom)**2:
+                    finish_shape()
+                    return
+            drawing_points.append([gl_x, gl_y])
+            redraw_needed = True
+
         elif current_draw_mode == DRAW_MODE_CLIP_WINDOW:
             drawing_points.append([gl_x, gl_y])
             if len(drawing_points) == 2:
                 x1, y1 = drawing_points[0]
                 x2, y2 = drawing_points[1]
-                clipping_window_coords['x_min'] = min(x1, x2)
-                clipping_window_coords['y_min'] = min(y1, y2)
-                clipping_window_coords['x_max'] = max(x1, x2)
-                clipping_window_coords['y_max'] = max(y1, y2)
-                logging.info(f"Jendela clipping diatur ke: {clipping_window_coords}")
+                try:
+                    add_clip_region(ClipRegion.rectangle(min(x1, x2), min(y1, y2), max(x1, x2), max(y1, y2)),
+                                    replace=not clip_region_append)
+                except ValueError as e: # Kedua klik segaris: jendela tanpa luas
+                    logging.warning(f"Jendela clipping tidak dibuat: {e}")
                 drawing_points.clear()
                 redraw_needed = True
                 current_draw_mode = DRAW_MODE_NONE
@@ -664,38 +1616,41 @@ def mouse_handler(button, state, x, y):
         elif current_draw_mode == DRAW_MODE_NONE: # Mode seleksi objek atau drag window.
             selected_object_index = -1 # Reset pilihan sebelumnya.
             
-            # --- Cek apakah klik berada di dalam jendela clipping (untuk memulai drag) ---
-            if (clipping_window_coords['x_min'] <= gl_x <= clipping_window_coords['x_max'] and
-                clipping_window_coords['y_min'] <= gl_y <= clipping_window_coords['y_max'] and
-                clipping_enabled):
-                
-                is_dragging_clipping_window = True
+            # --- Cek apakah klik berada di dalam daerah clipping (untuk memulai drag; daerah terakhir di atas) ---
+            regions = list(clip_regions)
+            dragged_clip_region = next((i for i in range(len(regions) - 1, -1, -1)
+                                        if clipping_enabled and regions[i].contains(gl_x, gl_y)), -1)
+            if dragged_clip_region != -1:
                 drag_start_x = gl_x
                 drag_start_y = gl_y
-                drag_offset_x = gl_x - clipping_window_coords['x_min']
-                drag_offset_y = gl_y - clipping_window_coords['y_min']
-                logging.info("Memulai drag jendela clipping.")
+                anchor_x, anchor_y = regions[dragged_clip_region].vertices[0]
+                drag_offset_x = gl_x - anchor_x
+                drag_offset_y = gl_y - anchor_y
+                logging.info(f"Memulai drag daerah clipping {dragged_clip_region}.")
             else: # Jika tidak drag window, coba pilih objek.
                 for i in range(len(drawn_objects) - 1, -1, -1):
                     obj = drawn_objects[i]
                     
                     # Dapatkan koordinat objek setelah transformasi untuk cek klik yang lebih akurat
-                    transformed_object_points = [apply_object_transform_to_point(p, obj.get('transformations', {})) for p in obj['points']]
+                    if obj['type'] in SHAPE_MODES:
+                        transformed_object_points = transform_shape_points(obj)
+                    else:
+                        transformed_object_points = [apply_object_transform_to_point(p, obj.get('transformations', {})) for p in obj['points']]
                     
                     is_clicked = False
 
                     if obj['type'] == DRAW_MODE_POINT:
                         p = transformed_object_points[0]
-                        if (gl_x - p[0])**2 + (gl_y - p[1])**2 < 0.03**2:
+                        if (gl_x - p[0])**2 + (gl_y - p[1])**2 < tolerance**2:
                             is_clicked = True
                     elif obj['type'] == DRAW_MODE_LINE:
                         p1, p2 = transformed_object_points[0], transformed_object_points[1]
-                        if ((gl_x - p1[0])**2 + (gl_y - p1[1])**2 < 0.03**2 or
-                            (gl_x - p2[0])**2 + (gl_y - p2[1])**2 < 0.03**2):
+                        if ((gl_x - p1[0])**2 + (gl_y - p1[1])**2 < tolerance**2 or
+                            (gl_x - p2[0])**2 + (gl_y - p2[1])**2 < tolerance**2):
                             is_clicked = True
                     elif obj['type'] == DRAW_MODE_TRIANGLE:
                         for p in transformed_object_points:
-                            if (gl_x - p[0])**2 + (gl_y - p[1])**2 < 0.03**2:
+                            if (gl_x - p[0])**2 + (gl_y - p[1])**2 < tolerance**2:
                                 is_clicked = True
                                 break
                     elif obj['type'] == DRAW_MODE_ELLIPSE:
@@ -719,27 +1674,32 @@ def mouse_handler(button, state, x, y):
 
                         if min_x <= gl_x <= max_x and min_y <= gl_y <= max_y:
                             is_clicked = True
+                    elif obj['type'] == DRAW_MODE_POLYGON:
+                        is_clicked = point_in_polygon(gl_x, gl_y, transformed_object_points)
+                    elif obj['type'] == DRAW_MODE_POLYLINE:
+                        is_clicked = distance_to_polyline(gl_x, gl_y, transformed_object_points) < tolerance
 
                     if is_clicked:
                         selected_object_index = i
                         logging.info(f"Objek type {obj['type']} di indeks {selected_object_index} dipilih.")
                         break
                 
-                if selected_object_index == -1 and not is_dragging_clipping_window:
+                if selected_object_index == -1 and dragged_clip_region == -1:
                     logging.info("Tidak ada objek yang dipilih.")
             redraw_needed = True
 
 
     # Penanganan mouse lepas (mengakhiri drag)
     if button == GLUT_LEFT_BUTTON and state == GLUT_UP:
-        if is_dragging_clipping_window:
-            is_dragging_clipping_window = False
-            logging.info("Mengakhiri drag jendela clipping.")
+        if dragged_clip_region != -1:
+            dragged_clip_region = -1
+            logging.info("Mengakhiri drag daerah clipping.")
             redraw_needed = True
 
     # Penanganan klik kanan mouse (contoh: untuk menghapus semua objek)
     if button == GLUT_RIGHT_BUTTON and state == GLUT_DOWN:
         drawn_objects.clear()
+        scene_layer.invalidate(rebuild_bounds=True)
         drawing_points.clear()
         selected_object_index = -1
         logging.info("Semua objek dihapus.")
@@ -749,28 +1709,35 @@ def mouse_handler(button, state, x, y):
 def mouse_motion_handler(x, y):
     """
     Fungsi callback untuk event gerakan mouse.
-    Digunakan untuk menggeser jendela clipping saat sedang di-drag.
+    Digunakan untuk menggeser daerah clipping saat sedang di-drag, dan untuk pan viewport (klik tengah).
     """
-    global is_dragging_clipping_window, drag_offset_x, drag_offset_y, clipping_window_coords, redraw_needed
+    global drag_offset_x, drag_offset_y, redraw_needed
+
+    if panned_viewport is not None:
+        # Titik dunia yang dipegang tetap berada di bawah kursor
+        gl_x, gl_y = window_to_world(x, y, panned_viewport)
+        center_x, center_y = panned_viewport.center
+        set_view(panned_viewport, (center_x + pan_anchor[0] - gl_x, center_y + pan_anchor[1] - gl_y))
+        glutPostRedisplay()
+        return
 
-    if is_dragging_clipping_window:
-        # Konversi koordinat layar ke OpenGL
-        gl_x = (x / (glutGet(GLUT_WINDOW_WIDTH) / 2.0)) - 1.0
-        gl_y = 1.0 - (y / (glutGet(GLUT_WINDOW_HEIGHT) / 2.0))
+    if 0 <= dragged_clip_region < len(clip_regions):
+        # Konversi koordinat layar ke koordinat dunia viewport tempat drag dimulai
+        gl_x, gl_y = window_to_world(x, y, active_viewport if active_viewport in viewports else None)
 
-        # Hitung posisi baru sudut kiri bawah window
-        new_x_min = gl_x - drag_offset_x
-        new_y_min = gl_y - drag_offset_y
+        # Hitung posisi baru verteks pertama daerah
+        region = clip_regions[dragged_clip_region]
+        new_x = gl_x - drag_offset_x
+        new_y = gl_y - drag_offset_y
 
         # Hitung delta pergerakan
-        delta_x = new_x_min - clipping_window_coords['x_min']
-        delta_y = new_y_min - clipping_window_coords['y_min']
+        delta_x = new_x - region.vertices[0][0]
+        delta_y = new_y - region.vertices[0][1]
 
-        # Geser seluruh window
-        clipping_window_coords['x_min'] += delta_x
-        clipping_window_coords['y_min'] += delta_y
-        clipping_window_coords['x_max'] += delta_x
-        clipping_window_coords['y_max'] += delta_y
+        # Geser seluruh daerah; yang digambar ulang hanya tempat yang dilewati tepinya
+        clip_regions[dragged_clip_region] = region.moved(delta_x, delta_y)
+        if clipping_enabled:
+            scene_layer.damage_clip_regions()
 
         redraw_needed = True # Minta redraw untuk update visual yang halus
         glutPostRedisplay() # Perlu segera di-redraw untuk animasi halus
@@ -779,8 +1746,8 @@ def mouse_motion_handler(x, y):
 # --- Handler Perintah dari Socket (untuk Komunikasi Flask -> PyOpenGL) ---
 def handle_incoming_command(command_data):
     global current_line_thickness, current_draw_color, redraw_needed, \
-           current_draw_mode, drawn_objects, clipping_window_coords, clipping_enabled, \
-           selected_object_index
+           current_draw_mode, drawn_objects, clip_regions, clip_region_append, clipping_enabled, \
+           selected_object_index, viewports
 
     command_type = command_data.get("type")
     action = command_data.get("action")
@@ -813,6 +1780,7 @@ def handle_incoming_command(command_data):
             elif action == "reset_transforms":
                 obj['transformations'] = {}
                 logging.info(f"Transformasi objek indeks {selected_object_index} direset.")
+            scene_layer.damage_object(selected_object_index) # Posisi lama dan baru digambar ulang
             redraw_needed = True
         else:
             logging.info("Tidak ada objek yang dipilih untuk transformasi.")
@@ -827,6 +1795,7 @@ def handle_incoming_command(command_data):
                 hex_color = command_data["color"].lstrip('#')
                 rgb_tuple = tuple(int(hex_color[i:i+2], 16) / 255.0 for i in (0, 2, 4))
                 obj['color'] = list(rgb_tuple)
+            scene_layer.damage_object(selected_object_index)
             logging.info(f"Pengaturan warna/ketebalan diperbarui untuk objek indeks {selected_object_index}.")
             redraw_needed = True
         else: # Jika tidak ada objek yang dipilih, setel current_draw_color/thickness untuk objek baru.
@@ -839,6 +1808,9 @@ def handle_incoming_command(command_data):
             logging.info(f"Pengaturan gambar diperbarui untuk objek baru: ketebalan={current_line_thickness}, warna={current_draw_color}")
             redraw_needed = True
 
+    elif command_type == "draw_mode" and command_data.get("mode") == "finish_shape":
+        finish_shape() # Poligon/polyline yang sedang diinput disimpan; mode gambar tetap
+
     elif command_type == "draw_mode":
         mode_str = command_data.get("mode")
         drawing_points.clear()
@@ -848,50 +1820,154 @@ def handle_incoming_command(command_data):
         elif mode_str == "triangle": current_draw_mode = DRAW_MODE_TRIANGLE
         elif mode_str == "ellipse": current_draw_mode = DRAW_MODE_ELLIPSE
         elif mode_str == "rectangle": current_draw_mode = DRAW_MODE_RECTANGLE
+        elif mode_str == "polygon": current_draw_mode = DRAW_MODE_POLYGON
+        elif mode_str == "polyline": current_draw_mode = DRAW_MODE_POLYLINE
         elif mode_str == "none": current_draw_mode = DRAW_MODE_NONE
         elif mode_str == "clear_all":
             drawn_objects.clear()
+            scene_layer.invalidate(rebuild_bounds=True)
             current_draw_mode = DRAW_MODE_NONE
             selected_object_index = -1
             logging.info("Semua objek dihapus.")
         logging.info(f"Mode gambar diatur ke: {mode_str}")
         redraw_needed = True
 
+    elif command_type == "shape":
+        # Poligon/polyline lengkap dari panel atau skrip (mis. outline peta/CAD dengan ribuan verteks)
+        kind = {"polygon": DRAW_MODE_POLYGON, "polyline": DRAW_MODE_POLYLINE}.get(command_data.get("kind"))
+        points = [[float(x), float(y)] for x, y in command_data.get("points", [])]
+        if kind is None or len(points) < (3 if kind == DRAW_MODE_POLYGON else 2):
+            raise ValueError("Bentuk harus 'polygon' (minimal 3 titik) atau 'polyline' (minimal 2 titik).")
+        color = list(current_draw_color)
+        if "color" in command_data:
+            hex_color = command_data["color"].lstrip('#')
+            color = [int(hex_color[i:i+2], 16) / 255.0 for i in (0, 2, 4)]
+        drawn_objects.append({
+            'type': kind,
+            'points': points,
+            'color': color,
+            'thickness': float(command_data.get("thickness", current_line_thickness)),
+            'transformations': {}
+        })
+        logging.info(f"{command_data['kind'].capitalize()} dengan {len(points)} verteks ditambahkan.")
+        redraw_needed = True
+
     elif command_type == "clipping":
         action = command_data.get("action")
+        if action in ("enable", "disable"):
+            scene_layer.invalidate()
         if action == "enable":
             clipping_enabled = True
             logging.info("Clipping diaktifkan.")
         elif action == "disable":
             clipping_enabled = False
             logging.info("Clipping dinonaktifkan.")
-        elif action == "set_window_mode":
-            current_draw_mode = DRAW_MODE_CLIP_WINDOW
+        elif action in ("set_window_mode", "add_window_mode", "add_polygon_mode"):
+            # Jendela persegi (2 klik) atau poligon konveks (klik verteks-verteksnya), menggantikan
+            # semua daerah (set_window_mode) atau ditambahkan ke daerah yang sudah ada
+            current_draw_mode = DRAW_MODE_CLIP_POLYGON if action == "add_polygon_mode" else DRAW_MODE_CLIP_WINDOW
+            clip_region_append = action != "set_window_mode"
             drawing_points.clear()
             selected_object_index = -1
-            logging.info("Mode set window clipping diaktifkan. Klik 2 titik di jendela OpenGL.")
-        
+            if action == "add_polygon_mode":
+                logging.info("Mode daerah clipping poligon diaktifkan. Klik verteks-verteksnya, lalu klik titik pertama.")
+            else:
+                logging.info("Mode set window clipping diaktifkan. Klik 2 titik di jendela OpenGL.")
+        elif action == "set_regions":
+            # Daerah-daerah dari panel atau skrip: daftar poligon [[x, y], ...], masing-masing dijadikan convex hull
+            regions = [ClipRegion(points) for points in command_data.get("regions", [])]
+            if not regions:
+                raise ValueError("Minimal satu daerah clipping dibutuhkan.")
+            clip_regions = regions
+            if clipping_enabled:
+                scene_layer.damage_clip_regions()
+            logging.info(f"{len(regions)} daerah clipping diatur.")
+        elif action == "reset_regions":
+            clip_regions = [ClipRegion.rectangle(*DEFAULT_CLIP_WINDOW)]
+            if clipping_enabled:
+                scene_layer.damage_clip_regions()
+            logging.info("Daerah clipping dikembalikan ke jendela awal.")
+
         redraw_needed = True
 
-# --- Kelas Aplikasi Flask (untuk Web Panel) ---
-from flask import Flask, request, jsonify, send_from_directory
-from flask_cors import CORS
+    elif command_type == "viewport":
+        # Pan/zoom per viewport dan tata letaknya; viewport lain tidak digambar ulang
+        if action == "layout":
+            set_viewport_layout(command_data.get("layout"))
+            logging.info(f"Tata letak viewport diatur ke: {command_data.get('layout')}")
+        elif action == "add_offscreen":
+            # Target offscreen (mis. thumbnail/ekspor) dengan pan/zoom sendiri, memakai geometri yang sama
+            name = command_data.get("name")
+            width, height = (int(value) for value in command_data.get("size", (0, 0)))
+            if not name or any(viewport.name == name for viewport in viewports) or width < 1 or height < 1:
+                raise ValueError("Viewport offscreen membutuhkan nama baru dan size [lebar, tinggi] positif.")
+            viewports = viewports + [Viewport(name, center=command_data.get("center", (0.0, 0.0)),
+                                              zoom=command_data.get("zoom", 1.0), offscreen_size=(width, height))]
+            logging.info(f"Viewport offscreen '{name}' ({width}x{height}) ditambahkan.")
+        elif action == "remove":
+            viewport = find_viewport(command_data.get("name"))
+            if viewport.on_screen:
+                raise ValueError("Hanya viewport offscreen yang bisa dihapus; ganti tata letak untuk viewport di jendela.")
+            viewports = [other for other in viewports if other is not viewport]
+            logging.info(f"Viewport '{viewport.name}' dihapus.")
+        elif action == "reset":
+            for viewport in list(viewports):
+                set_view(viewport, (0.0, 0.0), 1.0)
+            logging.info("Pan/zoom semua viewport direset.")
+        else:
+            viewport = find_viewport(command_data.get("name", "main"))
+            if action == "set":
+                set_view(viewport, command_data.get("center"), command_data.get("zoom"))
+            elif action == "pan":
+                # x, y dalam persen setengah lebar tampilan (seperti translasi objek pada zoom 1)
+                center_x, center_y = viewport.center
+                set_view(viewport, (center_x + command_data.get("x", 0) / 100.0 / viewport.zoom,
+                                    center_y + command_data.get("y", 0) / 100.0 / viewport.zoom))
+            elif action == "zoom":
+                zoom_view(viewport, float(command_data.get("factor", VIEW_ZOOM_STEP)))
+            elif action == "fit":
+                fit_view(viewport)
+            else:
+                raise ValueError(f"Aksi viewport tidak dikenal: {action}")
+            logging.info(f"Viewport '{viewport.name}': pusat ({viewport.center[0]:.3f}, {viewport.center[1]:.3f}), "
+                         f"zoom {viewport.zoom:.3f}")
+        redraw_needed = True
 
+# --- Kelas Aplikasi Flask (untuk Web Panel) ---
 class WebControlPanelApp:
-    def __init__(self, host, port, pyopengl_host, pyopengl_port):
+    def __init__(self, host, port, pyopengl_host, pyopengl_port, binary_protocol=True):
+        # Flask diimpor di sini (bukan saat modul dimuat) agar jendela OpenGL tidak menunggunya
+        from flask import Flask
+        from flask_cors import CORS
         self.app = Flask(__name__, static_folder='static', static_url_path='')
         CORS(self.app)
         self.host = host
         self.port = port
         self.pyopengl_host = pyopengl_host
         self.pyopengl_port = pyopengl_port
+        # Sesi protokol biner yang tetap terbuka ke PyOpenGL (dipakai bergantian oleh thread Flask)
+        self.binary_protocol = binary_protocol
+        self.binary_format = None
+        self._binary_socket = None
+        self._binary_reader = None
+        self._binary_lock = threading.Lock()
         self._setup_routes()
 
     def _setup_routes(self):
+        from flask import request, jsonify, send_from_directory, Response
+
         @self.app.route('/')
         def index():
             return send_from_directory(self.app.static_folder, 'index.html')
 
+        @self.app.route('/api/snapshot', methods=['GET'])
+        def snapshot_api():
+            snapshot = frame_snapshot.request()
+            if snapshot is None:
+                return jsonify({"status": "error", "message": "Jendela PyOpenGL tidak menggambar frame (belum berjalan?)."}), 503
+            frame_id, png = snapshot
+            return Response(png, mimetype='image/png', headers={'X-Frame-Index': str(frame_id), 'Cache-Control': 'no-store'})
+
         @self.app.route('/api/transform', methods=['POST'])
         def transform_object_api():
             data = request.json
@@ -921,6 +1997,29 @@ class WebControlPanelApp:
             result = self._send_command_to_pyopengl(command_to_send)
             return jsonify(result)
 
+        @self.app.route('/api/shape', methods=['POST'])
+        def add_shape_api():
+            data = request.json
+            if not data or not all(k in data for k in ['kind', 'points']):
+                return jsonify({"status": "error", "message": "Data bentuk tidak lengkap (kind, points)."}), 400
+
+            command_to_send = {"type": "shape", "kind": data['kind'], "points": data['points']}
+            command_to_send.update({k: data[k] for k in ['color', 'thickness'] if k in data})
+            result = self._send_command_to_pyopengl(command_to_send)
+            return jsonify(result)
+
+        @self.app.route('/api/viewport', methods=['POST'])
+        def handle_viewport_api():
+            data = request.json
+            if not data or 'action' not in data:
+                return jsonify({"status": "error", "message": "Aksi viewport tidak ditentukan."}), 400
+
+            command_to_send = {"type": "viewport", "action": data['action']}
+            command_to_send.update({k: data[k] for k in ['name', 'layout', 'center', 'zoom', 'factor', 'x', 'y', 'size']
+                                    if k in data})
+            result = self._send_command_to_pyopengl(command_to_send)
+            return jsonify(result)
+
         @self.app.route('/api/clipping', methods=['POST'])
         def handle_clipping_api():
             data = request.json
@@ -928,10 +2027,70 @@ class WebControlPanelApp:
                 return jsonify({"status": "error", "message": "Aksi clipping tidak ditentukan."}), 400
             
             command_to_send = {"type": "clipping", "action": data['action']}
+            if 'regions' in data:
+                command_to_send['regions'] = data['regions']
             result = self._send_command_to_pyopengl(command_to_send)
             return jsonify(result)
 
     def _send_command_to_pyopengl(self, command_data):
+        """Mengirim perintah lewat sesi biner jika tersedia, selain itu lewat JSON (satu koneksi per perintah)."""
+        if self.binary_protocol:
+            response = self._send_command_binary(command_data)
+            if response is not None:
+                return response
+        return self._send_command_json(command_data)
+
+    def _open_binary_session(self):
+        """Membuka koneksi dan melakukan handshake; False jika server tidak mendukung protokol biner."""
+        s = socket.create_connection((self.pyopengl_host, self.pyopengl_port), timeout=2)
+        s.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        offered = bytes(PROTOCOL_FORMAT_IDS[fmt] for fmt in available_protocol_formats())
+        s.sendall(BINARY_PROTOCOL_MAGIC + bytes([len(offered)]) + offered)
+        reader = s.makefile('rb')
+        reply = reader.read(len(BINARY_PROTOCOL_MAGIC) + 1)
+        if len(reply) < len(BINARY_PROTOCOL_MAGIC) + 1 or not reply.startswith(BINARY_PROTOCOL_MAGIC):
+            reader.close()
+            s.close()
+            return False
+        self._binary_socket = s
+        self._binary_reader = reader
+        self.binary_format = PROTOCOL_FORMAT_NAMES.get(reply[-1], 'json')
+        logging.info(f"Protokol biner '{self.binary_format}' dipakai ke aplikasi PyOpenGL.")
+        return True
+
+    def _close_binary_session(self):
+        for resource in (self._binary_reader, self._binary_socket):
+            if resource:
+                resource.close()
+        self._binary_socket = None
+        self._binary_reader = None
+
+    def _send_command_binary(self, command_data):
+        """Respon dari sesi biner, atau None bila harus jatuh kembali ke JSON."""
+        with self._binary_lock:
+            sent = False
+            try:
+                if self._binary_socket is None and not self._open_binary_session():
+                    logging.info("Server PyOpenGL tidak mendukung protokol biner, memakai JSON.")
+                    self.binary_protocol = False
+                    return None
+                send_frame(self._binary_socket, encode_command(command_data, self.binary_format))
+                sent = True
+                payload = read_frame(self._binary_reader)
+                if payload is None:
+                    raise ConnectionError("Sesi biner ditutup oleh server")
+                return decode_response(payload)
+            except (OSError, ValueError, struct.error) as e:
+                # Koneksi dibuka ulang pada perintah berikutnya
+                self._close_binary_session()
+                if sent:
+                    # Perintah mungkin sudah dieksekusi (translasi/rotasi bersifat relatif), jangan dikirim ulang
+                    logging.error(f"Sesi biner gagal setelah perintah terkirim: {e}")
+                    return {"status": "error", "message": f"Koneksi ke PyOpenGL terputus: {e}"}
+                logging.warning(f"Sesi biner gagal ({e}), mengirim lewat JSON.")
+                return None
+
+    def _send_command_json(self, command_data):
         try:
             with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
                 s.settimeout(2)
@@ -982,14 +2141,18 @@ if __name__ == '__main__':
     
     logging.info("Memulai Web Control Panel Flask...")
     
-    web_panel_app_instance = WebControlPanelApp(
-        host=PYOPENGL_APP_HOST, 
-        port=FLASK_WEB_PORT,
-        pyopengl_host=PYOPENGL_APP_HOST, 
-        pyopengl_port=PYOPENGL_APP_PORT
-    )
+    def run_web_panel():
+        # Panel dibuat (dan Flask diimpor) di thread-nya sendiri, sementara GLUT sudah menggambar
+        web_panel_app_instance = WebControlPanelApp(
+            host=PYOPENGL_APP_HOST, 
+            port=FLASK_WEB_PORT,
+            pyopengl_host=PYOPENGL_APP_HOST, 
+            pyopengl_port=PYOPENGL_APP_PORT
+        )
+        web_panel_app_instance.run_flask_app()
+
     flask_thread = threading.Thread(
-        target=web_panel_app_instance.run_flask_app, 
+        target=run_web_panel, 
         daemon=True
     )
     flask_thread.start()
@@ -998,4 +2161,4 @@ if __name__ == '__main__':
     glutMainLoop() 
 
     pyopengl_command_server_instance.stop()
-    logging.info("Aplikasi ditutup dengan bersih.")
\ No newline at end of file
+    logging.info("Aplikasi ditutup dengan bersih.")
\ No newline at end of file
@@ -0,0 +1,770 @@
+"""
+Geometri scene 2D dalam bentuk array NumPy.
+
+SceneArrays menyimpan salinan objek-objek main.py (drawn_objects) sebagai
+structure of arrays yang diperbarui per objek. build_geometry() mengubah
+sekumpulan baris menjadi vertex array siap gambar (transformasi, clipping
+dan tesselasi dikerjakan sekaligus untuk semua objek, tanpa loop Python per
+objek), sehingga bisa dijalankan di thread worker: operasi NumPy pada array
+besar melepas GIL.
+
+Hasilnya satu array verteks (x, y, z, r, g, b) float32:
+  triangles  bidang terisi (segitiga, persegi, elips, poligon, hasil clipping)
+             sebagai indeks segitiga, digambar dengan glDrawElements(GL_TRIANGLES)
+  lines      segmen garis dan polyline, dikelompokkan per ketebalan (glLineWidth)
+  points     titik, dikelompokkan per ukuran (glPointSize)
+Urutan gambar objek (objek yang lebih baru menutupi yang lama) dijaga oleh
+kedalaman z per objek dan depth test, sehingga kelompok-kelompok itu boleh
+digambar dalam urutan apa pun.
+
+Geometri dalam koordinat dunia, jadi hasilnya dipakai oleh semua viewport
+main.py (pan/zoom hanya mengubah proyeksi). Beberapa build bisa ditulis
+berurutan ke satu GeometryBuffer (first: posisi verteks pertamanya di VBO
+gabungan), mis. satu kelompok objek per kombinasi viewport yang menampilkannya.
+"""
+
+import threading
+
+import numpy as np
+
+# Sama dengan DRAW_MODE_* di main.py
+KIND_POINT = 1
+KIND_LINE = 2
+KIND_TRIANGLE = 3
+KIND_ELLIPSE = 4
+KIND_RECTANGLE = 5
+KIND_POLYGON = 7
+KIND_POLYLINE = 8
+PATH_KINDS = (KIND_POLYGON, KIND_POLYLINE) # Jumlah titik bebas: disimpan sebagai Path
+
+MAX_POINTS = 4 # Titik per baris untuk bentuk tetap
+ELLIPSE_SEGMENTS = 100 # Sama dengan default draw_ellipse()
+
+# Kedalaman objek ke-i: z = -1 + (i + 1) * DEPTH_STEP, objek yang lebih baru lebih dekat
+# (gluOrtho2D: near -1, far 1). Cukup untuk 4 juta objek dengan depth buffer 24 bit.
+DEPTH_STEP = 2.0 ** -21
+
+VERTEX_FLOATS = 6 # x, y, z, r, g, b
+
+# Bagian dunia yang terlihat tanpa pan/zoom (x_min, y_min, x_max, y_max), seperti gluOrtho2D(-1, 1, -1, 1)
+WORLD_WINDOW = (-1.0, -1.0, 1.0, 1.0)
+
+
+def pack_object(obj):
+    """
+    (jenis, titik (MAX_POINTS, 2), jumlah titik, warna, ketebalan, transformasi) dari
+    dictionary objek. Titik poligon/polyline tidak dikemas di sini (lihat Path).
+    """
+    kind = obj['type']
+    points = obj['points']
+    if kind in PATH_KINDS:
+        points = []
+    elif kind == KIND_RECTANGLE:
+        # Persegi disimpan sebagai keempat sudutnya (urutan yang sama dengan display())
+        (x1, y1), (x2, y2) = points
+        points = [[x1, y1], [x2, y1], [x2, y2], [x1, y2]]
+    transforms = obj.get('transformations', {})
+    tx, ty = transforms.get('translate', (0.0, 0.0))
+    sx, sy = transforms.get('scale', (1.0, 1.0))
+    transform = (tx, ty, transforms.get('rotate', 0.0), sx, sy)
+    return kind, points, len(points), obj['color'], obj.get('thickness', 1.0), transform
+
+
+# --- Triangulasi poligon (ear clipping) ---
+
+def _cross(o, a, b):
+    return (a[..., 0] - o[..., 0]) * (b[..., 1] - o[..., 1]) - (a[..., 1] - o[..., 1]) * (b[..., 0] - o[..., 0])
+
+
+def _ears(vertices, previous, current, following, convex):
+    """
+    Sudut cembung mana yang merupakan telinga: tidak ada titik refleks di dalam atau di
+    tepi segitiga (previous, current, following). Hanya titik refleks yang perlu diuji.
+    """
+    ear = convex.copy()
+    reflex = current[~convex]
+    candidates = np.nonzero(convex)[0]
+    if not len(reflex) or not len(candidates):
+        return ear
+    triangles = np.stack([vertices[previous[candidates]], vertices[current[candidates]],
+                          vertices[following[candidates]]], axis=1)
+
+    # Titik refleks dikelompokkan ke kolom-kolom x dan diurutkan menurut y di dalam kolom
+    # (kunci = kolom + y ternormalisasi), sehingga setiap segitiga hanya diuji terhadap
+    # titik di dalam kotak pembatasnya: satu searchsorted per kolom yang dilaluinya.
+    points = vertices[reflex]
+    x_min, y_min = points.min(axis=0)
+    x_span, y_span = np.ptp(points, axis=0) + 1e-12
+    columns = max(1, int(np.sqrt(len(reflex))))
+
+    def column(x):
+        return np.clip(((x - x_min) / x_span * columns).astype(np.int64), 0, columns - 1)
+
+    def level(y):
+        return np.clip((y - y_min) / y_span, 0.0, 1.0) * 0.5
+
+    keys = column(points[:, 0]) + level(points[:, 1])
+    order = np.argsort(keys, kind='stable')
+    reflex, keys = reflex[order], keys[order]
+
+    first, last = column(triangles[..., 0].min(axis=1)), column(triangles[..., 0].max(axis=1))
+    spans = last - first + 1
+    cells = np.repeat(np.arange(len(candidates)), spans)
+    cell_column = np.repeat(first, spans) + np.arange(len(cells)) - np.repeat(np.cumsum(spans) - spans, spans)
+    low = np.searchsorted(keys, cell_column + level(triangles[cells, :, 1].min(axis=1)), side='left')
+    high = np.searchsorted(keys, cell_column + level(triangles[cells, :, 1].max(axis=1)), side='right')
+    counts = high - low
+    total = int(counts.sum())
+    if not total:
+        return ear
+
+    owner = np.repeat(cells, counts)
+    point = vertices[reflex[np.repeat(low, counts) + np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)]]
+    a, b, c = triangles[owner, 0], triangles[owner, 1], triangles[owner, 2]
+    inside = (_cross(a, b, point) >= 0) & (_cross(b, c, point) >= 0) & (_cross(c, a, point) >= 0)
+    # Titik refleks yang berimpit dengan sudut segitiga (titik berulang) tidak menghalangi
+    corner = np.all(point == a, axis=1) | np.all(point == b, axis=1) | np.all(point == c, axis=1)
+    blocked = np.bincount(owner[inside & ~corner], minlength=len(candidates)) > 0
+    ear[candidates[blocked]] = False
+    return ear
+
+
+def triangulate(vertices):
+    """
+    Ear clipping untuk poligon sederhana (cekung boleh, tanpa lubang): indeks segitiga
+    (t, 3) int32 ke vertices, semuanya berorientasi berlawanan arah jarum jam. Setiap putaran
+    memotong semua telinga yang tidak bersebelahan sekaligus, sehingga jumlah putaran kecil
+    dan setiap putaran berupa operasi array. Poligon yang berpotongan sendiri (tanpa telinga)
+    sisanya dijadikan fan, seperti GL_POLYGON.
+    """
+    vertices = np.asarray(vertices, dtype=float)
+    empty = np.zeros((0, 3), dtype=np.int32)
+    if len(vertices) < 3:
+        return empty
+    # Titik berurutan yang sama dibuang
+    remaining = np.nonzero(np.any(vertices != np.roll(vertices, 1, axis=0), axis=1))[0]
+    if len(remaining) < 3:
+        return empty
+    x, y = vertices[remaining, 0], vertices[remaining, 1]
+    if np.sum(x * np.roll(y, -1) - np.roll(x, -1) * y) < 0:
+        remaining = remaining[::-1] # Searah jarum jam -> dibalik
+
+    triangles = []
+    while len(remaining) > 3:
+        previous, following = np.roll(remaining, 1), np.roll(remaining, -1)
+        turn = _cross(vertices[previous], vertices[remaining], vertices[following])
+        positions = np.nonzero(_ears(vertices, previous, remaining, following, turn > 0))[0]
+        if not len(positions):
+            flat = np.nonzero(turn == 0)[0]
+            if len(flat): # Titik segaris: dibuang tanpa segitiga
+                remaining = np.delete(remaining, flat[0])
+                continue
+            triangles.append(np.stack([np.full(len(remaining) - 2, remaining[0]),
+                                       remaining[1:-1], remaining[2:]], axis=1))
+            remaining = remaining[:0]
+            break
+        # Telinga yang tidak bersebelahan (juga melingkar) dipotong bersamaan; minimal 3 titik tersisa
+        taken = np.zeros(len(remaining), dtype=bool)
+        last = -2
+        for position in positions.tolist():
+            if position - last > 1:
+                taken[position] = True
+                last = position
+        if taken[0] and taken[-1]:
+            taken[-1] = False
+        excess = int(taken.sum()) - (len(remaining) - 3)
+        if excess > 0:
+            taken[np.nonzero(taken)[0][-excess:]] = False
+        triangles.append(np.stack([previous[taken], remaining[taken], following[taken]], axis=1))
+        remaining = remaining[~taken]
+    if len(remaining) == 3:
+        triangles.append(remaining[None])
+    return np.concatenate(triangles).astype(np.int32) if triangles else empty
+
+
+class Path:
+    """Titik-titik poligon/polyline dan triangulasinya (poligon), dihitung sekali per titik."""
+
+    def __init__(self, kind, vertices):
+        self.kind = kind
+        self.vertices = vertices # (k, 2) float64, koordinat objek (sebelum transformasi)
+        self.triangles = triangulate(vertices) if kind == KIND_POLYGON else None
+
+    def matches(self, kind, vertices):
+        return kind == self.kind and np.array_equal(vertices, self.vertices)
+
+
+class SceneArrays:
+    """
+    Objek-objek scene sebagai array (satu baris per objek), diperbarui per objek.
+    bounds menyimpan bounding box tiap objek (lihat compute_bounds). Poligon dan polyline
+    disimpan di paths (indeks -> Path); triangulasinya dipakai ulang selama titiknya sama.
+    """
+    FIELDS = (('kind', (), np.int8), ('points', (MAX_POINTS, 2), float), ('point_count', (), np.int32),
+              ('color', (3,), np.float32), ('thickness', (), float), ('transform', (5,), float),
+              ('bounds', (5,), float))
+
+    def __init__(self, capacity=1024):
+        self.lock = threading.Lock()
+        self.count = 0
+        self.paths = {}
+        self.triangulations = 0 # Jumlah poligon yang ditriangulasi (bukan dari cache)
+        for name, shape, dtype in self.FIELDS:
+            setattr(self, name, np.zeros((capacity,) + shape, dtype=dtype))
+
+    def _grow(self, needed):
+        capacity = len(self.kind)
+        if needed <= capacity:
+            return
+        capacity = max(needed, 2 * capacity)
+        for name, shape, dtype in self.FIELDS:
+            array = np.zeros((capacity,) + shape, dtype=dtype)
+            array[:self.count] = getattr(self, name)[:self.count]
+            setattr(self, name, array)
+
+    def _set(self, index, obj):
+        kind, points, count, color, thickness, transform = pack_object(obj)
+        self.kind[index] = kind
+        if count:
+            self.points[index, :count] = points
+        self.point_count[index] = count
+        self.color[index] = color
+        self.thickness[index] = thickness
+        self.transform[index] = transform
+        if kind in PATH_KINDS:
+            vertices = np.asarray(obj['points'], dtype=float).reshape(-1, 2)
+            cached = self.paths.get(index)
+            if cached is None or not cached.matches(kind, vertices):
+                self.paths[index] = Path(kind, vertices)
+                self.triangulations += kind == KIND_POLYGON
+        else:
+            self.paths.pop(index, None)
+
+    def _rows(self, indices):
+        rows = {name: getattr(self, name)[indices] for name, _, _ in self.FIELDS}
+        rows['index'] = np.asarray(indices, dtype=np.int64)
+        rows['paths'] = [self.paths[index] for index in rows['index'][np.isin(rows['kind'], PATH_KINDS)].tolist()]
+        return rows
+
+    def update(self, index, obj):
+        """
+        Mengemas ulang satu objek yang berubah; mengembalikan (bounding box lama, baru),
+        atau None jika objek belum tersimpan.
+        """
+        with self.lock:
+            if index >= self.count:
+                return None
+            old = self.bounds[index].copy()
+            self._set(index, obj)
+            self.bounds[index] = compute_bounds(self._rows([index]))[0]
+            return old, self.bounds[index].copy()
+
+    def sync(self, objects):
+        """
+        Menambahkan objek baru di akhir daftar. Mengembalikan (bounding box objek yang
+        ditambahkan, True jika daftar menyusut dan semua objek dikemas ulang).
+        """
+        with self.lock:
+            shrunk = len(objects) < self.count
+            if shrunk:
+                self.count = 0
+            start, end = self.count, len(objects)
+            self._grow(end)
+            for index in range(start, end):
+                self._set(index, objects[index])
+            self.bounds[start:end] = compute_bounds(self._rows(np.arange(start, end)))
+            self.count = end
+            return self.bounds[start:end].copy(), shrunk
+
+    def reset(self):
+        with self.lock:
+            self.count = 0
+
+    def path(self, index):
+        """Path objek ke-index (None untuk bentuk tetap atau objek yang belum tersimpan)."""
+        with self.lock:
+            return self.paths.get(index) if index < self.count else None
+
+    def rows(self, indices=None):
+        """
+        Salinan baris-baris (semua jika indices None) sebagai dictionary array; 'paths'
+        berisi Path baris-baris poligon/polyline, berurutan.
+        """
+        with self.lock:
+            return self._rows(np.arange(self.count) if indices is None else indices)
+
+    def max_margin(self):
+        with self.lock:
+            return float(self.bounds[:self.count, 4].max()) if self.count else 2.0
+
+    def scene_bounds(self):
+        """Bounding box semua objek (x_min, y_min, x_max, y_max), atau None jika kosong."""
+        with self.lock:
+            if not self.count:
+                return None
+            bounds = self.bounds[:self.count]
+            return (float(bounds[:, 0].min()), float(bounds[:, 1].min()),
+                    float(bounds[:, 2].max()), float(bounds[:, 3].max()))
+
+    def hits(self, rects, width, height, window=WORLD_WINDOW):
+        """
+        Indeks terurut objek yang bounding box-nya (dalam piksel tampilan width x height
+        yang memperlihatkan window, termasuk margin) beririsan dengan salah satu kotak
+        piksel rects (x0, y0, x1, y1).
+        """
+        with self.lock:
+            pixels = pixel_boxes(self.bounds[:self.count], width, height, window)
+        x0, y0, x1, y1 = pixels.T
+        hit = np.zeros(len(pixels), dtype=bool)
+        for rx0, ry0, rx1, ry1 in rects:
+            hit |= (x0 < rx1) & (x1 > rx0) & (y0 < ry1) & (y1 > ry0)
+        return np.nonzero(hit)[0]
+
+
+# --- Transformasi dan bounding box ---
+
+def transform_points(points, transform):
+    """
+    Skala, rotasi (derajat, di sekitar origin) lalu translasi, seperti
+    apply_object_transform_to_point di main.py; points (n, k, 2), transform (n, 5).
+    """
+    tx, ty, angle, sx, sy = (transform[:, i:i + 1] for i in range(5))
+    x = points[..., 0] * sx
+    y = points[..., 1] * sy
+    radians = np.radians(angle)
+    cos, sin = np.cos(radians), np.sin(radians)
+    return np.stack([x * cos - y * sin + tx, x * sin + y * cos + ty], axis=-1)
+
+
+def compute_bounds(rows):
+    """Bounding box setelah transformasi: (n, 5) [x_min, y_min, x_max, y_max, margin_piksel]."""
+    count = len(rows['kind'])
+    bounds = np.empty((count, 5))
+    if not count:
+        return bounds
+    transformed = transform_points(rows['points'], rows['transform'])
+    valid = np.arange(MAX_POINTS) < rows['point_count'][:, None]
+    bounds[:, 0] = np.where(valid, transformed[..., 0], np.inf).min(axis=1)
+    bounds[:, 1] = np.where(valid, transformed[..., 1], np.inf).min(axis=1)
+    bounds[:, 2] = np.where(valid, transformed[..., 0], -np.inf).max(axis=1)
+    bounds[:, 3] = np.where(valid, transformed[..., 1], -np.inf).max(axis=1)
+
+    ellipse = rows['kind'] == KIND_ELLIPSE
+    if ellipse.any():
+        center = transformed[ellipse, 0]
+        radii = np.abs(rows['points'][ellipse, 1] * rows['transform'][ellipse][:, 3:5])
+        # Lingkaran dengan radius terbesar mencakup elips, baik diputar (tanpa clipping) maupun tidak
+        radius = radii.max(axis=1)
+        bounds[ellipse, :4] = np.stack([center[:, 0] - radius, center[:, 1] - radius,
+                                        center[:, 0] + radius, center[:, 1] + radius], axis=1)
+
+    for row, path in zip(np.nonzero(np.isin(rows['kind'], PATH_KINDS))[0].tolist(), rows['paths']):
+        vertices = transform_points(path.vertices[None], rows['transform'][row:row + 1])[0]
+        bounds[row, :2] = vertices.min(axis=0) if len(vertices) else 0.0
+        bounds[row, 2:4] = vertices.max(axis=0) if len(vertices) else 0.0
+    bounds[:, 4] = rows['thickness'] / 2.0 + 2.0
+    return bounds
+
+
+def pixel_boxes(bounds, width, height, window=WORLD_WINDOW):
+    """
+    Bounding box dunia (n, 5) [x_min, y_min, x_max, y_max, margin_piksel] -> kotak piksel
+    (n, 4) pada tampilan width x height yang memperlihatkan window dunia, termasuk margin
+    (margin tetap dalam piksel pada zoom berapa pun, seperti glLineWidth/glPointSize).
+    """
+    x_min, y_min, x_max, y_max = window
+    origin = np.array([x_min, y_min, x_min, y_min])
+    scale = np.array([width / (x_max - x_min), height / (y_max - y_min)] * 2)
+    return (bounds[:, :4] - origin) * scale + bounds[:, 4:5] * np.array([-1.0, -1.0, 1.0, 1.0])
+
+
+def ellipse_rims(centers, radii, segments=ELLIPSE_SEGMENTS):
+    """Titik-titik keliling elips (n, segments + 1, 2), sudut 0 .. 2*pi seperti draw_ellipse()."""
+    angles = 2.0 * np.pi * np.arange(segments + 1, dtype=float) / float(segments)
+    return np.stack([centers[:, 0:1] + radii[:, 0:1] * np.cos(angles),
+                     centers[:, 1:2] + radii[:, 1:2] * np.sin(angles)], axis=-1)
+
+
+# --- Daerah clipping: poligon konveks ---
+
+def convex_hull(points):
+    """Convex hull (monotone chain) berlawanan arah jarum jam, tanpa titik yang segaris."""
+    points = np.unique(np.asarray(points, dtype=float).reshape(-1, 2), axis=0)
+    if len(points) < 3:
+        return points
+
+    def chain(sequence):
+        hull = []
+        for point in sequence:
+            while len(hull) >= 2 and _cross(hull[-2], hull[-1], point) <= 0:
+                hull.pop()
+            hull.append(point)
+        return hull
+
+    lower, upper = chain(points), chain(points[::-1])
+    return np.array(lower[:-1] + upper[:-1])
+
+
+class ClipRegion:
+    """
+    Daerah clipping konveks: convex hull dari titik-titik yang diberikan, berlawanan arah
+    jarum jam. Titik p berada di dalam jika normals @ p >= offsets untuk setiap tepi
+    (normal ke arah dalam, tidak dinormalisasi: tepi horizontal/vertikal diuji tepat
+    seperti perbandingan x_min <= x <= x_max).
+    """
+
+    def __init__(self, points):
+        self.vertices = convex_hull(points)
+        if len(self.vertices) < 3:
+            raise ValueError("Daerah clipping membutuhkan minimal 3 titik yang tidak segaris.")
+        edges = np.roll(self.vertices, -1, axis=0) - self.vertices
+        self.normals = np.stack([-edges[:, 1], edges[:, 0]], axis=1)
+        self.offsets = np.einsum('ij,ij->i', self.normals, self.vertices)
+        self.bounds = tuple(self.vertices.min(axis=0).tolist() + self.vertices.max(axis=0).tolist())
+
+    @classmethod
+    def rectangle(cls, x_min, y_min, x_max, y_max):
+        return cls([[x_min, y_min], [x_max, y_min], [x_max, y_max], [x_min, y_max]])
+
+    def moved(self, dx, dy):
+        return ClipRegion(self.vertices + [dx, dy])
+
+    def contains(self, x, y):
+        return bool(np.all(self.normals @ [x, y] >= self.offsets))
+
+    def __eq__(self, other):
+        return isinstance(other, ClipRegion) and np.array_equal(self.vertices, other.vertices)
+
+    __hash__ = None
+
+
+def _distances(points, region):
+    """Jarak bertanda (tidak dinormalisasi) titik (..., 2) ke setiap tepi region (..., k); >= 0 di dalam."""
+    return points @ region.normals.T - region.offsets
+
+
+def points_inside(points, region):
+    return np.all(_distances(points, region) >= 0, axis=-1)
+
+
+def bounds_overlap(bounds, region):
+    """Bounding box (n, >= 4) yang beririsan dengan bounding box region (uji tolak cepat per region)."""
+    x_min, y_min, x_max, y_max = region.bounds
+    return (bounds[:, 0] <= x_max) & (bounds[:, 2] >= x_min) & (bounds[:, 1] <= y_max) & (bounds[:, 3] >= y_min)
+
+
+def clip_segments(start, end, region):
+    """
+    Cyrus-Beck untuk banyak segmen sekaligus terhadap region konveks: (start, end, keep)
+    dengan start/end (m, 2) yang sudah dipotong; segmen di luar region mempunyai keep False.
+    Segmen yang kedua ujungnya di dalam (diterima) atau di sisi luar tepi yang sama
+    (ditolak) tidak melewati perhitungan parameter t.
+    """
+    start_distance = _distances(start, region)
+    end_distance = _distances(end, region)
+    inside = np.all(start_distance >= 0, axis=1) & np.all(end_distance >= 0, axis=1)
+    outside = np.any((start_distance < 0) & (end_distance < 0), axis=1)
+    keep = inside.copy()
+    start, end = start.copy(), end.copy()
+    crossing = np.nonzero(~inside & ~outside)[0]
+    if len(crossing):
+        d0, d1 = start_distance[crossing], end_distance[crossing]
+        # Titik potong dengan garis tepi: t = d0 / (d0 - d1); masuk jika d0 < d1, keluar jika d0 > d1
+        with np.errstate(divide='ignore', invalid='ignore'):
+            t = d0 / (d0 - d1)
+        t0 = np.where(d0 < d1, t, 0.0).max(axis=1, initial=0.0)
+        t1 = np.where(d0 > d1, t, 1.0).min(axis=1, initial=1.0)
+        segment_start, delta = start[crossing], end[crossing] - start[crossing]
+        keep[crossing] = t0 <= t1
+        start[crossing] = np.where((t0 > 0)[:, None], segment_start + t0[:, None] * delta, segment_start)
+        end[crossing] = np.where((t1 < 1)[:, None], segment_start + t1[:, None] * delta, end[crossing])
+    return start, end, keep
+
+
+def _clip_polygons_edge(vertices, counts, normal, offset):
+    """Satu langkah Sutherland-Hodgman (satu tepi region) untuk semua poligon sekaligus."""
+    columns = vertices.shape[1]
+    index = np.arange(columns)
+    valid = index < counts[:, None]
+    following = (index + 1) % np.maximum(counts, 1)[:, None]
+    p1 = vertices
+    p2 = np.take_along_axis(vertices, following[..., None], axis=1)
+    d1 = p1 @ normal - offset
+    d2 = np.take_along_axis(d1, following, axis=1)
+    inside1, inside2 = d1 >= 0, d2 >= 0
+
+    # Titik potong dengan tepi (hanya dipakai jika p1 dan p2 di sisi berbeda, jadi d1 != d2)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t = d1 / (d1 - d2)
+    intersection = p1 + np.where(inside1 != inside2, t, 0.0)[..., None] * (p2 - p1)
+
+    # Setiap tepi menghasilkan: titik potong (jika melintasi batas) lalu p2 (jika di dalam)
+    candidates = np.stack([intersection, p2], axis=2).reshape(len(vertices), 2 * columns, 2)
+    keep = (np.stack([inside1 != inside2, inside2], axis=2) & valid[..., None]).reshape(len(vertices), 2 * columns)
+    new_counts = keep.sum(axis=1).astype(np.int32)
+    order = np.argsort(~keep, axis=1, kind='stable')[:, :max(int(new_counts.max(initial=0)), 1)]
+    return np.take_along_axis(candidates, order[..., None], axis=1), new_counts
+
+
+def clip_polygons(vertices, counts, region):
+    """
+    Sutherland-Hodgman untuk banyak poligon sekaligus terhadap region konveks (satu
+    langkah per tepi region). vertices (n, k, 2) dengan counts (n,) verteks terpakai per
+    baris; mengembalikan (vertices, counts) hasil clipping. Poligon yang seluruh
+    verteksnya di dalam dipakai apa adanya, poligon yang seluruhnya di luar satu tepi
+    langsung dibuang (counts 0).
+    """
+    counts = np.asarray(counts, dtype=np.int32)
+    if not len(vertices):
+        return vertices, counts
+    valid = (np.arange(vertices.shape[1]) < counts[:, None])[..., None]
+    distance = _distances(vertices, region)
+    inside = np.all((distance >= 0) | ~valid, axis=(1, 2))
+    outside = np.any(np.all((distance < 0) | ~valid, axis=1), axis=1)
+    crossing = np.nonzero(~inside & ~outside)[0]
+    result_counts = np.where(inside, counts, 0).astype(np.int32)
+    if not len(crossing):
+        return vertices, result_counts
+
+    clipped, clipped_counts = vertices[crossing], counts[crossing]
+    for normal, offset in zip(region.normals, region.offsets):
+        clipped, clipped_counts = _clip_polygons_edge(clipped, clipped_counts, normal, offset)
+    result = np.zeros((len(vertices), max(vertices.shape[1], clipped.shape[1]), 2))
+    result[:, :vertices.shape[1]] = vertices
+    result[crossing, :clipped.shape[1]] = clipped
+    result_counts[crossing] = clipped_counts
+    return result, result_counts
+
+
+# --- Membangun vertex array ---
+
+class GeometryBuffer:
+    """
+    Array verteks yang dipakai ulang antar frame (membesar bila perlu). take() memberikan
+    potongan berurutan sampai reset(); potongan yang sudah diberikan tetap valid saat array
+    membesar (array lama tetap dipegang potongannya).
+    """
+
+    def __init__(self):
+        self.vertices = np.empty((0, VERTEX_FLOATS), dtype=np.float32)
+        self.used = 0
+
+    def reset(self):
+        self.used = 0
+
+    def take(self, count):
+        if self.used + count > len(self.vertices):
+            self.vertices = np.empty((max(self.used + count, 2 * len(self.vertices)), VERTEX_FLOATS), dtype=np.float32)
+        start, self.used = self.used, self.used + count
+        return self.vertices[start:self.used]
+
+
+class Geometry:
+    """Hasil build_geometry(): verteks, indeks segitiga dan rentang gambar tiap kelompok."""
+
+    def __init__(self, vertices, triangles, line_batches, point_batches, first=0):
+        self.vertices = vertices # (V, 6) float32
+        self.first = first # Posisi verteks pertama di VBO; indeks dan rentang di bawah sudah termasuk first
+        self.triangles = triangles # uint32 (3 per segitiga), untuk glDrawElements(GL_TRIANGLES)
+        self.line_batches = line_batches # [(ketebalan, first, count)] untuk GL_LINES
+        self.point_batches = point_batches # [(ukuran, first, count)] untuk GL_POINTS
+
+    @property
+    def empty(self):
+        return not len(self.vertices)
+
+
+def _vertices(points, depth, color):
+    """Verteks (n * k, 6) dari titik (n, k, 2) dengan kedalaman (n,) dan warna (n, 3) per objek."""
+    count, per_object = points.shape[:2]
+    vertices = np.empty((count, per_object, VERTEX_FLOATS), dtype=np.float32)
+    vertices[..., :2] = points
+    vertices[..., 2] = depth[:, None]
+    vertices[..., 3:] = color[:, None, :]
+    return vertices.reshape(-1, VERTEX_FLOATS)
+
+
+def _ragged_vertices(points, counts, depth, color):
+    """Seperti _vertices, tetapi hanya counts[i] titik pertama setiap baris yang dipakai."""
+    valid = np.arange(points.shape[1]) < counts[:, None]
+    rows = np.nonzero(valid)[0]
+    vertices = np.empty((len(rows), VERTEX_FLOATS), dtype=np.float32)
+    vertices[:, :2] = points[valid]
+    vertices[:, 2] = depth[rows]
+    vertices[:, 3:] = color[rows]
+    return vertices
+
+
+def fan_triangles(counts):
+    """
+    Indeks segitiga (t, 3) untuk poligon konveks berurutan dengan counts[i] verteks:
+    (awal, awal + j, awal + j + 1) untuk setiap poligon, seperti GL_TRIANGLE_FAN.
+    """
+    counts = np.asarray(counts, dtype=np.int64)
+    starts = np.cumsum(counts) - counts
+    per_polygon = np.maximum(counts - 2, 0)
+    total = int(per_polygon.sum())
+    base = np.repeat(starts, per_polygon)
+    step = np.arange(total) - np.repeat(np.cumsum(per_polygon) - per_polygon, per_polygon) + 1
+    return np.stack([base, base + step, base + step + 1], axis=1)
+
+
+def _convex_fill(points, counts, depth, color):
+    """Poligon konveks (n, k, 2) dengan counts verteks -> (verteks, indeks segitiga)."""
+    return _ragged_vertices(points, counts, depth, color), fan_triangles(counts)
+
+
+def _path_rows(rows, kind):
+    """(baris, Path) untuk semua objek berjenis kind."""
+    path_rows = np.nonzero(np.isin(rows['kind'], PATH_KINDS))[0]
+    return [(row, path) for row, path in zip(path_rows.tolist(), rows['paths']) if path.kind == kind]
+
+
+def build_geometry(rows, clipping, regions, buffer=None, first=0):
+    """
+    Vertex array untuk baris-baris SceneArrays.rows(), yang akan diunggah mulai verteks
+    ke-first VBO. clipping dan regions (daftar
+    ClipRegion) mengikuti clipping_enabled dan clip_regions di main.py: tanpa clipping
+    objek diisi dan ditransformasi penuh (seperti glTranslate/glRotate/glScale di
+    display()); dengan clipping setiap objek dipotong terhadap setiap region yang bounding
+    box-nya beririsan dengan bounding box objek, dan yang tergambar adalah gabungan
+    potongannya. Titik diuji, garis dan polyline dipotong (Cyrus-Beck), segitiga/persegi
+    dan segitiga hasil triangulasi poligon dipotong (Sutherland-Hodgman) lalu digambar
+    sebagai segitiga, dan elips digambar sebagai outline yang segmennya dipotong.
+    """
+    kind = rows['kind']
+    depth = -1.0 + (rows['index'] + 1) * DEPTH_STEP
+    color = rows['color']
+    thickness = rows['thickness']
+    transformed = transform_points(rows['points'], rows['transform'])
+
+    fills = [] # (verteks, indeks segitiga lokal)
+    lines = [] # (verteks, ketebalan per segmen)
+    points = [] # (verteks, ukuran per titik)
+
+    def regions_of(selected):
+        """
+        (region, baris) untuk setiap region: baris-baris selected yang bounding box-nya
+        beririsan dengan region (yang lain ditolak sebelum geometrinya dibuat). Tanpa
+        clipping: (None, selected).
+        """
+        if not clipping:
+            if len(selected):
+                yield None, selected
+            return
+        bounds = rows['bounds'][selected]
+        for region in regions:
+            overlapping = selected[bounds_overlap(bounds, region)]
+            if len(overlapping):
+                yield region, overlapping
+
+    def add_points(region, position, owner):
+        if region is not None:
+            inside = points_inside(position, region)
+            position, owner = position[inside], owner[inside]
+        points.append((_vertices(position[:, None], depth[owner], color[owner]), thickness[owner]))
+
+    def add_segments(region, start, end, owner):
+        if region is not None:
+            start, end, keep = clip_segments(start, end, region)
+            start, end, owner = start[keep], end[keep], owner[keep]
+        lines.append((_vertices(np.stack([start, end], axis=1), depth[owner], color[owner]), thickness[owner]))
+
+    def add_convex(region, vertices, counts, owner):
+        if region is not None:
+            vertices, counts = clip_polygons(vertices, counts, region)
+            drawn = counts >= 3
+            vertices, counts, owner = vertices[drawn], counts[drawn], owner[drawn]
+        fills.append(_convex_fill(vertices, counts, depth[owner], color[owner]))
+
+    for region, selected in regions_of(np.nonzero(kind == KIND_POINT)[0]):
+        add_points(region, transformed[selected, 0], selected)
+
+    for region, selected in regions_of(np.nonzero(kind == KIND_LINE)[0]):
+        add_segments(region, transformed[selected, 0], transformed[selected, 1], selected)
+
+    for region, selected in regions_of(np.nonzero((kind == KIND_TRIANGLE) | (kind == KIND_RECTANGLE))[0]):
+        add_convex(region, transformed[selected], rows['point_count'][selected], selected)
+
+    for region, selected in regions_of(np.nonzero(kind == KIND_ELLIPSE)[0]):
+        raw = rows['points'][selected]
+        ellipse_transform = rows['transform'][selected]
+        if clipping:
+            # Outline dari pusat yang ditransformasi dan radius yang diskalakan, lalu tiap segmen dipotong
+            rims = ellipse_rims(transformed[selected, 0], raw[:, 1] * ellipse_transform[:, 3:5])
+            add_segments(region, rims[:, :-1].reshape(-1, 2), rims[:, 1:].reshape(-1, 2),
+                         np.repeat(selected, ELLIPSE_SEGMENTS))
+        else:
+            # Fan terisi: pusat lalu keliling, ditransformasi penuh (termasuk rotasi)
+            fan = np.concatenate([raw[:, 0:1], ellipse_rims(raw[:, 0], raw[:, 1])], axis=1)
+            fan = transform_points(fan, ellipse_transform)
+            add_convex(None, fan, np.full(len(fan), fan.shape[1]), selected)
+
+    # Verteks poligon/polyline ditransformasi sekali per build, dipakai oleh semua region
+    paths = dict(_path_rows(rows, KIND_POLYGON) + _path_rows(rows, KIND_POLYLINE))
+    path_vertices = {}
+
+    def vertices_of(row):
+        if row not in path_vertices:
+            path_vertices[row] = transform_points(paths[row].vertices[None], rows['transform'][row:row + 1])[0]
+        return path_vertices[row]
+
+    polygons = np.array([row for row, path in paths.items() if path.kind == KIND_POLYGON], dtype=np.int64)
+    for region, selected in regions_of(polygons):
+        if region is None:
+            for row in selected.tolist():
+                fills.append((_vertices(vertices_of(row)[None], depth[row:row + 1], color[row:row + 1]),
+                              paths[row].triangles))
+            continue
+        # Segitiga triangulasi (cache) dipotong satu per satu: hasilnya selalu konveks
+        pieces = [vertices_of(row)[paths[row].triangles] for row in selected.tolist()]
+        soup = np.concatenate(pieces)
+        add_convex(region, soup, np.full(len(soup), 3, dtype=np.int32),
+                   np.repeat(selected, [len(piece) for piece in pieces]))
+
+    polylines = np.array([row for row, path in paths.items() if path.kind == KIND_POLYLINE], dtype=np.int64)
+    for region, selected in regions_of(polylines):
+        strips = [vertices_of(row) for row in selected.tolist()]
+        add_segments(region, np.concatenate([strip[:-1] for strip in strips]),
+                     np.concatenate([strip[1:] for strip in strips]),
+                     np.repeat(selected, [max(len(strip) - 1, 0) for strip in strips]))
+
+    return _assemble(fills, lines, points, buffer, first)
+
+
+def _batches(groups, vertices_per_item, first):
+    """Menggabungkan (verteks, nilai per item) menjadi kelompok per nilai (ketebalan/ukuran)."""
+    pieces, batches = [], []
+    values = np.concatenate([value for _, value in groups]) if groups else np.empty(0)
+    vertices = (np.concatenate([array for array, _ in groups]) if groups
+                else np.empty((0, VERTEX_FLOATS), dtype=np.float32))
+    if not len(values):
+        return pieces, batches
+    unique, inverse = np.unique(values, return_inverse=True)
+    order = np.argsort(inverse, kind='stable')
+    counts = np.bincount(inverse, minlength=len(unique))
+    item_vertices = vertices.reshape(len(values), vertices_per_item, VERTEX_FLOATS)[order]
+    pieces.append(item_vertices.reshape(-1, VERTEX_FLOATS))
+    for value, count in zip(unique.tolist(), counts.tolist()):
+        batches.append((value, first, count * vertices_per_item))
+        first += count * vertices_per_item
+    return pieces, batches
+
+
+def _assemble(fills, lines, points, buffer, first):
+    fill_vertices = [array for array, _ in fills]
+    offsets = first + np.cumsum([0] + [len(array) for array in fill_vertices])
+    triangles = (np.concatenate([indices.reshape(-1) + offset for (_, indices), offset in zip(fills, offsets)])
+                 .astype(np.uint32) if fills else np.empty(0, dtype=np.uint32))
+    fill_end = int(offsets[-1])
+
+    line_pieces, line_batches = _batches(lines, 2, fill_end)
+    line_total = sum(count for _, _, count in line_batches)
+    point_pieces, point_batches = _batches(points, 1, fill_end + line_total)
+
+    pieces = fill_vertices + line_pieces + point_pieces
+    total = sum(len(piece) for piece in pieces)
+    vertices = buffer.take(total) if buffer is not None else np.empty((total, VERTEX_FLOATS), dtype=np.float32)
+    if pieces:
+        np.concatenate(pieces, out=vertices)
+    return Geometry(vertices, triangles, line_batches, point_batches, first)
@@ -74,6 +74,8 @@ document.addEventListener("DOMContentLoaded", () => {
       document.getElementById("drawTriangleTool"),
       document.getElementById("drawEllipseTool"),
       document.getElementById("drawRectangleTool"),
+      document.getElementById("drawPolygonTool"),
+      document.getElementById("drawPolylineTool"),
       document.getElementById("selectNoneTool"),
     ];
 
@@ -156,6 +158,18 @@ document.addEventListener("DOMContentLoaded", () => {
     sendMessageToBackend("/api/draw_mode", { mode: "rectangle" });
     setActiveDrawingToolButton("drawRectangleTool");
   });
+  document.getElementById("drawPolygonTool").addEventListener("click", () => {
+    sendMessageToBackend("/api/draw_mode", { mode: "polygon" });
+    setActiveDrawingToolButton("drawPolygonTool");
+  });
+  document.getElementById("drawPolylineTool").addEventListener("click", () => {
+    sendMessageToBackend("/api/draw_mode", { mode: "polyline" });
+    setActiveDrawingToolButton("drawPolylineTool");
+  });
+  document.getElementById("finishShapeTool").addEventListener("click", () => {
+    // Menyimpan poligon/polyline yang sedang diinput; mode gambar tidak berubah.
+    sendMessageToBackend("/api/draw_mode", { mode: "finish_shape" });
+  });
   document.getElementById("selectNoneTool").addEventListener("click", () => {
     sendMessageToBackend("/api/draw_mode", { mode: "none" });
     setActiveDrawingToolButton("selectNoneTool");
@@ -175,6 +189,17 @@ document.addEventListener("DOMContentLoaded", () => {
     // Catatan: Anda mungkin ingin menambahkan logika visual aktif khusus untuk tombol ini
     // jika pengguna sedang dalam mode mengatur jendela clipping.
   });
+  document.getElementById("addClipWindow").addEventListener("click", () => {
+    // Jendela persegi baru (2 klik) ditambahkan ke daerah clipping yang sudah ada.
+    sendMessageToBackend("/api/clipping", { action: "add_window_mode" });
+  });
+  document.getElementById("addClipPolygon").addEventListener("click", () => {
+    // Daerah poligon konveks: klik verteks-verteksnya, lalu klik titik pertama lagi.
+    sendMessageToBackend("/api/clipping", { action: "add_polygon_mode" });
+  });
+  document.getElementById("resetClipRegions").addEventListener("click", () => {
+    sendMessageToBackend("/api/clipping", { action: "reset_regions" });
+  });
   document.getElementById("enableClipping").addEventListener("click", () => {
     sendMessageToBackend("/api/clipping", { action: "enable" });
     // Menambahkan gaya aktif ke tombol "Aktifkan Clipping", menghapus dari "Nonaktifkan Clipping".
@@ -188,6 +213,27 @@ document.addEventListener("DOMContentLoaded", () => {
     document.getElementById("enableClipping").classList.remove("active-tool-button");
   });
 
+  // --- Event Listener untuk Kontrol Viewport ---
+  document.getElementById("layoutSingle").addEventListener("click", () => {
+    sendMessageToBackend("/api/viewport", { action: "layout", layout: "single" });
+  });
+  document.getElementById("layoutOverviewDetail").addEventListener("click", () => {
+    // Tampilan utama ditambah inset overview yang menandai area tampilan utama.
+    sendMessageToBackend("/api/viewport", { action: "layout", layout: "overview_detail" });
+  });
+  document.getElementById("viewZoomIn").addEventListener("click", () => {
+    sendMessageToBackend("/api/viewport", { action: "zoom", name: "main", factor: 1.25 });
+  });
+  document.getElementById("viewZoomOut").addEventListener("click", () => {
+    sendMessageToBackend("/api/viewport", { action: "zoom", name: "main", factor: 0.8 });
+  });
+  document.getElementById("viewFit").addEventListener("click", () => {
+    sendMessageToBackend("/api/viewport", { action: "fit", name: "main" });
+  });
+  document.getElementById("viewReset").addEventListener("click", () => {
+    sendMessageToBackend("/api/viewport", { action: "reset" });
+  });
+
   // --- Event Listener untuk Kontrol Umum ---
   document.getElementById("clearAllObjects").addEventListener("click", () => {
     sendMessageToBackend("/api/draw_mode", { mode: "clear_all" });
@@ -4,38 +4,364 @@ Flask + OpenGL 3D Graphics Application (Single File Backend)
 Simplified version - hanya 2 file: app.py + 3d.html
 """
 
-from flask import Flask, send_file
-from flask_socketio import SocketIO, emit
-import threading
 import time
+
+# Startup timings (see startup_times) are measured from here, before the heavy imports
+STARTED_AT = time.perf_counter()
+
+from flask import Flask, send_file, request, Response, jsonify
+from flask_socketio import SocketIO, emit, join_room, leave_room
+import threading
 import json
 import math
 import numpy as np
 import os
 import sys
-import webbrowser
+import io
+import ctypes
+import itertools
+import functools
 from pathlib import Path
 
+# Headless mode renders into an offscreen EGL surface (works with Mesa llvmpipe
+# on GPU-less machines). PyOpenGL picks its platform at import time, so this
+# has to be decided before the OpenGL import below.
+HEADLESS = os.environ.get('GRAFKOM_HEADLESS') == '1' or '--headless' in sys.argv
+if HEADLESS:
+    os.environ.setdefault('PYOPENGL_PLATFORM', 'egl')
+    os.environ.setdefault('EGL_PLATFORM', 'surfaceless')
+
 # Try import OpenGL
 try:
     from OpenGL.GL import *
     from OpenGL.GLU import *
-    import pygame
-    from pygame.locals import *
     OPENGL_AVAILABLE = True
 except ImportError:
     OPENGL_AVAILABLE = False
     print("⚠️  OpenGL not available. Install with: pip install PyOpenGL pygame")
 
+# The GL helpers import OpenGL themselves, so they are only loaded when it is
+# available; outside the try above, so their own errors are not mistaken for a
+# missing OpenGL
+if OPENGL_AVAILABLE:
+    import phong_shader
+    import shadow_map
+    import gl_state
+    import frame_readback
+
+import matrices
+import culling
+import mesh_lod
+import mesh_optimize
+import mesh_io
+import model_cache
+import bvh
+import wire_protocol
+
+# pygame is only needed for the window and for PNG encoding (importing it costs
+# more than OpenGL), so headless runs never load it; see load_pygame()
+pygame = None
+
+def load_pygame():
+    """Import pygame on first use"""
+    global pygame
+    if pygame is None:
+        import pygame as module
+        pygame = module
+    return pygame
+
+# Seconds from STARTED_AT to each startup event reached so far
+startup_times = {}
+
+def mark_startup(event):
+    """Record a startup event (only its first occurrence counts)"""
+    startup_times.setdefault(event, round(time.perf_counter() - STARTED_AT, 4))
+
+mark_startup('imports_s')
+
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'graphics3d_secret'
 socketio = SocketIO(app, cors_allowed_origins="*")
 
-class OpenGLRenderer:
+class OffscreenContext:
+    """EGL pbuffer context used instead of a pygame window in headless mode"""
+    def __init__(self, width, height):
+        from OpenGL import EGL
+        
+        self.egl = EGL
+        self.display = EGL.eglGetDisplay(EGL.EGL_DEFAULT_DISPLAY)
+        major, minor = EGL.EGLint(), EGL.EGLint()
+        EGL.eglInitialize(self.display, ctypes.pointer(major), ctypes.pointer(minor))
+        
+        config_attribs = [
+            EGL.EGL_SURFACE_TYPE, EGL.EGL_PBUFFER_BIT,
+            EGL.EGL_RED_SIZE, 8, EGL.EGL_GREEN_SIZE, 8, EGL.EGL_BLUE_SIZE, 8,
+            EGL.EGL_DEPTH_SIZE, 24,
+            EGL.EGL_RENDERABLE_TYPE, EGL.EGL_OPENGL_BIT,
+            EGL.EGL_NONE
+        ]
+        config = EGL.EGLConfig()
+        num_configs = EGL.EGLint()
+        EGL.eglChooseConfig(self.display, (EGL.EGLint * len(config_attribs))(*config_attribs),
+                            ctypes.pointer(config), 1, ctypes.pointer(num_configs))
+        if num_configs.value == 0:
+            raise RuntimeError("No EGL config with pbuffer + desktop OpenGL support")
+        
+        surface_attribs = [EGL.EGL_WIDTH, width, EGL.EGL_HEIGHT, height, EGL.EGL_NONE]
+        self.surface = EGL.eglCreatePbufferSurface(
+            self.display, config, (EGL.EGLint * len(surface_attribs))(*surface_attribs))
+        EGL.eglBindAPI(EGL.EGL_OPENGL_API)
+        self.context = EGL.eglCreateContext(self.display, config, EGL.EGL_NO_CONTEXT, None)
+        EGL.eglMakeCurrent(self.display, self.surface, self.surface, self.context)
+        
+    def release(self):
+        """Destroy the context and surface"""
+        EGL = self.egl
+        EGL.eglMakeCurrent(self.display, EGL.EGL_NO_SURFACE, EGL.EGL_NO_SURFACE, EGL.EGL_NO_CONTEXT)
+        EGL.eglDestroyContext(self.display, self.context)
+        EGL.eglDestroySurface(self.display, self.surface)
+        EGL.eglTerminate(self.display)
+
+def encode_png(pixels, width, height):
+    """Encode bottom-up RGB pixels (as returned by glReadPixels) to PNG bytes"""
+    pygame = load_pygame()
+    surface = pygame.image.frombuffer(pixels, (width, height), 'RGB')
+    buffer = io.BytesIO()
+    pygame.image.save(pygame.transform.flip(surface, False, True), buffer, 'frame.png')
+    return buffer.getvalue()
+
+class FrameClock:
+    """Frame rate limiter of the headless loop (tick() like pygame.time.Clock, without pygame)"""
     def __init__(self):
+        self.last_tick = time.perf_counter()
+    
+    def tick(self, framerate):
+        delay = 1.0 / framerate - (time.perf_counter() - self.last_tick)
+        if delay > 0:
+            time.sleep(delay)
+        self.last_tick = time.perf_counter()
+
+class Mesh:
+    """Indexed triangle mesh kept as NumPy arrays, uploaded to VBOs on first draw"""
+    def __init__(self, positions, normals, indices, texcoords=None, face_materials=None, materials=None):
+        self.positions = np.ascontiguousarray(positions, dtype=np.float32).reshape(-1, 3)
+        self.normals = np.ascontiguousarray(normals, dtype=np.float32).reshape(-1, 3)
+        self.texcoords = (np.ascontiguousarray(texcoords, dtype=np.float32).reshape(-1, 2)
+                          if texcoords is not None else None)
+        indices = np.asarray(indices).reshape(-1, 3)
+        
+        # Triangles sorted by material: one contiguous index range (and draw) per material
+        self.materials = materials or []
+        self.ranges = []
+        if face_materials is not None and len(face_materials):
+            order = np.argsort(face_materials, kind='stable')
+            indices = indices[order]
+            ids, first, counts = np.unique(np.asarray(face_materials)[order], return_index=True, return_counts=True)
+            self.ranges = list(zip(ids.tolist(), first.tolist(), counts.tolist()))
+        self.indices = np.ascontiguousarray(indices, dtype=np.uint32)
+        
+        # (aabb_min, aabb_max, sphere_center, sphere_radius) in object space
+        self.bounds = culling.compute_bounds(self.positions)
+        self.stride = 32 if self.texcoords is not None else 24
+        self.vbo = None
+        self.ibo = None
+        
+    @property
+    def vertex_count(self):
+        return len(self.positions)
+    
+    @property
+    def face_count(self):
+        return len(self.indices)
+    
+    def upload(self):
+        """Upload one interleaved position/normal(/texcoord) stream and indices (GL thread only)"""
+        columns = [self.positions, self.normals]
+        if self.texcoords is not None:
+            columns.append(self.texcoords)
+        interleaved = np.hstack(columns).astype(np.float32)
+        self.vbo = glGenBuffers(1)
+        glBindBuffer(GL_ARRAY_BUFFER, self.vbo)
+        glBufferData(GL_ARRAY_BUFFER, interleaved.nbytes, interleaved, GL_STATIC_DRAW)
+        self.ibo = glGenBuffers(1)
+        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, self.ibo)
+        glBufferData(GL_ELEMENT_ARRAY_BUFFER, self.indices.nbytes, self.indices, GL_STATIC_DRAW)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, 0)
+        
+    def bind(self):
+        """Bind buffers and vertex/normal(/texcoord) pointers"""
+        if self.vbo is None:
+            self.upload()
+        glBindBuffer(GL_ARRAY_BUFFER, self.vbo)
+        glEnableClientState(GL_VERTEX_ARRAY)
+        glEnableClientState(GL_NORMAL_ARRAY)
+        glVertexPointer(3, GL_FLOAT, self.stride, ctypes.c_void_p(0))
+        glNormalPointer(GL_FLOAT, self.stride, ctypes.c_void_p(12))
+        if self.texcoords is not None:
+            glEnableClientState(GL_TEXTURE_COORD_ARRAY)
+            glTexCoordPointer(2, GL_FLOAT, self.stride, ctypes.c_void_p(24))
+        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, self.ibo)
+        
+    def unbind(self):
+        glDisableClientState(GL_VERTEX_ARRAY)
+        glDisableClientState(GL_NORMAL_ARRAY)
+        if self.texcoords is not None:
+            glDisableClientState(GL_TEXTURE_COORD_ARRAY)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, 0)
+        
+    def draw(self):
+        """Draw the whole mesh with the current matrix and material"""
+        self.bind()
+        self.draw_elements()
+        self.unbind()
+    
+    def draw_elements(self):
+        """Draw call only, for a mesh that is already bound"""
+        glDrawElements(GL_TRIANGLES, self.indices.size, GL_UNSIGNED_INT, None)
+    
+    def draw_materials(self, set_material, default_color):
+        """Draw with each material's own color, one draw call per material; returns the draw count"""
+        if not self.ranges:
+            set_material(default_color)
+            self.draw()
+            return 1
+        self.bind()
+        for material, first, count in self.ranges:
+            set_material(self.materials[material]['diffuse'] if material < len(self.materials) else default_color)
+            glDrawElements(GL_TRIANGLES, count * 3, GL_UNSIGNED_INT, ctypes.c_void_p(first * 12))
+        self.unbind()
+        return len(self.ranges)
+        
+    def release(self):
+        """Delete GPU buffers (GL thread only)"""
+        if self.vbo is not None:
+            glDeleteBuffers(2, [self.vbo, self.ibo])
+            self.vbo = None
+            self.ibo = None
+
+def build_quad_mesh(quads):
+    """Mesh from a list of (normal, [4 vertices]) quads, split into triangles"""
+    positions, normals, indices = [], [], []
+    for normal, corners in quads:
+        base = len(positions)
+        positions.extend(corners)
+        normals.extend([normal] * len(corners))
+        for i in range(1, len(corners) - 1):
+            indices.append([base, base + i, base + i + 1])
+    return Mesh(positions, normals, indices)
+
+def build_cube_mesh():
+    """Same cube as draw_cube, as a mesh"""
+    return build_quad_mesh([
+        ((0.0, 0.0, 1.0), [(-1, -1, 1), (1, -1, 1), (1, 1, 1), (-1, 1, 1)]),
+        ((0.0, 0.0, -1.0), [(-1, -1, -1), (-1, 1, -1), (1, 1, -1), (1, -1, -1)]),
+        ((0.0, 1.0, 0.0), [(-1, 1, -1), (-1, 1, 1), (1, 1, 1), (1, 1, -1)]),
+        ((0.0, -1.0, 0.0), [(-1, -1, -1), (1, -1, -1), (1, -1, 1), (-1, -1, 1)]),
+        ((1.0, 0.0, 0.0), [(1, -1, -1), (1, 1, -1), (1, 1, 1), (1, -1, 1)]),
+        ((-1.0, 0.0, 0.0), [(-1, -1, -1), (-1, -1, 1), (-1, 1, 1), (-1, 1, -1)])
+    ])
+
+def build_pyramid_mesh(base_size=1.5, height=2.5):
+    """Same pyramid as draw_pyramid, as a mesh"""
+    b, h = base_size, height
+    apex = (0.0, h, 0.0)
+    return build_quad_mesh([
+        ((0.0, -1.0, 0.0), [(-b, 0, -b), (b, 0, -b), (b, 0, b), (-b, 0, b)]),
+        ((0.0, 0.7, 0.7), [apex, (-b, 0, b), (b, 0, b)]),
+        ((0.7, 0.7, 0.0), [apex, (b, 0, b), (b, 0, -b)]),
+        ((0.0, 0.7, -0.7), [apex, (b, 0, -b), (-b, 0, -b)]),
+        ((-0.7, 0.7, 0.0), [apex, (-b, 0, -b), (-b, 0, b)])
+    ])
+
+def build_sphere_mesh(radius=1.5, slices=32, stacks=16):
+    """UV sphere with smooth normals (same resolution as draw_sphere)"""
+    theta = np.linspace(0.0, np.pi, stacks + 1)[:, None]
+    phi = np.linspace(0.0, 2.0 * np.pi, slices + 1)[None, :]
+    normals = np.stack([
+        np.sin(theta) * np.sin(phi),
+        np.cos(theta) * np.ones_like(phi),
+        np.sin(theta) * np.cos(phi)
+    ], axis=-1).reshape(-1, 3)
+    
+    ring = slices + 1
+    i, j = np.meshgrid(np.arange(stacks), np.arange(slices), indexing='ij')
+    a = (i * ring + j).ravel()
+    b = a + ring
+    indices = np.concatenate([
+        np.stack([a, b, b + 1], axis=1),
+        np.stack([a, b + 1, a + 1], axis=1)
+    ])
+    return Mesh(normals * radius, normals, indices)
+
+def build_flat_mesh(vertices, faces, texcoords=None, face_materials=None, materials=None):
+    """De-indexed mesh with one flat normal per triangle (how draw_obj_model shades)"""
+    vertices = np.asarray(vertices, dtype=np.float32).reshape(-1, 3)
+    faces = np.asarray(faces, dtype=np.int64).reshape(-1, 3)
+    positions = vertices[faces]
+    normals = compute_face_normals(vertices, faces)
+    return Mesh(positions.reshape(-1, 3), np.repeat(normals, 3, axis=0),
+                np.arange(faces.size).reshape(-1, 3),
+                texcoords[faces].reshape(-1, 2) if texcoords is not None else None,
+                face_materials, materials)
+
+def build_smooth_mesh(vertices, faces, texcoords=None, face_materials=None, materials=None):
+    """Indexed mesh with area-weighted vertex normals (shares vertices between triangles)"""
+    vertices = np.asarray(vertices, dtype=np.float32).reshape(-1, 3)
+    faces = np.asarray(faces, dtype=np.int64).reshape(-1, 3)
+    v1, v2, v3 = vertices[faces[:, 0]], vertices[faces[:, 1]], vertices[faces[:, 2]]
+    face_normals = np.cross(v2 - v1, v3 - v1)
+    # Sum per vertex with bincount (np.add.at is several times slower)
+    corner_vertices = faces.ravel()
+    normals = np.stack([np.bincount(corner_vertices, np.repeat(face_normals[:, axis], 3), minlength=len(vertices))
+                        for axis in range(3)], axis=1).astype(np.float32)
+    lengths = np.linalg.norm(normals, axis=1, keepdims=True)
+    normals = np.divide(normals, lengths, out=np.zeros_like(normals), where=lengths > 0)
+    return Mesh(vertices, normals, faces, texcoords, face_materials, materials)
+
+def compute_face_normals(vertices, faces):
+    """Unit normal per triangle; degenerate triangles get a zero normal"""
+    v1, v2, v3 = vertices[faces[:, 0]], vertices[faces[:, 1]], vertices[faces[:, 2]]
+    normals = np.cross(v2 - v1, v3 - v1)
+    lengths = np.linalg.norm(normals, axis=1, keepdims=True)
+    return np.divide(normals, lengths, out=np.zeros_like(normals), where=lengths > 0)
+
+class SceneNode:
+    """One object in the scene graph: a mesh reference plus transform and material"""
+    def __init__(self, node_id, mesh, transform=None, material=None):
+        self.node_id = node_id
+        self.mesh = mesh
+        self.transform = {
+            'rot_x': 0.0, 'rot_y': 0.0, 'rot_z': 0.0,
+            'scale': 1.0,
+            'pos_x': 0.0, 'pos_y': 0.0, 'pos_z': 0.0
+        }
+        self.transform.update(transform or {})
+        self.material = {'color': list(MESH_COLORS.get(mesh, MESH_COLORS['obj']))}
+        self.material.update(material or {})
+        
+    def to_dict(self):
+        return {'id': self.node_id, 'mesh': self.mesh,
+                'transform': dict(self.transform), 'material': dict(self.material)}
+
+# Default material colors (same as the single-object draw methods)
+MESH_COLORS = {
+    'cube': (0.39, 0.71, 0.96),
+    'pyramid': (0.94, 0.58, 0.98),
+    'sphere': (0.31, 0.80, 0.77),
+    'obj': (0.0, 0.74, 0.83)
+}
+
+# Instanced drawing: the per-instance model matrix comes from a vertex
+# attribute (divisor 1); lighting reuses the fixed-function light/material state.
+class OpenGLRenderer:
+    def __init__(self, headless=HEADLESS):
         # Window settings
         self.window_width = 800
         self.window_height = 600
+        self.headless = headless
+        self.offscreen = None
         
         # Camera parameters untuk gluLookAt
         self.camera_params = {
@@ -73,13 +399,101 @@ class OpenGLRenderer:
         self.shadows_enabled = True
         self.auto_rotate = True
         
+        # Shadow of the current object on the ground; the depth pass is only
+        # re-rendered when shadow_key() changes (applied on the render thread)
+        self.shadow_map = None
+        self.shadow_resolution = 1024
+        self.shadow_active = False
+        self.depth_only = False
+        
+        # CPU time of the last frame per pass, in ms
+        self.frame_times = {}
+        
+        # Lighting, material, polygon mode and program changes go through the
+        # state cache, which drops calls that would not change anything
+        self.gl_state = gl_state.StateCache()
+        
+        # Snapshots: while requested, frames are read back through pixel buffer
+        # objects on the render thread and PNG-encoded by the requesting thread
+        self.readback = None
+        self.snapshots = frame_readback.SnapshotStore(encode_png)
+        self.frame_index = 0
+        
+        # Projection, view and object model matrices, built in NumPy and
+        # rebuilt only when their parameters change
+        self.matrix_cache = matrices.MatrixCache()
+        
         # Animation
         self.rotation_angle = 0.0
         self.running = False
+        # Set once the first frame is rendered (or the renderer failed to start)
+        self.ready = threading.Event()
         
         # OBJ model data
         self.obj_vertices = []
         self.obj_faces = []
+        self.obj_file = None
+        # Optional attributes from the file (None when absent) and usemtl materials
+        self.obj_normals = None
+        self.obj_texcoords = None
+        self.obj_face_materials = None
+        self.obj_materials = []
+        self.obj_groups = []
+        
+        # Background OBJ loading: the loader thread parks a finished model in
+        # pending_model and the render loop installs it between frames
+        self.load_job = None
+        self.pending_model = None
+        
+        # Recently loaded models (CPU arrays, GPU buffers and LODs), keyed by
+        # file identity so switching back to a model skips the reload
+        self.current_model = None
+        self.model_cache = model_cache.ModelCache(512 * 1024 * 1024, on_evict=self.on_model_evicted)
+        
+        # Scene graph: many objects drawn on top of the current object.
+        # Nodes sharing a mesh and material are drawn as one instanced batch.
+        self.scene_nodes = {}
+        self.scene_lock = threading.Lock()
+        self.scene_dirty = True
+        self.node_ids = itertools.count(1)
+        self.meshes = {}
+        self.batches = []
+        self.retired_meshes = []
+        self.instancing_enabled = True
+        self.instanced_program = None
+        self.instance_attrib = -1
+        
+        # Per-pixel Phong through phong_shader (lights/material as uniforms);
+        # the fixed-function path remains as fallback and for comparison
+        self.shader_lighting = True
+        self.phong_program = None
+        self.draw_calls = 0
+        
+        # OBJ import stage: weld duplicate vertices, drop degenerate triangles and
+        # reorder for the vertex cache. Optimized models are drawn indexed with
+        # smooth normals; without it every triangle keeps its own flat-shaded corners.
+        self.optimize_imports = True
+        # Binary STL/PLY are drawn as memory-mapped (load time bounded by the disk);
+        # running them through the import stage as well is an explicit opt-in
+        self.optimize_mapped_imports = False
+        self.import_report = None
+        
+        # Levels of detail for the loaded OBJ model, built in a background thread.
+        # Policies: 'screen_size' (pick from projected size), 'full', 'coarsest'
+        self.obj_lod_meshes = []
+        self.lod_policy = 'screen_size'
+        self.lod_pixels_per_triangle = 4.0
+        self.lod_generation = 0
+        self.lod_thread = None
+        self.current_lod_level = 0
+        
+        # Ray picking: BVHs built on first pick (OBJ models keep theirs in the
+        # model dict, so cached models do not rebuild); name -> (faces, bvh)
+        self.pick_bvhs = {}
+        
+        # View-frustum culling (counts are per frame, objects = nodes + current object)
+        self.frustum_culling_enabled = True
+        self.cull_stats = {'drawn': 0, 'culled': 0}
         
         # Statistics
         self.vertex_count = 8
@@ -92,10 +506,13 @@ class OpenGLRenderer:
             return False
             
         try:
-            os.environ['SDL_VIDEO_WINDOW_POS'] = '100,100'
-            pygame.init()
-            pygame.display.set_mode((self.window_width, self.window_height), DOUBLEBUF | OPENGL)
-            pygame.display.set_caption("OpenGL 3D Renderer - Controlled by Web UI")
+            if self.headless:
+                self.offscreen = OffscreenContext(self.window_width, self.window_height)
+            else:
+                os.environ['SDL_VIDEO_WINDOW_POS'] = '100,100'
+                load_pygame().init()
+                pygame.display.set_mode((self.window_width, self.window_height), pygame.DOUBLEBUF | pygame.OPENGL)
+                pygame.display.set_caption("OpenGL 3D Renderer - Controlled by Web UI")
             
             # Enable depth testing
             glEnable(GL_DEPTH_TEST)
@@ -114,6 +531,17 @@ class OpenGLRenderer:
             
             # Set background color
             glClearColor(0.06, 0.06, 0.14, 1.0)
+            
+            self.init_shaders()
+            
+            try:
+                self.readback = frame_readback.FrameReadback()
+            except Exception as e:
+                print(f"⚠️  Pixel buffer objects not available, snapshots read back synchronously: {e}")
+                self.readback = None
+            
+            # New context; the lights above were also set before any camera
+            self.gl_state.invalidate()
             return True
             
         except Exception as e:
@@ -125,109 +553,156 @@ class OpenGLRenderer:
         glViewport(0, 0, self.window_width, self.window_height)
         
     def setup_projection(self):
-        """Setup projection matrix menggunakan gluPerspective"""
-        glMatrixMode(GL_PROJECTION)
-        glLoadIdentity()
-        
+        """Load the projection matrix (gluPerspective or glOrtho equivalent) if it changed"""
+        matrix = self.projection_matrix_gl()
+        def load():
+            glMatrixMode(GL_PROJECTION)
+            glLoadMatrixf(matrix)
+            glMatrixMode(GL_MODELVIEW)
+        self.gl_state.call('projection_matrix', self.matrix_cache.version('projection'), load)
+    
+    def projection_key(self):
+        return (self.projection_mode, tuple(sorted(self.perspective_params.items())))
+    
+    def build_projection_matrix(self):
         if self.projection_mode == 'perspective':
-            gluPerspective(
+            return matrices.perspective_matrix(
                 self.perspective_params['fov'],
-                self.perspective_params['aspect'], 
+                self.perspective_params['aspect'],
                 self.perspective_params['near'],
                 self.perspective_params['far']
             )
-        else:  # orthographic
-            frustum_size = 5
-            aspect = self.perspective_params['aspect']
-            glOrtho(
-                -frustum_size * aspect / 2, frustum_size * aspect / 2,
-                -frustum_size / 2, frustum_size / 2,
-                self.perspective_params['near'], self.perspective_params['far']
-            )
+        frustum_size = 5
+        aspect = self.perspective_params['aspect']
+        return matrices.ortho_matrix(
+            -frustum_size * aspect / 2, frustum_size * aspect / 2,
+            -frustum_size / 2, frustum_size / 2,
+            self.perspective_params['near'], self.perspective_params['far']
+        )
+    
+    def projection_matrix(self):
+        """Projection matrix (perspective or orthographic), cached until its parameters change"""
+        return self.matrix_cache.get('projection', self.projection_key(), self.build_projection_matrix)
+    
+    def projection_matrix_gl(self):
+        return self.matrix_cache.gl('projection', self.projection_key(), self.build_projection_matrix)
+    
+    def view_key(self):
+        return tuple(sorted(self.camera_params.items()))
+    
+    def build_view_matrix(self):
+        c = self.camera_params
+        return matrices.look_at_matrix(
+            (c['eye_x'], c['eye_y'], c['eye_z']),
+            (c['center_x'], c['center_y'], c['center_z']),
+            (c['up_x'], c['up_y'], c['up_z'])
+        )
+    
+    def view_matrix(self):
+        """Camera (gluLookAt) matrix, cached until camera_params change"""
+        return self.matrix_cache.get('view', self.view_key(), self.build_view_matrix)
+    
+    def model_key(self):
+        return (tuple(sorted(self.transform_params.items())), self.rotation_angle if self.auto_rotate else 0.0)
+    
+    def build_model_matrix(self):
+        return matrices.model_matrix(self.transform_params, self.rotation_angle if self.auto_rotate else 0.0)
+    
+    def model_matrix(self):
+        """Model matrix of the current object, cached until transform_params or the rotation change"""
+        return self.matrix_cache.get('model', self.model_key(), self.build_model_matrix)
+    
+    def frustum_planes(self):
+        """World-space view-frustum planes for the current camera and projection"""
+        return culling.frustum_planes(self.projection_matrix() @ self.view_matrix())
     
     def setup_camera(self):
-        """Setup camera menggunakan gluLookAt"""
+        """Load the projection and the camera (view) matrix into GL"""
+        self.setup_projection()
         glMatrixMode(GL_MODELVIEW)
-        glLoadIdentity()
-        
-        gluLookAt(
-            self.camera_params['eye_x'], self.camera_params['eye_y'], self.camera_params['eye_z'],
-            self.camera_params['center_x'], self.camera_params['center_y'], self.camera_params['center_z'],
-            self.camera_params['up_x'], self.camera_params['up_y'], self.camera_params['up_z']
-        )
+        glLoadMatrixf(self.matrix_cache.gl('view', self.view_key(), self.build_view_matrix))
+    
+    def phong_lights(self):
+        """Lights of the Phong model (world space), shared by the shader and fixed-function paths"""
+        black = [0.0, 0.0, 0.0, 1.0]
+        ambient_enabled = self.lighting_params['ambient_enabled']
+        diffuse_enabled = self.lighting_params['diffuse_enabled']
+        specular_enabled = self.lighting_params['specular_enabled']
+        return [
+            # Ambient Light
+            {'enabled': ambient_enabled, 'position': [0.0, 0.0, 1.0, 0.0],
+             'ambient': [0.2, 0.2, 0.2, 1.0], 'diffuse': black, 'specular': black},
+            # Directional Light (Diffuse + Specular)
+            {'enabled': diffuse_enabled or specular_enabled, 'position': [10.0, 10.0, 5.0, 0.0],
+             'ambient': black,
+             'diffuse': [0.8, 0.8, 0.8, 1.0] if diffuse_enabled else black,
+             'specular': [1.0, 1.0, 1.0, 1.0] if specular_enabled else black},
+            # Point Light
+            {'enabled': True, 'position': [5.0, 5.0, 5.0, 1.0],
+             'ambient': black, 'diffuse': [0.3, 0.1, 0.1, 1.0], 'specular': [0.5, 0.2, 0.2, 1.0]}
+        ]
+    
+    def lighting_key(self):
+        """Everything the light uniforms depend on (lighting toggles and camera)"""
+        return (tuple(sorted(self.lighting_params.items())), tuple(sorted(self.camera_params.items())))
+    
+    def active_program(self):
+        """Phong program used for non-instanced draws, or None on the fixed-function path"""
+        return self.phong_program if self.shader_lighting else None
+    
+    def update_program_lights(self, program):
+        """Re-send light uniforms to a (bound) program if lighting or camera changed"""
+        changed = program.update_lights(self.lighting_key(),
+                                        lambda: phong_shader.eye_space_lights(self.phong_lights(), self.view_matrix()))
+        self.gl_state.record(changed, calls=5)
     
     def setup_phong_lighting(self):
         """Setup Phong lighting model"""
-        glEnable(GL_LIGHTING)
-        glEnable(GL_NORMALIZE)
-        
-        # Ambient Light
-        if self.lighting_params['ambient_enabled']:
-            glEnable(GL_LIGHT0)
-            ambient_light = [0.2, 0.2, 0.2, 1.0]
-            glLightfv(GL_LIGHT0, GL_AMBIENT, ambient_light)
-            glLightfv(GL_LIGHT0, GL_DIFFUSE, [0.0, 0.0, 0.0, 1.0])
-            glLightfv(GL_LIGHT0, GL_SPECULAR, [0.0, 0.0, 0.0, 1.0])
-        else:
-            glDisable(GL_LIGHT0)
-            
-        # Directional Light (Diffuse + Specular)
-        if self.lighting_params['diffuse_enabled'] or self.lighting_params['specular_enabled']:
-            glEnable(GL_LIGHT1)
-            
-            light_position = [10.0, 10.0, 5.0, 0.0]
-            glLightfv(GL_LIGHT1, GL_POSITION, light_position)
-            
-            if self.lighting_params['diffuse_enabled']:
-                diffuse_light = [0.8, 0.8, 0.8, 1.0]
-                glLightfv(GL_LIGHT1, GL_DIFFUSE, diffuse_light)
-            else:
-                glLightfv(GL_LIGHT1, GL_DIFFUSE, [0.0, 0.0, 0.0, 1.0])
-                
-            if self.lighting_params['specular_enabled']:
-                specular_light = [1.0, 1.0, 1.0, 1.0]
-                glLightfv(GL_LIGHT1, GL_SPECULAR, specular_light)
-            else:
-                glLightfv(GL_LIGHT1, GL_SPECULAR, [0.0, 0.0, 0.0, 1.0])
-        else:
-            glDisable(GL_LIGHT1)
-            
-        # Point Light
-        glEnable(GL_LIGHT2)
-        point_light_pos = [5.0, 5.0, 5.0, 1.0]
-        glLightfv(GL_LIGHT2, GL_POSITION, point_light_pos)
-        glLightfv(GL_LIGHT2, GL_DIFFUSE, [0.3, 0.1, 0.1, 1.0])
-        glLightfv(GL_LIGHT2, GL_SPECULAR, [0.5, 0.2, 0.2, 1.0])
-        
-    def set_material_properties(self, color):
+        state = self.gl_state
+        program = self.active_program()
+        if program is not None:
+            state.disable(GL_LIGHTING)
+            state.use_program(program.program)
+            self.update_program_lights(program)
+            return
+        
+        state.use_program(0)
+        state.enable(GL_LIGHTING)
+        state.enable(GL_NORMALIZE)
+        
+        # Light positions are transformed by the current (camera) modelview
+        view_key = tuple(sorted(self.camera_params.items()))
+        for i, light in enumerate(self.phong_lights()):
+            gl_light = GL_LIGHT0 + i
+            state.set_enabled(gl_light, light['enabled'])
+            if not light['enabled']:
+                continue
+            state.light(gl_light, GL_POSITION, light['position'], view_key)
+            state.light(gl_light, GL_AMBIENT, light['ambient'])
+            state.light(gl_light, GL_DIFFUSE, light['diffuse'])
+            state.light(gl_light, GL_SPECULAR, light['specular'])
+        
+    def set_material_properties(self, color, program=None):
         """Set material properties untuk Phong shading"""
         ambient = [color[0] * 0.2, color[1] * 0.2, color[2] * 0.2, 1.0]
         diffuse = [color[0], color[1], color[2], 1.0]
         specular = [0.8, 0.8, 0.8, 1.0] if self.lighting_params['specular_enabled'] else [0.0, 0.0, 0.0, 1.0]
         shininess = 100.0 if self.lighting_params['specular_enabled'] else 0.0
         
-        glMaterialfv(GL_FRONT, GL_AMBIENT, ambient)
-        glMaterialfv(GL_FRONT, GL_DIFFUSE, diffuse)
-        glMaterialfv(GL_FRONT, GL_SPECULAR, specular)
-        glMaterialf(GL_FRONT, GL_SHININESS, shininess)
-    
-    def apply_transformations(self):
-        """Apply object transformations"""
-        glTranslatef(
-            self.transform_params['pos_x'],
-            self.transform_params['pos_y'], 
-            self.transform_params['pos_z']
-        )
+        if self.depth_only:
+            return
         
-        glRotatef(self.transform_params['rot_x'], 1, 0, 0)
-        glRotatef(self.transform_params['rot_y'], 0, 1, 0)
-        glRotatef(self.transform_params['rot_z'], 0, 0, 1)
+        program = program or self.active_program()
+        if program is not None:
+            self.gl_state.uniforms(program.program, 'material', (tuple(ambient), tuple(diffuse), tuple(specular), shininess),
+                                   lambda: program.set_material(ambient, diffuse, specular, shininess), calls=4)
+            return
         
-        if self.auto_rotate:
-            glRotatef(self.rotation_angle, 0, 1, 0)
-            
-        scale = self.transform_params['scale']
-        glScalef(scale, scale, scale)
+        self.gl_state.material(ambient, diffuse, specular, shininess)
+    
+    def apply_transformations(self):
+        """Apply object transformations (one glMultMatrixf with the cached model matrix)"""
+        glMultMatrixf(self.matrix_cache.gl('model', self.model_key(), self.build_model_matrix))
     
     def draw_cube(self):
         """Draw cube with manual vertex creation"""
@@ -235,10 +710,7 @@ class OpenGLRenderer:
         self.vertex_count = 8
         self.face_count = 6
         
-        if self.wireframe_mode:
-            glPolygonMode(GL_FRONT_AND_BACK, GL_LINE)
-        else:
-            glPolygonMode(GL_FRONT_AND_BACK, GL_FILL)
+        self.gl_state.polygon_mode(GL_LINE if self.wireframe_mode else GL_FILL)
             
         glBegin(GL_QUADS)
         
@@ -292,10 +764,7 @@ class OpenGLRenderer:
         self.vertex_count = 5
         self.face_count = 5
         
-        if self.wireframe_mode:
-            glPolygonMode(GL_FRONT_AND_BACK, GL_LINE)
-        else:
-            glPolygonMode(GL_FRONT_AND_BACK, GL_FILL)
+        self.gl_state.polygon_mode(GL_LINE if self.wireframe_mode else GL_FILL)
             
         base_size = 1.5
         height = 2.5
@@ -344,10 +813,7 @@ class OpenGLRenderer:
         self.vertex_count = 514
         self.face_count = 512
         
-        if self.wireframe_mode:
-            glPolygonMode(GL_FRONT_AND_BACK, GL_LINE)
-        else:
-            glPolygonMode(GL_FRONT_AND_BACK, GL_FILL)
+        self.gl_state.polygon_mode(GL_LINE if self.wireframe_mode else GL_FILL)
             
         quadric = gluNewQuadric()
         gluQuadricNormals(quadric, GLU_SMOOTH)
@@ -355,118 +821,722 @@ class OpenGLRenderer:
         gluDeleteQuadric(quadric)
     
     def load_obj_file(self, filename):
-        """Load OBJ file"""
-        self.obj_vertices = []
-        self.obj_faces = []
-        
+        """Load OBJ/STL/PLY file (blocking; the web UI loads through load_obj_async)"""
         try:
-            if not os.path.exists(filename):
-                # Try creating a simple test OBJ if file doesn't exist
-                if 'tetrahedron' in filename.lower():
-                    self.create_test_tetrahedron()
-                    return True
-                else:
-                    return False
-                    
-            with open(filename, 'r') as file:
-                for line in file:
-                    parts = line.strip().split()
-                    if not parts:
-                        continue
-                        
-                    if parts[0] == 'v':
-                        vertex = [float(parts[1]), float(parts[2]), float(parts[3])]
-                        self.obj_vertices.append(vertex)
-                        
-                    elif parts[0] == 'f':
-                        face = []
-                        for part in parts[1:]:
-                            vertex_index = int(part.split('/')[0]) - 1
-                            face.append(vertex_index)
-                        
-                        if len(face) > 3:
-                            for i in range(1, len(face) - 1):
-                                triangle = [face[0], face[i], face[i + 1]]
-                                self.obj_faces.append(triangle)
-                        else:
-                            self.obj_faces.append(face)
-                            
+            model = self.read_obj_model(filename)
+        except Exception as e:
+            print(f"Error loading OBJ file: {e}")
+            return False
+        if model is None:
+            return False
+        self.install_model(model)
+        return True
+    
+    def read_obj_model(self, filename, progress=None, cancelled=None):
+        """
+        Parse and prepare a mesh file (OBJ, binary STL or PLY) without touching the live scene.
+        Returns a model dict for install_model, or None if the file is missing.
+        """
+        if not os.path.exists(filename):
+            # Try creating a simple test OBJ if file doesn't exist
+            if 'tetrahedron' in filename.lower():
+                model = self.create_test_tetrahedron(install=False)
+                model['filename'] = filename
+                return model
+            return None
+        
+        optimize = self.optimize_imports and (self.optimize_mapped_imports or not mesh_io.is_mapped_format(filename))
+        key = model_cache.file_key(filename, self.optimize_imports, optimize)
+        model = self.model_cache.get(key)
+        if model is not None:
+            if progress:
+                progress('cached', 1, 1)
+            return model
+        
+        data = mesh_io.load_mesh(
+            filename, cancelled=cancelled,
+            progress=(lambda done, total: progress('parsing', done, total)) if progress else None)
+        
+        report = None
+        if optimize and len(data.faces):
+            if progress:
+                progress('optimizing', 0, 1)
+            names = [name for name in ('normals', 'texcoords') if getattr(data, name) is not None]
+            data.positions, data.faces, attributes, data.face_materials, report = \
+                mesh_optimize.optimize_mesh_attributes(data.positions, data.faces,
+                                                       [getattr(data, name) for name in names],
+                                                       data.face_materials)
+            for name, attribute in zip(names, attributes):
+                setattr(data, name, attribute)
+            print(f"🧹 Import optimized: {report['vertices_before']} -> "
+                  f"{report['vertices_after']} vertices, "
+                  f"{report['degenerate_removed']} degenerate triangles removed, "
+                  f"{mesh_optimize.describe_acmr(report)}")
+        if cancelled and cancelled():
+            raise mesh_io.LoadCancelled(filename)
+        model = self.make_model(filename, data, report)
+        model['key'] = key
+        self.model_cache.put(key, model, self.model_nbytes(model))
+        return model
+    
+    def make_model(self, filename, data, report=None):
+        """Model dict (as installed by install_model) for a mesh_io.MeshData"""
+        return {
+            'filename': filename,
+            'data': data,
+            'report': report,
+            'key': None,
+            'mesh': self.build_obj_mesh(data.positions, data.faces, data.normals, data.texcoords,
+                                        data.face_materials, data.materials) if len(data.faces) else None,
+            'lod_meshes': None,
+            'bvh': None,
+            'bvh_building': False
+        }
+    
+    def model_nbytes(self, model):
+        """Approximate memory held by a model: CPU arrays plus GPU copies of its meshes"""
+        data = model['data']
+        arrays = [data.positions, data.faces, data.normals, data.texcoords, data.face_materials]
+        nbytes = sum(array.nbytes for array in arrays if array is not None)
+        for mesh in [model['mesh']] + (model['lod_meshes'] or []):
+            if mesh is not None:
+                mesh_arrays = [mesh.positions, mesh.normals, mesh.texcoords, mesh.indices]
+                nbytes += 2 * sum(array.nbytes for array in mesh_arrays if array is not None)
+        if model['bvh'] is not None:
+            nbytes += model['bvh'].nbytes
+        return nbytes
+    
+    def on_model_evicted(self, key, model):
+        """Free the GPU buffers of an evicted model unless it is on screen"""
+        if model is self.current_model:
+            return
+        with self.scene_lock:
+            self.retired_meshes.extend(mesh for mesh in [model['mesh']] + (model['lod_meshes'] or [])
+                                       if mesh is not None)
+    
+    def install_model(self, model):
+        """Make a prepared model the current object (render thread, between frames)"""
+        with self.scene_lock:
+            mesh = self.meshes.pop('obj', None)
+            # Meshes of a cached model stay alive for when it is selected again
+            if not self.model_cache.contains(self.current_model):
+                if mesh is not None:
+                    self.retired_meshes.append(mesh)
+                self.retired_meshes.extend(self.obj_lod_meshes)
+            self.obj_lod_meshes = []
+            self.current_model = model
+            if model['mesh'] is not None:
+                self.meshes['obj'] = model['mesh']
+            data = model['data']
+            self.obj_vertices = data.positions
+            self.obj_faces = data.faces
+            self.obj_normals = data.normals
+            self.obj_texcoords = data.texcoords
+            self.obj_face_materials = data.face_materials
+            self.obj_materials = data.materials
+            self.obj_groups = data.groups
+            self.obj_file = model['filename']
+            self.import_report = model['report']
             self.vertex_count = len(self.obj_vertices)
             self.face_count = len(self.obj_faces)
             self.current_object = 'obj'
-            return True
+            self.scene_dirty = True
+            if model['lod_meshes'] is not None:
+                self.obj_lod_meshes = model['lod_meshes']
+                self.lod_generation += 1
+        if model['lod_meshes'] is None:
+            self.start_lod_build()
+    
+    def load_obj_async(self, filename, progress=None, done=None):
+        """
+        Load an OBJ file on a worker thread, cancelling any load still in flight.
+        progress(stage, done, total) reports parsing progress; done(success,
+        message) is called once the model is installed, or the load failed.
+        """
+        with self.scene_lock:
+            previous = self.load_job
+            if previous is not None:
+                previous['cancel'].set()
+                if self.pending_model is not None and self.pending_model[1] is previous:
+                    self.pending_model = None
+            job = {'filename': filename, 'cancel': threading.Event(), 'done': done, 'finished': False}
+            self.load_job = job
+        if previous is not None:
+            self.finish_load(previous, False, 'cancelled')
+        
+        def work():
+            try:
+                model = self.read_obj_model(filename, progress, job['cancel'].is_set)
+            except mesh_io.LoadCancelled:
+                self.finish_load(job, False, 'cancelled')
+                return
+            except Exception as e:
+                print(f"Error loading OBJ file: {e}")
+                self.finish_load(job, False, str(e))
+                return
+            if model is None:
+                self.finish_load(job, False, 'file not found')
+                return
             
-        except Exception as e:
-            print(f"Error loading OBJ file: {e}")
-            return False
+            with self.scene_lock:
+                if job['cancel'].is_set():
+                    model = None
+                else:
+                    self.pending_model = (model, job)
+            if model is None:
+                self.finish_load(job, False, 'cancelled')
+            elif not self.running:
+                # No render loop to pick it up
+                self.install_pending_model()
+        
+        threading.Thread(target=work, daemon=True).start()
+        return job
+    
+    def cancel_obj_load(self):
+        """Cancel the load in flight, if any; returns True if there was one"""
+        with self.scene_lock:
+            job = self.load_job
+            if job is None:
+                return False
+            job['cancel'].set()
+            if self.pending_model is not None and self.pending_model[1] is job:
+                self.pending_model = None
+        self.finish_load(job, False, 'cancelled')
+        return True
+    
+    def finish_load(self, job, success, message):
+        """Report the outcome of a background load exactly once"""
+        with self.scene_lock:
+            if job['finished']:
+                return
+            job['finished'] = True
+            if self.load_job is job:
+                self.load_job = None
+        if job['done']:
+            job['done'](success, message)
     
-    def create_test_tetrahedron(self):
+    def install_pending_model(self):
+        """Install a model finished by the loader thread, if one is waiting"""
+        with self.scene_lock:
+            pending, self.pending_model = self.pending_model, None
+        if pending is None:
+            return
+        model, job = pending
+        self.install_model(model)
+        print(f"📁 Loaded {os.path.basename(model['filename'])}: "
+              f"{self.vertex_count} vertices, {self.face_count} faces")
+        self.finish_load(job, True, 'loaded')
+    
+    def create_test_tetrahedron(self, install=True):
         """Create a simple test tetrahedron"""
-        self.obj_vertices = [
+        vertices = np.array([
             [0.0, 1.0, 0.0],
             [-1.0, -1.0, 1.0],
             [1.0, -1.0, 1.0],
             [0.0, -1.0, -1.0]
-        ]
+        ], dtype=np.float32)
         
-        self.obj_faces = [
+        faces = np.array([
             [0, 1, 2],
             [0, 3, 1],
             [0, 2, 3],
             [1, 3, 2]
-        ]
+        ], dtype=np.int64)
         
-        self.vertex_count = 4
-        self.face_count = 4
-        self.current_object = 'obj'
+        model = self.make_model('tetrahedron', mesh_io.MeshData(vertices, faces))
+        if install:
+            self.install_model(model)
+        return model
     
     def draw_obj_model(self):
-        """Draw OBJ model"""
-        if not self.obj_vertices or not self.obj_faces:
-            return
-            
-        self.set_material_properties([0.0, 0.74, 0.83])
+        """Draw OBJ model at the level of detail picked for its screen size; returns the draw count"""
+        chain = self.obj_lod_chain()
+        if not chain:
+            return 0
+        model = self.model_matrix()
+        self.current_lod_level = int(self.lod_levels(chain, model[None])[0])
+        mesh = chain[self.current_lod_level]
         
-        if self.wireframe_mode:
-            glPolygonMode(GL_FRONT_AND_BACK, GL_LINE)
-        else:
-            glPolygonMode(GL_FRONT_AND_BACK, GL_FILL)
-            
-        glBegin(GL_TRIANGLES)
-        for face in self.obj_faces:
-            if len(face) >= 3:
-                v1 = np.array(self.obj_vertices[face[0]])
-                v2 = np.array(self.obj_vertices[face[1]])
-                v3 = np.array(self.obj_vertices[face[2]])
-                
-                normal = np.cross(v2 - v1, v3 - v1)
-                normal = normal / np.linalg.norm(normal)
-                
-                glNormal3f(normal[0], normal[1], normal[2])
-                glVertex3f(v1[0], v1[1], v1[2])
-                glVertex3f(v2[0], v2[1], v2[2])
-                glVertex3f(v3[0], v3[1], v3[2])
-        glEnd()
+        self.gl_state.polygon_mode(GL_LINE if self.wireframe_mode else GL_FILL)
+        
+        # One draw call per usemtl material
+        return mesh.draw_materials(self.set_material_properties, MESH_COLORS['obj'])
     
     def draw_ground(self):
-        """Draw ground plane"""
-        glDisable(GL_LIGHTING)
+        """Draw ground plane (receiving the shadow of the current object when active)"""
+        self.gl_state.disable(GL_LIGHTING)
         glColor3f(0.2, 0.2, 0.2)
+        if self.shadow_active:
+            receiver = self.shadow_map
+            self.gl_state.use_program(receiver.program)
+            self.gl_state.uniforms(receiver.program, 'receiver', (receiver.key, receiver.resolution),
+                                   lambda: receiver.bind_receiver((0.2, 0.2, 0.2)), calls=6)
+        else:
+            self.gl_state.use_program(0)
         
+        # Counter-clockwise seen from above, so back-face culling keeps it
         glBegin(GL_QUADS)
         glVertex3f(-10.0, -2.0, -10.0)
-        glVertex3f( 10.0, -2.0, -10.0)
-        glVertex3f( 10.0, -2.0,  10.0)
         glVertex3f(-10.0, -2.0,  10.0)
+        glVertex3f( 10.0, -2.0,  10.0)
+        glVertex3f( 10.0, -2.0, -10.0)
         glEnd()
+    
+    # --- Shadows ---
+    def shadow_light(self):
+        """The directional light of the Phong model, which casts the shadow"""
+        return self.phong_lights()[1]
+    
+    def shadow_key(self):
+        """Everything the depth pass depends on"""
+        return (
+            tuple(self.shadow_light()['position']),
+            tuple(sorted(self.transform_params.items())),
+            self.rotation_angle if self.auto_rotate else None,
+            self.current_object,
+            id(self.get_mesh(self.current_object)),
+            self.current_lod_level,
+            self.wireframe_mode
+        )
+    
+    def update_shadow_map(self):
+        """Re-render the shadow depth pass if needed; sets shadow_active for draw_ground"""
+        self.shadow_active = False
+        if not self.shadows_enabled or self.shadow_map is None or self.current_object == 'none':
+            return
+        light = self.shadow_light()
+        mesh = self.get_mesh(self.current_object)
+        if not light['enabled'] or mesh is None:
+            return
+        self.shadow_map.set_resolution(self.shadow_resolution)
+        
+        # Light frustum fitted to the object's bounding sphere
+        model = self.model_matrix()
+        aabb_min, aabb_max, center, radius = mesh.bounds
+        center = (model @ np.append(center, 1.0))[:3]
+        radius = radius * abs(self.transform_params['scale'])
+        matrix = shadow_map.light_matrix(light['position'], center, radius)
+        
+        self.shadow_map.render(self.shadow_key(), matrix, self.draw_shadow_casters)
+        self.shadow_active = True
+    
+    def draw_shadow_casters(self):
+        """Depth-only draw of the current object (no materials, no culling against the camera)"""
+        self.depth_only = True
+        self.gl_state.use_program(0)
+        self.gl_state.disable(GL_LIGHTING)
+        glPushMatrix()
+        try:
+            self.apply_transformations()
+            self.draw_object_geometry()
+        finally:
+            glPopMatrix()
+            self.depth_only = False
+    
+    def init_shaders(self):
+        """Compile the Phong programs; fall back to fixed-function lighting / individual draws"""
+        try:
+            self.phong_program = phong_shader.PhongProgram()
+        except Exception as e:
+            print(f"⚠️  Phong shader not available, using fixed-function lighting: {e}")
+            self.phong_program = None
+            self.shader_lighting = False
         
-        glEnable(GL_LIGHTING)
+        try:
+            self.instanced_program = phong_shader.PhongProgram(instanced=True)
+            self.instance_attrib = self.instanced_program.instance_attrib
+        except Exception as e:
+            print(f"⚠️  Instanced drawing not available, using individual draws: {e}")
+            self.instanced_program = None
+            self.instancing_enabled = False
+        
+        try:
+            self.shadow_map = shadow_map.ShadowMap(self.shadow_resolution)
+        except Exception as e:
+            print(f"⚠️  Shadow mapping not available: {e}")
+            self.shadow_map = None
+            self.shadows_enabled = False
+    
+    def get_mesh(self, name):
+        """Mesh for a primitive name or 'obj' (the currently loaded OBJ model)"""
+        if name not in self.meshes:
+            if name == 'cube':
+                self.meshes[name] = build_cube_mesh()
+            elif name == 'pyramid':
+                self.meshes[name] = build_pyramid_mesh()
+            elif name == 'sphere':
+                self.meshes[name] = build_sphere_mesh()
+            elif name == 'obj':
+                if len(self.obj_vertices) == 0 or len(self.obj_faces) == 0:
+                    return None
+                self.meshes[name] = self.build_obj_mesh(self.obj_vertices, self.obj_faces, self.obj_normals,
+                                                        self.obj_texcoords, self.obj_face_materials,
+                                                        self.obj_materials)
+            else:
+                return None
+        return self.meshes[name]
+    
+    def build_obj_mesh(self, vertices, faces, normals=None, texcoords=None, face_materials=None, materials=None):
+        """
+        GPU-ready mesh for OBJ data. Normals shipped in the file are used as-is;
+        otherwise they are computed smooth (import stage on) or flat (off).
+        """
+        if normals is not None:
+            return Mesh(vertices, normals, faces, texcoords, face_materials, materials)
+        if self.optimize_imports:
+            return build_smooth_mesh(vertices, faces, texcoords, face_materials, materials)
+        return build_flat_mesh(vertices, faces, texcoords, face_materials, materials)
+    
+    # --- Picking ---
+    def pick_bvh(self):
+        """
+        BVH of the current object (object space) as (tree, pending). An OBJ
+        model's BVH is built in the background (build_model_bvh): until it is
+        ready tree is None and pending True. tree is None without pending if
+        there is nothing to pick.
+        """
+        with self.scene_lock:
+            if self.current_object != 'obj':
+                # Primitives are small enough to build their BVH right away
+                mesh = self.get_mesh(self.current_object)
+                if mesh is None or len(mesh.indices) == 0:
+                    return None, False
+                cached = self.pick_bvhs.get(self.current_object)
+                if cached is None or cached[0] is not mesh.indices:
+                    cached = self.pick_bvhs[self.current_object] = (mesh.indices,
+                                                                    bvh.BVH(mesh.positions, mesh.indices))
+                return cached[1], False
+            model = self.current_model
+            if model is None or model['data'].faces is not self.obj_faces or len(self.obj_faces) == 0:
+                return None, False
+            if model['bvh'] is not None:
+                return model['bvh'], False
+            building = model['bvh_building']
+        if not building:
+            threading.Thread(target=self.build_model_bvh, args=(model,), daemon=True).start()
+        return None, True
+    
+    def build_model_bvh(self, model):
+        """Build the picking BVH of a model once (background threads only)"""
+        with self.scene_lock:
+            if model['bvh'] is not None or model['bvh_building']:
+                return
+            model['bvh_building'] = True
+        data = model['data']
+        tree = bvh.BVH(data.positions, data.faces)
+        with self.scene_lock:
+            model['bvh'] = tree
+            model['bvh_building'] = False
+        self.model_cache.resize(model['key'], self.model_nbytes(model))
+    
+    def pick_ray(self, x, y, width=None, height=None):
+        """World-space ray (origin, unit direction) through a screen point (pixels, origin top-left)"""
+        width = width or self.window_width
+        height = height or self.window_height
+        ndc_x = 2.0 * (x + 0.5) / width - 1.0
+        ndc_y = 1.0 - 2.0 * (y + 0.5) / height
+        inverse = np.linalg.inv(self.projection_matrix().astype(np.float64) @ self.view_matrix())
+        near = inverse @ (ndc_x, ndc_y, -1.0, 1.0)
+        far = inverse @ (ndc_x, ndc_y, 1.0, 1.0)
+        near, far = near[:3] / near[3], far[:3] / far[3]
+        direction = far - near
+        direction /= np.linalg.norm(direction)
+        if self.projection_mode == 'perspective':
+            c = self.camera_params
+            near = np.array([c['eye_x'], c['eye_y'], c['eye_z']])
+        return near, direction
+    
+    def pick(self, x, y, width=None, height=None):
+        """
+        Closest hit on the current object under a screen point: world-space
+        position, triangle index (into obj_faces for OBJ models, else into
+        the primitive's mesh) and distance from the camera; None on a miss,
+        {'pending': True} while the OBJ model's BVH is still being built.
+        """
+        tree, pending = self.pick_bvh()
+        if tree is None:
+            return {'object': self.current_object, 'pending': True} if pending else None
+        origin, direction = self.pick_ray(x, y, width, height)
+        
+        # Into object space, where the BVH lives
+        model = self.model_matrix().astype(np.float64)
+        inverse = np.linalg.inv(model)
+        local_origin = (inverse @ np.append(origin, 1.0))[:3]
+        local_direction = inverse[:3, :3] @ direction
+        t, triangle = tree.intersect(local_origin, local_direction)
+        if triangle[0] < 0:
+            return None
+        
+        position = (model @ np.append(local_origin + t[0] * local_direction, 1.0))[:3]
+        return {
+            'object': self.current_object,
+            'triangle': int(triangle[0]),
+            'position': [float(value) for value in position],
+            'distance': float(np.linalg.norm(position - origin))
+        }
+    
+    # --- Levels of detail ---
+    def start_lod_build(self):
+        """Build the LOD chain of the current OBJ model in a background thread"""
+        self.lod_generation += 1
+        generation = self.lod_generation
+        vertices, faces = self.obj_vertices, self.obj_faces
+        face_materials, materials = self.obj_face_materials, self.obj_materials
+        model = self.current_model
+        
+        def build():
+            # The picking BVH is built after the LOD chain, on the same thread
+            if len(faces) >= 256:
+                build_lods()
+            if model is not None and generation == self.lod_generation:
+                self.build_model_bvh(model)
+        
+        def build_lods():
+            start = time.perf_counter()
+            chain = mesh_lod.build_lod_chain(vertices, faces, face_materials=face_materials,
+                                             cancelled=lambda: generation != self.lod_generation)
+            lod_meshes = [self.build_obj_mesh(lod_vertices, lod_faces, face_materials=lod_materials,
+                                              materials=materials)
+                          for lod_vertices, lod_faces, lod_materials in chain]
+            with self.scene_lock:
+                if generation != self.lod_generation:
+                    return
+                self.obj_lod_meshes = lod_meshes
+                if model is not None:
+                    model['lod_meshes'] = lod_meshes
+            if model is not None:
+                self.model_cache.resize(model['key'], self.model_nbytes(model))
+            print(f"🔻 LOD chain built in {time.perf_counter() - start:.2f}s: "
+                  f"{[len(faces)] + [mesh.face_count for mesh in lod_meshes]} triangles")
+        
+        self.lod_thread = threading.Thread(target=build, daemon=True)
+        self.lod_thread.start()
+    
+    def obj_lod_chain(self):
+        """OBJ meshes ordered finest first (level 0 is the full-resolution model)"""
+        base = self.get_mesh('obj')
+        if base is None:
+            return []
+        return [base] + self.obj_lod_meshes
+    
+    def projected_radius_px(self, centers, radii):
+        """Approximate on-screen radius in pixels of world-space spheres"""
+        height = self.window_height
+        if self.projection_mode == 'perspective':
+            c = self.camera_params
+            eye = np.array([c['eye_x'], c['eye_y'], c['eye_z']], dtype=np.float32)
+            distance = np.linalg.norm(np.asarray(centers) - eye, axis=1)
+            half_fov = math.tan(math.radians(self.perspective_params['fov']) / 2.0)
+            return np.asarray(radii) / np.maximum(distance * half_fov, 1e-6) * height / 2.0
+        frustum_size = 5
+        return np.asarray(radii) / (frustum_size / 2.0) * height / 2.0
+    
+    def lod_levels(self, chain, model_matrices):
+        """LOD level for each of n instances of the OBJ model, per the current policy"""
+        count = len(model_matrices)
+        if self.lod_policy == 'full' or len(chain) < 2:
+            return np.zeros(count, dtype=np.int64)
+        if self.lod_policy == 'coarsest':
+            return np.full(count, len(chain) - 1, dtype=np.int64)
+        aabb_min, aabb_max, center, radius = chain[0].bounds
+        centers, radii = culling.transform_spheres(model_matrices, center, radius)
+        return mesh_lod.select_levels([mesh.face_count for mesh in chain],
+                                      self.projected_radius_px(centers, radii),
+                                      self.lod_pixels_per_triangle)
+    
+    # --- Scene graph ---
+    def add_node(self, mesh, transform=None, material=None, node_id=None):
+        """Add a node and return its ID"""
+        if mesh not in MESH_COLORS:
+            raise ValueError(f"Unknown mesh '{mesh}'")
+        with self.scene_lock:
+            if node_id is None:
+                node_id = str(next(self.node_ids))
+                while node_id in self.scene_nodes:
+                    node_id = str(next(self.node_ids))
+            self.scene_nodes[node_id] = SceneNode(node_id, mesh, transform, material)
+            self.scene_dirty = True
+        return node_id
+    
+    def remove_node(self, node_id):
+        """Remove a node; returns False if the ID is unknown"""
+        with self.scene_lock:
+            if self.scene_nodes.pop(node_id, None) is None:
+                return False
+            self.scene_dirty = True
+        return True
+    
+    def update_node(self, node_id, transform=None, material=None):
+        """Update a node's transform and/or material; returns False if the ID is unknown"""
+        with self.scene_lock:
+            node = self.scene_nodes.get(node_id)
+            if node is None:
+                return False
+            node.transform.update(transform or {})
+            node.material.update(material or {})
+            self.scene_dirty = True
+        return True
+    
+    def clear_nodes(self):
+        with self.scene_lock:
+            self.scene_nodes.clear()
+            self.scene_dirty = True
+    
+    def rebuild_batches(self):
+        """Group nodes by (mesh, color) and compute per-instance matrices"""
+        with self.scene_lock:
+            groups = {}
+            for node in self.scene_nodes.values():
+                key = (node.mesh, tuple(node.material['color']))
+                groups.setdefault(key, []).append(node.transform)
+            self.scene_dirty = False
+        
+        for batch in self.batches:
+            if batch['buffer'] is not None:
+                glDeleteBuffers(1, [batch['buffer']])
+        
+        # Batches sorted by state key (material, then mesh) so consecutive
+        # batches sharing a material skip the material change
+        self.batches = []
+        for (mesh_name, color), transforms in sorted(groups.items(), key=lambda item: (item[0][1], item[0][0])):
+            positions = [(t['pos_x'], t['pos_y'], t['pos_z']) for t in transforms]
+            rotations = [(t['rot_x'], t['rot_y'], t['rot_z']) for t in transforms]
+            scales = [t['scale'] for t in transforms]
+            model = matrices.model_matrices(positions, rotations, scales)
+            self.batches.append({
+                'mesh': mesh_name,
+                'color': list(color),
+                'matrices': model,
+                'instances': matrices.to_gl(model),
+                'buffer': None,
+                'uploaded_mask': None
+            })
+    
+    def draw_scene_nodes(self):
+        """Draw all scene graph nodes, one draw call per batch when instancing"""
+        if self.retired_meshes:
+            with self.scene_lock:
+                retired, self.retired_meshes = self.retired_meshes, []
+            for mesh in retired:
+                mesh.release()
+        if self.scene_dirty:
+            self.rebuild_batches()
+        planes = self.frustum_planes() if self.frustum_culling_enabled else None
+        
+        self.gl_state.polygon_mode(GL_LINE if self.wireframe_mode else GL_FILL)
+        
+        for batch in self.batches:
+            mesh = self.get_mesh(batch['mesh'])
+            if mesh is None:
+                continue
+            
+            # Cull before any GL call for this batch
+            instances = batch['instances']
+            if self.frustum_culling_enabled:
+                visible = culling.cull(planes, batch['matrices'], mesh.bounds)
+            else:
+                visible = np.ones(len(instances), dtype=bool)
+            visible_count = int(visible.sum())
+            self.cull_stats['drawn'] += visible_count
+            self.cull_stats['culled'] += len(visible) - visible_count
+            if visible_count == 0:
+                continue
+            if visible_count < len(visible):
+                instances = instances[visible]
+            
+            # Per-instance LOD for the OBJ model; instances are grouped by level.
+            # upload_key encodes visibility and level, so the instance buffer
+            # is only re-uploaded when either changes.
+            if batch['mesh'] == 'obj':
+                chain = self.obj_lod_chain()
+                levels = self.lod_levels(chain, batch['matrices'][visible])
+                order = np.argsort(levels, kind='stable')
+                instances = instances[order]
+                levels = levels[order]
+                used_levels, starts, counts = np.unique(levels, return_index=True, return_counts=True)
+                draws = [(chain[level], start, count) for level, start, count in zip(used_levels, starts, counts)]
+                upload_key = visible.astype(np.int64)
+                upload_key[visible] = levels[np.argsort(order)] + 1
+            else:
+                draws = [(mesh, 0, len(instances))]
+                upload_key = visible
+            
+            if self.instancing_enabled and self.instanced_program is not None:
+                self.draw_batch_instanced(batch, instances, draws, upload_key)
+            else:
+                self.set_material_properties(batch['color'])
+                for draw_mesh, start, count in draws:
+                    draw_mesh.bind()
+                    for matrix in instances[start:start + count]:
+                        glPushMatrix()
+                        glMultMatrixf(matrix)
+                        draw_mesh.draw_elements()
+                        glPopMatrix()
+                        self.draw_calls += 1
+                    draw_mesh.unbind()
+        
+        program = self.active_program()
+        self.gl_state.use_program(program.program if program is not None else 0)
+    
+    def draw_batch_instanced(self, batch, instances, draws, upload_key):
+        """Draw the visible instances of a batch, one glDrawElementsInstanced per mesh level"""
+        if batch['buffer'] is None:
+            batch['buffer'] = glGenBuffers(1)
+        # Re-upload only when the set of visible instances changed
+        if not np.array_equal(upload_key, batch['uploaded_mask']):
+            glBindBuffer(GL_ARRAY_BUFFER, batch['buffer'])
+            glBufferData(GL_ARRAY_BUFFER, instances.nbytes, instances, GL_DYNAMIC_DRAW)
+            batch['uploaded_mask'] = upload_key
+        
+        self.gl_state.use_program(self.instanced_program.program)
+        self.update_program_lights(self.instanced_program)
+        self.set_material_properties(batch['color'], self.instanced_program)
+        
+        for mesh, start, count in draws:
+            mesh.bind()
+            glBindBuffer(GL_ARRAY_BUFFER, batch['buffer'])
+            for column in range(4):
+                location = self.instance_attrib + column
+                glEnableVertexAttribArray(location)
+                glVertexAttribPointer(location, 4, GL_FLOAT, GL_FALSE, 64,
+                                      ctypes.c_void_p(int(start) * 64 + column * 16))
+                glVertexAttribDivisor(location, 1)
+            
+            glDrawElementsInstanced(GL_TRIANGLES, mesh.indices.size, GL_UNSIGNED_INT, None, int(count))
+            self.draw_calls += 1
+            
+            for column in range(4):
+                glVertexAttribDivisor(self.instance_attrib + column, 0)
+                glDisableVertexAttribArray(self.instance_attrib + column)
+            mesh.unbind()
+    
+    def current_object_visible(self):
+        """Frustum test for the current object (before any GL call)"""
+        if self.current_object == 'none':
+            return False
+        if not self.frustum_culling_enabled:
+            return True
+        mesh = self.get_mesh(self.current_object)
+        if mesh is None:
+            return False
+        model = self.model_matrix()
+        return bool(culling.cull(self.frustum_planes(), model, mesh.bounds)[0])
     
     def draw_current_object(self):
         """Draw currently selected object"""
+        if not self.current_object_visible():
+            if self.current_object != 'none':
+                self.cull_stats['culled'] += 1
+            return
+        self.cull_stats['drawn'] += 1
+        
         glPushMatrix()
         self.apply_transformations()
-        
+        self.draw_calls += self.draw_object_geometry()
+        glPopMatrix()
+    
+    def draw_object_geometry(self):
+        """Draw the selected object under the current modelview; returns the draw count"""
         if self.current_object == 'cube':
             self.draw_cube()
         elif self.current_object == 'pyramid':
@@ -474,21 +1544,104 @@ class OpenGLRenderer:
         elif self.current_object == 'sphere':
             self.draw_sphere()
         elif self.current_object == 'obj':
-            self.draw_obj_model()
-            
-        glPopMatrix()
+            return self.draw_obj_model()
+        else:
+            return 0
+        return 1
     
     def render(self):
         """Main rendering function"""
+        start = time.perf_counter()
+        self.frame_index += 1
+        self.gl_state.begin_frame()
+        self.update_shadow_map()
+        shadow_done = time.perf_counter()
+        
         glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
         
         self.setup_camera()
-        self.setup_phong_lighting()
         
+        self.draw_calls = 0
+        self.cull_stats = {'drawn': 0, 'culled': 0}
         self.draw_ground()
+        ground_done = time.perf_counter()
+        self.setup_phong_lighting()
         self.draw_current_object()
+        object_done = time.perf_counter()
+        self.draw_scene_nodes()
+        self.gl_state.use_program(0)
+        nodes_done = time.perf_counter()
+        self.update_snapshot_readback()
+        readback_done = time.perf_counter()
+        
+        if self.offscreen:
+            glFinish()
+        else:
+            pygame.display.flip()
+        end = time.perf_counter()
+        
+        self.frame_times = {
+            'shadow_ms': (shadow_done - start) * 1000.0,
+            'ground_ms': (ground_done - shadow_done) * 1000.0,
+            'object_ms': (object_done - ground_done) * 1000.0,
+            'nodes_ms': (nodes_done - object_done) * 1000.0,
+            'readback_ms': (readback_done - nodes_done) * 1000.0,
+            'present_ms': (end - readback_done) * 1000.0,
+            'total_ms': (end - start) * 1000.0
+        }
+    
+    def read_pixels(self):
+        """Read back the last rendered frame as bottom-up RGB bytes"""
+        glPixelStorei(GL_PACK_ALIGNMENT, 1)
+        return glReadPixels(0, 0, self.window_width, self.window_height, GL_RGB, GL_UNSIGNED_BYTE)
+    
+    def update_snapshot_readback(self):
+        """Read the frame back for snapshots while they are requested (before it is presented)"""
+        if self.readback is None:
+            if self.snapshots.wanted():
+                self.snapshots.publish([(self.frame_index, self.read_pixels(),
+                                         self.window_width, self.window_height)])
+        elif self.snapshots.wanted():
+            self.snapshots.publish(self.readback.capture(self.frame_index, self.window_width, self.window_height))
+        elif self.readback.busy:
+            self.snapshots.publish(self.readback.collect())
+    
+    def snapshot(self, timeout=2.0):
+        """(frame index, PNG bytes) of the first frame rendered after the call, None if the renderer isn't running"""
+        if not self.running:
+            return None
+        return self.snapshots.request(self.frame_index, timeout)
+    
+    def get_scene_state(self):
+        """Snapshot of everything needed to reproduce the current frame"""
+        return {
+            'camera': dict(self.camera_params),
+            'perspective': dict(self.perspective_params),
+            'transform': dict(self.transform_params),
+            'lighting': dict(self.lighting_params),
+            'object': self.current_object,
+            'projection': self.projection_mode,
+            'wireframe': self.wireframe_mode,
+            'auto_rotate': self.auto_rotate,
+            'rotation_angle': self.rotation_angle,
+            'obj_file': self.obj_file
+        }
+    
+    def apply_scene_state(self, state):
+        """Apply a (partial) scene state produced by get_scene_state"""
+        self.camera_params.update(state.get('camera', {}))
+        self.perspective_params.update(state.get('perspective', {}))
+        self.transform_params.update(state.get('transform', {}))
+        self.lighting_params.update(state.get('lighting', {}))
+        self.projection_mode = state.get('projection', self.projection_mode)
+        self.wireframe_mode = state.get('wireframe', self.wireframe_mode)
+        self.auto_rotate = state.get('auto_rotate', self.auto_rotate)
+        self.rotation_angle = state.get('rotation_angle', self.rotation_angle)
         
-        pygame.display.flip()
+        obj_file = state.get('obj_file')
+        if obj_file and obj_file != self.obj_file:
+            self.load_obj_file(obj_file)
+        self.current_object = state.get('object', self.current_object)
     
     def update_animation(self):
         """Update animation"""
@@ -500,21 +1653,27 @@ class OpenGLRenderer:
     def run(self):
         """Main renderer loop"""
         if not self.init_opengl():
+            self.ready.set()
             return
             
+        mark_startup('renderer_ready_s')
         print("✅ OpenGL Renderer started")
         self.running = True
         
-        clock = pygame.time.Clock()
+        clock = FrameClock() if self.headless else pygame.time.Clock()
         frame_counter = 0
         
         while self.running:
-            for event in pygame.event.get():
+            for event in pygame.event.get() if not self.headless else []:
                 if event.type == pygame.QUIT:
                     self.running = False
             
+            self.install_pending_model()
             self.update_animation()
             self.render()
+            if not self.ready.is_set():
+                mark_startup('first_frame_s')
+                self.ready.set()
             clock.tick(60)
             
             # Emit status every 60 frames
@@ -522,114 +1681,219 @@ class OpenGLRenderer:
             if frame_counter % 60 == 0:
                 self.emit_status()
         
-        pygame.quit()
+        if self.offscreen:
+            self.offscreen.release()
+        else:
+            pygame.quit()
+    
+    def status_payload(self):
+        """Current status as sent to the web UI"""
+        return {
+            'object': self.current_object.title(),
+            'vertices': self.vertex_count,
+            'faces': self.face_count,
+            'projection': self.projection_mode.title(),
+            'wireframe': self.wireframe_mode,
+            'auto_rotate': self.auto_rotate,
+            'shading': 'phong_shader' if self.active_program() is not None else 'fixed_function',
+            'lighting': {
+                'ambient': self.lighting_params['ambient_enabled'],
+                'diffuse': self.lighting_params['diffuse_enabled'],
+                'specular': self.lighting_params['specular_enabled']
+            },
+            'nodes': len(self.scene_nodes),
+            'draw_calls': self.draw_calls,
+            'gl_state': dict(self.gl_state.frame_stats),
+            'frame_times': {name: round(ms, 3) for name, ms in self.frame_times.items()},
+            'shadows': {
+                'enabled': self.shadows_enabled,
+                'active': self.shadow_active,
+                'resolution': self.shadow_resolution,
+                'depth_passes': self.shadow_map.depth_passes if self.shadow_map else 0
+            },
+            'culling': dict(self.cull_stats),
+            'snapshots': dict(self.snapshots.stats),
+            'startup': dict(startup_times),
+            'import': self.import_report,
+            'model_cache': self.model_cache.stats(),
+            'lod': {
+                'policy': self.lod_policy,
+                'levels': ([len(self.obj_faces)] + [mesh.face_count for mesh in self.obj_lod_meshes]
+                           if len(self.obj_faces) else []),
+                'current_level': self.current_lod_level
+            }
+        }
     
     def emit_status(self):
         """Emit current status to web UI"""
         try:
-            socketio.emit('status_update', {
-                'object': self.current_object.title(),
-                'vertices': self.vertex_count,
-                'faces': self.face_count,
-                'projection': self.projection_mode.title(),
-                'wireframe': self.wireframe_mode,
-                'auto_rotate': self.auto_rotate,
-                'lighting': {
-                    'ambient': self.lighting_params['ambient_enabled'],
-                    'diffuse': self.lighting_params['diffuse_enabled'],
-                    'specular': self.lighting_params['specular_enabled']
-                }
-            })
+            payload = self.status_payload()
+            # Encoded once per wire format in use, sent to that format's room
+            for fmt in set(client_protocols.values()):
+                socketio.emit('status_update', wire_protocol.encode('status_update', payload, fmt),
+                              to=protocol_room(fmt))
         except:
             pass
 
 # Global renderer instance
 renderer = OpenGLRenderer() if OPENGL_AVAILABLE else None
 
+# Wire format negotiated by each connection (sid -> wire_protocol format)
+client_protocols = {}
+
+def protocol_room(fmt):
+    return f"protocol:{fmt}"
+
+def emit_to(sid, event, data):
+    """Emit to one client in its negotiated wire format"""
+    socketio.emit(event, wire_protocol.encode(event, data, client_protocols.get(sid, 'json')), to=sid)
+
+def reply(event, data):
+    """Emit to the client of the current event in its negotiated wire format"""
+    emit(event, wire_protocol.encode(event, data, client_protocols.get(request.sid, 'json')))
+
+def decoded(handler):
+    """Let an event handler take binary (wire_protocol) payloads as well as JSON"""
+    @functools.wraps(handler)
+    def wrapper(data=None):
+        try:
+            # A schema payload is only accepted by the event it was packed for
+            data = wire_protocol.decode(data, request.event['message'])
+        except ValueError as e:
+            print(f"⚠️  Bad {handler.__name__} payload: {e}")
+            return
+        return handler(data)
+    return wrapper
+
 @app.route('/')
 def index():
     """Serve main page"""
     return send_file('3d.html')
 
+@app.route('/api/snapshot')
+def snapshot_api():
+    """Latest rendered frame as PNG"""
+    snapshot = renderer.snapshot() if renderer else None
+    if snapshot is None:
+        return jsonify({'error': 'Renderer is not running'}), 503
+    frame, png = snapshot
+    return Response(png, mimetype='image/png', headers={'X-Frame-Index': str(frame), 'Cache-Control': 'no-store'})
+
+@app.route('/api/startup')
+def startup_api():
+    """Startup timings (seconds since the process started)"""
+    return jsonify(startup_times)
+
 # WebSocket event handlers
 @socketio.on('connect')
 def handle_connect():
     """Handle client connection"""
     print('🔗 Client connected')
+    client_protocols[request.sid] = 'json'
+    join_room(protocol_room('json'))
     if renderer:
-        emit('status_update', {
-            'object': renderer.current_object.title(),
-            'vertices': renderer.vertex_count,
-            'faces': renderer.face_count,
-            'projection': renderer.projection_mode.title(),
-            'wireframe': renderer.wireframe_mode,
-            'auto_rotate': renderer.auto_rotate,
-            'lighting': {
-                'ambient': renderer.lighting_params['ambient_enabled'],
-                'diffuse': renderer.lighting_params['diffuse_enabled'],
-                'specular': renderer.lighting_params['specular_enabled']
-            }
-        })
+        reply('status_update', renderer.status_payload())
 
 @socketio.on('disconnect')
 def handle_disconnect():
     """Handle client disconnection"""
     print('🔌 Client disconnected')
+    client_protocols.pop(request.sid, None)
+
+@socketio.on('negotiate_protocol')
+def handle_negotiate_protocol(data):
+    """Choose this connection's wire format from the client's offer ({'formats': [...]})"""
+    fmt = wire_protocol.negotiate(data.get('formats') if isinstance(data, dict) else None)
+    leave_room(protocol_room(client_protocols.get(request.sid, 'json')))
+    join_room(protocol_room(fmt))
+    client_protocols[request.sid] = fmt
+    # Always JSON, the client only switches once it has this
+    emit('protocol_selected', {'format': fmt, 'available': wire_protocol.available_formats()})
 
 @socketio.on('set_object')
+@decoded
 def handle_set_object(data):
     """Handle object change from web UI"""
     if renderer:
         obj_type = data['type']
-        if obj_type in ['cube', 'pyramid', 'sphere']:
+        if obj_type in ['cube', 'pyramid', 'sphere', 'none']:
             renderer.current_object = obj_type
             print(f"📦 Object changed to: {obj_type}")
 
 @socketio.on('update_transform')
+@decoded
 def handle_update_transform(data):
     """Handle transform updates from web UI"""
     if renderer:
         renderer.transform_params.update(data)
 
 @socketio.on('update_camera')
+@decoded
 def handle_update_camera(data):
     """Handle camera updates from web UI"""
     if renderer:
         renderer.camera_params.update(data)
 
 @socketio.on('update_perspective')
+@decoded
 def handle_update_perspective(data):
     """Handle perspective updates from web UI"""
     if renderer:
         renderer.perspective_params.update(data)
-        renderer.setup_projection()
 
 @socketio.on('update_lighting')
+@decoded
 def handle_update_lighting(data):
     """Handle lighting updates from web UI"""
     if renderer:
         renderer.lighting_params.update(data)
 
+@socketio.on('set_shader_lighting')
+@decoded
+def handle_set_shader_lighting(data):
+    """Switch between per-pixel Phong shader and fixed-function lighting"""
+    if renderer:
+        renderer.shader_lighting = bool(data.get('enabled', True)) and renderer.phong_program is not None
+
 @socketio.on('toggle_wireframe')
 def handle_toggle_wireframe():
     """Toggle wireframe mode"""
     if renderer:
         renderer.wireframe_mode = not renderer.wireframe_mode
-        emit('wireframe_toggled', {'enabled': renderer.wireframe_mode})
+        reply('wireframe_toggled', {'enabled': renderer.wireframe_mode})
+
+@socketio.on('toggle_shadows')
+@decoded
+def handle_toggle_shadows(data=None):
+    """Toggle (or set, with {'enabled': bool}) shadow mapping"""
+    if renderer:
+        enabled = data.get('enabled') if isinstance(data, dict) and 'enabled' in data else not renderer.shadows_enabled
+        renderer.shadows_enabled = bool(enabled) and renderer.shadow_map is not None
+        reply('shadows_toggled', {'enabled': renderer.shadows_enabled})
+
+@socketio.on('set_shadow_resolution')
+@decoded
+def handle_set_shadow_resolution(data):
+    """Set the shadow map resolution (one of shadow_map.RESOLUTIONS)"""
+    if renderer:
+        resolution = int(data.get('resolution', 1024))
+        if resolution in shadow_map.RESOLUTIONS:
+            renderer.shadow_resolution = resolution
+            reply('shadow_resolution_set', {'resolution': resolution})
 
 @socketio.on('toggle_auto_rotate')
 def handle_toggle_auto_rotate():
     """Toggle auto rotation"""
     if renderer:
         renderer.auto_rotate = not renderer.auto_rotate
-        emit('auto_rotate_toggled', {'enabled': renderer.auto_rotate})
+        reply('auto_rotate_toggled', {'enabled': renderer.auto_rotate})
 
 @socketio.on('set_projection')
+@decoded
 def handle_set_projection(data):
     """Set projection mode"""
     if renderer:
         renderer.projection_mode = data['mode']
-        renderer.setup_projection()
 
 @socketio.on('reset_camera')
 def handle_reset_camera():
@@ -641,21 +1905,132 @@ def handle_reset_camera():
             'up_x': 0.0, 'up_y': 1.0, 'up_z': 0.0
         }
 
+@socketio.on('add_node')
+@decoded
+def handle_add_node(data):
+    """Add an object to the scene graph"""
+    if renderer:
+        try:
+            node_id = renderer.add_node(data.get('mesh', 'cube'), data.get('transform'),
+                                        data.get('material'), data.get('id'))
+        except ValueError as e:
+            reply('node_error', {'message': str(e)})
+            return
+        reply('node_added', {'id': node_id, 'nodes': len(renderer.scene_nodes)})
+
+@socketio.on('remove_node')
+@decoded
+def handle_remove_node(data):
+    """Remove an object from the scene graph"""
+    if renderer:
+        success = renderer.remove_node(data['id'])
+        reply('node_removed', {'id': data['id'], 'success': success})
+
+@socketio.on('update_node')
+@decoded
+def handle_update_node(data):
+    """Update transform/material of a scene graph object"""
+    if renderer:
+        success = renderer.update_node(data['id'], data.get('transform'), data.get('material'))
+        if not success:
+            reply('node_error', {'message': f"Unknown node {data['id']}"})
+
+@socketio.on('clear_nodes')
+def handle_clear_nodes():
+    """Remove every scene graph object"""
+    if renderer:
+        renderer.clear_nodes()
+
+@socketio.on('set_lod_policy')
+@decoded
+def handle_set_lod_policy(data):
+    """Set level-of-detail policy: screen_size, full or coarsest"""
+    if renderer and data.get('policy') in ['screen_size', 'full', 'coarsest']:
+        renderer.lod_policy = data['policy']
+        if 'pixels_per_triangle' in data:
+            renderer.lod_pixels_per_triangle = max(0.1, float(data['pixels_per_triangle']))
+
+@socketio.on('set_import_optimization')
+@decoded
+def handle_set_import_optimization(data):
+    """
+    Enable/disable the OBJ import stage (weld + vertex cache reorder), re-importing
+    the loaded file; 'mapped' opts binary STL/PLY files into it as well
+    """
+    if renderer:
+        renderer.optimize_imports = bool(data.get('enabled', True))
+        if 'mapped' in data:
+            renderer.optimize_mapped_imports = bool(data['mapped'])
+        # The model on screen was imported with the old setting; the cache key includes it
+        if renderer.obj_file:
+            start_obj_load(renderer.obj_file, request.sid)
+
+@socketio.on('set_model_cache_budget')
+@decoded
+def handle_set_model_cache_budget(data):
+    """Set the byte budget of the loaded-model cache (in MB)"""
+    if renderer:
+        renderer.model_cache.set_budget(int(max(0.0, float(data.get('budget_mb', 512))) * 1024 * 1024))
+
 @socketio.on('load_obj')
+@decoded
 def handle_load_obj(data):
-    """Handle OBJ file loading"""
+    """Handle OBJ file loading (runs in the background, reports obj_load_progress)"""
     if renderer:
-        filename = data['filename']
-        success = renderer.load_obj_file(filename)
-        
+        start_obj_load(data['filename'], request.sid)
+
+def start_obj_load(filename, sid):
+    """Load an OBJ file in the background, reporting progress and the result to one client"""
+    last_percent = [-1]
+    
+    def progress(stage, done, total):
+        percent = int(100 * done / total) if total else 100
+        if percent != last_percent[0] or stage != 'parsing':
+            last_percent[0] = percent
+            emit_to(sid, 'obj_load_progress', {
+                'filename': os.path.basename(filename),
+                'stage': stage,
+                'percent': percent
+            })
+    
+    def finished(success, message):
         if success:
-            emit('obj_loaded', {
+            emit_to(sid, 'obj_loaded', {
                 'vertices': renderer.vertex_count,
                 'faces': renderer.face_count,
-                'filename': os.path.basename(filename)
+                'filename': os.path.basename(filename),
+                'materials': [material['name'] for material in renderer.obj_materials],
+                'groups': renderer.obj_groups
             })
-        
-        emit('obj_load_result', {'success': success, 'filename': filename})
+        emit_to(sid, 'obj_load_result', {'success': success, 'filename': filename, 'message': message})
+    
+    renderer.load_obj_async(filename, progress, finished)
+    reply('obj_load_progress', {'filename': os.path.basename(filename), 'stage': 'queued', 'percent': 0})
+
+@socketio.on('pick')
+@decoded
+def handle_pick(data):
+    """Pick the current object at a screen point ({'x', 'y'} in pixels, optional 'width'/'height' of the view)"""
+    if renderer:
+        hit = renderer.pick(float(data['x']), float(data['y']), data.get('width'), data.get('height'))
+        # While the BVH of a new model is built, the reply says pending and the client may retry
+        reply('pick_result', {'hit': hit is not None and not hit.get('pending'), **(hit or {})})
+
+@socketio.on('snapshot')
+def handle_snapshot():
+    """Latest rendered frame as PNG bytes (snapshot_result)"""
+    if renderer:
+        snapshot = renderer.snapshot()
+        if snapshot is None:
+            reply('snapshot_result', {'success': False, 'message': 'Renderer is not running'})
+        else:
+            reply('snapshot_result', {'success': True, 'frame': snapshot[0], 'png': snapshot[1]})
+
+@socketio.on('cancel_load_obj')
+def handle_cancel_load_obj():
+    """Cancel the OBJ load in flight"""
+    if renderer:
+        renderer.cancel_obj_load()
 
 def install_requirements():
     """Auto-install requirements if missing"""
@@ -715,13 +2090,56 @@ def start_renderer():
     if renderer:
         renderer.run()
 
+def argv_value(flag, default):
+    """Value following flag on the command line (e.g. --port 5001), default if absent"""
+    if flag in sys.argv:
+        index = sys.argv.index(flag)
+        if index + 1 < len(sys.argv):
+            return sys.argv[index + 1]
+    return default
+
+def wait_for_server(port, timeout=30.0):
+    """Block until the web server accepts connections on port; False on timeout"""
+    import socket
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=0.5):
+                return True
+        except OSError:
+            time.sleep(0.02)
+    return False
+
+def when_server_ready(port, open_browser):
+    """Record server readiness and open the browser once the page can actually load"""
+    if not wait_for_server(port):
+        return
+    mark_startup('server_ready_s')
+    if not open_browser:
+        return
+    url = f'http://localhost:{port}'
+    # The page shows the renderer status as soon as it connects
+    if renderer:
+        renderer.ready.wait(timeout=5)
+    try:
+        import webbrowser
+        webbrowser.open(url)
+        print("🌐 Opening web browser...")
+    except Exception:
+        print(f"🌐 Please open {url} in your browser")
+
 if __name__ == '__main__':
     print_banner()
+    port = int(argv_value('--port', 5000))
     
-    # Check and install requirements
-    if not install_requirements():
-        input("Press Enter to exit...")
-        sys.exit(1)
+    # Checking (and pip installing) every dependency costs seconds per launch,
+    # so it only runs on request; missing packages already show up above
+    if '--install-deps' in sys.argv:
+        if not install_requirements():
+            input("Press Enter to exit...")
+            sys.exit(1)
+    elif not OPENGL_AVAILABLE:
+        print("💡 Run with --install-deps to install the missing packages")
     
     # Check if 3d.html exists (FIXED: was checking for index.html)
     if not os.path.exists('3d.html'):
@@ -732,37 +2150,29 @@ if __name__ == '__main__':
     
     print("🚀 Starting Flask + OpenGL Application...")
     
-    # Start OpenGL renderer in background thread if available
+    # Start OpenGL renderer in background thread if available; the server
+    # starts meanwhile and the renderer reports itself once it is up
     if OPENGL_AVAILABLE and renderer:
         renderer_thread = threading.Thread(target=start_renderer, daemon=True)
         renderer_thread.start()
-        time.sleep(1)  # Give renderer time to initialize
-        print("✅ OpenGL renderer started")
     else:
         print("⚠️  OpenGL not available - UI only mode")
     
-    # Try to open browser
-    try:
-        time.sleep(1)
-        webbrowser.open('http://localhost:5000')
-        print("🌐 Opening web browser...")
-    except:
-        print("🌐 Please open http://localhost:5000 in your browser")
+    threading.Thread(target=when_server_ready, args=(port, '--no-browser' not in sys.argv), daemon=True).start()
     
     print("\n" + "="*60)
     print("🎮 Controls:")
-    print("  • Web UI: http://localhost:5000")
+    print(f"  • Web UI: http://localhost:{port}")
     print("  • OpenGL Window: Mouse drag = rotate, wheel = zoom")
     print("  • Keyboard (Web): 1,2,3 = objects, Space = auto-rotate")
     print("  • Press Ctrl+C to stop")
     print("="*60 + "\n")
     
-    # Start Flask-SocketIO server
+    # Start Flask-SocketIO server (also when launched without a terminal, e.g. from an IDE)
     try:
-        socketio.run(app, host='0.0.0.0', port=5000, debug=False)
+        socketio.run(app, host='0.0.0.0', port=port, debug=False, allow_unsafe_werkzeug=True)
     except KeyboardInterrupt:
         print("\n👋 Application stopped by user")
     except Exception as e:
         print(f"\n❌ Error: {e}")
         input("Press Enter to exit...")
-        
\ No newline at end of file
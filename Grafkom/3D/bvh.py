@@ -0,0 +1,187 @@
+"""
+Bounding volume hierarchy over a triangle mesh, for ray picking.
+
+Built once per mesh, fully vectorized: triangles are sorted along a 30-bit
+Morton (Z-order) curve of their centroids and every node splits its range
+at the object median of that order, so the tree is built level by level
+with array operations only. Nodes live in flat arrays (bounds, first child,
+triangle range); the two children of a node are stored next to each other.
+
+Traversal is vectorized too: any number of rays walk the tree breadth first
+as (ray, node) pairs, and leaf triangles are tested with Moller-Trumbore in
+bulk. Pairs whose box starts beyond the ray's closest hit so far are dropped.
+"""
+
+import numpy as np
+
+LEAF_SIZE = 4
+
+
+def morton_codes(points):
+    """30-bit Morton codes of points, quantized to 1024 cells per axis of their bounding box"""
+    lo = points.min(axis=0)
+    extent = points.max(axis=0) - lo
+    extent[extent == 0] = 1.0
+    cells = np.clip(((points - lo) / extent * 1023.0).astype(np.int64), 0, 1023)
+
+    def spread(x):
+        # Insert two zero bits between each of the 10 bits of x
+        x = (x | (x << 16)) & 0x030000FF
+        x = (x | (x << 8)) & 0x0300F00F
+        x = (x | (x << 4)) & 0x030C30C3
+        x = (x | (x << 2)) & 0x09249249
+        return x
+
+    return (spread(cells[:, 0]) << 2) | (spread(cells[:, 1]) << 1) | spread(cells[:, 2])
+
+
+class BVH:
+    """Flat-array BVH of one mesh (object space)"""
+
+    def __init__(self, vertices, faces, leaf_size=LEAF_SIZE):
+        vertices = np.asarray(vertices, dtype=np.float32).reshape(-1, 3)
+        faces = np.asarray(faces, dtype=np.int64).reshape(-1, 3)
+        count = len(faces)
+
+        triangles = vertices[faces]
+        tri_min = triangles.min(axis=1)
+        tri_max = triangles.max(axis=1)
+        order = (np.argsort(morton_codes((tri_min + tri_max) * 0.5), kind='stable')
+                 if count else np.zeros(0, dtype=np.int64))
+
+        # Triangles in tree order, pre-arranged for Moller-Trumbore
+        self.triangle_index = order
+        triangles = triangles[order]
+        self.v0 = np.ascontiguousarray(triangles[:, 0])
+        self.edge1 = triangles[:, 1] - triangles[:, 0]
+        self.edge2 = triangles[:, 2] - triangles[:, 0]
+        tri_min = tri_min[order]
+        tri_max = tri_max[order]
+
+        # Topology, level by level: node ranges [start, start + count)
+        starts = [np.zeros(1, dtype=np.int64)]
+        counts = [np.full(1, count, dtype=np.int64)]
+        lefts = []
+        next_id = 1
+        while True:
+            start, size = starts[-1], counts[-1]
+            split = size > leaf_size
+            left = np.full(len(start), -1, dtype=np.int64)
+            inner = np.flatnonzero(split)
+            if len(inner) == 0:
+                lefts.append(left)
+                break
+            left[inner] = next_id + 2 * np.arange(len(inner))
+            lefts.append(left)
+            next_id += 2 * len(inner)
+            half = size[inner] // 2
+            child_start = np.empty(2 * len(inner), dtype=np.int64)
+            child_count = np.empty(2 * len(inner), dtype=np.int64)
+            child_start[0::2] = start[inner]
+            child_start[1::2] = start[inner] + half
+            child_count[0::2] = half
+            child_count[1::2] = size[inner] - half
+            starts.append(child_start)
+            counts.append(child_count)
+
+        self.start = np.concatenate(starts)
+        self.count = np.concatenate(counts)
+        self.left = np.concatenate(lefts)
+        self.depth = len(starts)
+        node_count = len(self.start)
+
+        # Bounds: leaves by a segmented reduction (leaf ranges tile [0, count)
+        # in start order), then parents from their children, deepest level first
+        self.lo = np.zeros((node_count, 3), dtype=np.float32)
+        self.hi = np.zeros((node_count, 3), dtype=np.float32)
+        leaves = np.flatnonzero((self.left < 0) & (self.count > 0))
+        if len(leaves):
+            leaves = leaves[np.argsort(self.start[leaves])]
+            self.lo[leaves] = np.minimum.reduceat(tri_min, self.start[leaves], axis=0)
+            self.hi[leaves] = np.maximum.reduceat(tri_max, self.start[leaves], axis=0)
+        offsets = np.cumsum([0] + [len(level) for level in starts])
+        for level in range(len(starts) - 1, -1, -1):
+            ids = np.arange(offsets[level], offsets[level + 1])
+            ids = ids[self.left[ids] >= 0]
+            children = self.left[ids]
+            self.lo[ids] = np.minimum(self.lo[children], self.lo[children + 1])
+            self.hi[ids] = np.maximum(self.hi[children], self.hi[children + 1])
+
+    @property
+    def node_count(self):
+        return len(self.start)
+
+    @property
+    def nbytes(self):
+        arrays = [self.triangle_index, self.v0, self.edge1, self.edge2,
+                  self.start, self.count, self.left, self.lo, self.hi]
+        return sum(array.nbytes for array in arrays)
+
+    def intersect(self, origins, directions, t_max=np.inf):
+        """
+        Closest hit of each ray (origins, directions: (n, 3), object space).
+        Returns (t, triangle): ray parameter (inf on a miss) and index into
+        the faces the BVH was built from (-1 on a miss).
+        """
+        origins = np.asarray(origins, dtype=np.float32).reshape(-1, 3)
+        directions = np.asarray(directions, dtype=np.float32).reshape(-1, 3)
+        ray_count = len(origins)
+        best_t = np.full(ray_count, t_max, dtype=np.float32)
+        best_triangle = np.full(ray_count, -1, dtype=np.int64)
+        if ray_count == 0 or len(self.triangle_index) == 0:
+            return best_t, best_triangle
+
+        safe = np.where(np.abs(directions) < 1e-12, 1e-12, directions)
+        inverse = 1.0 / safe
+
+        ray = np.arange(ray_count)
+        node = np.zeros(ray_count, dtype=np.int64)
+        while len(ray):
+            # Slab test of every (ray, node) pair
+            o, inv = origins[ray], inverse[ray]
+            t1 = (self.lo[node] - o) * inv
+            t2 = (self.hi[node] - o) * inv
+            near = np.minimum(t1, t2).max(axis=1)
+            far = np.maximum(t1, t2).min(axis=1)
+            hit = (far >= np.maximum(near, 0.0)) & (near <= best_t[ray])
+            ray, node = ray[hit], node[hit]
+
+            leaf = self.left[node] < 0
+            if leaf.any():
+                self._intersect_leaves(ray[leaf], node[leaf], origins, directions, best_t, best_triangle)
+
+            inner = ~leaf
+            ray = np.repeat(ray[inner], 2)
+            node = np.repeat(self.left[node[inner]], 2)
+            node[1::2] += 1
+
+        best_t[best_triangle < 0] = np.inf
+        return best_t, best_triangle
+
+    def _intersect_leaves(self, ray, node, origins, directions, best_t, best_triangle):
+        """Moller-Trumbore against every triangle of the given leaves; updates best_t/best_triangle"""
+        counts = self.count[node]
+        ray = np.repeat(ray, counts)
+        # Triangle slots start[node] .. start[node] + count[node] - 1 of each pair
+        first = np.repeat(self.start[node] - np.cumsum(counts) + counts, counts)
+        slot = first + np.arange(len(ray))
+
+        d = directions[ray]
+        e1, e2 = self.edge1[slot], self.edge2[slot]
+        p = np.cross(d, e2)
+        det = (e1 * p).sum(axis=1)
+        valid = np.abs(det) > 1e-12
+        inv_det = 1.0 / np.where(valid, det, 1.0)
+        s = origins[ray] - self.v0[slot]
+        u = (s * p).sum(axis=1) * inv_det
+        q = np.cross(s, e1)
+        v = (d * q).sum(axis=1) * inv_det
+        t = (e2 * q).sum(axis=1) * inv_det
+        valid &= (u >= 0.0) & (v >= 0.0) & (u + v <= 1.0) & (t > 0.0) & (t < best_t[ray])
+        if not valid.any():
+            return
+
+        ray, slot, t = ray[valid], slot[valid], t[valid]
+        np.minimum.at(best_t, ray, t)
+        closest = t == best_t[ray]
+        best_triangle[ray[closest]] = self.triangle_index[slot[closest]]
@@ -0,0 +1,83 @@
+"""
+Bounding volumes and view-frustum culling.
+
+Bounds are computed once per mesh (object space) and transformed per node
+with its model matrix. Frustum planes are extracted from projection @ view
+(Gribb/Hartmann) and every test is vectorized over many objects at once.
+"""
+
+import numpy as np
+
+
+def compute_bounds(positions):
+    """Object-space AABB (min, max) and bounding sphere (center, radius) of a vertex array"""
+    positions = np.asarray(positions, dtype=np.float32).reshape(-1, 3)
+    if len(positions) == 0:
+        zero = np.zeros(3, dtype=np.float32)
+        return zero, zero, zero, 0.0
+    aabb_min = positions.min(axis=0)
+    aabb_max = positions.max(axis=0)
+    center = (aabb_min + aabb_max) * 0.5
+    radius = float(np.sqrt(((positions - center) ** 2).sum(axis=1).max()))
+    return aabb_min, aabb_max, center, radius
+
+
+def frustum_planes(view_projection):
+    """
+    Six planes (left, right, bottom, top, near, far) as rows (a, b, c, d),
+    normalized so that a*x + b*y + c*z + d is the signed distance (inside >= 0).
+    """
+    m = np.asarray(view_projection, dtype=np.float64)
+    planes = np.array([
+        m[3] + m[0], m[3] - m[0],
+        m[3] + m[1], m[3] - m[1],
+        m[3] + m[2], m[3] - m[2]
+    ])
+    planes /= np.linalg.norm(planes[:, :3], axis=1, keepdims=True)
+    return planes
+
+
+def transform_spheres(model_matrices, center, radius):
+    """World-space sphere centers (n, 3) and radii (n,) for one object sphere under n matrices"""
+    model_matrices = np.asarray(model_matrices).reshape(-1, 4, 4)
+    centers = model_matrices[:, :3, :3] @ np.asarray(center, dtype=np.float32) + model_matrices[:, :3, 3]
+    # Largest axis scale bounds how much the sphere can grow
+    scales = np.linalg.norm(model_matrices[:, :3, :3], axis=1).max(axis=1)
+    return centers, radius * scales
+
+
+def transform_aabbs(model_matrices, aabb_min, aabb_max):
+    """World-space AABBs (mins, maxs), each (n, 3), enclosing one object AABB under n matrices"""
+    model_matrices = np.asarray(model_matrices).reshape(-1, 4, 4)
+    center = (np.asarray(aabb_min) + np.asarray(aabb_max)) * 0.5
+    extent = (np.asarray(aabb_max) - np.asarray(aabb_min)) * 0.5
+    world_centers = model_matrices[:, :3, :3] @ center + model_matrices[:, :3, 3]
+    world_extents = np.abs(model_matrices[:, :3, :3]) @ extent
+    return world_centers - world_extents, world_centers + world_extents
+
+
+def spheres_in_frustum(planes, centers, radii):
+    """Boolean mask of spheres that are at least partially inside the frustum"""
+    distances = centers @ planes[:, :3].T + planes[:, 3]
+    return (distances >= -np.asarray(radii)[:, None]).all(axis=1)
+
+
+def aabbs_in_frustum(planes, mins, maxs):
+    """Boolean mask of AABBs that are at least partially inside the frustum (p-vertex test)"""
+    normals = planes[:, :3]
+    # For each plane pick the box corner furthest along the plane normal
+    positive = np.where(normals[None, :, :] >= 0, maxs[:, None, :], mins[:, None, :])
+    distances = (positive * normals[None, :, :]).sum(axis=2) + planes[:, 3]
+    return (distances >= 0).all(axis=1)
+
+
+def cull(planes, model_matrices, bounds):
+    """Visibility mask for n instances of one mesh: sphere test first, AABB test on survivors"""
+    aabb_min, aabb_max, center, radius = bounds
+    centers, radii = transform_spheres(model_matrices, center, radius)
+    visible = spheres_in_frustum(planes, centers, radii)
+    if visible.any():
+        candidates = np.flatnonzero(visible)
+        mins, maxs = transform_aabbs(np.asarray(model_matrices).reshape(-1, 4, 4)[candidates], aabb_min, aabb_max)
+        visible[candidates] = aabbs_in_frustum(planes, mins, maxs)
+    return visible
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Offline turntable / camera-sweep export for the 3D renderer.
+
+Renders N frames headlessly and writes a PNG sequence (and optionally a video
+through ffmpeg). Frames are split across a process pool; the mesh is parsed
+once in the parent and handed to the workers through shared memory, so each
+worker only pays for its own GL context.
+
+Usage:
+    python export_turntable.py model.obj --frames 360 --out turntable/
+    python export_turntable.py sphere --sweep camera --video turntable.mp4
+"""
+
+import os
+import math
+import time
+import shutil
+import argparse
+import subprocess
+import multiprocessing
+from multiprocessing import shared_memory
+
+# Export never opens a window
+os.environ.setdefault('GRAFKOM_HEADLESS', '1')
+
+import numpy as np
+
+from app import OpenGLRenderer, encode_png
+from mesh_io import MeshData
+
+PRIMITIVES = ['cube', 'pyramid', 'sphere']
+
+# MeshData arrays handed to the workers through shared memory
+MESH_ARRAYS = ['positions', 'faces', 'normals', 'texcoords', 'face_materials']
+
+# Per-worker state, set up once by _init_worker
+_worker = {}
+
+
+def share_array(array):
+    """Copy an array into a new shared memory block"""
+    shm = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    np.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf)[...] = array
+    return shm, (shm.name, array.shape, array.dtype.str)
+
+
+def attach_array(spec):
+    """Attach to a shared memory block created by share_array (no copy)"""
+    name, shape, dtype = spec
+    shm = shared_memory.SharedMemory(name=name)
+    return shm, np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf)
+
+
+def frame_state(index, num_frames, sweep, base_state):
+    """Scene state for one frame of the sweep"""
+    angle = 360.0 * index / num_frames
+    if sweep == 'rotation':
+        return {'auto_rotate': True, 'rotation_angle': angle}
+
+    # Orbit the eye around the look-at center, keeping radius and height
+    camera = base_state['camera']
+    dx = camera['eye_x'] - camera['center_x']
+    dz = camera['eye_z'] - camera['center_z']
+    radius = math.hypot(dx, dz)
+    theta = math.atan2(dz, dx) + math.radians(angle)
+    return {
+        'auto_rotate': False,
+        'camera': {
+            'eye_x': camera['center_x'] + radius * math.cos(theta),
+            'eye_z': camera['center_z'] + radius * math.sin(theta)
+        }
+    }
+
+
+def _init_worker(width, height, obj_name, mesh_specs, base_state):
+    """
+    Pool initializer: one headless renderer per worker, mesh attached once.
+    mesh_specs is (array specs by MeshData attribute, materials, groups, import report).
+    """
+    renderer = OpenGLRenderer(headless=True)
+    renderer.window_width = width
+    renderer.window_height = height
+    renderer.perspective_params['aspect'] = width / height
+    if not renderer.init_opengl():
+        raise RuntimeError("OpenGL init failed in export worker")
+
+    renderer.apply_scene_state(base_state)
+    if mesh_specs:
+        array_specs, materials, groups, report = mesh_specs
+        attached = {name: attach_array(spec) for name, spec in array_specs.items()}
+        # Keep the mappings alive for the lifetime of the worker
+        _worker['shm'] = [shm for shm, _ in attached.values()]
+        data = MeshData(*(attached[name][1] if name in attached else None for name in MESH_ARRAYS),
+                        materials=materials, groups=groups)
+        model = renderer.make_model(obj_name, data, report)
+        # Every frame at full detail: no LOD chain in the workers
+        model['lod_meshes'] = []
+        renderer.install_model(model)
+    renderer.setup_projection()
+
+    _worker['renderer'] = renderer
+    _worker['base_state'] = base_state
+
+
+def _render_frame(task):
+    """Render one frame and write it to disk; returns the frame index"""
+    index, num_frames, sweep, path = task
+    renderer = _worker['renderer']
+    renderer.apply_scene_state(frame_state(index, num_frames, sweep, _worker['base_state']))
+    renderer.render()
+    pixels = renderer.read_pixels()
+    with open(path, 'wb') as file:
+        file.write(encode_png(pixels, renderer.window_width, renderer.window_height))
+    return index
+
+
+def export_turntable(model, num_frames=360, out_dir='turntable', sweep='rotation',
+                     workers=None, width=800, height=600, video=None, fps=30):
+    """Render a turntable sequence; returns the list of written frame paths"""
+    os.makedirs(out_dir, exist_ok=True)
+    workers = workers or os.cpu_count() or 1
+
+    # Parse the model once in the parent
+    loader = OpenGLRenderer(headless=True)
+    shared = []
+    mesh_specs = None
+    if model in PRIMITIVES:
+        loader.current_object = model
+    else:
+        if not loader.load_obj_file(model):
+            raise FileNotFoundError(f"Could not load OBJ file: {model}")
+        data = loader.current_model['data']
+        array_specs = {}
+        for name in MESH_ARRAYS:
+            array = getattr(data, name)
+            if array is not None:
+                shm, array_specs[name] = share_array(np.ascontiguousarray(array))
+                shared.append(shm)
+        mesh_specs = (array_specs, data.materials, data.groups, loader.current_model['report'])
+
+    base_state = loader.get_scene_state()
+    base_state['obj_file'] = None  # workers get the mesh through shared memory
+    paths = [os.path.join(out_dir, f"frame_{i:04d}.png") for i in range(num_frames)]
+    tasks = [(i, num_frames, sweep, paths[i]) for i in range(num_frames)]
+
+    start = time.perf_counter()
+    try:
+        ctx = multiprocessing.get_context('spawn')
+        with ctx.Pool(workers, initializer=_init_worker,
+                      initargs=(width, height, model, mesh_specs, base_state)) as pool:
+            chunksize = max(1, num_frames // (workers * 8))
+            done = 0
+            for _ in pool.imap_unordered(_render_frame, tasks, chunksize=chunksize):
+                done += 1
+                if done % max(1, num_frames // 10) == 0:
+                    print(f"  {done}/{num_frames} frames")
+    finally:
+        for shm in shared:
+            shm.close()
+            shm.unlink()
+    elapsed = time.perf_counter() - start
+    print(f"✅ {num_frames} frames rendered in {elapsed:.2f}s with {workers} worker(s) "
+          f"({num_frames / elapsed:.1f} frames/s)")
+
+    if video:
+        encode_video(out_dir, video, fps)
+    return paths
+
+
+def encode_video(frames_dir, video_path, fps):
+    """Assemble the PNG sequence into a video with ffmpeg"""
+    ffmpeg = shutil.which('ffmpeg')
+    if not ffmpeg:
+        print("⚠️  ffmpeg not found, skipping video (PNG frames are kept)")
+        return False
+    subprocess.check_call([
+        ffmpeg, '-y', '-loglevel', 'error', '-framerate', str(fps),
+        '-i', os.path.join(frames_dir, 'frame_%04d.png'),
+        '-pix_fmt', 'yuv420p', video_path
+    ])
+    print(f"🎬 Video written to {video_path}")
+    return True
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Headless turntable export")
+    parser.add_argument('model', help="path to an OBJ file, or one of: " + ", ".join(PRIMITIVES))
+    parser.add_argument('--frames', type=int, default=360)
+    parser.add_argument('--out', default='turntable', help="output directory for the PNG sequence")
+    parser.add_argument('--sweep', choices=['rotation', 'camera'], default='rotation')
+    parser.add_argument('--workers', type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument('--width', type=int, default=800)
+    parser.add_argument('--height', type=int, default=600)
+    parser.add_argument('--video', default=None, help="also encode a video (requires ffmpeg)")
+    parser.add_argument('--fps', type=int, default=30)
+    args = parser.parse_args()
+
+    export_turntable(args.model, args.frames, args.out, args.sweep, args.workers,
+                     args.width, args.height, args.video, args.fps)
@@ -0,0 +1,133 @@
+"""
+Asynchronous readback of rendered frames, for snapshots.
+
+FrameReadback copies the framebuffer into one of two pixel buffer objects:
+glReadPixels into a bound GL_PIXEL_PACK_BUFFER returns without waiting for
+the GPU, and each copy is mapped a frame later (when it has completed) while
+the next frame reads into the other buffer.
+
+SnapshotStore hands the read-back frames to other threads, which encode them
+to PNG themselves (never on the render thread), once per frame: requests
+served from the same frame share the encoded bytes.
+"""
+
+import ctypes
+import threading
+import time
+
+from OpenGL.GL import (
+    GL_PIXEL_PACK_BUFFER, GL_STREAM_READ, GL_READ_ONLY, GL_RGB, GL_UNSIGNED_BYTE, GL_PACK_ALIGNMENT,
+    glGenBuffers, glBindBuffer, glBufferData, glMapBuffer, glUnmapBuffer, glPixelStorei, glDeleteBuffers
+)
+from OpenGL.raw.GL.VERSION.GL_1_0 import glReadPixels as read_pixels_into
+
+
+class FrameReadback:
+    """Two pixel pack buffers read into on alternate frames"""
+
+    def __init__(self):
+        self.buffers = [int(buffer) for buffer in glGenBuffers(2)]
+        self.size = None
+        # (frame_id, width, height) read into each buffer and not mapped yet
+        self.pending = [None, None]
+        self.index = 0
+
+    @property
+    def busy(self):
+        return any(self.pending)
+
+    def capture(self, frame_id, width, height):
+        """
+        Start reading the current framebuffer (RGB) into the next buffer and map
+        the one read a frame ago. Returns the frames that completed, as
+        (frame_id, bottom-up RGB bytes, width, height), oldest first.
+        """
+        ready = []
+        if self.size != (width, height):
+            ready = self.collect()
+            for buffer in self.buffers:
+                glBindBuffer(GL_PIXEL_PACK_BUFFER, buffer)
+                glBufferData(GL_PIXEL_PACK_BUFFER, width * height * 3, None, GL_STREAM_READ)
+            self.size = (width, height)
+
+        glBindBuffer(GL_PIXEL_PACK_BUFFER, self.buffers[self.index])
+        glPixelStorei(GL_PACK_ALIGNMENT, 1)
+        read_pixels_into(0, 0, width, height, GL_RGB, GL_UNSIGNED_BYTE, ctypes.c_void_p(0))
+        self.pending[self.index] = (frame_id, width, height)
+        self.index ^= 1
+        ready += self._map(self.index)
+        glBindBuffer(GL_PIXEL_PACK_BUFFER, 0)
+        return ready
+
+    def collect(self):
+        """Map every outstanding read (waits for them); same result as capture()"""
+        ready = self._map(self.index) + self._map(self.index ^ 1)
+        glBindBuffer(GL_PIXEL_PACK_BUFFER, 0)
+        return sorted(ready, key=lambda frame: frame[0])
+
+    def _map(self, index):
+        if self.pending[index] is None:
+            return []
+        frame_id, width, height = self.pending[index]
+        self.pending[index] = None
+        glBindBuffer(GL_PIXEL_PACK_BUFFER, self.buffers[index])
+        pointer = glMapBuffer(GL_PIXEL_PACK_BUFFER, GL_READ_ONLY)
+        try:
+            pixels = ctypes.string_at(pointer, width * height * 3)
+        finally:
+            glUnmapBuffer(GL_PIXEL_PACK_BUFFER)
+        return [(frame_id, pixels, width, height)]
+
+    def release(self):
+        glDeleteBuffers(2, self.buffers)
+
+
+class SnapshotStore:
+    """Latest read-back frame, shared between the render thread and snapshot requests"""
+
+    def __init__(self, encode, hot_seconds=1.0):
+        # encode(pixels, width, height) -> PNG bytes, called by the requesting thread
+        self.encode = encode
+        self.hot_seconds = hot_seconds
+        self.condition = threading.Condition()
+        self.encode_lock = threading.Lock()
+        self.frame = None
+        self.png = None
+        self.requested_at = None
+        self.stats = {'requests': 0, 'frames': 0, 'encodes': 0, 'reused': 0}
+
+    def wanted(self):
+        """True while snapshots were requested recently: the renderer keeps reading frames back"""
+        requested_at = self.requested_at
+        return requested_at is not None and time.monotonic() - requested_at < self.hot_seconds
+
+    def publish(self, frames):
+        """Called by the render thread with the frames FrameReadback returned"""
+        if not frames:
+            return
+        with self.condition:
+            self.frame = frames[-1]
+            self.stats['frames'] += len(frames)
+            self.condition.notify_all()
+
+    def request(self, after_frame=None, timeout=2.0):
+        """
+        (frame_id, PNG bytes) of the first frame newer than after_frame (any
+        frame if None), or None if none arrives within timeout.
+        """
+        with self.condition:
+            self.requested_at = time.monotonic()
+            self.stats['requests'] += 1
+            if not self.condition.wait_for(
+                    lambda: self.frame is not None and (after_frame is None or self.frame[0] > after_frame),
+                    timeout):
+                return None
+            frame_id, pixels, width, height = self.frame
+
+        with self.encode_lock:
+            if self.png is not None and self.png[0] >= frame_id:
+                self.stats['reused'] += 1
+            else:
+                self.png = (frame_id, self.encode(pixels, width, height))
+                self.stats['encodes'] += 1
+            return self.png
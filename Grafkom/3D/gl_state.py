@@ -0,0 +1,91 @@
+"""
+Redundant GL state-change elimination for the 3D renderer.
+
+StateCache remembers the last value set for each piece of state it manages
+(capabilities, polygon mode, bound program, fixed-function material and
+light parameters, uniform groups) and skips calls that would not change it.
+State it manages must only be changed through it; after anything else
+touches that state (or a new context is made current) call invalidate().
+
+Calls issued and elided are counted per frame (begin_frame() closes one),
+in GL calls: a material or uniform group counts as the calls it replaces.
+"""
+
+from OpenGL.GL import (
+    GL_FRONT, GL_FRONT_AND_BACK, GL_AMBIENT, GL_DIFFUSE, GL_SPECULAR, GL_SHININESS,
+    glEnable, glDisable, glPolygonMode, glUseProgram, glMaterialfv, glMaterialf, glLightfv
+)
+
+
+class StateCache:
+    """Shadow copy of GL state with per-frame issued/elided counters"""
+
+    def __init__(self):
+        self.values = {}
+        self.issued = 0
+        self.elided = 0
+        self.frame_stats = {'issued': 0, 'elided': 0}
+
+    def invalidate(self, key=None):
+        """Forget one key, or everything (the next set of each value is issued)"""
+        if key is None:
+            self.values.clear()
+        else:
+            self.values.pop(key, None)
+
+    def begin_frame(self):
+        """Close the counters of the previous frame into frame_stats"""
+        self.frame_stats = {'issued': self.issued, 'elided': self.elided}
+        self.issued = 0
+        self.elided = 0
+
+    def record(self, changed, calls=1):
+        """Count calls the caller issued or skipped through its own caching"""
+        if changed:
+            self.issued += calls
+        else:
+            self.elided += calls
+
+    def call(self, key, value, function, *args, calls=1):
+        """function(*args) unless key already holds value; returns True if issued"""
+        if key in self.values and self.values[key] == value:
+            self.elided += calls
+            return False
+        function(*args)
+        self.values[key] = value
+        self.issued += calls
+        return True
+
+    def set_enabled(self, capability, enabled):
+        enabled = bool(enabled)
+        return self.call(('enabled', capability), enabled, glEnable if enabled else glDisable, capability)
+
+    def enable(self, capability):
+        return self.set_enabled(capability, True)
+
+    def disable(self, capability):
+        return self.set_enabled(capability, False)
+
+    def polygon_mode(self, mode):
+        return self.call('polygon_mode', mode, glPolygonMode, GL_FRONT_AND_BACK, mode)
+
+    def use_program(self, program):
+        return self.call('program', program, glUseProgram, program)
+
+    def material(self, ambient, diffuse, specular, shininess):
+        """Fixed-function front material; each parameter is cached on its own"""
+        self.call(('material', 'ambient'), tuple(ambient), glMaterialfv, GL_FRONT, GL_AMBIENT, ambient)
+        self.call(('material', 'diffuse'), tuple(diffuse), glMaterialfv, GL_FRONT, GL_DIFFUSE, diffuse)
+        self.call(('material', 'specular'), tuple(specular), glMaterialfv, GL_FRONT, GL_SPECULAR, specular)
+        self.call(('material', 'shininess'), shininess, glMaterialf, GL_FRONT, GL_SHININESS, shininess)
+
+    def light(self, light, parameter, values, view_key=None):
+        """
+        glLightfv, cached per (light, parameter). Positions are transformed by
+        the modelview at call time, so pass the view they were set under.
+        """
+        return self.call(('light', light, parameter), (tuple(values), view_key), glLightfv, light, parameter, values)
+
+    def uniforms(self, program, group, value, upload, calls):
+        """Upload a group of uniforms of a program (in use) when value changed"""
+        return self.call(('uniforms', program, group), value, upload, calls=calls)
@@ -0,0 +1,164 @@
+"""
+NumPy 4x4 matrix helpers for the 3D renderer.
+
+Matrices use the column-vector convention of OpenGL (p' = M @ p); use to_gl()
+to get the column-major float32 layout expected by glLoadMatrixf/glMultMatrixf
+and by mat4 vertex attributes.
+"""
+
+import math
+import numpy as np
+
+
+def translation_matrix(x, y, z):
+    """Equivalent of glTranslatef"""
+    matrix = np.identity(4, dtype=np.float32)
+    matrix[:3, 3] = (x, y, z)
+    return matrix
+
+
+def scale_matrix(sx, sy, sz):
+    """Equivalent of glScalef"""
+    return np.diag(np.array([sx, sy, sz, 1.0], dtype=np.float32))
+
+
+def rotation_matrix(angle, x, y, z):
+    """Equivalent of glRotatef (angle in degrees around axis x, y, z)"""
+    axis = np.array([x, y, z], dtype=np.float64)
+    axis /= np.linalg.norm(axis)
+    x, y, z = axis
+    c = math.cos(math.radians(angle))
+    s = math.sin(math.radians(angle))
+    t = 1.0 - c
+    matrix = np.identity(4, dtype=np.float32)
+    matrix[:3, :3] = [
+        [t * x * x + c,     t * x * y - s * z, t * x * z + s * y],
+        [t * x * y + s * z, t * y * y + c,     t * y * z - s * x],
+        [t * x * z - s * y, t * y * z + s * x, t * z * z + c]
+    ]
+    return matrix
+
+
+def perspective_matrix(fov, aspect, near, far):
+    """Equivalent of gluPerspective"""
+    f = 1.0 / math.tan(math.radians(fov) / 2.0)
+    matrix = np.zeros((4, 4), dtype=np.float32)
+    matrix[0, 0] = f / aspect
+    matrix[1, 1] = f
+    matrix[2, 2] = (far + near) / (near - far)
+    matrix[2, 3] = 2.0 * far * near / (near - far)
+    matrix[3, 2] = -1.0
+    return matrix
+
+
+def ortho_matrix(left, right, bottom, top, near, far):
+    """Equivalent of glOrtho"""
+    matrix = np.identity(4, dtype=np.float32)
+    matrix[0, 0] = 2.0 / (right - left)
+    matrix[1, 1] = 2.0 / (top - bottom)
+    matrix[2, 2] = -2.0 / (far - near)
+    matrix[0, 3] = -(right + left) / (right - left)
+    matrix[1, 3] = -(top + bottom) / (top - bottom)
+    matrix[2, 3] = -(far + near) / (far - near)
+    return matrix
+
+
+def look_at_matrix(eye, center, up):
+    """Equivalent of gluLookAt"""
+    eye = np.asarray(eye, dtype=np.float64)
+    forward = np.asarray(center, dtype=np.float64) - eye
+    forward /= np.linalg.norm(forward)
+    side = np.cross(forward, np.asarray(up, dtype=np.float64))
+    side /= np.linalg.norm(side)
+    true_up = np.cross(side, forward)
+
+    matrix = np.identity(4, dtype=np.float32)
+    matrix[0, :3] = side
+    matrix[1, :3] = true_up
+    matrix[2, :3] = -forward
+    matrix[:3, 3] = -matrix[:3, :3] @ eye
+    return matrix
+
+
+def model_matrix(transform_params, extra_rot_y=0.0):
+    """Model matrix built in the same order as OpenGLRenderer.apply_transformations"""
+    matrix = translation_matrix(transform_params['pos_x'], transform_params['pos_y'], transform_params['pos_z'])
+    matrix = matrix @ rotation_matrix(transform_params['rot_x'], 1, 0, 0)
+    matrix = matrix @ rotation_matrix(transform_params['rot_y'], 0, 1, 0)
+    matrix = matrix @ rotation_matrix(transform_params['rot_z'], 0, 0, 1)
+    if extra_rot_y:
+        matrix = matrix @ rotation_matrix(extra_rot_y, 0, 1, 0)
+    scale = transform_params['scale']
+    return matrix @ scale_matrix(scale, scale, scale)
+
+
+def model_matrices(positions, rotations, scales):
+    """
+    Batched model matrices, T * Rx * Ry * Rz * S for every row.
+    positions, rotations (degrees): (n, 3); scales: (n,). Returns (n, 4, 4).
+    """
+    positions = np.asarray(positions, dtype=np.float32).reshape(-1, 3)
+    radians = np.radians(np.asarray(rotations, dtype=np.float32).reshape(-1, 3))
+    scales = np.asarray(scales, dtype=np.float32).reshape(-1)
+    count = len(positions)
+
+    cos, sin = np.cos(radians), np.sin(radians)
+    cx, cy, cz = cos[:, 0], cos[:, 1], cos[:, 2]
+    sx, sy, sz = sin[:, 0], sin[:, 1], sin[:, 2]
+
+    # Rx @ Ry @ Rz written out
+    rotation = np.empty((count, 3, 3), dtype=np.float32)
+    rotation[:, 0, 0] = cy * cz
+    rotation[:, 0, 1] = -cy * sz
+    rotation[:, 0, 2] = sy
+    rotation[:, 1, 0] = sx * sy * cz + cx * sz
+    rotation[:, 1, 1] = -sx * sy * sz + cx * cz
+    rotation[:, 1, 2] = -sx * cy
+    rotation[:, 2, 0] = -cx * sy * cz + sx * sz
+    rotation[:, 2, 1] = cx * sy * sz + sx * cz
+    rotation[:, 2, 2] = cx * cy
+
+    matrices = np.zeros((count, 4, 4), dtype=np.float32)
+    matrices[:, :3, :3] = rotation * scales[:, None, None]
+    matrices[:, :3, 3] = positions
+    matrices[:, 3, 3] = 1.0
+    return matrices
+
+
+def to_gl(matrix):
+    """Column-major float32 copy of one (4, 4) or many (n, 4, 4) matrices"""
+    return np.ascontiguousarray(np.swapaxes(matrix, -1, -2), dtype=np.float32)
+
+
+class MatrixCache:
+    """
+    Named matrices rebuilt only when their key (the parameters they are made
+    from) changes. Cached matrices are read-only and shared with every
+    consumer; version() changes whenever a matrix is rebuilt.
+    """
+
+    def __init__(self):
+        self.entries = {}  # name -> [key, matrix, column-major copy or None, version]
+        self.rebuilds = 0
+
+    def get(self, name, key, build):
+        """Matrix for name, calling build() only if key differs from the cached one"""
+        entry = self.entries.get(name)
+        if entry is None or entry[0] != key:
+            matrix = np.asarray(build(), dtype=np.float32)
+            matrix.flags.writeable = False
+            self.rebuilds += 1
+            entry = self.entries[name] = [key, matrix, None, self.rebuilds]
+        return entry[1]
+
+    def gl(self, name, key, build):
+        """Column-major float32 copy of get(name, key, build), for glLoadMatrixf/glMultMatrixf"""
+        self.get(name, key, build)
+        entry = self.entries[name]
+        if entry[2] is None:
+            entry[2] = to_gl(entry[1])
+        return entry[2]
+
+    def version(self, name):
+        entry = self.entries.get(name)
+        return entry[3] if entry else None
@@ -0,0 +1,507 @@
+"""
+Mesh file readers.
+
+OBJ files are streamed in chunks so callers can report progress and cancel a
+load between chunks; each chunk's lines are converted to NumPy arrays in bulk.
+Faces referencing separate position/texcoord/normal indices are de-indexed
+into one vertex per unique (v, vt, vn) corner, and faces are tagged with their
+usemtl material so they can be drawn in one batch per material.
+
+Binary STL and PLY files are memory-mapped and viewed as NumPy structured
+arrays with np.frombuffer, so no Python code runs per vertex or face. STL
+facet normals become vertex normals in the same vectorized pass, so these
+meshes can be drawn as loaded, without an import stage (is_mapped_format).
+"""
+
+import os
+import re
+import mmap
+
+import numpy as np
+from numpy.lib.recfunctions import structured_to_unstructured
+
+CHUNK_SIZE = 1 << 20
+
+DEFAULT_DIFFUSE = [0.0, 0.74, 0.83]
+
+# A face corner with two slashes ("v/vt/vn" or "v//vn")
+_FULL_CORNER = re.compile(r'/[^\s/]*/')
+
+
+class LoadCancelled(Exception):
+    """Raised when a load is cancelled between chunks"""
+
+
+class MeshData:
+    """
+    Triangle mesh as loaded from a file: positions (n, 3), faces (m, 3) and
+    optional per-vertex normals (n, 3) / texcoords (n, 2). face_materials
+    indexes into materials ({'name', 'diffuse'}); groups lists the o/g names
+    with their triangle counts.
+    """
+    def __init__(self, positions, faces, normals=None, texcoords=None,
+                 face_materials=None, materials=None, groups=None):
+        self.positions = positions
+        self.faces = faces
+        self.normals = normals
+        self.texcoords = texcoords
+        self.face_materials = face_materials
+        self.materials = materials or []
+        self.groups = groups or []
+
+
+def fan_triangulate(indices, counts):
+    """Split polygons (flat index list + vertex count per polygon) into triangle fans"""
+    indices = np.asarray(indices, dtype=np.int64)
+    counts = np.asarray(counts, dtype=np.int64)
+    starts = np.cumsum(counts) - counts
+    triangles_per_polygon = np.maximum(counts - 2, 0)
+    total = int(triangles_per_polygon.sum())
+    if total == 0:
+        return np.zeros((0, 3) + indices.shape[1:], dtype=np.int64)
+
+    polygon = np.repeat(np.arange(len(counts)), triangles_per_polygon)
+    first_triangle = np.cumsum(triangles_per_polygon) - triangles_per_polygon
+    k = np.arange(total) - np.repeat(first_triangle, triangles_per_polygon)
+    base = starts[polygon]
+    return np.stack([indices[base], indices[base + k + 1], indices[base + k + 2]], axis=1)
+
+
+def _parse_floats(lines, width):
+    """(len(lines), width) float32 array from whitespace separated values"""
+    values = np.array(' '.join(lines).split(), dtype=np.float32)
+    if len(values) == width * len(lines):
+        return values.reshape(-1, width)
+    # Ragged rows (optional w, vertex colors, 1D texcoords): pad / truncate
+    rows = [(line.split() + ['0'] * width)[:width] for line in lines]
+    return np.array(rows, dtype=np.float32)
+
+
+def _parse_corners(corners):
+    """(n, 3) int64 array of v/vt/vn indices per corner token, 0 where absent"""
+    text = ' '.join(corners)
+    slashes = text.count('/')
+    count = len(corners)
+    if slashes == 0:
+        result = np.zeros((count, 3), dtype=np.int64)
+        result[:, 0] = np.array(corners, dtype=np.int64)
+        return result
+    if slashes == 2 * count:
+        return np.array(text.replace('//', '/0/').replace('/', ' ').split(), dtype=np.int64).reshape(-1, 3)
+    if slashes == count and not _FULL_CORNER.search(text):
+        result = np.zeros((count, 3), dtype=np.int64)
+        result[:, :2] = np.array(text.replace('/', ' ').split(), dtype=np.int64).reshape(-1, 2)
+        return result
+    # Mixed corner formats within one chunk
+    rows = [[int(part) if part else 0 for part in (token.split('/') + ['', ''])[:3]] for token in corners]
+    return np.array(rows, dtype=np.int64)
+
+
+def load_mtl(filename):
+    """Diffuse color of every material in an .mtl file: {name: [r, g, b]}"""
+    materials = {}
+    current = None
+    with open(filename, 'r', errors='replace') as file:
+        for line in file:
+            parts = line.split()
+            if not parts:
+                continue
+            if parts[0] == 'newmtl' and len(parts) > 1:
+                current = ' '.join(parts[1:])
+                materials[current] = list(DEFAULT_DIFFUSE)
+            elif parts[0] == 'Kd' and current is not None and len(parts) >= 4:
+                materials[current] = [float(value) for value in parts[1:4]]
+    return materials
+
+
+class ObjStreamParser:
+    """Incremental OBJ parser: feed() text chunks, then finish() for a MeshData"""
+
+    def __init__(self):
+        self.partial_line = ''
+        self.position_chunks = []
+        self.texcoord_chunks = []
+        self.normal_chunks = []
+        self.corner_chunks = []
+        self.face_material_chunks = []
+        self.face_group_chunks = []
+        # Running counts, needed to resolve negative (relative) indices
+        self.counts = [0, 0, 0]
+        self.material_names = []
+        self.material_ids = {}
+        self.material = -1
+        self.group_names = []
+        self.group = -1
+        self.mtllibs = []
+
+    def feed(self, text):
+        lines = (self.partial_line + text).split('\n')
+        self.partial_line = lines.pop()
+        self._parse_lines(lines)
+
+    def _parse_lines(self, lines):
+        positions, texcoords, normals = [], [], []
+        faces, face_bases, face_materials, face_groups = [], [], [], []
+        counts = self.counts
+        for line in lines:
+            # Tag and rest split on any whitespace: lines may be indented or tab separated
+            parts = line.split(None, 1)
+            if not parts:
+                continue
+            tag = parts[0]
+            rest = parts[1] if len(parts) > 1 else ''
+            if tag == 'v':
+                positions.append(rest)
+                counts[0] += 1
+            elif tag == 'f':
+                faces.append(rest)
+                face_bases.append((counts[0], counts[1], counts[2]))
+                face_materials.append(self.material)
+                face_groups.append(self.group)
+            elif tag == 'vn':
+                normals.append(rest)
+                counts[2] += 1
+            elif tag == 'vt':
+                texcoords.append(rest)
+                counts[1] += 1
+            elif tag == 'usemtl':
+                name = rest.strip()
+                if name not in self.material_ids:
+                    self.material_ids[name] = len(self.material_names)
+                    self.material_names.append(name)
+                self.material = self.material_ids[name]
+            elif tag in ('o', 'g'):
+                self.group_names.append(rest.strip())
+                self.group = len(self.group_names) - 1
+            elif tag == 'mtllib':
+                self.mtllibs.extend(rest.split())
+
+        if positions:
+            self.position_chunks.append(_parse_floats(positions, 3))
+        if texcoords:
+            self.texcoord_chunks.append(_parse_floats(texcoords, 2))
+        if normals:
+            self.normal_chunks.append(_parse_floats(normals, 3))
+        if not faces:
+            return
+
+        polygons = [line.split() for line in faces]
+        polygon_sizes = np.fromiter((len(polygon) for polygon in polygons), dtype=np.int64, count=len(polygons))
+        corners = _parse_corners([token for polygon in polygons for token in polygon])
+
+        # OBJ indices are 1-based; negative ones count back from the last element so far
+        bases = np.repeat(np.array(face_bases, dtype=np.int64), polygon_sizes, axis=0)
+        corners = np.where(corners > 0, corners - 1, np.where(corners < 0, bases + corners, -1))
+
+        triangles_per_polygon = np.maximum(polygon_sizes - 2, 0)
+        self.corner_chunks.append(fan_triangulate(corners, polygon_sizes))
+        self.face_material_chunks.append(np.repeat(np.array(face_materials, dtype=np.int64), triangles_per_polygon))
+        self.face_group_chunks.append(np.repeat(np.array(face_groups, dtype=np.int64), triangles_per_polygon))
+
+    def finish(self, base_dir='.'):
+        if self.partial_line:
+            self._parse_lines([self.partial_line])
+            self.partial_line = ''
+
+        positions = _concat(self.position_chunks, (0, 3), np.float32)
+        texcoords = _concat(self.texcoord_chunks, (0, 2), np.float32)
+        normals = _concat(self.normal_chunks, (0, 3), np.float32)
+        corners = _concat(self.corner_chunks, (0, 3, 3), np.int64)
+        face_materials = _concat(self.face_material_chunks, (0,), np.int64)
+        face_groups = _concat(self.face_group_chunks, (0,), np.int64)
+
+        # Drop faces referencing missing positions
+        valid = ((corners[:, :, 0] >= 0) & (corners[:, :, 0] < len(positions))).all(axis=1)
+        corners, face_materials, face_groups = corners[valid], face_materials[valid], face_groups[valid]
+
+        # Attributes are per corner: indices that are absent or out of range count as missing (-1)
+        flat = corners.reshape(-1, 3).copy()
+        flat[:, 1] = np.where((flat[:, 1] >= 0) & (flat[:, 1] < len(texcoords)), flat[:, 1], -1)
+        flat[:, 2] = np.where((flat[:, 2] >= 0) & (flat[:, 2] < len(normals)), flat[:, 2], -1)
+        use_texcoords = bool((flat[:, 1] >= 0).any())
+        use_normals = bool((flat[:, 2] >= 0).any())
+
+        if not use_texcoords and not use_normals:
+            mesh = MeshData(positions, flat[:, 0].reshape(-1, 3))
+        else:
+            # De-index: one output vertex per unique (v, vt, vn) combination, 0 standing for a missing index
+            keys = (flat + np.array([0, 1, 1], dtype=np.int64)) * np.array([1, use_texcoords, use_normals],
+                                                                            dtype=np.int64)
+            spans = np.array([len(positions), len(texcoords) + 1, len(normals) + 1], dtype=np.int64)
+            if float(spans.prod()) < 2 ** 62:
+                packed = (keys[:, 0] * spans[1] + keys[:, 1]) * spans[2] + keys[:, 2]
+                _, first, inverse = np.unique(packed, return_index=True, return_inverse=True)
+            else:
+                _, first, inverse = np.unique(keys, axis=0, return_index=True, return_inverse=True)
+            unique = flat[first]
+            faces = inverse.reshape(-1, 3)
+            vertex_positions = positions[unique[:, 0]]
+            vertex_texcoords = vertex_normals = None
+            if use_texcoords:
+                vertex_texcoords = np.where((unique[:, 1] >= 0)[:, None], texcoords[unique[:, 1]], 0.0)
+            if use_normals:
+                vertex_normals = normals[unique[:, 2]]
+                missing = unique[:, 2] < 0
+                if missing.any():
+                    # Parts without vn get smooth normals from their own faces; supplied ones are kept
+                    vertex_normals[missing] = _vertex_normals(vertex_positions, faces)[missing]
+            mesh = MeshData(vertex_positions, faces, vertex_normals,
+                            vertex_texcoords.astype(np.float32) if vertex_texcoords is not None else None)
+
+        # Materials in order of first use; faces before any usemtl get the default
+        library = {}
+        for mtllib in self.mtllibs:
+            path = os.path.join(base_dir, mtllib)
+            if os.path.exists(path):
+                library.update(load_mtl(path))
+        if self.material_names:
+            used = np.unique(face_materials)
+            names = [None] + self.material_names
+            remap = np.zeros(len(names), dtype=np.int64)
+            remap[used + 1] = np.arange(len(used))
+            mesh.face_materials = remap[face_materials + 1]
+            mesh.materials = [{'name': names[i + 1] or 'default',
+                               'diffuse': library.get(names[i + 1], DEFAULT_DIFFUSE)} for i in used]
+
+        if self.group_names and len(face_groups):
+            group_faces = np.bincount(face_groups + 1, minlength=len(self.group_names) + 1)
+            mesh.groups = [{'name': name, 'faces': int(count)}
+                           for name, count in zip(['default'] + self.group_names, group_faces) if count]
+        return mesh
+
+
+def _vertex_normals(positions, faces):
+    """Area-weighted smooth vertex normals; vertices without faces get +Z"""
+    v1, v2, v3 = positions[faces[:, 0]], positions[faces[:, 1]], positions[faces[:, 2]]
+    face_normals = np.cross(v2 - v1, v3 - v1).astype(np.float64)
+    corner_vertices = faces.ravel()
+    sums = np.stack([np.bincount(corner_vertices, np.repeat(face_normals[:, axis], 3), minlength=len(positions))
+                     for axis in range(3)], axis=1)
+    lengths = np.linalg.norm(sums, axis=1, keepdims=True)
+    return np.where(lengths > 0, sums / np.maximum(lengths, 1e-30), [0.0, 0.0, 1.0]).astype(np.float32)
+
+
+def _concat(chunks, empty_shape, dtype):
+    return np.concatenate(chunks) if chunks else np.zeros(empty_shape, dtype=dtype)
+
+
+def load_obj(filename, chunk_size=CHUNK_SIZE, progress=None, cancelled=None):
+    """
+    Read an OBJ file (and the diffuse colors of its mtllib) into a MeshData.
+    progress(bytes_read, total_bytes) is called after every chunk; if
+    cancelled() returns True the load stops with LoadCancelled.
+    """
+    total = os.path.getsize(filename)
+    parser = ObjStreamParser()
+    bytes_read = 0
+    with open(filename, 'rb') as file:
+        while True:
+            if cancelled and cancelled():
+                raise LoadCancelled(filename)
+            chunk = file.read(chunk_size)
+            if not chunk:
+                break
+            bytes_read += len(chunk)
+            # Complete a multi-byte character split across the chunk boundary
+            while True:
+                try:
+                    text = chunk.decode('utf-8')
+                    break
+                except UnicodeDecodeError as e:
+                    if e.start < len(chunk) - 3:
+                        text = chunk.decode('utf-8', errors='replace')
+                        break
+                    extra = file.read(1)
+                    if not extra:
+                        text = chunk.decode('utf-8', errors='replace')
+                        break
+                    chunk += extra
+                    bytes_read += 1
+            parser.feed(text.replace('\r', ''))
+            if progress:
+                progress(bytes_read, total)
+    return parser.finish(os.path.dirname(os.path.abspath(filename)))
+
+
+# Binary STL: 80 byte header, uint32 triangle count, then 50 byte records
+STL_HEADER_SIZE = 84
+STL_RECORD = np.dtype([('normal', '<f4', (3,)), ('vertices', '<f4', (3, 3)), ('attribute', '<u2')])
+
+PLY_TYPES = {
+    'char': 'i1', 'int8': 'i1', 'uchar': 'u1', 'uint8': 'u1',
+    'short': 'i2', 'int16': 'i2', 'ushort': 'u2', 'uint16': 'u2',
+    'int': 'i4', 'int32': 'i4', 'uint': 'u4', 'uint32': 'u4',
+    'float': 'f4', 'float32': 'f4', 'double': 'f8', 'float64': 'f8'
+}
+
+
+def map_file(filename):
+    """Read-only memory map of a whole file (arrays viewing it keep it alive)"""
+    with open(filename, 'rb') as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            return b''
+        return mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+MAPPED_FORMATS = ('.stl', '.ply')
+
+
+def is_mapped_format(filename):
+    """True for the formats read by memory mapping (binary STL and PLY)"""
+    return os.path.splitext(filename)[1].lower() in MAPPED_FORMATS
+
+
+def facet_normals(triangles, supplied=None):
+    """
+    Unit normal per triangle ((m, 3, 3) corners): the supplied facet normals
+    where they have unit length, the geometric normal elsewhere (many
+    exporters write zeros); degenerate triangles get a zero normal
+    """
+    if supplied is not None:
+        usable = np.abs(np.linalg.norm(supplied, axis=1) - 1.0) < 1e-3
+        if usable.all():
+            return np.ascontiguousarray(supplied, dtype=np.float32)
+        normals = np.array(supplied, dtype=np.float32)
+        normals[~usable] = facet_normals(triangles[~usable])
+        return normals
+    normals = np.cross(triangles[:, 1] - triangles[:, 0], triangles[:, 2] - triangles[:, 0])
+    lengths = np.linalg.norm(normals, axis=1, keepdims=True)
+    return np.divide(normals, lengths, out=np.zeros_like(normals), where=lengths > 0)
+
+
+def load_stl(filename, progress=None, cancelled=None):
+    """
+    Read an STL file into a MeshData: an unwelded triangle soup whose vertex
+    normals are the facet normals (see facet_normals). Binary files are viewed
+    in place, ASCII files are parsed in bulk.
+    """
+    data = map_file(filename)
+    size = len(data)
+    count = int(np.frombuffer(data, '<u4', 1, 80)[0]) if size >= STL_HEADER_SIZE else -1
+    supplied = None
+    if STL_HEADER_SIZE + count * STL_RECORD.itemsize == size:
+        records = np.frombuffer(data, STL_RECORD, count, STL_HEADER_SIZE)
+        positions = records['vertices'].reshape(-1, 3)
+        supplied = records['normal']
+    else:
+        tokens = bytes(data).split()
+        vertex_at = np.flatnonzero(np.array(tokens, dtype=object) == b'vertex')
+        values = np.array([tokens[i + k] for i in vertex_at for k in (1, 2, 3)], dtype=np.float32)
+        positions = values.reshape(-1, 3)
+    if cancelled and cancelled():
+        raise LoadCancelled(filename)
+    if progress:
+        progress(size, size)
+    positions = np.ascontiguousarray(positions, dtype=np.float32)
+    normals = facet_normals(positions.reshape(-1, 3, 3), supplied)
+    return MeshData(positions, np.arange(len(positions), dtype=np.int64).reshape(-1, 3),
+                    np.repeat(normals, 3, axis=0))
+
+
+def parse_ply_header(data):
+    """(format, elements, header size) where elements are [name, count, properties]"""
+    end = data.find(b'end_header')
+    if not data[:3] == b'ply' or end < 0:
+        raise ValueError("Not a PLY file")
+    header_size = data.find(b'\n', end) + 1
+    lines = bytes(data[:header_size]).decode('ascii', errors='replace').splitlines()
+    file_format = None
+    elements = []
+    for line in lines:
+        parts = line.split()
+        if not parts:
+            continue
+        if parts[0] == 'format':
+            file_format = parts[1]
+        elif parts[0] == 'element':
+            elements.append([parts[1], int(parts[2]), []])
+        elif parts[0] == 'property' and elements:
+            if parts[1] == 'list':
+                elements[-1][2].append((parts[4], PLY_TYPES[parts[2]], PLY_TYPES[parts[3]]))
+            else:
+                elements[-1][2].append((parts[2], PLY_TYPES[parts[1]], None))
+    return file_format, elements, header_size
+
+
+def _ply_element(data, offset, count, properties, byte_order):
+    """View a PLY element as a structured array; returns (array, end offset)"""
+    lists = [prop for prop in properties if prop[2] is not None]
+    if not lists:
+        dtype = np.dtype([(name, byte_order + kind) for name, kind, _ in properties])
+        return np.frombuffer(data, dtype, count, offset), offset + count * dtype.itemsize
+
+    # List properties: assume every list has the length of the first one
+    # (all-triangle or all-quad meshes) and verify that assumption
+    probe = offset
+    fields = []
+    for name, kind, item_kind in properties:
+        if item_kind is None:
+            fields.append((name, byte_order + kind))
+            probe += np.dtype(kind).itemsize
+        else:
+            length = int(np.frombuffer(data, byte_order + kind, 1, probe)[0])
+            fields.append((name + '_count', byte_order + kind))
+            fields.append((name, byte_order + item_kind, (length,)))
+            probe += np.dtype(kind).itemsize + length * np.dtype(item_kind).itemsize
+    dtype = np.dtype(fields)
+    if offset + count * dtype.itemsize <= len(data):
+        array = np.frombuffer(data, dtype, count, offset)
+        if all((array[name + '_count'] == dtype[name].shape[0]).all() for name, _, item_kind in lists):
+            return array, offset + count * dtype.itemsize
+    raise ValueError("PLY faces with mixed vertex counts are not supported")
+
+
+def load_ply(filename, progress=None, cancelled=None):
+    """
+    Read a binary (little or big endian) PLY file into a MeshData. Vertex and
+    face elements are viewed in place; x/y/z, nx/ny/nz and s/t (or u/v)
+    vertex properties are used.
+    """
+    data = map_file(filename)
+    file_format, elements, offset = parse_ply_header(data)
+    if file_format not in ('binary_little_endian', 'binary_big_endian'):
+        raise ValueError(f"Unsupported PLY format '{file_format}' (binary only)")
+    byte_order = '<' if file_format == 'binary_little_endian' else '>'
+
+    vertices = faces = None
+    for name, count, properties in elements:
+        if cancelled and cancelled():
+            raise LoadCancelled(filename)
+        array, offset = _ply_element(data, offset, count, properties, byte_order)
+        if name == 'vertex':
+            vertices = array
+        elif name == 'face':
+            faces = array
+        if progress:
+            progress(offset, len(data))
+    if vertices is None:
+        raise ValueError("PLY file has no vertex element")
+
+    def columns(*names):
+        if all(name in vertices.dtype.names for name in names):
+            # A view (no copy) when the fields are adjacent float32s
+            return structured_to_unstructured(vertices[list(names)], dtype=np.float32)
+        return None
+
+    positions = columns('x', 'y', 'z')
+    if faces is not None:
+        index_field = 'vertex_indices' if 'vertex_indices' in faces.dtype.names else 'vertex_index'
+        polygons = faces[index_field]
+        if polygons.shape[1] == 3:
+            triangles = polygons
+        else:
+            triangles = fan_triangulate(polygons.ravel(), np.full(len(polygons), polygons.shape[1]))
+    else:
+        triangles = np.arange(len(positions) - len(positions) % 3, dtype=np.int64).reshape(-1, 3)
+    return MeshData(positions, triangles, columns('nx', 'ny', 'nz'),
+                    columns('s', 't') if columns('s', 't') is not None else columns('u', 'v'))
+
+
+def load_mesh(filename, progress=None, cancelled=None):
+    """Read an OBJ, STL or PLY file (by extension) into a MeshData"""
+    extension = os.path.splitext(filename)[1].lower()
+    if extension == '.stl':
+        return load_stl(filename, progress, cancelled)
+    if extension == '.ply':
+        return load_ply(filename, progress, cancelled)
+    return load_obj(filename, progress=progress, cancelled=cancelled)
@@ -0,0 +1,119 @@
+"""
+LRU cache of loaded models with a byte budget.
+
+Entries are keyed by file identity (absolute path, mtime, size, plus any
+import settings the caller folds in), so an edited file misses and is
+reloaded. Sizes are supplied by the caller and may grow after insertion
+(e.g. when levels of detail are added); eviction runs on every insert or
+resize until the cache fits its budget again.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+
+
+def file_key(path, *extra):
+    """Cache key for a file on disk, or None if it does not exist"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (os.path.abspath(path), stat.st_mtime_ns, stat.st_size) + extra
+
+
+class ModelCache:
+    """Byte-budgeted LRU map; on_evict(key, value) is called for every evicted entry"""
+
+    def __init__(self, budget_bytes, on_evict=None):
+        self.budget_bytes = budget_bytes
+        self.on_evict = on_evict
+        self.entries = OrderedDict()  # key -> (value, nbytes)
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        """Cached value (now most recently used) or None"""
+        with self.lock:
+            entry = self.entries.get(key) if key is not None else None
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value, nbytes):
+        """Insert or replace an entry; values larger than the whole budget are not kept"""
+        if key is None:
+            return
+        with self.lock:
+            self._remove(key)
+            if nbytes > self.budget_bytes:
+                return
+            self.entries[key] = (value, nbytes)
+            self.total_bytes += nbytes
+            evicted = self._shrink()
+        self._notify(evicted)
+
+    def resize(self, key, nbytes):
+        """Update the size of an entry that grew or shrank after insertion"""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return
+            self.total_bytes += nbytes - entry[1]
+            self.entries[key] = (entry[0], nbytes)
+            evicted = self._shrink()
+        self._notify(evicted)
+
+    def discard(self, key):
+        """Drop an entry without counting it as an eviction; returns its value"""
+        with self.lock:
+            entry = self._remove(key)
+        return entry[0] if entry else None
+
+    def contains(self, value):
+        with self.lock:
+            return any(entry[0] is value for entry in self.entries.values())
+
+    def set_budget(self, budget_bytes):
+        with self.lock:
+            self.budget_bytes = budget_bytes
+            evicted = self._shrink()
+        self._notify(evicted)
+
+    def stats(self):
+        with self.lock:
+            return {
+                'entries': len(self.entries),
+                'bytes': self.total_bytes,
+                'budget_bytes': self.budget_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions
+            }
+
+    def _remove(self, key):
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.total_bytes -= entry[1]
+        return entry
+
+    def _shrink(self):
+        evicted = []
+        while self.total_bytes > self.budget_bytes and self.entries:
+            key, (value, nbytes) = self.entries.popitem(last=False)
+            self.total_bytes -= nbytes
+            self.evictions += 1
+            evicted.append((key, value))
+        return evicted
+
+    def _notify(self, evicted):
+        # Outside the lock: the callback may take other locks
+        if self.on_evict:
+            for key, value in evicted:
+                self.on_evict(key, value)
@@ -0,0 +1,137 @@
+"""
+Per-pixel Phong shading for the 3D renderer.
+
+GLSL 1.20 program (runs on Mesa llvmpipe as well as desktop drivers) with
+the lights and material supplied as uniforms. Vertices still come through
+the compatibility built-ins (gl_Vertex, gl_ModelViewMatrix, ...), so the
+immediate-mode primitives, gluSphere and the VBO meshes all draw through it
+unchanged. The instanced variant takes an extra per-instance model matrix.
+"""
+
+import numpy as np
+from OpenGL.GL import (
+    GL_VERTEX_SHADER, GL_FRAGMENT_SHADER,
+    glUseProgram, glGetUniformLocation, glGetAttribLocation,
+    glUniform1f, glUniform3f, glUniform3fv, glUniform4fv
+)
+from OpenGL.GL import shaders
+
+LIGHT_COUNT = 3
+
+# Global ambient term of the fixed-function light model (GL default)
+SCENE_AMBIENT = (0.2, 0.2, 0.2)
+
+VERTEX_SHADER = """
+#version 120
+#ifdef INSTANCED
+attribute mat4 instance_matrix;
+#endif
+varying vec3 v_normal;
+varying vec3 v_position;
+void main() {
+#ifdef INSTANCED
+    vec4 position = instance_matrix * gl_Vertex;
+    vec3 normal = mat3(instance_matrix) * gl_Normal;
+#else
+    vec4 position = gl_Vertex;
+    vec3 normal = gl_Normal;
+#endif
+    vec4 eye = gl_ModelViewMatrix * position;
+    v_position = eye.xyz;
+    v_normal = gl_NormalMatrix * normal;
+    gl_Position = gl_ProjectionMatrix * eye;
+}
+"""
+
+FRAGMENT_SHADER = """
+#version 120
+const int LIGHT_COUNT = %d;
+uniform vec4 light_position[LIGHT_COUNT];
+uniform vec3 light_ambient[LIGHT_COUNT];
+uniform vec3 light_diffuse[LIGHT_COUNT];
+uniform vec3 light_specular[LIGHT_COUNT];
+uniform vec3 scene_ambient;
+uniform vec3 material_ambient;
+uniform vec3 material_diffuse;
+uniform vec3 material_specular;
+uniform float material_shininess;
+varying vec3 v_normal;
+varying vec3 v_position;
+void main() {
+    vec3 n = normalize(v_normal);
+    vec3 v = normalize(-v_position);
+    vec3 color = scene_ambient * material_ambient;
+    for (int i = 0; i < LIGHT_COUNT; i++) {
+        vec4 light = light_position[i];
+        vec3 l = normalize(light.w == 0.0 ? light.xyz : light.xyz - v_position);
+        float diffuse = max(dot(n, l), 0.0);
+        float specular = 0.0;
+        if (diffuse > 0.0 && material_shininess > 0.0) {
+            specular = pow(max(dot(n, normalize(l + v)), 0.0), material_shininess);
+        }
+        color += light_ambient[i] * material_ambient
+               + diffuse * light_diffuse[i] * material_diffuse
+               + specular * light_specular[i] * material_specular;
+    }
+    gl_FragColor = vec4(color, 1.0);
+}
+""" % LIGHT_COUNT
+
+
+def eye_space_lights(lights, view):
+    """
+    Uniform arrays for a list of lights ({'enabled', 'position', 'ambient',
+    'diffuse', 'specular'}, world space) under a view matrix. Disabled lights
+    get zero colors, like a disabled GL_LIGHTi.
+    """
+    positions = np.zeros((LIGHT_COUNT, 4), dtype=np.float32)
+    colors = {name: np.zeros((LIGHT_COUNT, 3), dtype=np.float32) for name in ('ambient', 'diffuse', 'specular')}
+    for i, light in enumerate(lights[:LIGHT_COUNT]):
+        positions[i] = view @ np.asarray(light['position'], dtype=np.float32)
+        if light['enabled']:
+            for name in colors:
+                colors[name][i] = light[name][:3]
+    return positions, colors
+
+
+class PhongProgram:
+    """Compiled Phong program; light uniforms are re-sent only when their key changes"""
+
+    def __init__(self, instanced=False):
+        vertex_source = VERTEX_SHADER
+        if instanced:
+            vertex_source = vertex_source.replace('#version 120', '#version 120\n#define INSTANCED', 1)
+        self.program = shaders.compileProgram(
+            shaders.compileShader(vertex_source, GL_VERTEX_SHADER),
+            shaders.compileShader(FRAGMENT_SHADER, GL_FRAGMENT_SHADER)
+        )
+        self.instance_attrib = glGetAttribLocation(self.program, 'instance_matrix') if instanced else -1
+        self.uniforms = {name: glGetUniformLocation(self.program, name) for name in (
+            'light_position', 'light_ambient', 'light_diffuse', 'light_specular', 'scene_ambient',
+            'material_ambient', 'material_diffuse', 'material_specular', 'material_shininess')}
+        self.lights_key = None
+        self.light_updates = 0
+
+    def use(self):
+        glUseProgram(self.program)
+
+    def update_lights(self, key, make_lights):
+        """Upload lights from make_lights() -> (positions, colors) if key differs (program in use)"""
+        if key == self.lights_key:
+            return False
+        positions, colors = make_lights()
+        glUniform4fv(self.uniforms['light_position'], LIGHT_COUNT, positions)
+        glUniform3fv(self.uniforms['light_ambient'], LIGHT_COUNT, colors['ambient'])
+        glUniform3fv(self.uniforms['light_diffuse'], LIGHT_COUNT, colors['diffuse'])
+        glUniform3fv(self.uniforms['light_specular'], LIGHT_COUNT, colors['specular'])
+        glUniform3f(self.uniforms['scene_ambient'], *SCENE_AMBIENT)
+        self.lights_key = key
+        self.light_updates += 1
+        return True
+
+    def set_material(self, ambient, diffuse, specular, shininess):
+        """Material uniforms (program in use)"""
+        glUniform3f(self.uniforms['material_ambient'], *ambient[:3])
+        glUniform3f(self.uniforms['material_diffuse'], *diffuse[:3])
+        glUniform3f(self.uniforms['material_specular'], *specular[:3])
+        glUniform1f(self.uniforms['material_shininess'], shininess)
@@ -0,0 +1,393 @@
+#!/usr/bin/env python3
+"""
+Headless multi-scene render service.
+
+Hosts many independent scenes (each identified by an ID) and renders them on a
+pool of worker processes. Every worker owns its own offscreen EGL context, so
+independent scenes render in parallel across cores. A scene is pinned to one
+worker (affinity) so that worker keeps the scene state and loaded meshes warm.
+
+Usage:
+    python render_service.py --workers 4 --port 5001
+"""
+
+import os
+import copy
+import uuid
+import time
+import queue
+import argparse
+import threading
+import multiprocessing
+from concurrent.futures import Future
+
+# The service never opens a window
+os.environ.setdefault('GRAFKOM_HEADLESS', '1')
+
+from flask import Flask, request, jsonify, Response
+
+from app import OpenGLRenderer, encode_png
+
+
+def default_scene_state():
+    """Scene state of a freshly started renderer"""
+    return OpenGLRenderer(headless=True).get_scene_state()
+
+
+def merge_scene_state(state, changes):
+    """Merge changes into a scene state (nested dicts are updated, not replaced)"""
+    for key, value in changes.items():
+        if isinstance(value, dict) and isinstance(state.get(key), dict):
+            state[key].update(value)
+        else:
+            state[key] = value
+    return state
+
+
+def _worker_main(worker_id, width, height, job_queue, result_queue):
+    """Worker process loop: one offscreen context, many scenes"""
+    renderer = OpenGLRenderer(headless=True)
+    renderer.window_width = width
+    renderer.window_height = height
+    if not renderer.init_opengl():
+        result_queue.put(('worker_failed', worker_id, False, 'OpenGL init failed', 0.0))
+        return
+
+    # Last state seen for each scene; parsed meshes stay warm in the renderer's model cache
+    scene_states = {}
+    active_scene = None
+
+    while True:
+        job = job_queue.get()
+        if job is None:
+            break
+
+        job_id, scene_id, state, output_format = job
+        if job_id == 'drop':
+            # The scene was deleted; its mesh stays in the model cache (bounded by its budget)
+            scene_states.pop(scene_id, None)
+            if active_scene == scene_id:
+                active_scene = None
+            continue
+        try:
+            if state is not None:
+                scene_states[scene_id] = state
+            elif scene_id not in scene_states:
+                raise KeyError(f"Scene state for {scene_id} was never sent to worker {worker_id}")
+
+            start = time.perf_counter()
+            if scene_id != active_scene or state is not None:
+                scene_state = scene_states[scene_id]
+                obj_file = scene_state.get('obj_file')
+                if obj_file and obj_file != renderer.obj_file:
+                    renderer.load_obj_file(obj_file)
+                renderer.apply_scene_state(scene_state)
+                renderer.setup_projection()
+                active_scene = scene_id
+
+            renderer.render()
+            pixels = renderer.read_pixels()
+            if output_format == 'png':
+                payload = encode_png(pixels, width, height)
+            else:
+                payload = bytes(pixels)
+            elapsed = time.perf_counter() - start
+            result_queue.put((job_id, worker_id, True, payload, elapsed))
+        except Exception as e:
+            result_queue.put((job_id, worker_id, False, f"{type(e).__name__}: {e}", 0.0))
+
+    renderer.offscreen.release()
+
+
+class RenderService:
+    """Scene registry plus a process pool that renders scenes on demand"""
+
+    def __init__(self, workers=None, width=800, height=600):
+        self.num_workers = workers or os.cpu_count() or 1
+        self.width = width
+        self.height = height
+
+        self.scenes = {}              # scene_id -> state dict
+        self.scene_versions = {}      # scene_id -> int, bumped on every update
+        self.affinity = {}            # scene_id -> worker index
+        self.sent_versions = {}       # scene_id -> version last shipped to its worker
+
+        self.lock = threading.Lock()
+        self.processes = []
+        self.job_queues = []
+        self.result_queue = None
+        self.pending = {}             # job_id -> (Future, worker index)
+        self.queue_depth = []
+        self.alive = []               # worker index -> False once it failed or exited
+        self.collector = None
+        self.running = False
+
+        self.frames_rendered = 0
+        self.frames_failed = 0
+        self.render_seconds = 0.0
+
+    def start(self):
+        """Spawn the worker processes"""
+        # spawn (not fork): each worker must create its own GL context from scratch
+        ctx = multiprocessing.get_context('spawn')
+        self.result_queue = ctx.Queue()
+        for worker_id in range(self.num_workers):
+            job_queue = ctx.Queue()
+            process = ctx.Process(
+                target=_worker_main,
+                args=(worker_id, self.width, self.height, job_queue, self.result_queue),
+                daemon=True
+            )
+            process.start()
+            self.processes.append(process)
+            self.job_queues.append(job_queue)
+            self.queue_depth.append(0)
+            self.alive.append(True)
+
+        self.running = True
+        self.collector = threading.Thread(target=self._collect_results, daemon=True)
+        self.collector.start()
+        print(f"✅ Render service started with {self.num_workers} worker(s)")
+
+    def stop(self):
+        """Stop all workers and fail any job still in flight"""
+        self.running = False
+        for job_queue in self.job_queues:
+            job_queue.put(None)
+        for process in self.processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        self.result_queue.put(None)
+        if self.collector:
+            self.collector.join(timeout=1)
+        with self.lock:
+            for future, _ in self.pending.values():
+                future.set_exception(RuntimeError("Render service stopped"))
+            self.pending.clear()
+
+    def _collect_results(self):
+        """Resolve job futures as workers report back, and notice workers that died"""
+        while self.running:
+            try:
+                result = self.result_queue.get(timeout=0.5)
+            except queue.Empty:
+                for worker_index, process in enumerate(self.processes):
+                    if self.alive[worker_index] and not process.is_alive() and self.running:
+                        self._worker_died(worker_index, f"process exited with code {process.exitcode}")
+                continue
+            if result is None:
+                break
+            job_id, worker_id, ok, payload, elapsed = result
+            if job_id == 'worker_failed':
+                self._worker_died(worker_id, payload)
+                continue
+
+            with self.lock:
+                future, worker_index = self.pending.pop(job_id, (None, None))
+                if worker_index is not None:
+                    self.queue_depth[worker_index] -= 1
+                if ok:
+                    self.frames_rendered += 1
+                    self.render_seconds += elapsed
+                else:
+                    self.frames_failed += 1
+
+            if future is None:
+                continue
+            if ok:
+                future.set_result(payload)
+            else:
+                future.set_exception(RuntimeError(payload))
+
+    def _worker_died(self, worker_index, reason):
+        """Fail the jobs of a dead worker and re-pin its scenes to the live ones"""
+        with self.lock:
+            if not self.alive[worker_index]:
+                return
+            self.alive[worker_index] = False
+            failed = [job_id for job_id, (_, index) in self.pending.items() if index == worker_index]
+            futures = [self.pending.pop(job_id)[0] for job_id in failed]
+            self.frames_failed += len(futures)
+            self.queue_depth[worker_index] = 0
+            # The next worker has never seen these scenes: drop the pin and resend the state
+            orphaned = [scene_id for scene_id, index in self.affinity.items() if index == worker_index]
+            for scene_id in orphaned:
+                del self.affinity[scene_id]
+                self.sent_versions.pop(scene_id, None)
+        print(f"❌ Render worker {worker_index} failed: {reason} "
+              f"({len(futures)} job(s) failed, {len(orphaned)} scene(s) moved)")
+        for future in futures:
+            future.set_exception(RuntimeError(f"Render worker {worker_index} failed: {reason}"))
+
+    def _assign_worker(self, scene_id):
+        """Pin a scene to the live worker with the fewest scenes (then shortest queue)"""
+        if scene_id not in self.affinity:
+            live = [i for i in range(self.num_workers) if self.alive[i]]
+            if not live:
+                raise RuntimeError("No live render workers")
+            scene_counts = [0] * self.num_workers
+            for worker_index in self.affinity.values():
+                scene_counts[worker_index] += 1
+            self.affinity[scene_id] = min(live, key=lambda i: (scene_counts[i], self.queue_depth[i]))
+        return self.affinity[scene_id]
+
+    # --- Scene registry ---
+    def create_scene(self, scene_id=None, state=None):
+        """Register a new scene and return its ID"""
+        scene_id = scene_id or uuid.uuid4().hex[:8]
+        scene_state = default_scene_state()
+        if state:
+            merge_scene_state(scene_state, state)
+        with self.lock:
+            if scene_id in self.scenes:
+                raise KeyError(f"Scene {scene_id} already exists")
+            self.scenes[scene_id] = scene_state
+            self.scene_versions[scene_id] = 0
+            if any(self.alive):
+                self._assign_worker(scene_id)
+        return scene_id
+
+    def update_scene(self, scene_id, changes):
+        """Update part of a scene's state"""
+        with self.lock:
+            merge_scene_state(self.scenes[scene_id], changes)
+            self.scene_versions[scene_id] += 1
+            return copy.deepcopy(self.scenes[scene_id])
+
+    def delete_scene(self, scene_id):
+        """Forget a scene and tell its worker to drop its copy of the state"""
+        with self.lock:
+            del self.scenes[scene_id]
+            del self.scene_versions[scene_id]
+            worker_index = self.affinity.pop(scene_id, None)
+            shipped = self.sent_versions.pop(scene_id, None) is not None
+        if worker_index is not None and shipped and self.alive[worker_index]:
+            self.job_queues[worker_index].put(('drop', scene_id, None, None))
+
+    def get_scene(self, scene_id):
+        with self.lock:
+            return copy.deepcopy(self.scenes[scene_id])
+
+    def list_scenes(self):
+        with self.lock:
+            return {scene_id: self.affinity.get(scene_id) for scene_id in self.scenes}
+
+    # --- Jobs ---
+    def submit(self, scene_id, output_format='png'):
+        """Queue a render job; returns a Future resolving to PNG (or raw RGB) bytes"""
+        future = Future()
+        job_id = uuid.uuid4().hex
+        with self.lock:
+            if scene_id not in self.scenes:
+                raise KeyError(f"Unknown scene {scene_id}")
+            worker_index = self._assign_worker(scene_id)
+
+            # Only ship the state when the worker's copy is stale
+            version = self.scene_versions[scene_id]
+            state = None
+            if self.sent_versions.get(scene_id) != version:
+                # Deep copy: the queue pickles the job later, outside the lock, while updates go on
+                state = copy.deepcopy(self.scenes[scene_id])
+                self.sent_versions[scene_id] = version
+
+            self.pending[job_id] = (future, worker_index)
+            self.queue_depth[worker_index] += 1
+
+        self.job_queues[worker_index].put((job_id, scene_id, state, output_format))
+        return future
+
+    def render(self, scene_id, output_format='png', timeout=30):
+        """Render a scene and wait for the result"""
+        return self.submit(scene_id, output_format).result(timeout=timeout)
+
+    def stats(self):
+        with self.lock:
+            return {
+                'workers': self.num_workers,
+                'workers_alive': sum(self.alive),
+                'scenes': len(self.scenes),
+                'queue_depth': list(self.queue_depth),
+                'frames_rendered': self.frames_rendered,
+                'frames_failed': self.frames_failed,
+                'avg_render_ms': (self.render_seconds / self.frames_rendered * 1000.0
+                                  if self.frames_rendered else 0.0)
+            }
+
+
+def create_service_app(service):
+    """Flask app exposing the scene registry and render jobs over HTTP"""
+    service_app = Flask(__name__)
+
+    @service_app.route('/api/scenes', methods=['GET'])
+    def list_scenes():
+        return jsonify({'status': 'success', 'scenes': service.list_scenes()})
+
+    @service_app.route('/api/scenes', methods=['POST'])
+    def create_scene():
+        data = request.get_json(silent=True) or {}
+        try:
+            scene_id = service.create_scene(data.get('scene_id'), data.get('state'))
+        except KeyError as e:
+            return jsonify({'status': 'error', 'message': str(e)}), 409
+        return jsonify({'status': 'success', 'scene_id': scene_id}), 201
+
+    @service_app.route('/api/scenes/<scene_id>', methods=['GET'])
+    def get_scene(scene_id):
+        try:
+            return jsonify({'status': 'success', 'state': service.get_scene(scene_id)})
+        except KeyError:
+            return jsonify({'status': 'error', 'message': f"Unknown scene {scene_id}"}), 404
+
+    @service_app.route('/api/scenes/<scene_id>', methods=['PATCH'])
+    def update_scene(scene_id):
+        data = request.get_json(silent=True) or {}
+        try:
+            state = service.update_scene(scene_id, data)
+        except KeyError:
+            return jsonify({'status': 'error', 'message': f"Unknown scene {scene_id}"}), 404
+        return jsonify({'status': 'success', 'state': state})
+
+    @service_app.route('/api/scenes/<scene_id>', methods=['DELETE'])
+    def delete_scene(scene_id):
+        try:
+            service.delete_scene(scene_id)
+        except KeyError:
+            return jsonify({'status': 'error', 'message': f"Unknown scene {scene_id}"}), 404
+        return jsonify({'status': 'success'})
+
+    @service_app.route('/api/scenes/<scene_id>/render', methods=['GET'])
+    def render_scene(scene_id):
+        output_format = request.args.get('format', 'png')
+        try:
+            payload = service.render(scene_id, output_format)
+        except KeyError:
+            return jsonify({'status': 'error', 'message': f"Unknown scene {scene_id}"}), 404
+        except Exception as e:
+            return jsonify({'status': 'error', 'message': str(e)}), 500
+        mimetype = 'image/png' if output_format == 'png' else 'application/octet-stream'
+        return Response(payload, mimetype=mimetype)
+
+    @service_app.route('/api/service/stats', methods=['GET'])
+    def service_stats():
+        return jsonify({'status': 'success', 'stats': service.stats()})
+
+    return service_app
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Headless multi-scene render service")
+    parser.add_argument('--workers', type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument('--width', type=int, default=800)
+    parser.add_argument('--height', type=int, default=600)
+    parser.add_argument('--port', type=int, default=5001)
+    args = parser.parse_args()
+
+    service = RenderService(args.workers, args.width, args.height)
+    service.start()
+    try:
+        create_service_app(service).run(host='0.0.0.0', port=args.port, debug=False, use_reloader=False)
+    except KeyboardInterrupt:
+        print("\n👋 Render service stopped by user")
+    finally:
+        service.stop()
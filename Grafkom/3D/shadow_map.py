@@ -0,0 +1,190 @@
+"""
+Shadow mapping of the current object onto the ground plane.
+
+The depth pass renders the shadow casters from the directional light into a
+depth texture through an orthographic projection fitted to their bounding
+sphere. It is cached: ShadowMap.render() only re-renders when the caller's
+key (light, object transform, rotation angle, ...) changes, so a static scene
+pays for it once. The ground is then drawn with a small GLSL 1.20 program
+that looks the texture up through the light matrix (3x3 PCF on top of the
+hardware depth comparison).
+"""
+
+import numpy as np
+from OpenGL.GL import (
+    GL_TEXTURE_2D, GL_DEPTH_COMPONENT, GL_DEPTH_COMPONENT24, GL_FLOAT, GL_NONE,
+    GL_TEXTURE_MIN_FILTER, GL_TEXTURE_MAG_FILTER, GL_LINEAR,
+    GL_TEXTURE_WRAP_S, GL_TEXTURE_WRAP_T, GL_CLAMP_TO_BORDER, GL_TEXTURE_BORDER_COLOR,
+    GL_TEXTURE_COMPARE_MODE, GL_TEXTURE_COMPARE_FUNC, GL_COMPARE_REF_TO_TEXTURE, GL_LEQUAL,
+    GL_FRAMEBUFFER, GL_DEPTH_ATTACHMENT, GL_FRAMEBUFFER_COMPLETE, GL_DEPTH_BUFFER_BIT,
+    GL_FRAMEBUFFER_BINDING, GL_VIEWPORT, GL_PROJECTION, GL_MODELVIEW, GL_TEXTURE0,
+    GL_VERTEX_SHADER, GL_FRAGMENT_SHADER,
+    glGenTextures, glBindTexture, glTexImage2D, glTexParameteri, glTexParameterfv, glDeleteTextures,
+    glGenFramebuffers, glBindFramebuffer, glFramebufferTexture2D, glCheckFramebufferStatus,
+    glDeleteFramebuffers, glDrawBuffer, glReadBuffer, glViewport, glGetIntegerv, glClear,
+    glMatrixMode, glPushMatrix, glPopMatrix, glLoadMatrixf, glLoadIdentity, glActiveTexture,
+    glDeleteProgram, glGetUniformLocation, glUniform1i, glUniform1f, glUniform3f, glUniformMatrix4fv
+)
+from OpenGL.GL import shaders
+
+import matrices
+
+DEFAULT_RESOLUTION = 1024
+RESOLUTIONS = (256, 512, 1024, 2048, 4096)
+
+# Light-space clip coordinates [-1, 1] -> texture coordinates / depth [0, 1]
+BIAS_MATRIX = np.array([
+    [0.5, 0.0, 0.0, 0.5],
+    [0.0, 0.5, 0.0, 0.5],
+    [0.0, 0.0, 0.5, 0.5],
+    [0.0, 0.0, 0.0, 1.0]
+], dtype=np.float32)
+
+RECEIVER_VERTEX_SHADER = """
+#version 120
+uniform mat4 shadow_matrix;
+varying vec4 v_shadow;
+void main() {
+    v_shadow = shadow_matrix * gl_Vertex;
+    gl_Position = gl_ModelViewProjectionMatrix * gl_Vertex;
+}
+"""
+
+RECEIVER_FRAGMENT_SHADER = """
+#version 120
+uniform sampler2DShadow shadow_map;
+uniform float texel_size;
+uniform float shadow_strength;
+uniform vec3 color;
+varying vec4 v_shadow;
+void main() {
+    vec3 coord = v_shadow.xyz / v_shadow.w;
+    // Receivers beyond the light's far plane still compare against the casters
+    coord.z = min(coord.z, 1.0);
+    float lit = 0.0;
+    for (int x = -1; x <= 1; x++) {
+        for (int y = -1; y <= 1; y++) {
+            lit += shadow2D(shadow_map, coord + vec3(x, y, 0.0) * texel_size).r;
+        }
+    }
+    lit /= 9.0;
+    gl_FragColor = vec4(color * mix(1.0 - shadow_strength, 1.0, lit), 1.0);
+}
+"""
+
+
+def light_matrix(direction, center, radius, depth=50.0):
+    """
+    Orthographic light projection @ view for a directional light (direction
+    points towards the light) that encloses a sphere; the depth range extends
+    `depth` units past it so receivers behind the casters are covered.
+    """
+    direction = np.asarray(direction[:3], dtype=np.float64)
+    direction /= np.linalg.norm(direction)
+    center = np.asarray(center, dtype=np.float64)
+    radius = max(float(radius), 1e-3)
+    # Any up vector not parallel to the light direction
+    up = (0.0, 0.0, 1.0) if abs(direction[1]) > 0.99 else (0.0, 1.0, 0.0)
+    eye = center + direction * (radius * 2.0)
+    view = matrices.look_at_matrix(eye, center, up)
+    projection = matrices.ortho_matrix(-radius, radius, -radius, radius, radius, radius * 3.0 + depth)
+    return projection @ view
+
+
+class ShadowMap:
+    """Depth texture + framebuffer for one directional light"""
+
+    def __init__(self, resolution=DEFAULT_RESOLUTION):
+        self.resolution = resolution
+        self.texture = glGenTextures(1)
+        self.framebuffer = glGenFramebuffers(1)
+        self.matrix = np.identity(4, dtype=np.float32)
+        self.key = None
+        self.depth_passes = 0
+        self.allocate()
+
+        self.program = shaders.compileProgram(
+            shaders.compileShader(RECEIVER_VERTEX_SHADER, GL_VERTEX_SHADER),
+            shaders.compileShader(RECEIVER_FRAGMENT_SHADER, GL_FRAGMENT_SHADER)
+        )
+        self.uniforms = {name: glGetUniformLocation(self.program, name) for name in (
+            'shadow_matrix', 'shadow_map', 'texel_size', 'shadow_strength', 'color')}
+
+    def allocate(self):
+        """(Re)create the depth texture at the current resolution"""
+        glBindTexture(GL_TEXTURE_2D, self.texture)
+        glTexImage2D(GL_TEXTURE_2D, 0, GL_DEPTH_COMPONENT24, self.resolution, self.resolution, 0,
+                     GL_DEPTH_COMPONENT, GL_FLOAT, None)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
+        # Outside the light frustum every lookup is lit
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_S, GL_CLAMP_TO_BORDER)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_T, GL_CLAMP_TO_BORDER)
+        glTexParameterfv(GL_TEXTURE_2D, GL_TEXTURE_BORDER_COLOR, [1.0, 1.0, 1.0, 1.0])
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_COMPARE_MODE, GL_COMPARE_REF_TO_TEXTURE)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_COMPARE_FUNC, GL_LEQUAL)
+        glBindTexture(GL_TEXTURE_2D, 0)
+
+        glBindFramebuffer(GL_FRAMEBUFFER, self.framebuffer)
+        glFramebufferTexture2D(GL_FRAMEBUFFER, GL_DEPTH_ATTACHMENT, GL_TEXTURE_2D, self.texture, 0)
+        glDrawBuffer(GL_NONE)
+        glReadBuffer(GL_NONE)
+        status = glCheckFramebufferStatus(GL_FRAMEBUFFER)
+        glBindFramebuffer(GL_FRAMEBUFFER, 0)
+        if status != GL_FRAMEBUFFER_COMPLETE:
+            raise RuntimeError(f"shadow framebuffer incomplete (0x{status:x})")
+        self.key = None
+
+    def set_resolution(self, resolution):
+        if resolution != self.resolution:
+            self.resolution = resolution
+            self.allocate()
+
+    def render(self, key, matrix, draw_casters):
+        """
+        Depth pass with draw_casters() under the light matrix, skipped when key
+        is unchanged since the last pass. Returns True if it rendered.
+        """
+        if key == self.key:
+            return False
+        viewport = glGetIntegerv(GL_VIEWPORT)
+        previous = int(glGetIntegerv(GL_FRAMEBUFFER_BINDING))
+        glBindFramebuffer(GL_FRAMEBUFFER, self.framebuffer)
+        glViewport(0, 0, self.resolution, self.resolution)
+        glClear(GL_DEPTH_BUFFER_BIT)
+
+        glMatrixMode(GL_PROJECTION)
+        glPushMatrix()
+        glLoadMatrixf(matrices.to_gl(matrix))
+        glMatrixMode(GL_MODELVIEW)
+        glPushMatrix()
+        glLoadIdentity()
+        try:
+            draw_casters()
+        finally:
+            glPopMatrix()
+            glMatrixMode(GL_PROJECTION)
+            glPopMatrix()
+            glMatrixMode(GL_MODELVIEW)
+            glBindFramebuffer(GL_FRAMEBUFFER, previous)
+            glViewport(*viewport)
+
+        self.matrix = BIAS_MATRIX @ matrix
+        self.key = key
+        self.depth_passes += 1
+        return True
+
+    def bind_receiver(self, color, strength=0.6):
+        """Receiver uniforms and depth texture (unit 0), for world-space geometry (program in use)"""
+        glActiveTexture(GL_TEXTURE0)
+        glBindTexture(GL_TEXTURE_2D, self.texture)
+        glUniform1i(self.uniforms['shadow_map'], 0)
+        glUniformMatrix4fv(self.uniforms['shadow_matrix'], 1, False, matrices.to_gl(self.matrix))
+        glUniform1f(self.uniforms['texel_size'], 1.0 / self.resolution)
+        glUniform1f(self.uniforms['shadow_strength'], strength)
+        glUniform3f(self.uniforms['color'], *color[:3])
+
+    def release(self):
+        glDeleteFramebuffers(1, [self.framebuffer])
+        glDeleteTextures([self.texture])
+        glDeleteProgram(self.program)
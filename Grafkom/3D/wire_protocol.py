@@ -0,0 +1,151 @@
+"""
+Compact binary payloads for the 3D SocketIO events.
+
+The wire format is chosen per connection (the 'negotiate_protocol' event).
+This is for scripted clients driving the camera/transform at high rates; the
+browser page (3d.html) renders with Three.js itself, never sends those
+events and stays on JSON.
+
+  json     plain dicts, as before; always accepted, also from negotiated clients
+  struct   update_camera / update_transform packed with a fixed schema,
+           everything else still as dicts
+  msgpack  like struct, everything else MessagePack (needs the optional
+           msgpack package; only offered when it is installed)
+
+A binary payload is one tag byte followed by the body:
+
+  TAG_SCHEMA   schema id (uint8), field mask (uint16), one float32 per field
+               present in the mask, in schema order (partial updates from a
+               single slider only carry that field)
+  TAG_MSGPACK  MessagePack body
+  TAG_JSON     UTF-8 JSON body
+
+A binary payload is only sent when it is smaller on the wire than the JSON
+dict, counting the Socket.IO attachment overhead: a single-slider update is
+cheaper as JSON and goes out as a dict.
+"""
+
+import json
+import struct
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+TAG_SCHEMA = 0x01
+TAG_MSGPACK = 0x02
+TAG_JSON = 0x03
+
+# Server preference order
+FORMATS = ('msgpack', 'struct', 'json')
+
+# event -> (schema id, fields); ids and field order are part of the protocol
+SCHEMAS = {
+    'update_camera': (1, ('eye_x', 'eye_y', 'eye_z', 'center_x', 'center_y', 'center_z',
+                          'up_x', 'up_y', 'up_z')),
+    'update_transform': (2, ('rot_x', 'rot_y', 'rot_z', 'scale', 'pos_x', 'pos_y', 'pos_z')),
+}
+SCHEMA_EVENTS = {schema_id: event for event, (schema_id, _) in SCHEMAS.items()}
+
+HEADER = struct.Struct('<BBH')
+_FLOATS = [struct.Struct('<%df' % count) for count in range(17)]
+
+# Extra bytes of a Socket.IO event carrying a binary attachment instead of
+# the dict inline: the '{"_placeholder":true,"num":0}' stand-in and the
+# longer packet header (the attachment also travels as a second frame)
+ATTACHMENT_OVERHEAD = 31
+
+
+def available_formats():
+    return [fmt for fmt in FORMATS if fmt != 'msgpack' or msgpack is not None]
+
+
+def negotiate(offered):
+    """Best format both sides support (server preference), 'json' if none"""
+    offered = set(offered or ())
+    for fmt in available_formats():
+        if fmt in offered:
+            return fmt
+    return 'json'
+
+
+def pack_schema(event, data):
+    """Fixed-schema payload of a camera/transform update, None if data doesn't fit the schema"""
+    schema_id, fields = SCHEMAS[event]
+    mask = 0
+    values = []
+    for bit, field in enumerate(fields):
+        if field in data:
+            value = data[field]
+            if not isinstance(value, (int, float)):
+                return None
+            mask |= 1 << bit
+            values.append(value)
+    if len(values) != len(data):
+        return None
+    return HEADER.pack(TAG_SCHEMA, schema_id, mask) + _FLOATS[len(values)].pack(*values)
+
+
+def unpack_schema(payload):
+    """(event, data) of a fixed-schema payload"""
+    _, schema_id, mask = HEADER.unpack_from(payload)
+    event = SCHEMA_EVENTS.get(schema_id)
+    if event is None:
+        raise ValueError(f"unknown schema id {schema_id}")
+    fields = [field for bit, field in enumerate(SCHEMAS[event][1]) if mask & (1 << bit)]
+    values = _FLOATS[len(fields)].unpack_from(payload, HEADER.size)
+    return event, dict(zip(fields, values))
+
+
+def json_size(data):
+    """Bytes of data as Socket.IO serializes it inline"""
+    try:
+        return len(json.dumps(data, separators=(',', ':')).encode('utf-8'))
+    except (TypeError, ValueError):
+        return None
+
+
+def encode(event, data, fmt):
+    """
+    Payload of event for a connection using fmt: a dict where that format
+    sends JSON or where the binary form would not be smaller on the wire
+    """
+    if fmt == 'json' or not isinstance(data, dict):
+        return data
+    payload = None
+    if event in SCHEMAS:
+        payload = pack_schema(event, data)
+    if payload is None and fmt == 'msgpack' and msgpack is not None:
+        payload = bytes([TAG_MSGPACK]) + msgpack.packb(data, use_bin_type=True)
+    if payload is None:
+        return data
+    size = json_size(data)
+    if size is not None and len(payload) + ATTACHMENT_OVERHEAD >= size:
+        return data
+    return payload
+
+
+def decode(payload, event=None):
+    """
+    Dict of a received payload; JSON dicts (and None) pass through unchanged.
+    With event, a fixed-schema payload must carry that event's schema.
+    """
+    if not isinstance(payload, (bytes, bytearray, memoryview)):
+        return payload
+    payload = bytes(payload)
+    if not payload:
+        raise ValueError("empty payload")
+    tag = payload[0]
+    if tag == TAG_SCHEMA:
+        schema_event, data = unpack_schema(payload)
+        if event is not None and schema_event != event:
+            raise ValueError(f"{schema_event} payload sent as {event}")
+        return data
+    if tag == TAG_MSGPACK:
+        if msgpack is None:
+            raise ValueError("msgpack payload but msgpack is not installed")
+        return msgpack.unpackb(payload[1:], raw=False)
+    if tag == TAG_JSON:
+        return json.loads(payload[1:].decode('utf-8'))
+    raise ValueError(f"unknown payload tag 0x{tag:02x}")
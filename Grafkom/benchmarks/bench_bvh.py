@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+BVH picking cost: build time, single-ray pick latency and batched rays/sec,
+against a brute-force test of every triangle (vectorized over the faces,
+one ray at a time) for reference.
+
+Usage:
+    python bench_bvh.py --triangles 1000000
+    python bench_bvh.py --triangles 100000 1000000 --rays 20000 --json
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '3D'))
+
+import bvh
+from synthetic import torus_for_triangles
+
+
+def random_rays(count, seed=0):
+    """Rays from a shell around the torus aimed roughly at its center (about half of them hit)"""
+    rng = np.random.default_rng(seed)
+    origins = rng.normal(size=(count, 3))
+    origins *= 4.0 / np.linalg.norm(origins, axis=1, keepdims=True)
+    directions = -origins + rng.normal(scale=0.8, size=(count, 3))
+    directions /= np.linalg.norm(directions, axis=1, keepdims=True)
+    return origins.astype(np.float32), directions.astype(np.float32)
+
+
+def brute_force(vertices, faces, origin, direction):
+    """Closest hit of one ray against every triangle"""
+    v0 = vertices[faces[:, 0]]
+    e1 = vertices[faces[:, 1]] - v0
+    e2 = vertices[faces[:, 2]] - v0
+    p = np.cross(direction, e2)
+    det = (e1 * p).sum(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        s = origin - v0
+        u = (s * p).sum(axis=1) / det
+        q = np.cross(s, e1)
+        v = (q @ direction) / det
+        t = (e2 * q).sum(axis=1) / det
+    valid = (np.abs(det) > 1e-12) & (u >= 0) & (v >= 0) & (u + v <= 1) & (t > 0)
+    return t[valid].min() if valid.any() else np.inf
+
+
+def bench(triangles, rays, brute_rays):
+    vertices, faces = torus_for_triangles(triangles)
+    faces = np.asarray(faces).reshape(-1, 3)
+
+    start = time.perf_counter()
+    tree = bvh.BVH(vertices, faces)
+    build_seconds = time.perf_counter() - start
+
+    origins, directions = random_rays(rays)
+    start = time.perf_counter()
+    t, _ = tree.intersect(origins, directions)
+    batch_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for i in range(brute_rays):
+        tree.intersect(origins[i], directions[i])
+    pick_seconds = (time.perf_counter() - start) / brute_rays
+
+    start = time.perf_counter()
+    for i in range(brute_rays):
+        expected = brute_force(vertices, faces, origins[i], directions[i])
+        if not (np.isclose(expected, t[i], rtol=1e-4) or (np.isinf(expected) and np.isinf(t[i]))):
+            raise AssertionError(f"ray {i}: BVH t={t[i]} brute force t={expected}")
+    brute_seconds = (time.perf_counter() - start) / brute_rays
+
+    return {
+        'triangles': len(faces),
+        'nodes': tree.node_count,
+        'depth': tree.depth,
+        'bvh_megabytes': tree.nbytes / 1e6,
+        'build_seconds': build_seconds,
+        'rays': rays,
+        'hit_ratio': float(np.isfinite(t).mean()),
+        'rays_per_second': rays / batch_seconds,
+        'pick_ms': pick_seconds * 1000.0,
+        'brute_force_ms': brute_seconds * 1000.0
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--triangles', type=int, nargs='+', default=[1000000])
+    parser.add_argument('--rays', type=int, default=10000, help="rays traced as one batch")
+    parser.add_argument('--brute-rays', type=int, default=20,
+                        help="rays timed one at a time (pick latency) and checked against brute force")
+    parser.add_argument('--json', action='store_true', help="print results as JSON")
+    args = parser.parse_args()
+
+    results = []
+    for triangles in args.triangles:
+        result = bench(triangles, args.rays, args.brute_rays)
+        results.append(result)
+        if not args.json:
+            print(f"{result['triangles']:>9} tris  build {result['build_seconds']:6.3f}s "
+                  f"({result['nodes']} nodes, depth {result['depth']}, {result['bvh_megabytes']:.1f} MB)  "
+                  f"{result['rays_per_second']:9.0f} rays/s batched  pick {result['pick_ms']:6.2f} ms  "
+                  f"brute force {result['brute_force_ms']:7.2f} ms/ray")
+
+    if args.json:
+        print(json.dumps(results, indent=2))
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Cost of clipping the 2D scene against several convex clip regions.
+
+scene_geometry.build_geometry() turns the whole scene (synthetic.scene_2d plus
+a few polygon/polyline outlines from synthetic.shapes_2d) into vertex arrays
+once per region count in --regions. Each region is a regular polygon with
+--sides corners (synthetic.clip_regions_2d; 4 gives rotated squares). Points
+are tested, lines / polyline segments / ellipse outlines are clipped with
+Cyrus-Beck, and triangles / rectangles / polygon triangles with
+Sutherland-Hodgman, all as NumPy arrays; objects whose bounding box misses a
+region's bounding box are rejected before any of that.
+
+Reported per region count: median build time, the objects that passed the
+bounding box test (summed over regions, against objects x regions), and the
+vertices produced. The unclipped build is the reference. No window or GL
+context is needed.
+
+Usage:
+    python bench_clipping.py
+    python bench_clipping.py --objects 200000 --regions 1 4 16 64 --sides 8
+    python bench_clipping.py --json
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+
+import numpy as np
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..', '2D'))
+
+from scene_geometry import SceneArrays, ClipRegion, build_geometry, bounds_overlap
+from synthetic import scene_2d, shapes_2d, clip_regions_2d
+
+
+def build_ms(rows, clipping, regions, runs):
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        geometry = build_geometry(rows, clipping, regions)
+        times.append((time.perf_counter() - start) * 1000.0)
+    return float(np.median(times)), len(geometry.vertices)
+
+
+def run(objects, shapes, vertices, region_counts, sides, runs):
+    arrays = SceneArrays()
+    arrays.sync(scene_2d(objects) + shapes_2d(shapes, vertices))
+    rows = arrays.rows()
+    count = len(rows['kind'])
+    unclipped_ms, unclipped_vertices = build_ms(rows, False, [], runs)
+    results = []
+    for region_count in region_counts:
+        regions = [ClipRegion(points) for points in clip_regions_2d(region_count, sides)]
+        candidates = sum(int(bounds_overlap(rows['bounds'], region).sum()) for region in regions)
+        clipped_ms, clipped_vertices = build_ms(rows, True, regions, runs)
+        results.append({
+            'regions': region_count,
+            'build_ms': clipped_ms,
+            'candidates': candidates,
+            'rejected': 1.0 - candidates / (count * region_count),
+            'vertices': clipped_vertices
+        })
+    return count, unclipped_ms, unclipped_vertices, results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--objects', type=int, default=100000, help="small objects (synthetic.scene_2d)")
+    parser.add_argument('--shapes', type=int, default=10, help="polygon/polyline outlines (synthetic.shapes_2d)")
+    parser.add_argument('--vertices', type=int, default=2000, help="vertices per outline")
+    parser.add_argument('--regions', type=int, nargs='+', default=[1, 2, 4, 8, 16], help="clip region counts")
+    parser.add_argument('--sides', type=int, default=6, help="corners per clip region")
+    parser.add_argument('--runs', type=int, default=3, help="builds timed per region count")
+    parser.add_argument('--json', action='store_true', help="print results as JSON")
+    args = parser.parse_args()
+
+    count, unclipped_ms, unclipped_vertices, results = run(args.objects, args.shapes, args.vertices,
+                                                           args.regions, args.sides, args.runs)
+    if args.json:
+        print(json.dumps({'objects': count, 'sides': args.sides, 'unclipped_ms': unclipped_ms,
+                          'unclipped_vertices': unclipped_vertices, 'results': results}, indent=2))
+        sys.exit(0)
+    print(f"{count} objects, regions with {args.sides} sides; unclipped build {unclipped_ms:.1f} ms, "
+          f"{unclipped_vertices} vertices")
+    for row in results:
+        print(f"{row['regions']:4d} regions  {row['build_ms']:8.1f} ms  {row['candidates']:8d} objects clipped "
+              f"({row['rejected'] * 100.0:.0f}% rejected by bounding box)  {row['vertices']} vertices")
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Scene graph draw cost: N cubes as one instanced batch vs. one draw call each.
+
+Usage:
+    python bench_instancing.py --count 10000 --frames 20
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '3D'))
+os.environ.setdefault('GRAFKOM_HEADLESS', '1')
+
+import numpy as np
+
+from app import OpenGLRenderer
+
+
+def build_renderer(count, width, height):
+    renderer = OpenGLRenderer(headless=True)
+    renderer.window_width = width
+    renderer.window_height = height
+    if not renderer.init_opengl():
+        raise RuntimeError("OpenGL init failed")
+    renderer.current_object = 'none'
+    renderer.auto_rotate = False
+    renderer.camera_params.update({'eye_x': 0.0, 'eye_y': 25.0, 'eye_z': 25.0})
+
+    side = int(np.ceil(np.sqrt(count)))
+    for i in range(count):
+        row, col = divmod(i, side)
+        renderer.add_node('cube', {
+            'pos_x': (col / side - 0.5) * 20.0,
+            'pos_z': (row / side - 0.5) * 20.0,
+            'rot_y': (i * 7) % 360,
+            'scale': 0.08
+        })
+    return renderer
+
+
+def time_frames(renderer, frames):
+    renderer.render()  # first frame builds batches and uploads buffers
+    start = time.perf_counter()
+    for _ in range(frames):
+        renderer.render()
+    elapsed = time.perf_counter() - start
+    return {
+        'frame_ms': elapsed / frames * 1000.0,
+        'draw_calls': renderer.draw_calls
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--count', type=int, default=10000)
+    parser.add_argument('--frames', type=int, default=20)
+    parser.add_argument('--width', type=int, default=800)
+    parser.add_argument('--height', type=int, default=600)
+    parser.add_argument('--json', action='store_true', help="print results as JSON")
+    args = parser.parse_args()
+
+    renderer = build_renderer(args.count, args.width, args.height)
+    results = {}
+    for mode, enabled in (('instanced', True), ('individual', False)):
+        renderer.instancing_enabled = enabled
+        results[mode] = time_frames(renderer, args.frames)
+    results['speedup'] = results['individual']['frame_ms'] / results['instanced']['frame_ms']
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for mode in ('instanced', 'individual'):
+            print(f"{mode:<11} {results[mode]['frame_ms']:9.2f} ms/frame  "
+                  f"({results[mode]['draw_calls']} draw calls)")
+        print(f"speedup     x{results['speedup']:.1f}")
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Lighting path cost: per-pixel Phong shader vs. fixed-function (per-vertex)
+lighting, for each built-in object and an OBJ torus of a given size.
+
+Usage:
+    python bench_lighting.py --frames 60
+    python bench_lighting.py --triangles 20000 500000 --width 1280 --height 720
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '3D'))
+os.environ.setdefault('GRAFKOM_HEADLESS', '1')
+
+from app import OpenGLRenderer
+from synthetic import torus_for_triangles, write_ply
+
+MODES = (('phong_shader', True), ('fixed_function', False))
+
+
+def time_frames(renderer, frames):
+    renderer.render()
+    start = time.perf_counter()
+    for _ in range(frames):
+        renderer.render()
+    return (time.perf_counter() - start) / frames * 1000.0
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--triangles', type=int, nargs='+', default=[20000, 200000])
+    parser.add_argument('--frames', type=int, default=30)
+    parser.add_argument('--width', type=int, default=800)
+    parser.add_argument('--height', type=int, default=600)
+    parser.add_argument('--json', action='store_true', help="print results as JSON")
+    args = parser.parse_args()
+
+    renderer = OpenGLRenderer(headless=True)
+    renderer.window_width = args.width
+    renderer.window_height = args.height
+    renderer.perspective_params['aspect'] = args.width / args.height
+    if not renderer.init_opengl():
+        raise RuntimeError("OpenGL init failed")
+    if renderer.phong_program is None:
+        raise RuntimeError("Phong shader failed to compile")
+    renderer.lod_policy = 'full'
+
+    scenes = [(name, name) for name in ('cube', 'pyramid', 'sphere')]
+    directory = tempfile.mkdtemp()
+    for triangles in args.triangles:
+        path = os.path.join(directory, f'torus_{triangles}.ply')
+        write_ply(path, *torus_for_triangles(triangles))
+        scenes.append((f'torus {triangles}', path))
+
+    results = []
+    for label, scene in scenes:
+        if scene.endswith('.ply'):
+            renderer.load_obj_file(scene)
+            os.remove(scene)
+        else:
+            renderer.current_object = scene
+        result = {'scene': label}
+        for mode, enabled in MODES:
+            renderer.shader_lighting = enabled
+            result[mode] = time_frames(renderer, args.frames)
+        results.append(result)
+        if not args.json:
+            print(f"{label:<16} shader {result['phong_shader']:8.2f} ms/frame   "
+                  f"fixed-function {result['fixed_function']:8.2f} ms/frame")
+    os.rmdir(directory)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+LOD generation cost and frame time per LOD policy.
+
+Usage:
+    python bench_lod.py --triangles 200000 1000000 --frames 20
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '3D'))
+os.environ.setdefault('GRAFKOM_HEADLESS', '1')
+
+import mesh_lod
+from app import OpenGLRenderer
+from synthetic import torus_for_triangles
+
+POLICIES = ['full', 'screen_size', 'coarsest']
+DISTANCES = {'near': 3.0, 'mid': 10.0, 'far': 40.0}
+
+
+def bench_decimation(triangles):
+    vertices, faces = torus_for_triangles(triangles)
+    start = time.perf_counter()
+    chain = mesh_lod.build_lod_chain(vertices, faces)
+    return {
+        'triangles': len(faces),
+        'seconds': time.perf_counter() - start,
+        'levels': [len(lod_faces) for _, lod_faces, _ in chain]
+    }
+
+
+def bench_frames(triangles, frames, width, height):
+    renderer = OpenGLRenderer(headless=True)
+    renderer.window_width = width
+    renderer.window_height = height
+    if not renderer.init_opengl():
+        raise RuntimeError("OpenGL init failed")
+    renderer.auto_rotate = False
+
+    renderer.obj_vertices, renderer.obj_faces = torus_for_triangles(triangles)
+    renderer.current_object = 'obj'
+    renderer.invalidate_obj_mesh()
+    renderer.lod_thread.join()
+
+    results = {}
+    for distance_name, distance in DISTANCES.items():
+        renderer.camera_params.update({'eye_x': distance, 'eye_y': distance, 'eye_z': distance})
+        for policy in POLICIES:
+            renderer.lod_policy = policy
+            renderer.render()  # upload buffers of the chosen level
+            start = time.perf_counter()
+            for _ in range(frames):
+                renderer.render()
+            results[f"{distance_name}/{policy}"] = {
+                'frame_ms': (time.perf_counter() - start) / frames * 1000.0,
+                'level': renderer.current_lod_level
+            }
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--triangles', type=int, nargs='+', default=[200000, 1000000])
+    parser.add_argument('--frames', type=int, default=20)
+    parser.add_argument('--width', type=int, default=800)
+    parser.add_argument('--height', type=int, default=600)
+    parser.add_argument('--json', action='store_true', help="print results as JSON")
+    args = parser.parse_args()
+
+    results = {'decimation': [bench_decimation(t) for t in args.triangles],
+               'frames': bench_frames(args.triangles[0], args.frames, args.width, args.height)}
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for result in results['decimation']:
+            print(f"decimate {result['triangles']:>9} tris: {result['seconds']:6.2f}s -> {result['levels']}")
+        for name, result in results['frames'].items():
+            print(f"{name:<18} {result['frame_ms']:8.2f} ms/frame  (level {result['level']})")
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Mesh file load throughput: text OBJ against memory-mapped binary STL and
+PLY for the same mesh. Reports seconds and MB/s per format for the reader
+alone (mesh_io.load_mesh; the binary readers should run at close to disk or
+page cache bandwidth), and the time of the full load path the 3D app uses
+(app.OpenGLRenderer.load_obj_file: reader, import stage and mesh build,
+uncached). STL and PLY skip the import stage unless it is opted into, so
+their full load should stay within a small factor of the reader.
+
+Usage:
+    python bench_mesh_formats.py --triangles 1000000 10000000
+    python bench_mesh_formats.py --formats stl ply --triangles 10000000 --cold
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import contextlib
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '3D'))
+os.environ.setdefault('GRAFKOM_HEADLESS', '1')
+
+import app
+import mesh_io
+from synthetic import torus_for_triangles, write_obj, write_stl, write_ply
+
+WRITERS = {'obj': write_obj, 'stl': write_stl, 'ply': write_ply}
+
+
+def drop_page_cache(path):
+    """Ask the kernel to forget cached pages of a file (Linux only)"""
+    if hasattr(os, 'posix_fadvise'):
+        with open(path, 'rb') as file:
+            os.fsync(file.fileno())
+            os.posix_fadvise(file.fileno(), 0, 0, os.POSIX_FADV_DONTNEED)
+
+
+def bench_format(fmt, vertices, faces, directory, cold, repeat):
+    path = os.path.join(directory, f'mesh.{fmt}')
+    WRITERS[fmt](path, vertices, faces)
+    size = os.path.getsize(path)
+    best = float('inf')
+    for _ in range(repeat):
+        if cold:
+            drop_page_cache(path)
+        start = time.perf_counter()
+        mesh = mesh_io.load_mesh(path)
+        best = min(best, time.perf_counter() - start)
+    # Full load path with a fresh renderer each time, so the model cache is cold
+    best_load = float('inf')
+    for _ in range(repeat):
+        if cold:
+            drop_page_cache(path)
+        renderer = app.OpenGLRenderer(headless=True)
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(sys.stderr):
+            renderer.load_obj_file(path)
+        best_load = min(best_load, time.perf_counter() - start)
+        # Cancel the background LOD build so it does not run into the next measurement
+        renderer.lod_generation += 1
+        if renderer.lod_thread is not None:
+            renderer.lod_thread.join()
+    os.remove(path)
+    return {
+        'format': fmt,
+        'triangles': len(mesh.faces),
+        'megabytes': size / 1e6,
+        'seconds': best,
+        'megabytes_per_second': size / 1e6 / best,
+        'load_obj_file_seconds': best_load
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--triangles', type=int, nargs='+', default=[1000000])
+    parser.add_argument('--formats', nargs='+', choices=sorted(WRITERS), default=['obj', 'stl', 'ply'])
+    parser.add_argument('--cold', action='store_true', help="drop the file from the page cache before each load")
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--json', action='store_true', help="print results as JSON")
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for triangles in args.triangles:
+            vertices, faces = torus_for_triangles(triangles)
+            for fmt in args.formats:
+                result = bench_format(fmt, vertices, faces, directory, args.cold, args.repeat)
+                results.append(result)
+                if not args.json:
+                    print(f"{result['triangles']:>9} tris  {fmt}: {result['megabytes']:8.1f} MB in "
+                          f"{result['seconds']:7.3f}s ({result['megabytes_per_second']:8.1f} MB/s), "
+                      f"load_obj_file {result['load_obj_file_seconds']:7.3f}s")
+
+    if args.json:
+        print(json.dumps(results, indent=2))
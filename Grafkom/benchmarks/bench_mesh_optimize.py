@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+OBJ import stage (weld + degenerate removal + vertex cache reorder) on
+real-world-sized meshes. Inputs mimic exporter output: a triangle soup
+(every corner its own vertex) in shuffled triangle order. Meshes above
+--tipsify-max-faces are reordered along a Z-order curve instead of Tipsify.
+
+Usage:
+    python bench_mesh_optimize.py --triangles 100000 500000 1000000
+    python bench_mesh_optimize.py --triangles 1000000 --tipsify-max-faces 2000000
+"""
+
+import os
+import sys
+import json
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '3D'))
+
+import numpy as np
+
+import mesh_optimize
+from synthetic import torus_for_triangles
+
+
+def exported_soup(triangles, seed=0):
+    vertices, faces = torus_for_triangles(triangles)
+    rng = np.random.default_rng(seed)
+    faces = faces[rng.permutation(len(faces))]
+    soup = vertices[faces].reshape(-1, 3)
+    return soup, np.arange(len(soup)).reshape(-1, 3)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--triangles', type=int, nargs='+', default=[100000, 500000, 1000000])
+    parser.add_argument('--cache-size', type=int, default=mesh_optimize.CACHE_SIZE)
+    parser.add_argument('--tipsify-max-faces', type=int, default=mesh_optimize.TIPSIFY_MAX_FACES,
+                        help="largest mesh reordered with Tipsify (larger ones use Z-order)")
+    parser.add_argument('--json', action='store_true', help="print results as JSON")
+    args = parser.parse_args()
+
+    results = []
+    for triangles in args.triangles:
+        vertices, faces = exported_soup(triangles)
+        _, _, report = mesh_optimize.optimize_mesh(vertices, faces, cache_size=args.cache_size,
+                                                  tipsify_max_faces=args.tipsify_max_faces)
+        results.append(report)
+        if not args.json:
+            print(f"{report['faces_before']:>9} tris: vertices {report['vertices_before']} -> {report['vertices_after']}, "
+                  f"weld {report['weld_seconds']:.2f}s, reorder ({report['reorder_method']}) {report['reorder_seconds']:.2f}s, "
+                  f"{mesh_optimize.describe_acmr(report)}")
+
+    if args.json:
+        print(json.dumps(results, indent=2))
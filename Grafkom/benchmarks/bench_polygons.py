@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Polygon and polyline primitives of the 2D app with many vertices per shape
+(map / CAD outlines, synthetic.shapes_2d).
+
+  triangulate  scene_geometry.triangulate (ear clipping) on concave outlines of
+               increasing size; each triangulation is checked (triangle areas
+               sum to the polygon area, no triangle is inverted)
+  scene        --shapes outlines of --vertices points each, rendered headless
+               like bench_redraw.py: full redraw with clipping off and on, then
+               edits of one shape (translate, rotate, recolor) with the number
+               of polygons re-triangulated (0: the cached triangulation is
+               reused while the points are unchanged)
+
+With --check every edited frame is compared pixel by pixel with a full
+redraw of the same state.
+
+Usage:
+    python bench_polygons.py
+    python bench_polygons.py --shapes 100 --vertices 20000 --edits 5
+    python bench_polygons.py --check --json
+"""
+
+import sys
+import json
+import time
+import random
+import logging
+import argparse
+
+import numpy as np
+
+from bench_redraw import main, headless_window, frame_ms, pixels, full_redraw_ms, WIDTH, HEIGHT
+from synthetic import outline_2d, shapes_2d
+from scene_geometry import triangulate
+
+
+def check_triangulation(outline, triangles):
+    """(relative area error, inverted triangles)"""
+    corners = outline[triangles]
+    areas = 0.5 * ((corners[:, 1, 0] - corners[:, 0, 0]) * (corners[:, 2, 1] - corners[:, 0, 1]) -
+                   (corners[:, 1, 1] - corners[:, 0, 1]) * (corners[:, 2, 0] - corners[:, 0, 0]))
+    x, y = outline[:, 0], outline[:, 1]
+    area = 0.5 * abs(np.sum(x * np.roll(y, -1) - np.roll(x, -1) * y))
+    return float(abs(areas.sum() - area) / area), int(np.count_nonzero(areas < 0))
+
+
+def bench_triangulate(sizes, runs=3):
+    results = []
+    for size in sizes:
+        outline = outline_2d(size, seed=size)
+        times = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            triangles = triangulate(outline)
+            times.append((time.perf_counter() - start) * 1000.0)
+        area_error, inverted = check_triangulation(outline, triangles)
+        results.append({'vertices': size, 'triangles': len(triangles), 'ms': float(np.median(times)),
+                        'area_error': area_error, 'inverted': inverted})
+    return results
+
+
+def edit(name, rng):
+    main.selected_object_index = rng.randrange(len(main.drawn_objects))
+    if name == 'translate':
+        main.handle_incoming_command({'type': 'transform', 'action': 'translate',
+                                      'x': rng.uniform(-2, 2), 'y': rng.uniform(-2, 2)})
+    elif name == 'rotate':
+        main.handle_incoming_command({'type': 'transform', 'action': 'rotate', 'angle': rng.uniform(-10, 10)})
+    else:
+        main.handle_incoming_command({'type': 'draw_settings', 'thickness': rng.choice([1.0, 2.0]),
+                                      'color': '#%06x' % rng.randrange(0x1000000)})
+
+
+def bench_scene(shapes, vertices, edits, check, seed=0):
+    rng = random.Random(seed)
+    arrays = main.scene_layer.arrays
+    main.drawn_objects.extend(shapes_2d(shapes, vertices, seed=seed))
+    start = time.perf_counter()
+    frame_ms()
+    first_ms = (time.perf_counter() - start) * 1000.0 # Includes triangulating every polygon once
+
+    results = []
+    for clipping in (False, True):
+        main.handle_incoming_command({'type': 'clipping', 'action': 'enable' if clipping else 'disable'})
+        full_ms = full_redraw_ms()
+        for name in ('translate', 'rotate', 'recolor'):
+            times = []
+            triangulations = arrays.triangulations
+            mismatched = 0
+            for _ in range(edits):
+                edit(name, rng)
+                times.append(frame_ms())
+                if check:
+                    partial = pixels()
+                    full_redraw_ms()
+                    mismatched += int(np.count_nonzero(partial != pixels()))
+            results.append({
+                'clipping': clipping,
+                'edit': name,
+                'frame_ms': float(np.median(times)),
+                'full_redraw_ms': full_ms,
+                'retriangulated': arrays.triangulations - triangulations,
+                'mismatched_bytes': mismatched if check else None
+            })
+    return first_ms, results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1000, 5000, 20000],
+                        help="outline sizes for the triangulation timing")
+    parser.add_argument('--shapes', type=int, default=40, help="outlines in the scene (half polygons, half polylines)")
+    parser.add_argument('--vertices', type=int, default=5000, help="vertices per outline")
+    parser.add_argument('--edits', type=int, default=5, help="edits timed per kind")
+    parser.add_argument('--pipeline', choices=['threaded', 'serial'], default='serial',
+                        help="prepare frames on the worker thread or inside display()")
+    parser.add_argument('--check', action='store_true', help="compare every edited frame with a full redraw")
+    parser.add_argument('--json', action='store_true', help="print results as JSON")
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    triangulated = bench_triangulate(args.sizes)
+
+    headless_window(WIDTH, HEIGHT)
+    main.scene_layer = main.SceneLayer(threaded=args.pipeline == 'threaded')
+    first_ms, results = bench_scene(args.shapes, args.vertices, args.edits, args.check)
+
+    if args.json:
+        print(json.dumps({'triangulate': triangulated, 'shapes': args.shapes, 'vertices': args.vertices,
+                          'first_frame_ms': first_ms, 'scene': results}, indent=2))
+        sys.exit(0)
+    for row in triangulated:
+        print(f"triangulate {row['vertices']:6d} vertices  {row['ms']:8.1f} ms  "
+              f"{row['triangles']} triangles, area error {row['area_error']:.1e}, {row['inverted']} inverted")
+    print(f"{args.shapes} outlines x {args.vertices} vertices, {WIDTH}x{HEIGHT}, {args.pipeline} pipeline; "
+          f"first frame (triangulates all) {first_ms:.1f} ms")
+    for row in results:
+        checked = f"  mismatched bytes {row['mismatched_bytes']}" if args.check else ""
+        print(f"clipping {'on ' if row['clipping'] else 'off'}  {row['edit']:<10} {row['frame_ms']:8.2f} ms  "
+              f"(full redraw {row['full_redraw_ms']:8.1f} ms)  {row['retriangulated']} re-triangulated{checked}")
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Wire protocol cost of the high-frequency control messages: encode/decode time
+and bytes per message for JSON, the fixed-schema struct encoding and
+MessagePack (when installed), projected to a 1k messages/sec slider drag.
+
+3D messages are measured as Socket.IO packets (a binary payload travels as a
+placeholder packet plus an attachment frame); 2D commands as the framed TCP
+session of main.py, next to the legacy one-JSON-command-per-connection form.
+With --live the 2D command server is started on a local port and each form
+is timed end to end (request + response) through WebControlPanelApp.
+
+Usage:
+    python bench_protocol.py
+    python bench_protocol.py --messages 50000 --live --json
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import logging
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..', '3D'))
+sys.path.insert(0, os.path.join(HERE, '..', '2D'))
+
+from socketio import packet
+
+import wire_protocol
+import main as app2d
+
+RATE = 1000
+
+MESSAGES_3D = {
+    'camera (all fields)': ('update_camera', {
+        'eye_x': 5.25, 'eye_y': 4.75, 'eye_z': 5.5, 'center_x': 0.0, 'center_y': 0.0, 'center_z': 0.0,
+        'up_x': 0.0, 'up_y': 1.0, 'up_z': 0.0}),
+    'camera (one slider)': ('update_camera', {'eye_x': 5.25}),
+    'transform (all fields)': ('update_transform', {
+        'rot_x': 30.0, 'rot_y': 45.5, 'rot_z': 0.0, 'scale': 1.25, 'pos_x': 0.5, 'pos_y': 0.0, 'pos_z': -1.0}),
+    'transform (one slider)': ('update_transform', {'rot_y': 45.5}),
+}
+
+COMMANDS_2D = {
+    'translate': {'type': 'transform', 'action': 'translate', 'x': 10.0, 'y': -5.0},
+    'rotate': {'type': 'transform', 'action': 'rotate', 'angle': 15.0},
+    'draw_settings': {'type': 'draw_settings', 'thickness': 3.0, 'color': '#ff8800'},
+}
+
+
+def per_message_us(function, messages):
+    start = time.perf_counter()
+    for _ in range(messages):
+        function()
+    return (time.perf_counter() - start) / messages * 1e6
+
+
+def socketio_wire_bytes(event, payload):
+    """Bytes of the Socket.IO packet(s) carrying event (text packet + binary attachments)"""
+    encoded = packet.Packet(packet.EVENT, data=[event, payload]).encode()
+    if isinstance(encoded, list):
+        return sum(len(part) for part in encoded), len(encoded)
+    return len(encoded.encode('utf-8')), 1
+
+
+def result(kind, message, fmt, encode_us, decode_us, wire_bytes, frames):
+    return {
+        'kind': kind,
+        'message': message,
+        'format': fmt,
+        'encode_us': encode_us,
+        'decode_us': decode_us,
+        'wire_bytes': wire_bytes,
+        'frames': frames,
+        'bytes_per_second': wire_bytes * RATE,
+        'cpu_percent': (encode_us + decode_us) * RATE / 1e4
+    }
+
+
+def bench_3d(messages):
+    results = []
+    for name, (event, data) in MESSAGES_3D.items():
+        for fmt in wire_protocol.available_formats():
+            if fmt == 'json':
+                # The dict is serialized by Socket.IO itself
+                encode_us = per_message_us(lambda: json.dumps([event, data], separators=(',', ':')), messages)
+                text = json.dumps([event, data], separators=(',', ':'))
+                decode_us = per_message_us(lambda: json.loads(text), messages)
+            else:
+                encode_us = per_message_us(lambda: wire_protocol.encode(event, data, fmt), messages)
+                payload = wire_protocol.encode(event, data, fmt)
+                decode_us = per_message_us(lambda: wire_protocol.decode(payload), messages)
+            wire_bytes, frames = socketio_wire_bytes(event, wire_protocol.encode(event, data, fmt))
+            results.append(result('3d socketio', name, fmt, encode_us, decode_us, wire_bytes, frames))
+    return results
+
+
+def bench_2d(messages):
+    results = []
+    for name, command in COMMANDS_2D.items():
+        text = json.dumps(command)
+        encode_us = per_message_us(lambda: json.dumps(command).encode('utf-8'), messages)
+        decode_us = per_message_us(lambda: json.loads(text), messages)
+        results.append(result('2d tcp', name, 'json (per connection)', encode_us, decode_us, len(text), 1))
+        for fmt in app2d.available_protocol_formats():
+            payload = app2d.encode_command(command, fmt)
+            encode_us = per_message_us(lambda: app2d.encode_command(command, fmt), messages)
+            decode_us = per_message_us(lambda: app2d.decode_command(payload), messages)
+            wire_bytes = app2d.FRAME_HEADER.size + len(payload)
+            results.append(result('2d tcp', name, f"{fmt} (session)", encode_us, decode_us, wire_bytes, 1))
+    return results
+
+
+def bench_live(messages, port):
+    """End-to-end commands/sec through the 2D command server on a local port"""
+    server = app2d.PyOpenGLCommandServer('127.0.0.1', port, lambda command: None)
+    server.start()
+    time.sleep(0.2)
+    command = COMMANDS_2D['translate']
+    results = []
+    try:
+        for binary in (False, True):
+            client = app2d.WebControlPanelApp('127.0.0.1', 0, '127.0.0.1', port, binary_protocol=binary)
+            client._send_command_to_pyopengl(command)
+            start = time.perf_counter()
+            for _ in range(messages):
+                client._send_command_to_pyopengl(command)
+            seconds = time.perf_counter() - start
+            client._close_binary_session()
+            results.append({
+                'protocol': f"{client.binary_format} (session)" if binary else 'json (per connection)',
+                'commands_per_second': messages / seconds,
+                'round_trip_us': seconds / messages * 1e6
+            })
+    finally:
+        server.stop()
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--messages', type=int, default=20000, help="messages timed per encode/decode measurement")
+    parser.add_argument('--live', action='store_true', help="also time 2D commands end to end over TCP")
+    parser.add_argument('--live-messages', type=int, default=2000)
+    parser.add_argument('--port', type=int, default=12399, help="local port for the --live command server")
+    parser.add_argument('--json', action='store_true', help="print results as JSON")
+    args = parser.parse_args()
+
+    # The command server logs every legacy command at INFO
+    logging.getLogger().setLevel(logging.WARNING)
+
+    results = {'codec': bench_3d(args.messages) + bench_2d(args.messages)}
+    if args.live:
+        results['live'] = bench_live(args.live_messages, args.port)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"msgpack: {'available' if wire_protocol.msgpack else 'not installed'}; "
+              f"per message, and at {RATE} messages/sec")
+        for row in results['codec']:
+            print(f"{row['kind']:<12} {row['message']:<23} {row['format']:<22} "
+                  f"enc {row['encode_us']:5.2f} us  dec {row['decode_us']:5.2f} us  "
+                  f"{row['wire_bytes']:4d} B in {row['frames']} frame(s)  "
+                  f"{row['bytes_per_second'] / 1000:6.1f} kB/s  cpu {row['cpu_percent']:5.2f}%")
+        for row in results.get('live', []):
+            print(f"2d live      {row['protocol']:<22} {row['commands_per_second']:8.0f} commands/s  "
+                  f"{row['round_trip_us']:7.1f} us round trip")
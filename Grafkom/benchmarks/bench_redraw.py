@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+Frame time of the 2D display() on large scenes: a full redraw of every object
+against the damage-region redraw after small edits.
+
+The scene (synthetic.scene_2d) is rendered headless into an EGL pbuffer (the
+3D app's OffscreenContext stands in for the GLUT window), with clipping off
+and on. Edits go through main.handle_incoming_command / the mouse handlers,
+like the web panel and the window would send them:
+
+  translate   move one selected object by a few pixels
+  recolor     change color and thickness of one selected object
+  clip drag   drag the (first) clip region by one pixel (clipping on only)
+  idle        present a frame with nothing changed
+
+Each edit is followed by display() calls until the edit is on screen; the
+median of their total time is reported next to the full redraw, with the
+number of objects re-submitted. With --check every partial frame is compared
+pixel by pixel with a full redraw of the same state.
+
+Frame preparation (transform, clipping and tessellation into vertex arrays)
+runs on the SceneLayer's worker thread with --pipeline threaded, or inline in
+display() with --pipeline serial. The drag scenario (clipping on) moves the
+clipping window by one pixel before every frame at 60 Hz, the way a
+continuous drag feeds mouse_motion_handler, and reports the GL thread's
+frame time, the worker's preparation time, how often frames were presented
+while the worker was busy (overlap) and the scene updates per second that
+reached the screen (one update may carry several coalesced drag steps).
+
+Usage:
+    python bench_redraw.py
+    python bench_redraw.py --objects 100000 --edits 20 --pipeline serial
+    python bench_redraw.py --objects 5000 --check --json
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import logging
+import argparse
+
+import numpy as np
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..', '3D'))
+sys.path.insert(0, os.path.join(HERE, '..', '2D'))
+os.environ.setdefault('GRAFKOM_HEADLESS', '1')
+
+from app import OffscreenContext
+import main
+from synthetic import scene_2d
+
+WIDTH, HEIGHT = 800, 600
+
+
+def headless_window(width, height):
+    """EGL pbuffer in place of the GLUT window (swap -> glFinish)"""
+    context = OffscreenContext(width, height)
+    main.glutSwapBuffers = main.glFinish
+    main.glutGet = lambda what: width if what == main.GLUT_WINDOW_WIDTH else height
+    main.glutPostRedisplay = lambda: None
+    main.glClearColor(0.2, 0.2, 0.2, 1.0)
+    return context
+
+
+def frame_ms():
+    """One display() call, or (threaded) display() calls until the worker has nothing left to present"""
+    start = time.perf_counter()
+    main.display()
+    while main.scene_layer.pipeline.pending():
+        time.sleep(0.0005)
+        main.display()
+    return (time.perf_counter() - start) * 1000.0
+
+
+def pixels():
+    return np.frombuffer(main.glReadPixels(0, 0, WIDTH, HEIGHT, main.GL_RGB, main.GL_UNSIGNED_BYTE), dtype=np.uint8)
+
+
+def full_redraw_ms():
+    main.scene_layer.invalidate()
+    return frame_ms()
+
+
+def edit(name, rng):
+    """Apply one edit of the given kind"""
+    if name in ('translate', 'recolor'):
+        main.selected_object_index = rng.randrange(len(main.drawn_objects))
+        if name == 'translate':
+            main.handle_incoming_command({'type': 'transform', 'action': 'translate',
+                                          'x': rng.uniform(-2, 2), 'y': rng.uniform(-2, 2)})
+        else:
+            main.handle_incoming_command({'type': 'draw_settings', 'thickness': rng.choice([1.0, 3.0]),
+                                          'color': '#%06x' % rng.randrange(0x1000000)})
+    elif name == 'clip drag':
+        anchor_x, anchor_y = main.clip_regions[0].vertices[0]
+        main.dragged_clip_region = 0
+        main.drag_offset_x = main.drag_offset_y = 0.0
+        x = int(round((anchor_x + 1.0) * 0.5 * WIDTH)) + rng.choice([-1, 1])
+        y = int(round((1.0 - anchor_y) * 0.5 * HEIGHT))
+        main.mouse_motion_handler(x, y)
+        main.dragged_clip_region = -1
+
+
+def drag(frames, seed=0, rate=60.0):
+    """
+    Continuous clip drag: a mouse motion edit and a display() every 1/rate s (or as
+    fast as display() allows), without waiting for the worker to catch up
+    """
+    rng = random.Random(seed)
+    pipeline = main.scene_layer.pipeline
+    frame_ms() # Nothing in flight
+    plans, prep_ms = pipeline.stats['plans'], pipeline.stats['prep_ms']
+    intervals = []
+    started = time.perf_counter()
+    for frame in range(frames):
+        edit('clip drag', rng)
+        start = time.perf_counter()
+        main.display()
+        intervals.append((start, time.perf_counter()))
+        time.sleep(max(0.0, started + (frame + 1) / rate - time.perf_counter()))
+    frame_ms()
+    elapsed = time.perf_counter() - started
+    plans = pipeline.stats['plans'] - plans
+    prepared = [span for span in pipeline.prep_intervals if span[0] >= started]
+    # Frames presented while the worker was preparing the next one
+    overlapped = sum(any(p0 < end and p1 > start for p0, p1 in prepared)
+                     for start, end in intervals) if pipeline.threaded else 0
+    return {
+        'frames': frames,
+        'frame_ms': float(np.median([(end - start) * 1000.0 for start, end in intervals])),
+        'plans': plans,
+        'prep_ms': (pipeline.stats['prep_ms'] - prep_ms) / max(plans, 1),
+        'overlap': overlapped / frames,
+        'updates_per_s': plans / elapsed
+    }
+
+
+def run(edits, check, seed=0):
+    rng = random.Random(seed)
+    results = []
+    for clipping in (False, True):
+        main.handle_incoming_command({'type': 'clipping', 'action': 'enable' if clipping else 'disable'})
+        full_ms = full_redraw_ms()
+        mismatched = 0
+        for name in ('idle', 'translate', 'recolor') + (('clip drag',) if clipping else ()):
+            times = []
+            redrawn = 0
+            for _ in range(edits):
+                before = main.scene_layer.stats['objects_redrawn']
+                edit(name, rng)
+                times.append(frame_ms())
+                redrawn += main.scene_layer.stats['objects_redrawn'] - before
+                if check:
+                    partial = pixels()
+                    full_redraw_ms()
+                    mismatched += int(np.count_nonzero(partial != pixels()))
+            results.append({
+                'clipping': clipping,
+                'edit': name,
+                'frame_ms': float(np.median(times)),
+                'full_redraw_ms': full_ms,
+                'objects_redrawn': redrawn / edits,
+                'mismatched_bytes': mismatched if check else None
+            })
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--objects', type=int, default=20000, help="objects in the scene")
+    parser.add_argument('--edits', type=int, default=10, help="edits timed per kind")
+    parser.add_argument('--pipeline', choices=['threaded', 'serial'], default='threaded',
+                        help="prepare frames on the worker thread or inside display()")
+    parser.add_argument('--drag-frames', type=int, default=30, help="frames in the continuous drag")
+    parser.add_argument('--check', action='store_true', help="compare every partial frame with a full redraw")
+    parser.add_argument('--json', action='store_true', help="print results as JSON")
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    headless_window(WIDTH, HEIGHT)
+    main.scene_layer = main.SceneLayer(threaded=args.pipeline == 'threaded')
+    main.drawn_objects.extend(scene_2d(args.objects))
+    frame_ms()
+
+    results = run(args.edits, args.check)
+    dragged = drag(args.drag_frames) # clipping is still on after run()
+    if args.json:
+        print(json.dumps({'objects': args.objects, 'pipeline': args.pipeline, 'results': results,
+                          'drag': dragged}, indent=2))
+    else:
+        print(f"{args.objects} objects, {WIDTH}x{HEIGHT}, {args.pipeline} pipeline")
+        for row in results:
+            checked = f"  mismatched bytes {row['mismatched_bytes']}" if args.check else ""
+            print(f"clipping {'on ' if row['clipping'] else 'off'}  {row['edit']:<10} "
+                  f"{row['frame_ms']:8.2f} ms  (full redraw {row['full_redraw_ms']:8.1f} ms)  "
+                  f"{row['objects_redrawn']:7.1f} objects redrawn{checked}")
+        print(f"drag ({dragged['frames']} frames, clipping on): frame {dragged['frame_ms']:.2f} ms, "
+              f"prepare {dragged['prep_ms']:.2f} ms x {dragged['plans']} plans, "
+              f"{dragged['overlap'] * 100.0:.0f}% of frames overlapped, {dragged['updates_per_s']:.1f} scene updates/s")
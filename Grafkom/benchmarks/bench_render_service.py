@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Throughput of the headless render service versus worker count.
+
+Usage:
+    python bench_render_service.py --workers 1 2 4 --scenes 16 --frames 200
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '3D'))
+os.environ.setdefault('GRAFKOM_HEADLESS', '1')
+
+from render_service import RenderService
+
+OBJECTS = ['cube', 'pyramid', 'sphere']
+
+
+def run(num_workers, num_scenes, num_frames, output_format, width, height):
+    service = RenderService(num_workers, width, height)
+    service.start()
+    try:
+        scene_ids = []
+        for i in range(num_scenes):
+            scene_ids.append(service.create_scene(state={
+                'object': OBJECTS[i % len(OBJECTS)],
+                'rotation_angle': i * 10.0
+            }))
+
+        # Warm-up: one frame per scene so context creation is not measured
+        for future in [service.submit(scene_id, output_format) for scene_id in scene_ids]:
+            future.result(timeout=120)
+
+        start = time.perf_counter()
+        futures = []
+        for frame in range(num_frames):
+            scene_id = scene_ids[frame % num_scenes]
+            service.update_scene(scene_id, {'rotation_angle': frame * 2.0})
+            futures.append(service.submit(scene_id, output_format))
+        for future in futures:
+            future.result(timeout=300)
+        elapsed = time.perf_counter() - start
+    finally:
+        service.stop()
+
+    return {
+        'workers': num_workers,
+        'scenes': num_scenes,
+        'frames': num_frames,
+        'seconds': elapsed,
+        'frames_per_second': num_frames / elapsed
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--scenes', type=int, default=16)
+    parser.add_argument('--frames', type=int, default=200)
+    parser.add_argument('--format', choices=['png', 'raw'], default='png')
+    parser.add_argument('--width', type=int, default=400)
+    parser.add_argument('--height', type=int, default=300)
+    parser.add_argument('--json', action='store_true', help="print results as JSON")
+    args = parser.parse_args()
+
+    results = []
+    for num_workers in args.workers:
+        result = run(num_workers, args.scenes, args.frames, args.format, args.width, args.height)
+        results.append(result)
+        if not args.json:
+            speedup = result['frames_per_second'] / results[0]['frames_per_second']
+            print(f"workers={num_workers:<3} {result['frames_per_second']:8.1f} frames/s  "
+                  f"({result['seconds']:.2f}s, x{speedup:.2f})")
+
+    if args.json:
+        print(json.dumps(results, indent=2))
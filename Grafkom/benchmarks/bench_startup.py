@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+Startup time of the two applications: time to first served request and time
+to first rendered frame, measured from the moment the process is spawned.
+
+  3d  `app.py --headless --no-browser --port P` as launched by a user; the
+      first request is the first 200 of GET /, the first frame (and the
+      in-process import / renderer / server timings) come from /api/startup
+  2d  the __main__ sequence of main.py in a child process (`bench_startup.py
+      child-2d`): command server, then the GL window (an EGL pbuffer from the
+      3D app standing in for GLUT) and its first display(), with the web
+      panel started in its thread as main.py does; the first request is the
+      first 200 of GET /. The pbuffer needs the 3D app imported first, so 2D
+      times count from the start of `import main` instead of the spawn (with
+      OpenGL and Flask already loaded: these are main.py's own steps). A
+      plain `import main` is also timed on its own, with the heavy modules it
+      loaded (Flask and pygame load lazily).
+
+Each run is a fresh interpreter, so the timings include imports; the median
+over --runs is reported.
+
+Usage:
+    python bench_startup.py
+    python bench_startup.py --targets 3d --runs 10 --json
+"""
+
+import os
+import sys
+import json
+import time
+import socket
+import argparse
+import threading
+import subprocess
+import http.client
+
+import numpy as np
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DIR_2D = os.path.join(HERE, '..', '2D')
+DIR_3D = os.path.join(HERE, '..', '3D')
+
+WIDTH, HEIGHT = 800, 600
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def poll(port, path, timeout=60.0):
+    """Body of the first successful GET of path, or None on timeout"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        connection = http.client.HTTPConnection('127.0.0.1', port, timeout=1.0)
+        try:
+            connection.request('GET', path)
+            response = connection.getresponse()
+            body = response.read()
+            if response.status == 200:
+                return body
+        except OSError:
+            pass
+        finally:
+            connection.close()
+        time.sleep(0.005)
+    return None
+
+
+def stop(process):
+    process.terminate()
+    try:
+        process.wait(5)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+# --- 2D child ---------------------------------------------------------------------
+
+def report(**values):
+    print(json.dumps(values), flush=True)
+
+
+def child_2d(port):
+    """main.py's __main__ sequence, headless; prints the wall time of each step"""
+    os.environ['GRAFKOM_HEADLESS'] = '1'
+    sys.path.insert(0, DIR_3D)
+    from app import OffscreenContext
+    sys.path.insert(0, DIR_2D)
+    report(event='began', at=time.time())
+    import main
+    import logging
+    report(event='imported', at=time.time())
+    logging.getLogger().setLevel(logging.WARNING)
+
+    server = main.PyOpenGLCommandServer('127.0.0.1', free_port(), main.handle_incoming_command)
+    server.start()
+
+    # The window exists before the panel thread starts, as with glutCreateWindow
+    OffscreenContext(WIDTH, HEIGHT)
+    main.glutSwapBuffers = main.glFinish
+    main.glutGet = lambda what: WIDTH if what == main.GLUT_WINDOW_WIDTH else HEIGHT
+    main.glutPostRedisplay = lambda: None
+    main.glClearColor(0.2, 0.2, 0.2, 1.0)
+
+    def run_web_panel():
+        panel = main.WebControlPanelApp('127.0.0.1', port, '127.0.0.1', server.port)
+        panel.app.run(host='127.0.0.1', port=port, debug=False, use_reloader=False)
+
+    threading.Thread(target=run_web_panel, daemon=True).start()
+
+    main.display()
+    report(event='first_frame', at=time.time())
+    while True:
+        main.idle()
+        main.display()
+
+
+# --- Measurements -----------------------------------------------------------------
+
+def startup_3d():
+    port = free_port()
+    started = time.time()
+    process = subprocess.Popen(
+        [sys.executable, 'app.py', '--headless', '--no-browser', '--port', str(port)],
+        stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, cwd=DIR_3D)
+    try:
+        if poll(port, '/') is None:
+            raise RuntimeError("3d app did not serve a request")
+        first_request = time.time() - started
+        while True:
+            startup = json.loads(poll(port, '/api/startup'))
+            if 'first_frame_s' in startup:
+                first_frame = time.time() - started
+                break
+            if time.time() - started > 60:
+                raise RuntimeError("3d app did not render a frame")
+            time.sleep(0.005)
+    finally:
+        stop(process)
+    return {'first_request_s': first_request, 'first_frame_s': first_frame, 'in_process': startup}
+
+
+def startup_2d():
+    port = free_port()
+    process = subprocess.Popen(
+        [sys.executable, os.path.abspath(__file__), 'child-2d', '--port', str(port)],
+        stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True, cwd=DIR_2D)
+    events = {}
+
+    def read():
+        for line in process.stdout:
+            try:
+                message = json.loads(line)
+            except ValueError:
+                continue
+            events[message['event']] = message
+
+    reader = threading.Thread(target=read, daemon=True)
+    reader.start()
+    try:
+        if poll(port, '/') is None:
+            raise RuntimeError("2d panel did not serve a request")
+        first_request = time.time()
+        deadline = time.monotonic() + 60
+        while 'first_frame' not in events and time.monotonic() < deadline:
+            time.sleep(0.005)
+        if 'first_frame' not in events:
+            raise RuntimeError("2d app did not render a frame")
+    finally:
+        stop(process)
+    began = events['began']['at']
+    return {
+        'first_request_s': first_request - began,
+        'first_frame_s': events['first_frame']['at'] - began,
+        'imported_s': events['imported']['at'] - began
+    }
+
+
+def import_2d():
+    """Seconds of a plain `import main` and the heavy modules it loaded"""
+    code = ("import sys, time, json; start = time.perf_counter(); import main; "
+            "print(json.dumps({'import_s': time.perf_counter() - start, 'loaded': "
+            "[name for name in ('OpenGL.GL', 'OpenGL.GLUT', 'numpy', 'flask', 'pygame') if name in sys.modules]}))")
+    output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, cwd=DIR_2D, check=True)
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+
+def summarize(runs):
+    keys = [key for key, value in runs[0].items() if isinstance(value, float)]
+    return {key: float(np.median([run[key] for run in runs])) for key in keys}
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == 'child-2d':
+        parser = argparse.ArgumentParser(prog='bench_startup.py child-2d')
+        parser.add_argument('--port', type=int, required=True)
+        child_2d(parser.parse_args(sys.argv[2:]).port)
+        sys.exit(0)
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--targets', nargs='+', choices=['2d', '3d'], default=['2d', '3d'])
+    parser.add_argument('--runs', type=int, default=5, help="fresh processes started per target")
+    parser.add_argument('--json', action='store_true', help="print results as JSON")
+    args = parser.parse_args()
+
+    results = {}
+    for target in args.targets:
+        measure = startup_2d if target == '2d' else startup_3d
+        runs = [measure() for _ in range(args.runs)]
+        results[target] = {'median': summarize(runs), 'runs': runs}
+        if target == '2d':
+            imports = [import_2d() for _ in range(args.runs)]
+            results[target]['import'] = {'import_s': float(np.median([run['import_s'] for run in imports])),
+                                         'loaded': imports[-1]['loaded']}
+        if not args.json:
+            median = results[target]['median']
+            print(f"{target}  first request {median['first_request_s'] * 1000.0:7.1f} ms  "
+                  f"first frame {median['first_frame_s'] * 1000.0:7.1f} ms  (median of {args.runs})")
+            if target == '3d':
+                startup = runs[-1]['in_process']
+                print("    in process: " + "  ".join(f"{key} {value * 1000.0:.1f} ms" for key, value in
+                                                     sorted(startup.items(), key=lambda item: item[1])))
+            else:
+                imports = results[target]['import']
+                print(f"    import main {imports['import_s'] * 1000.0:.1f} ms alone "
+                      f"(loads {', '.join(imports['loaded'])}); {median['imported_s'] * 1000.0:.1f} ms here")
+
+    if args.json:
+        print(json.dumps(results, indent=2))
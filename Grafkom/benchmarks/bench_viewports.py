@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Several viewports of the 2D app sharing one geometry build per frame.
+
+The scene (synthetic.scene_2d) is rendered headless like bench_redraw.py with
+1, 2 and 4 viewports:
+
+  single     the default full-window view
+  overview   'overview_detail' layout: the main view zoomed in (--zoom) plus
+             the overview inset showing the whole scene
+  offscreen  overview_detail plus two offscreen targets (--offscreen-size),
+             one with the main view's pan/zoom and one zoomed elsewhere
+
+For each configuration a full redraw is timed, with the worker's preparation
+time (transform, clipping and tessellation, done once for all viewports) next
+to the time the same work takes when every viewport builds its own geometry
+from the objects it shows. Then edits are timed:
+
+  translate  move one object (damage in every viewport that shows it)
+  pan        pan the main view by a few pixels (only that view is redrawn)
+  zoom       zoom the main view in one scroll step and back
+
+With --check every viewport's framebuffer after an edit is compared pixel by
+pixel with a full redraw of the same state, and the offscreen target that
+mirrors the main view (at the same size) with the main view itself.
+
+Usage:
+    python bench_viewports.py
+    python bench_viewports.py --objects 100000 --edits 10
+    python bench_viewports.py --objects 5000 --check --json
+"""
+
+import sys
+import json
+import time
+import random
+import logging
+import argparse
+
+import numpy as np
+
+from bench_redraw import main, headless_window, frame_ms, full_redraw_ms, WIDTH, HEIGHT
+from synthetic import scene_2d
+from scene_geometry import build_geometry
+
+
+def configure(name, zoom, offscreen_size):
+    main.set_viewport_layout('single' if name == 'single' else 'overview_detail')
+    main.viewports = [viewport for viewport in main.viewports if viewport.on_screen]
+    detail = main.find_viewport('main')
+    main.set_view(detail, (0.3, 0.2), 1.0 if name == 'single' else zoom)
+    if name == 'offscreen':
+        width, height = offscreen_size
+        for target, center, target_zoom in (('mirror', (0.3, 0.2), zoom), ('corner', (-0.6, -0.6), 2.0 * zoom)):
+            main.handle_incoming_command({'type': 'viewport', 'action': 'add_offscreen', 'name': target,
+                                          'size': [width, height], 'center': list(center), 'zoom': target_zoom})
+
+
+def separate_build_ms(runs=3):
+    """Preparation if every viewport transformed, clipped and tessellated its own objects"""
+    layer = main.scene_layer
+    total = 0.0
+    for viewport in main.viewports:
+        width, height = viewport.size
+        times = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            rows = layer.arrays.rows(layer.arrays.hits([(0, 0, width, height)], width, height, viewport.window()))
+            build_geometry(rows, main.clipping_enabled, list(main.clip_regions))
+            times.append((time.perf_counter() - start) * 1000.0)
+        total += float(np.median(times))
+    return total
+
+
+def framebuffers():
+    return {viewport.name: main.scene_layer.read_pixels(viewport).copy() for viewport in main.viewports}
+
+
+def mismatched():
+    """Bytes that differ between every viewport's framebuffer and a full redraw of the same state"""
+    partial = framebuffers()
+    full_redraw_ms()
+    full = framebuffers()
+    return sum(int(np.count_nonzero(partial[name] != full[name])) for name in partial)
+
+
+def edit(name, rng):
+    detail = main.find_viewport('main')
+    if name == 'translate':
+        main.selected_object_index = rng.randrange(len(main.drawn_objects))
+        main.handle_incoming_command({'type': 'transform', 'action': 'translate',
+                                      'x': rng.uniform(-2, 2), 'y': rng.uniform(-2, 2)})
+    elif name == 'pan':
+        main.handle_incoming_command({'type': 'viewport', 'action': 'pan', 'name': 'main',
+                                      'x': rng.choice([-1, 1]), 'y': rng.choice([-1, 1])})
+    else:
+        factor = main.VIEW_ZOOM_STEP if detail.zoom < 100.0 else 1.0 / main.VIEW_ZOOM_STEP
+        main.handle_incoming_command({'type': 'viewport', 'action': 'zoom', 'name': 'main', 'factor': factor})
+
+
+def bench(name, zoom, offscreen_size, edits, check, seed=0):
+    rng = random.Random(seed)
+    configure(name, zoom, offscreen_size)
+    layer = main.scene_layer
+    pipeline = layer.pipeline
+    frame_ms()
+
+    plans, prep_ms, objects = pipeline.stats['plans'], pipeline.stats['prep_ms'], layer.stats['objects_redrawn']
+    full_ms = full_redraw_ms()
+    plans = pipeline.stats['plans'] - plans
+    result = {
+        'config': name,
+        'viewports': len(main.viewports),
+        'full_redraw_ms': full_ms,
+        'shared_prep_ms': (pipeline.stats['prep_ms'] - prep_ms) / max(plans, 1),
+        'separate_prep_ms': separate_build_ms(),
+        'objects_built': layer.stats['objects_redrawn'] - objects,
+        'edits': [],
+        'mirror_mismatched_bytes': None
+    }
+    if check and name == 'offscreen':
+        buffers = framebuffers()
+        if buffers['main'].shape == buffers['mirror'].shape:
+            result['mirror_mismatched_bytes'] = int(np.count_nonzero(buffers['main'] != buffers['mirror']))
+
+    for kind in ('translate', 'pan', 'zoom'):
+        times, redrawn, full_redraws, wrong = [], 0, 0, 0
+        for _ in range(edits):
+            edit(kind, rng)
+            before, full_before = layer.stats['objects_redrawn'], layer.stats['full_redraws']
+            times.append(frame_ms())
+            redrawn += layer.stats['objects_redrawn'] - before
+            full_redraws += layer.stats['full_redraws'] - full_before
+            if check:
+                wrong += mismatched()
+        result['edits'].append({
+            'edit': kind,
+            'frame_ms': float(np.median(times)),
+            'objects_built': redrawn / edits,
+            'viewports_fully_redrawn': full_redraws / edits,
+            'mismatched_bytes': wrong if check else None
+        })
+    return result
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--objects', type=int, default=20000, help="objects in the scene")
+    parser.add_argument('--zoom', type=float, default=4.0, help="zoom of the main view in the overview layouts")
+    parser.add_argument('--offscreen-size', type=int, nargs=2, default=[WIDTH, HEIGHT], metavar=('W', 'H'),
+                        help="size of the offscreen targets (the window size makes 'mirror' comparable to 'main')")
+    parser.add_argument('--edits', type=int, default=5, help="edits timed per kind")
+    parser.add_argument('--clipping', action='store_true', help="enable clipping (default clip window)")
+    parser.add_argument('--pipeline', choices=['threaded', 'serial'], default='serial',
+                        help="prepare frames on the worker thread or inside display()")
+    parser.add_argument('--check', action='store_true', help="compare every viewport after each edit with a full redraw")
+    parser.add_argument('--json', action='store_true', help="print results as JSON")
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    headless_window(WIDTH, HEIGHT)
+    main.scene_layer = main.SceneLayer(threaded=args.pipeline == 'threaded')
+    main.drawn_objects.extend(scene_2d(args.objects))
+    if args.clipping:
+        main.handle_incoming_command({'type': 'clipping', 'action': 'enable'})
+
+    results = [bench(name, args.zoom, args.offscreen_size, args.edits, args.check)
+               for name in ('single', 'overview', 'offscreen')]
+
+    if args.json:
+        print(json.dumps({'objects': args.objects, 'zoom': args.zoom, 'clipping': args.clipping,
+                          'configs': results}, indent=2))
+        sys.exit(0)
+    print(f"{args.objects} objects, {WIDTH}x{HEIGHT}, zoom {args.zoom:g}, clipping {'on' if args.clipping else 'off'}, "
+          f"{args.pipeline} pipeline")
+    for row in results:
+        mirror = (f", mirror target mismatched bytes {row['mirror_mismatched_bytes']}"
+                  if row['mirror_mismatched_bytes'] is not None else "")
+        print(f"{row['config']:<10} {row['viewports']} viewport(s)  full redraw {row['full_redraw_ms']:8.1f} ms  "
+              f"prepare {row['shared_prep_ms']:7.1f} ms shared / {row['separate_prep_ms']:7.1f} ms per viewport  "
+              f"{row['objects_built']} objects built{mirror}")
+        for edit_row in row['edits']:
+            checked = f"  mismatched bytes {edit_row['mismatched_bytes']}" if args.check else ""
+            print(f"    {edit_row['edit']:<10} {edit_row['frame_ms']:8.2f} ms  {edit_row['objects_built']:8.1f} objects built  "
+                  f"{edit_row['viewports_fully_redrawn']:.1f} viewports fully redrawn{checked}")
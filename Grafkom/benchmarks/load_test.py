@@ -0,0 +1,429 @@
+#!/usr/bin/env python3
+"""
+Load test of the control servers: N simulated operators against a local
+instance, at a configurable per-client message rate.
+
+  2d  Flask panel of main.py (WebControlPanelApp + PyOpenGLCommandServer):
+      POST /api/transform (translate/rotate/scale) and /api/draw_settings
+  3d  Flask-SocketIO server of app.py: update_camera, update_transform,
+      update_lighting and update_perspective slider events, sent with an
+      ack so every event has a round-trip latency
+
+The instance runs in a child process (`load_test.py serve 2d|3d`). With
+--renderer headless (default) it renders offscreen through EGL, which works
+on a GPU-less box with Mesa llvmpipe; the 2D GLUT window calls are replaced
+by the pbuffer (swap -> glFinish). It reports its render-loop frame rate
+once a second, measured before the load (idle) and under it. With
+--renderer stub nothing is rendered and only the servers are measured.
+
+Reported per client count: throughput, latency percentiles, error rate and
+frame rate drop. The 3D clients speak Engine.IO v4 / Socket.IO v5 over a
+raw WebSocket (simple-websocket, which the threaded Flask-SocketIO server
+needs anyway), so no socketio client extras are required.
+
+Usage:
+    python load_test.py 3d --clients 1 4 16 --rate 30 --duration 10
+    python load_test.py 2d --clients 8 --rate 20 --renderer stub --json
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import socket
+import argparse
+import threading
+import subprocess
+import http.client
+
+import numpy as np
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DIR_2D = os.path.join(HERE, '..', '2D')
+DIR_3D = os.path.join(HERE, '..', '3D')
+
+WIDTH, HEIGHT = 800, 600
+
+# (weight, request) mixes; each request is built per call from a random generator
+MIX_2D = (
+    (0.3, lambda rng: ('/api/transform', {'type': 'transform', 'action': 'translate',
+                                           'x': rng.uniform(-5, 5), 'y': rng.uniform(-5, 5)})),
+    (0.2, lambda rng: ('/api/transform', {'type': 'transform', 'action': 'rotate', 'angle': rng.uniform(-10, 10)})),
+    (0.2, lambda rng: ('/api/transform', {'type': 'transform', 'action': 'scale',
+                                           'scale_x': rng.uniform(0.95, 1.05), 'scale_y': rng.uniform(0.95, 1.05)})),
+    (0.3, lambda rng: ('/api/draw_settings', {'thickness': rng.uniform(1, 10),
+                                               'color': '#%06x' % rng.randrange(0x1000000)})),
+)
+MIX_3D = (
+    (0.4, lambda rng: ('update_camera', {rng.choice(['eye_x', 'eye_y', 'eye_z']): rng.uniform(-10, 10)})),
+    (0.4, lambda rng: ('update_transform', {rng.choice(['rot_x', 'rot_y', 'rot_z']): rng.uniform(0, 360),
+                                            'scale': rng.uniform(0.5, 2.0)})),
+    (0.1, lambda rng: ('update_lighting', {'light_x': rng.uniform(-5, 5), 'light_y': rng.uniform(2, 8)})),
+    (0.1, lambda rng: ('update_perspective', {'fov': rng.uniform(30, 90)})),
+)
+
+
+def pick(mix, rng):
+    value = rng.random()
+    for weight, build in mix:
+        value -= weight
+        if value <= 0:
+            return build(rng)
+    return mix[-1][1](rng)
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def wait_for_port(port, timeout=30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=0.5).close()
+            return True
+        except OSError:
+            time.sleep(0.05)
+    return False
+
+
+# --- Instance under test (child process) -------------------------------------
+
+def report(**values):
+    print(json.dumps(values), flush=True)
+
+
+def report_fps(frames):
+    """Print the frame rate once a second; frames() is the number of frames rendered so far"""
+    last_frames, last_time = frames(), time.monotonic()
+    while True:
+        time.sleep(1.0)
+        now_frames, now = frames(), time.monotonic()
+        report(fps=(now_frames - last_frames) / (now - last_time))
+        last_frames, last_time = now_frames, now
+
+
+def serve_3d(port, renderer_mode):
+    if renderer_mode == 'headless':
+        os.environ['GRAFKOM_HEADLESS'] = '1'
+    sys.path.insert(0, DIR_3D)
+    import app
+
+    if renderer_mode == 'headless':
+        threading.Thread(target=app.renderer.run, daemon=True).start()
+        while app.renderer.frame_index == 0:
+            time.sleep(0.05)
+        threading.Thread(target=report_fps, args=(lambda: app.renderer.frame_index,), daemon=True).start()
+    threading.Thread(target=lambda: app.socketio.run(app.app, host='127.0.0.1', port=port, debug=False,
+                                                     allow_unsafe_werkzeug=True), daemon=True).start()
+    wait_for_port(port)
+    report(ready=True)
+    threading.Event().wait()
+
+
+def serve_2d(port, renderer_mode):
+    sys.path.insert(0, DIR_2D)
+    if renderer_mode == 'headless':
+        os.environ['GRAFKOM_HEADLESS'] = '1'
+        sys.path.insert(0, DIR_3D)
+        from app import OffscreenContext
+    import main
+    import logging
+    # Every command is logged at INFO; that would dominate the measurement
+    logging.getLogger().setLevel(logging.WARNING)
+
+    # A scene to render and a selected object for the transforms
+    rng = random.Random(0)
+    for i in range(60):
+        kind = (main.DRAW_MODE_LINE, main.DRAW_MODE_TRIANGLE, main.DRAW_MODE_ELLIPSE, main.DRAW_MODE_RECTANGLE)[i % 4]
+        # Lines and rectangles take two points, triangles three
+        count = 3 if kind == main.DRAW_MODE_TRIANGLE else 2
+        points = [[rng.uniform(-0.9, 0.9), rng.uniform(-0.9, 0.9)] for _ in range(count)]
+        if kind == main.DRAW_MODE_ELLIPSE:
+            points = [points[0], [rng.uniform(0.05, 0.3), rng.uniform(0.05, 0.3)]]
+        main.drawn_objects.append({'type': kind, 'points': points, 'color': [rng.random(), rng.random(), rng.random()],
+                                   'thickness': 2.0, 'transformations': {}})
+    main.selected_object_index = 0
+    main.clipping_enabled = True
+
+    command_port = free_port()
+    server = main.PyOpenGLCommandServer('127.0.0.1', command_port, main.handle_incoming_command)
+    server.start()
+    wait_for_port(command_port)
+    panel = main.WebControlPanelApp('127.0.0.1', port, '127.0.0.1', command_port)
+    threading.Thread(target=lambda: panel.app.run(host='127.0.0.1', port=port, debug=False, use_reloader=False,
+                                                  threaded=True), daemon=True).start()
+    wait_for_port(port)
+
+    if renderer_mode == 'headless':
+        frames = [0]
+
+        def render_loop():
+            # The GLUT loop: display() then idle(), redrawing continuously
+            OffscreenContext(WIDTH, HEIGHT)
+            main.glutSwapBuffers = main.glFinish
+            main.glutGet = lambda what: WIDTH if what == main.GLUT_WINDOW_WIDTH else HEIGHT
+            main.glutPostRedisplay = lambda: None
+            main.glClearColor(0.2, 0.2, 0.2, 1.0)
+            while True:
+                main.display()
+                frames[0] += 1
+                main.idle()
+
+        threading.Thread(target=render_loop, daemon=True).start()
+        while frames[0] == 0:
+            time.sleep(0.05)
+        threading.Thread(target=report_fps, args=(lambda: frames[0],), daemon=True).start()
+    report(ready=True)
+    threading.Event().wait()
+
+
+class Instance:
+    """Child process running `serve`; collects the frame rate samples it prints"""
+
+    def __init__(self, target, renderer_mode):
+        self.port = free_port()
+        self.fps = []
+        self.process = subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), 'serve', target, '--port', str(self.port),
+             '--renderer', renderer_mode],
+            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True,
+            cwd=DIR_2D if target == '2d' else DIR_3D)
+        self.ready = threading.Event()
+        threading.Thread(target=self._read, daemon=True).start()
+        if not self.ready.wait(60):
+            self.stop()
+            raise RuntimeError(f"{target} instance did not start")
+
+    def _read(self):
+        for line in self.process.stdout:
+            try:
+                message = json.loads(line)
+            except ValueError:
+                continue
+            if message.get('ready'):
+                self.ready.set()
+            if 'fps' in message:
+                self.fps.append((time.monotonic(), message['fps']))
+
+    def fps_between(self, start, end):
+        samples = [fps for at, fps in self.fps if start + 1.0 <= at <= end]
+        return float(np.mean(samples)) if samples else None
+
+    def stop(self):
+        self.process.terminate()
+        try:
+            self.process.wait(5)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+
+
+# --- Clients ------------------------------------------------------------------
+
+class Stats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = []
+        self.errors = 0
+        self.sent = 0
+
+    def record(self, latency=None, error=False):
+        with self.lock:
+            self.sent += 1
+            if error:
+                self.errors += 1
+            else:
+                self.latencies.append(latency)
+
+
+def paced(rate, duration, stop):
+    """Yields at rate per second for duration seconds (catching up without bursts past one tick)"""
+    interval = 1.0 / rate
+    next_time = time.monotonic()
+    end = next_time + duration
+    while not stop.is_set():
+        now = time.monotonic()
+        if now >= end:
+            return
+        if now < next_time:
+            time.sleep(next_time - now)
+        next_time = max(next_time + interval, time.monotonic() - interval)
+        yield
+
+
+def client_2d(port, rate, duration, stats, seed, stop):
+    rng = random.Random(seed)
+    for _ in paced(rate, duration, stop):
+        path, body = pick(MIX_2D, rng)
+        start = time.perf_counter()
+        try:
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+            connection.request('POST', path, json.dumps(body), {'Content-Type': 'application/json'})
+            response = connection.getresponse()
+            payload = json.loads(response.read())
+            connection.close()
+            ok = response.status == 200 and payload.get('status') == 'success'
+            stats.record(time.perf_counter() - start, error=not ok)
+        except (OSError, ValueError):
+            stats.record(error=True)
+
+
+class SocketIOClient:
+    """Minimal Socket.IO client over a WebSocket: emit with ack, answer pings"""
+
+    def __init__(self, port):
+        import simple_websocket
+        self.ws = simple_websocket.Client(f"ws://127.0.0.1:{port}/socket.io/?EIO=4&transport=websocket")
+        self.ws.receive(timeout=10)  # Engine.IO open packet
+        self.ws.send('40')  # Socket.IO connect
+        self.pending = {}
+        self.lock = threading.Lock()
+        self.next_id = 0
+        self.closed = False
+        self.connected = threading.Event()
+        threading.Thread(target=self._read, daemon=True).start()
+        if not self.connected.wait(10):
+            raise ConnectionError("no Socket.IO connect reply")
+
+    def _read(self):
+        while not self.closed:
+            try:
+                message = self.ws.receive(timeout=1)
+            except Exception:
+                break
+            if message is None or not isinstance(message, str):
+                continue
+            if message == '2':
+                self.ws.send('3')
+            elif message.startswith('40'):
+                self.connected.set()
+            elif message.startswith('43'):
+                ack_id = int(message[2:message.index('[')])
+                with self.lock:
+                    entry = self.pending.pop(ack_id, None)
+                if entry:
+                    entry[1].append(time.perf_counter() - entry[0])
+                    entry[2].set()
+
+    def call(self, event, data, timeout=10.0):
+        """Round-trip seconds of an event, None on timeout"""
+        with self.lock:
+            ack_id = self.next_id
+            self.next_id += 1
+            entry = (time.perf_counter(), [], threading.Event())
+            self.pending[ack_id] = entry
+        self.ws.send(f"42{ack_id}" + json.dumps([event, data]))
+        if not entry[2].wait(timeout):
+            with self.lock:
+                self.pending.pop(ack_id, None)
+            return None
+        return entry[1][0]
+
+    def close(self):
+        self.closed = True
+        try:
+            self.ws.close()
+        except Exception:
+            pass
+
+
+def client_3d(port, rate, duration, stats, seed, stop):
+    rng = random.Random(seed)
+    try:
+        client = SocketIOClient(port)
+    except Exception:
+        stats.record(error=True)
+        return
+    try:
+        for _ in paced(rate, duration, stop):
+            event, data = pick(MIX_3D, rng)
+            try:
+                latency = client.call(event, data)
+            except Exception:
+                latency = None
+            stats.record(latency, error=latency is None)
+    finally:
+        client.close()
+
+
+def run_load(target, instance, clients, rate, duration, idle_seconds):
+    """One load step: idle frame rate, then `clients` clients for `duration` seconds"""
+    idle_start = time.monotonic()
+    time.sleep(idle_seconds)
+    idle_end = time.monotonic()
+
+    stats = Stats()
+    stop = threading.Event()
+    function = client_2d if target == '2d' else client_3d
+    threads = [threading.Thread(target=function, args=(instance.port, rate, duration, stats, seed, stop), daemon=True)
+               for seed in range(clients)]
+    start = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(duration + 30)
+    stop.set()
+    end = time.monotonic()
+
+    latencies = np.array(stats.latencies) * 1000.0
+    idle_fps = instance.fps_between(idle_start, idle_end)
+    load_fps = instance.fps_between(start, start + duration)
+    return {
+        'target': target,
+        'clients': clients,
+        'rate_per_client': rate,
+        'offered_per_second': clients * rate,
+        'sent': stats.sent,
+        'throughput_per_second': len(latencies) / (end - start),
+        'error_rate': stats.errors / stats.sent if stats.sent else 0.0,
+        'latency_ms': {name: float(np.percentile(latencies, q)) if len(latencies) else None
+                       for name, q in (('p50', 50), ('p90', 90), ('p99', 99), ('max', 100))},
+        'idle_fps': idle_fps,
+        'load_fps': load_fps,
+        'fps_drop': (1.0 - load_fps / idle_fps) if idle_fps and load_fps is not None else None
+    }
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == 'serve':
+        parser = argparse.ArgumentParser(prog='load_test.py serve')
+        parser.add_argument('target', choices=['2d', '3d'])
+        parser.add_argument('--port', type=int, required=True)
+        parser.add_argument('--renderer', choices=['headless', 'stub'], default='headless')
+        args = parser.parse_args(sys.argv[2:])
+        (serve_2d if args.target == '2d' else serve_3d)(args.port, args.renderer)
+        sys.exit(0)
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('target', choices=['2d', '3d'])
+    parser.add_argument('--clients', type=int, nargs='+', default=[1, 4, 16], help="client counts, one step each")
+    parser.add_argument('--rate', type=float, default=20.0, help="messages per second per client")
+    parser.add_argument('--duration', type=float, default=10.0, help="seconds of load per step")
+    parser.add_argument('--idle', type=float, default=3.0, help="seconds of idle frame rate before each step")
+    parser.add_argument('--renderer', choices=['headless', 'stub'], default='headless')
+    parser.add_argument('--json', action='store_true', help="print results as JSON")
+    args = parser.parse_args()
+
+    instance = Instance(args.target, args.renderer)
+    results = []
+    try:
+        for clients in args.clients:
+            result = run_load(args.target, instance, clients, args.rate, args.duration, args.idle)
+            results.append(result)
+            if not args.json:
+                latency = result['latency_ms']
+                fps = (f"fps {result['idle_fps']:5.1f} -> {result['load_fps']:5.1f} ({result['fps_drop']:+.0%} drop)"
+                       if result['fps_drop'] is not None else "fps n/a")
+                percentiles = (f"p50 {latency['p50']:7.2f}  p90 {latency['p90']:7.2f}  p99 {latency['p99']:7.2f} ms"
+                               if latency['p50'] is not None else "no replies")
+                print(f"{args.target} {clients:>3} clients x {args.rate:g}/s  "
+                      f"{result['throughput_per_second']:7.1f} msg/s  {percentiles}  "
+                      f"errors {result['error_rate']:.1%}  {fps}", flush=True)
+    finally:
+        instance.stop()
+
+    if args.json:
+        print(json.dumps(results, indent=2))
@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+"""
+Microbenchmarks of the graphics kernels, with stored baselines.
+
+Every kernel runs headless (no window or GL context) on synthetic data in
+three size tiers:
+
+  apply_object_transform   2D main.apply_object_transform_to_point, per point
+  points_inside            2D scene_geometry.points_inside, one batch of points
+  clip_segments            2D scene_geometry.clip_segments (Cyrus-Beck), one batch of lines
+  clip_polygons            2D scene_geometry.clip_polygons (Sutherland-Hodgman), 100 polygons
+  ellipse_outline          2D main.draw_ellipse(filled=False) tessellation
+  load_obj_file            3D OBJ parse + import stage (read_obj_model, uncached)
+  face_normals             3D app.compute_face_normals (flat-shaded OBJ normals)
+
+The clipping kernels clip against a convex hexagon (REGION).
+
+The time of a kernel is the best of several runs of its whole batch. It is
+compared as the median, over those runs, of its ratio to a fixed calibration
+workload (pure Python and NumPy) timed right after each run, so that
+baselines survive a machine that runs slower or faster overall, or drifts
+during the run. A batch shorter than
+--min-batch-seconds (default 10 ms) is repeated within each timed run until
+the run reaches it, and the per-batch time is the run divided by the repeats:
+sub-millisecond batches would otherwise be dominated by timer and scheduler
+noise. A kernel whose normalized time exceeds its baseline by more than
+--threshold (relative, default 0.25) is a regression, and the
+run exits with status 1. Different CPUs still shift the relative cost of
+kernels; re-record the baseline (--update-baseline) on the machine that runs
+the comparisons.
+
+Usage:
+    python microbench.py
+    python microbench.py --tiers small medium --threshold 0.1 --json
+    python microbench.py --kernels clip_segments face_normals --update-baseline
+"""
+
+import os
+import sys
+import json
+import time
+import math
+import argparse
+import statistics
+import platform
+import tempfile
+import logging
+import contextlib
+
+import numpy as np
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..', '3D'))
+sys.path.insert(0, os.path.join(HERE, '..', '2D'))
+os.environ.setdefault('GRAFKOM_HEADLESS', '1')
+
+import app
+import main as app2d
+import scene_geometry
+from synthetic import torus_for_triangles, write_obj
+
+DEFAULT_BASELINE = os.path.join(HERE, 'baseline.json')
+TIERS = ('small', 'medium', 'large')
+
+# Problem size per kernel and tier
+SIZES = {
+    'apply_object_transform': {'small': 1000, 'medium': 10000, 'large': 100000},
+    'points_inside': {'small': 1000, 'medium': 10000, 'large': 100000},
+    'clip_segments': {'small': 1000, 'medium': 10000, 'large': 100000},
+    'clip_polygons': {'small': 8, 'medium': 64, 'large': 512},
+    'ellipse_outline': {'small': 100, 'medium': 1000, 'large': 10000},
+    'load_obj_file': {'small': 10000, 'medium': 100000, 'large': 1000000},
+    'face_normals': {'small': 10000, 'medium': 100000, 'large': 1000000},
+}
+UNITS = {
+    'apply_object_transform': 'points',
+    'points_inside': 'points',
+    'clip_segments': 'lines',
+    'clip_polygons': 'vertices per polygon',
+    'ellipse_outline': 'segments',
+    'load_obj_file': 'triangles',
+    'face_normals': 'triangles',
+}
+
+REGION = scene_geometry.ClipRegion([[0.8 * math.cos(angle), 0.8 * math.sin(angle)]
+                                     for angle in np.linspace(0.0, 2.0 * math.pi, 7)[:-1]])
+TRANSFORMATIONS = {'translate': [0.1, -0.2], 'rotate': 30.0, 'scale': [1.5, 0.75]}
+POLYGONS = 100
+ELLIPSES = 10
+
+
+def random_points(count, seed=0):
+    """Points in [-1.5, 1.5]^2 (most of them outside REGION)"""
+    return np.random.default_rng(seed).uniform(-1.5, 1.5, size=(count, 2)).tolist()
+
+
+def star_polygon(vertices, rng):
+    """Star-shaped polygon around a random center, crossing the region edges"""
+    center = rng.uniform(-0.5, 0.5, size=2)
+    angles = np.sort(rng.uniform(0.0, 2.0 * math.pi, size=vertices))
+    radii = rng.uniform(0.3, 1.2, size=vertices)
+    return (center + np.stack([np.cos(angles), np.sin(angles)], axis=1) * radii[:, None]).tolist()
+
+
+def prepare(kernel, size, workdir):
+    """Synthetic input of a kernel; returns the function that runs one batch"""
+    if kernel == 'apply_object_transform':
+        points = random_points(size)
+        return lambda: [app2d.apply_object_transform_to_point(point, TRANSFORMATIONS) for point in points]
+
+    if kernel == 'points_inside':
+        points = np.array(random_points(size))
+        return lambda: scene_geometry.points_inside(points, REGION)
+
+    if kernel == 'clip_segments':
+        points = np.array(random_points(2 * size))
+        return lambda: scene_geometry.clip_segments(points[0::2], points[1::2], REGION)
+
+    if kernel == 'clip_polygons':
+        rng = np.random.default_rng(0)
+        polygons = np.array([star_polygon(size, rng) for _ in range(POLYGONS)])
+        counts = np.full(POLYGONS, size)
+        return lambda: scene_geometry.clip_polygons(polygons, counts, REGION)
+
+    if kernel == 'ellipse_outline':
+        return lambda: [app2d.draw_ellipse(0.1 * i, 0.0, 0.5, 0.3, [1.0, 1.0, 0.0], segments=size, filled=False)
+                        for i in range(ELLIPSES)]
+
+    if kernel == 'load_obj_file':
+        path = os.path.join(workdir, f"torus_{size}.obj")
+        vertices, faces = torus_for_triangles(size)
+        write_obj(path, vertices, faces)
+        renderer = app.OpenGLRenderer()
+        # Every run parses the file again instead of hitting the model cache
+        renderer.model_cache.set_budget(0)
+        return lambda: renderer.read_obj_model(path)
+
+    if kernel == 'face_normals':
+        vertices, faces = torus_for_triangles(size)
+        return lambda: app.compute_face_normals(vertices, faces)
+
+    raise ValueError(f"unknown kernel {kernel}")
+
+
+def repeats_for(run, min_batch_seconds):
+    """Times run has to be repeated to take at least min_batch_seconds (doubling from 1)"""
+    repeats = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(repeats):
+            run()
+        if time.perf_counter() - start >= min_batch_seconds:
+            return repeats
+        repeats *= 2
+
+
+def measure(workloads, min_seconds=0.5, max_runs=20, min_batch_seconds=0.01):
+    """
+    Seconds per batch of each workload in every round, timed round-robin so
+    that a round sees one machine state: after the warm-up (which also picks
+    the repeats per timed run), at least 3 rounds (or until the first workload
+    has min_seconds). Returns ([[seconds per batch per round]], [repeats per run]).
+    """
+    repeats = [repeats_for(run, min_batch_seconds) for run in workloads]
+    times = [[] for _ in workloads]
+    total = 0.0
+    while len(times[0]) < 3 or (total < min_seconds and len(times[0]) < max_runs):
+        for index, run in enumerate(workloads):
+            start = time.perf_counter()
+            for _ in range(repeats[index]):
+                run()
+            seconds = time.perf_counter() - start
+            times[index].append(seconds / repeats[index])
+            if index == 0:
+                total += seconds
+    return times, repeats
+
+
+def calibration_workload():
+    """Fixed mix of interpreter-bound and NumPy-bound work, like the kernels"""
+    total = 0.0
+    for i in range(100000):
+        total += math.sin(i * 0.001) * 0.5
+    data = np.arange(300000, dtype=np.float32).reshape(-1, 3)
+    np.cross(data[1:], data[:-1]).sum()
+    return total
+
+
+def calibrate():
+    (times,), _ = measure([calibration_workload], min_seconds=0.3)
+    return min(times)
+
+
+def load_baseline(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as file:
+        return json.load(file).get('results', {})
+
+
+def machine_info():
+    return {
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'machine': platform.machine(),
+        'processor': platform.processor() or platform.machine(),
+        'system': platform.system()
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--kernels', nargs='+', choices=list(SIZES), default=list(SIZES))
+    parser.add_argument('--tiers', nargs='+', choices=TIERS, default=list(TIERS))
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help="baseline JSON file")
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help="allowed slowdown over the baseline (0.25 = 25%%)")
+    parser.add_argument('--update-baseline', action='store_true',
+                        help="store these results as the baseline (merged into the file)")
+    parser.add_argument('--min-seconds', type=float, default=0.5, help="minimum timed seconds per kernel and tier")
+    parser.add_argument('--min-batch-seconds', type=float, default=0.01,
+                        help="repeat shorter batches within a timed run until it takes this long")
+    parser.add_argument('--json', action='store_true', help="print results as JSON")
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    baseline = load_baseline(args.baseline)
+    calibration = calibrate()
+    if not args.json:
+        print(f"calibration {calibration * 1000.0:.3f} ms")
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for kernel in args.kernels:
+            for tier in args.tiers:
+                size = SIZES[kernel][tier]
+                # Kernels may print (the OBJ import reports its optimization); keep stdout for results
+                with contextlib.redirect_stdout(sys.stderr):
+                    (times, calibrations), (repeats, _) = measure(
+                        [prepare(kernel, size, workdir), calibration_workload], args.min_seconds,
+                        min_batch_seconds=args.min_batch_seconds)
+                seconds = min(times)
+                normalized = statistics.median(kernel / reference for kernel, reference in zip(times, calibrations))
+                key = f"{kernel}/{tier}"
+                reference = baseline.get(key, {}).get('normalized')
+                change = normalized / reference - 1.0 if reference else None
+                result = {
+                    'kernel': kernel,
+                    'tier': tier,
+                    'size': size,
+                    'unit': UNITS[kernel],
+                    'seconds': seconds,
+                    'normalized': normalized,
+                    'calibration_seconds': min(calibrations),
+                    'runs': len(times),
+                    'repeats': repeats,
+                    'baseline_normalized': reference,
+                    'change': change,
+                    'regressed': change is not None and change > args.threshold
+                }
+                results.append(result)
+                if not args.json:
+                    compared = (f"{change:+7.1%} vs baseline{'  REGRESSION' if result['regressed'] else ''}"
+                                if change is not None else "no baseline")
+                    print(f"{kernel:<24} {tier:<6} {size:>8} {UNITS[kernel]:<20} "
+                          f"{seconds * 1000.0:10.3f} ms  {compared}", flush=True)
+
+    regressions = [f"{result['kernel']}/{result['tier']}" for result in results if result['regressed']]
+
+    if args.update_baseline:
+        stored = load_baseline(args.baseline)
+        stored.update({f"{result['kernel']}/{result['tier']}": {
+            'size': result['size'], 'seconds': result['seconds'], 'normalized': result['normalized']}
+            for result in results})
+        with open(args.baseline, 'w') as file:
+            json.dump({'machine': machine_info(), 'calibration_seconds': calibration,
+                       'results': dict(sorted(stored.items()))}, file, indent=2)
+            file.write('\n')
+
+    if args.json:
+        print(json.dumps({
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'machine': machine_info(),
+            'calibration_seconds': calibration,
+            'threshold': args.threshold,
+            'results': results,
+            'regressions': regressions
+        }, indent=2))
+    elif regressions:
+        print(f"\n{len(regressions)} regression(s) beyond {args.threshold:.0%}: {', '.join(regressions)}")
+
+    sys.exit(1 if regressions and not args.update_baseline else 0)
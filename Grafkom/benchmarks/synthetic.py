@@ -0,0 +1,140 @@
+"""
+Synthetic datasets shared by the benchmark scripts.
+"""
+
+import numpy as np
+
+
+def torus_mesh(rings=400, sides=200, major_radius=1.5, minor_radius=0.5):
+    """Closed torus: rings * sides vertices and 2 * rings * sides triangles"""
+    u = np.linspace(0.0, 2.0 * np.pi, rings, endpoint=False)[:, None]
+    v = np.linspace(0.0, 2.0 * np.pi, sides, endpoint=False)[None, :]
+    vertices = np.stack([
+        (major_radius + minor_radius * np.cos(v)) * np.cos(u),
+        minor_radius * np.sin(v) * np.ones_like(u),
+        (major_radius + minor_radius * np.cos(v)) * np.sin(u)
+    ], axis=-1).reshape(-1, 3).astype(np.float32)
+
+    i, j = np.meshgrid(np.arange(rings), np.arange(sides), indexing='ij')
+    a = i * sides + j
+    b = ((i + 1) % rings) * sides + j
+    c = ((i + 1) % rings) * sides + (j + 1) % sides
+    d = i * sides + (j + 1) % sides
+    faces = np.concatenate([
+        np.stack([a, d, c], axis=-1).reshape(-1, 3),
+        np.stack([a, c, b], axis=-1).reshape(-1, 3)
+    ]).astype(np.int64)
+    return vertices, faces
+
+
+def torus_for_triangles(triangles):
+    """Torus with roughly the requested triangle count (2:1 ring/side ratio)"""
+    sides = max(3, int(np.sqrt(triangles / 4.0)))
+    return torus_mesh(rings=2 * sides, sides=sides)
+
+
+def write_obj(path, vertices, faces):
+    """Write a mesh as a plain OBJ file (1-based indices)"""
+    with open(path, 'w') as file:
+        np.savetxt(file, vertices, fmt='v %.6f %.6f %.6f')
+        np.savetxt(file, np.asarray(faces) + 1, fmt='f %d %d %d')
+
+
+def write_stl(path, vertices, faces):
+    """Write a mesh as a binary STL file (zero facet normals)"""
+    record = np.dtype([('normal', '<f4', (3,)), ('vertices', '<f4', (3, 3)), ('attribute', '<u2')])
+    records = np.zeros(len(faces), dtype=record)
+    records['vertices'] = np.asarray(vertices, dtype=np.float32)[faces]
+    with open(path, 'wb') as file:
+        file.write(b'synthetic'.ljust(80, b' '))
+        file.write(np.uint32(len(faces)).tobytes())
+        file.write(records.tobytes())
+
+
+def write_ply(path, vertices, faces):
+    """Write a mesh as a binary little-endian PLY file"""
+    vertices = np.asarray(vertices, dtype='<f4')
+    face_records = np.zeros(len(faces), dtype=[('count', 'u1'), ('indices', '<i4', (3,))])
+    face_records['count'] = 3
+    face_records['indices'] = faces
+    header = (f"ply\nformat binary_little_endian 1.0\n"
+              f"element vertex {len(vertices)}\nproperty float x\nproperty float y\nproperty float z\n"
+              f"element face {len(faces)}\nproperty list uchar int vertex_indices\nend_header\n")
+    with open(path, 'wb') as file:
+        file.write(header.encode('ascii'))
+        file.write(vertices.tobytes())
+        file.write(face_records.tobytes())
+
+
+def scene_2d(count, seed=0, size=0.05, kinds=(1, 2, 3, 4, 5)):
+    """
+    2D scene of count small objects in the main.py drawn_objects format, cycling
+    through kinds (DRAW_MODE_POINT .. DRAW_MODE_RECTANGLE), spread over [-0.95, 0.95]^2
+    """
+    rng = np.random.default_rng(seed)
+    centers = rng.uniform(-0.95, 0.95, size=(count, 2))
+    offsets = rng.uniform(-size, size, size=(count, 3, 2))
+    radii = rng.uniform(size / 5.0, size, size=(count, 2))
+    colors = rng.uniform(0.0, 1.0, size=(count, 3))
+    thickness = rng.choice([1.0, 2.0, 4.0], size=count)
+    objects = []
+    for i in range(count):
+        kind = kinds[i % len(kinds)]
+        points = (centers[i] + offsets[i]).tolist()
+        if kind == 1:
+            points = points[:1]
+        elif kind in (2, 5):
+            points = points[:2]
+        elif kind == 4:
+            points = [centers[i].tolist(), radii[i].tolist()]
+        objects.append({'type': kind, 'points': points, 'color': colors[i].tolist(),
+                        'thickness': float(thickness[i]), 'transformations': {}})
+    return objects
+
+
+def outline_2d(vertices, seed=0, center=(0.0, 0.0), radius=0.5, roughness=0.35):
+    """
+    Closed concave outline of vertices points around center, like a coastline: the
+    radius varies with a few harmonics plus per-vertex noise. The angle increases
+    monotonically, so the polygon is simple (star-shaped around center).
+    """
+    rng = np.random.default_rng(seed)
+    angles = np.linspace(0.0, 2.0 * np.pi, vertices, endpoint=False)
+    scale = np.ones(vertices)
+    for harmonic in range(3, 13):
+        scale += roughness / harmonic * np.sin(harmonic * angles + rng.uniform(0.0, 2.0 * np.pi))
+    scale += rng.uniform(-roughness / 4.0, roughness / 4.0, size=vertices)
+    scale = radius * np.clip(scale, 0.2, None) / np.clip(scale, 0.2, None).max()
+    return np.stack([center[0] + scale * np.cos(angles), center[1] + scale * np.sin(angles)], axis=1)
+
+
+def shapes_2d(count, vertices, seed=0, kinds=(7, 8)):
+    """
+    count outlines of vertices points each in the main.py drawn_objects format,
+    alternating kinds (DRAW_MODE_POLYGON, DRAW_MODE_POLYLINE; a polyline is the
+    open outline), spread over [-0.8, 0.8]^2
+    """
+    rng = np.random.default_rng(seed)
+    objects = []
+    for i in range(count):
+        outline = outline_2d(vertices, seed=seed + i, center=rng.uniform(-0.8, 0.8, size=2),
+                             radius=float(rng.uniform(0.05, 0.3)))
+        objects.append({'type': kinds[i % len(kinds)], 'points': outline.tolist(),
+                        'color': rng.uniform(0.0, 1.0, size=3).tolist(),
+                        'thickness': float(rng.choice([1.0, 2.0])), 'transformations': {}})
+    return objects
+
+
+def clip_regions_2d(count, sides=6, seed=0, radius=0.3):
+    """
+    count convex clip regions (regular polygons with sides corners, randomly rotated)
+    spread over [-0.7, 0.7]^2, as vertex lists for the 2D 'set_regions' command
+    """
+    rng = np.random.default_rng(seed)
+    angles = np.linspace(0.0, 2.0 * np.pi, sides, endpoint=False)
+    regions = []
+    for _ in range(count):
+        center = rng.uniform(-0.7, 0.7, size=2)
+        rotated = angles + rng.uniform(0.0, 2.0 * np.pi)
+        regions.append((center + radius * np.stack([np.cos(rotated), np.sin(rotated)], axis=1)).tolist())
+    return regions